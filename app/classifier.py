@@ -0,0 +1,148 @@
+# app/classifier.py
+"""
+Plan de clasificación precompilado para filas de log.
+
+Reúne en un solo objeto lo que antes se hacía en varias pasadas sueltas:
+
+  - detección de nivel: ERROR, o INFO con payload {"error": ...}
+  - controlado / no controlado: palabras clave (KEYWORDS_NO_CONTROLADO)
+  - punto de corte de la firma: _CUT_TOKENS + fin del SQLSTATE[...]
+
+Al construirse, el plan deja listas solo las búsquedas necesarias:
+  - palabras clave en minúsculas y sin redundantes ("pdoexception" ya
+    implica "exception", no hace falta buscarla)
+  - el contenido se pasa a minúsculas a lo sumo una vez por fila, y solo si
+    las grafías habituales ("SQLSTATE", "Exception", '"error":') no aparecen
+  - los tokens de corte y el SQLSTATE van en una sola regex sensible a
+    mayúsculas: el primer match es el corte (una pasada, sin recortar copias)
+
+Nota: las palabras clave y los marcadores "error": NO van en esa regex. Son
+sin distinción de mayúsculas y, con el `re` de CPython, meterlos en la misma
+alternación (?i:...) la hace varias veces más lenta que `in`, que corre en C.
+Ver el benchmark en test/test_classifier.py.
+"""
+from __future__ import annotations
+
+import re
+from typing import Iterable, Optional, Tuple
+
+# Tokens a partir de los cuales ya no nos importa el resto del mensaje
+CUT_TOKENS: Tuple[str, ...] = (
+    "[stacktrace]",
+    '{"Request :',
+    "Accept:",
+    "Host:",
+    "User-Agent:",
+)
+
+SQLSTATE_RE = re.compile(r"(SQLSTATE\[[0-9A-Z]+\])")
+
+# Formas en que aparece "error": dentro del payload de un INFO
+ERROR_MARKERS: Tuple[str, ...] = (
+    '"error":',
+    '&quot;error&quot;:',
+    '\\"error\\":',
+)
+
+
+def _sin_redundantes(palabras: Iterable[str]) -> Tuple[str, ...]:
+    """Minúsculas, sin duplicados y sin las que contienen a otra de la lista."""
+    unicas = list(dict.fromkeys(p.lower() for p in palabras if p))
+    return tuple(
+        p for p in unicas
+        if not any(q != p and q in p for q in unicas)
+    )
+
+
+class ClassificationPlan:
+    """
+    Clasificador + cortador de firmas compilado una vez y reutilizado por fila.
+
+    Args:
+        keywords: palabras que marcan un error como NO controlado
+        cut_tokens: tokens donde se corta la firma (el orden no importa: gana
+                    la primera aparición en el texto)
+        error_markers: formas de "error": que convierten un INFO en error
+    """
+
+    def __init__(
+        self,
+        keywords: Iterable[str] = (),
+        cut_tokens: Iterable[str] = CUT_TOKENS,
+        error_markers: Iterable[str] = ERROR_MARKERS,
+        sqlstate_re: re.Pattern = SQLSTATE_RE,
+    ):
+        self.keywords = _sin_redundantes(keywords)
+        # Grafías habituales ("SQLSTATE", "PDOException"): si aparece alguna tal
+        # cual, no hace falta pasar a minúsculas todo el contenido (stacktraces
+        # de varios KB). Si no aparece ninguna, se busca en minúsculas.
+        self._keywords_tal_cual = tuple(dict.fromkeys(
+            v for k in self.keywords for v in (k.upper(), k.capitalize(), k)
+        ))
+        self.cut_tokens = tuple(t for t in cut_tokens if t)
+        self.error_markers = tuple(m.lower() for m in error_markers)
+
+        # Corte de firma: una sola regex (tokens primero, luego SQLSTATE); el
+        # primer match es el corte. Si gana un SQLSTATE, se revisa que ningún
+        # token empiece dentro de él (la versión anterior cortaba ahí primero).
+        tokens = "|".join(re.escape(t) for t in self.cut_tokens)
+        sql = f"(?P<sql>{sqlstate_re.pattern})"
+        self._cut_search = re.compile(f"{tokens}|{sql}" if tokens else sql).search
+        self._token_search = re.compile(tokens).search if tokens else None
+        self._max_token = max((len(t) for t in self.cut_tokens), default=0)
+
+    def _tiene_keyword(self, texto: str, lower: Optional[str]) -> bool:
+        for v in self._keywords_tal_cual:
+            if v in texto:
+                return True
+        if lower is None:
+            lower = texto.lower()
+        for k in self.keywords:
+            if k in lower:
+                return True
+        return False
+
+    def is_no_controlado(self, texto: str) -> bool:
+        return self._tiene_keyword(texto, None)
+
+    def classify(self, level: str, content: str) -> Optional[bool]:
+        """
+        None si la fila no es un error (ni ERROR ni INFO con "error":);
+        True si es un error NO controlado; False si es controlado.
+        """
+        level_lower = level.lower()
+        content_lower = None
+        if level_lower == "info":
+            for marker in self.error_markers:
+                if marker in content:
+                    break
+            else:
+                content_lower = content.lower()
+                for marker in self.error_markers:
+                    if marker in content_lower:
+                        break
+                else:
+                    return None
+        elif level_lower != "error":
+            return None
+
+        return self._tiene_keyword(content, content_lower)
+
+    def cut_index(self, line: str) -> int:
+        """
+        Posición donde termina la parte estable del mensaje: antes del primer
+        token de corte, o al final del primer SQLSTATE[...] anterior a él.
+        """
+        m = self._cut_search(line)
+        if m is None:
+            return len(line)
+        if m.group("sql") is None:
+            return m.start()
+        if self._token_search is not None:
+            t = self._token_search(line, m.start() + 1, m.end() + self._max_token - 1)
+            if t is not None and t.start() < m.end():
+                return t.start()
+        return m.end()
+
+    def signature(self, line: str) -> str:
+        return line[: self.cut_index(line)].strip()
@@ -1,17 +1,21 @@
 # app/error_filter.py
+from contextlib import contextmanager
 from datetime import date
-from typing import List, Tuple
+from typing import Dict, List, Tuple, TypeVar
 
-from db import get_alerted_signatures, add_alerted_signatures
+from db import get_alerted_signatures, add_alerted_signatures, remove_alerted_signatures
+from .log_entry import LogEntry
 from .signatures import build_signature
 
+Linea = TypeVar("Linea", LogEntry, str)
+
 
 def dividir_nuevos_y_avisados(
-    lineas: List[str],
+    lineas: List[Linea],
     app_key: str,
     dia: date,
     tipo: str,  # 'controlado' o 'no_controlado'
-) -> Tuple[List[str], List[str]]:
+) -> Tuple[List[Linea], List[Linea]]:
     """
     Separa las líneas en:
       - nuevas: nunca avisadas antes en el día
@@ -21,12 +25,13 @@ def dividir_nuevos_y_avisados(
     """
     ya_avisadas = get_alerted_signatures(app_key, dia, tipo)
 
-    nuevas: List[str] = []
-    avisadas: List[str] = []
+    nuevas: List[Linea] = []
+    avisadas: List[Linea] = []
     nuevas_firmas = set()
 
     for linea in lineas:
-        firma = build_signature(linea)
+        # LogEntry guarda su firma; los strings pasan por el LRU de firmas
+        firma = linea.signature if isinstance(linea, LogEntry) else build_signature(linea)
         if firma in ya_avisadas:
             avisadas.append(linea)
         else:
@@ -38,3 +43,30 @@ def dividir_nuevos_y_avisados(
         add_alerted_signatures(app_key, dia, tipo, nuevas_firmas)
 
     return nuevas, avisadas
+
+
+def desmarcar_avisados(lineas: List[Linea], app_key: str, dia: date, tipo: str) -> int:
+    """
+    Inversa de la marca de dividir_nuevos_y_avisados(): las firmas de estas
+    líneas (las "nuevas" que devolvió) vuelven a contar como nuevas.
+    """
+    firmas = {linea.signature if isinstance(linea, LogEntry) else build_signature(linea) for linea in lineas}
+    return remove_alerted_signatures(app_key, dia, tipo, firmas) if firmas else 0
+
+
+@contextmanager
+def desmarcar_si_falla(app_key: str, dia: date, nuevos_por_tipo: Dict[str, List[Linea]]):
+    """
+    Si el bloque falla, desmarca las nuevas de cada tipo: el resultado no
+    llegó a notificarse, así que el próximo intento (el reintento de la app
+    o la próxima ronda) las tiene que ver como nuevas otra vez.
+    """
+    try:
+        yield
+    except BaseException:
+        for tipo, lineas in nuevos_por_tipo.items():
+            try:
+                desmarcar_avisados(lineas, app_key, dia, tipo)
+            except Exception as e:
+                print(f"⚠️ No se pudieron desmarcar las firmas {tipo} de {app_key}: {e}")
+        raise
@@ -0,0 +1,330 @@
+# app/incremental_fetch.py
+"""
+Descarga incremental de archivos .log de Laravel (append-only).
+
+El scheduler baja el mismo log del día varias veces; en vez de descargarlo y
+clasificarlo entero cada vez, se guarda por (app, archivo):
+
+  - ETag / Last-Modified de la última respuesta
+  - offset donde empieza la última entrada del archivo (puede seguir
+    creciendo: stacktrace a medio escribir) y sus primeros bytes ("ancla")
+  - la clasificación de todo lo anterior a ese offset
+
+La siguiente corrida pide `Range: bytes=offset-` (+ If-None-Match) y
+solo clasifica la cola: la última entrada otra vez + lo nuevo.
+
+  304            → nada cambió: se reutiliza la clasificación guardada
+  206            → se valida el ancla y se clasifica solo la cola
+  200            → el servidor ignoró los headers (o el archivo cambió): completo
+  416 / ancla ≠  → el archivo se achicó o rotó: se descarta el estado, completo
+
+Solo aplica a cuerpos .log crudos (URLs directas de T4TRANS y descargas ?dl=);
+las páginas ?l= de log-viewer son HTML generado y no tienen offsets estables.
+
+Variables de entorno:
+  INCREMENTAL_FETCH=0          desactiva (siempre descarga completa, sin estado)
+  INCREMENTAL_FETCH_DIR=...    directorio del estado (default ".fetch_state")
+"""
+from __future__ import annotations
+
+import base64
+import codecs
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from app.log_entry import LogEntry
+
+INCREMENTAL_FETCH_ENABLED = os.getenv("INCREMENTAL_FETCH", "1") != "0"
+INCREMENTAL_FETCH_DIR = os.getenv("INCREMENTAL_FETCH_DIR", ".fetch_state")
+
+# Estados de archivos que no se tocan hace más de esto se borran (logs viejos)
+_STATE_MAX_AGE = 3 * 86400
+# Bytes de la última entrada que se comparan al recibir un 206
+_ANCHOR_LEN = 64
+# Si la última entrada supera esto (archivo sin headers Laravel) no se guarda estado
+_MAX_COLA_BYTES = 8 * 1024 * 1024
+_CHUNK_SIZE = 64 * 1024
+
+# Inicio de entrada: misma forma que _LARAVEL_HEADER_RE de app/log_parser.py
+_HEADER_RE = re.compile(rb"^\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\]\s+\w+\.\w+:", re.MULTILINE)
+_CONTENT_RANGE_RE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+# (chunks de texto) -> (errores_controlados, errores_no_controlados)
+Clasificador = Callable[[Iterable[str]], Tuple[List[LogEntry], List[LogEntry]]]
+
+_LISTAS = ("controlados", "no_controlados", "ultima_controlados", "ultima_no_controlados")
+
+
+@dataclass
+class FetchState:
+    """Lo recordado de la última descarga de un archivo .log."""
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    length: int = 0
+    offset: int = 0
+    anchor: str = ""
+    controlados: List[LogEntry] = field(default_factory=list)
+    no_controlados: List[LogEntry] = field(default_factory=list)
+    ultima_controlados: List[LogEntry] = field(default_factory=list)
+    ultima_no_controlados: List[LogEntry] = field(default_factory=list)
+    updated_at: float = field(default_factory=time.time)
+
+
+# -------------------------------------------------------------- estado ---
+
+_STATE_LOCK = threading.Lock()
+
+
+def _state_path(app_key: str, file_key: str) -> Path:
+    seguro = re.sub(r"[^A-Za-z0-9._-]", "_", f"{app_key}__{file_key}")
+    return Path(INCREMENTAL_FETCH_DIR) / f"{seguro}.json"
+
+
+def load_state(app_key: str, file_key: str) -> Optional[FetchState]:
+    try:
+        data = json.loads(_state_path(app_key, file_key).read_text(encoding="utf-8"))
+        # En disco las entradas van como la línea formateada
+        for nombre in _LISTAS:
+            data[nombre] = [LogEntry.from_line(linea) for linea in data.get(nombre, [])]
+        return FetchState(**data)
+    except (OSError, ValueError, TypeError, AttributeError):
+        return None
+
+
+def save_state(app_key: str, file_key: str, estado: FetchState) -> None:
+    destino = _state_path(app_key, file_key)
+    try:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_name(f".{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(vars(estado), default=str), encoding="utf-8")
+        os.replace(tmp, destino)
+        _prune_states(destino.parent)
+    except OSError as e:
+        print(f"   ⚠️ No se pudo guardar el estado de descarga incremental: {e}")
+
+
+def invalidate_state(app_key: str, file_key: str) -> None:
+    _state_path(app_key, file_key).unlink(missing_ok=True)
+
+
+def _prune_states(directorio: Path) -> None:
+    limite = time.time() - _STATE_MAX_AGE
+    with _STATE_LOCK:
+        for p in directorio.glob("*.json"):
+            try:
+                if p.stat().st_mtime < limite:
+                    p.unlink()
+            except OSError:
+                pass
+
+
+# ------------------------------------------------------------- descarga ---
+
+class _TailTracker:
+    """
+    Sigue los bytes que llegan: cuántos, cuántas líneas, y dónde empieza la
+    última entrada (la "cola", que se guarda para volver a pedirla).
+    """
+
+    def __init__(self, start: int):
+        self.received = 0
+        self.lines = 0
+        self.cola = bytearray()
+        self.cola_offset = start
+        self.overflow = False
+
+    def feed(self, chunk: bytes) -> None:
+        self.received += len(chunk)
+        self.lines += chunk.count(b"\n")
+        if self.overflow:
+            return
+        # Un header pudo quedar partido entre chunks: se re-escanea un poco hacia atrás
+        desde = max(0, len(self.cola) - 128)
+        self.cola += chunk
+        ultimo = None
+        for ultimo in _HEADER_RE.finditer(self.cola, desde):
+            pass
+        if ultimo is not None and ultimo.start() > 0:
+            self.cola_offset += ultimo.start()
+            del self.cola[:ultimo.start()]
+        if len(self.cola) > _MAX_COLA_BYTES:
+            self.overflow = True
+            self.cola = bytearray()
+
+    def decode(self, raw_chunks: Iterable[bytes]):
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+        for chunk in raw_chunks:
+            if not chunk:
+                continue
+            self.feed(chunk)
+            yield decoder.decode(chunk)
+        yield decoder.decode(b"", final=True)
+
+
+def _content_range_start(valor: Optional[str]) -> Optional[int]:
+    m = _CONTENT_RANGE_RE.match(valor or "")
+    return int(m.group(1)) if m else None
+
+
+def _request_headers(estado: Optional[FetchState]) -> dict:
+    if estado is None:
+        return {}
+    # Sin If-Range a propósito: cada append cambia el ETag y el servidor
+    # respondería 200 completo siempre. La validación la hace el ancla.
+    headers = {"Range": f"bytes={estado.offset}-"}
+    if estado.etag:
+        headers["If-None-Match"] = estado.etag
+    elif estado.last_modified:
+        headers["If-Modified-Since"] = estado.last_modified
+    return headers
+
+
+def _leer_ancla(it, n: int) -> bytes:
+    """Lee del iterador de chunks al menos n bytes (o hasta que se acabe)."""
+    head = b""
+    for chunk in it:
+        head += chunk
+        if len(head) >= n:
+            break
+    return head
+
+
+def _sin_sufijo(lista: List[str], sufijo: List[str]) -> Optional[List[str]]:
+    if not sufijo:
+        return lista
+    if lista[-len(sufijo):] != sufijo:
+        return None
+    return lista[:-len(sufijo)]
+
+
+# ---------------------------------------------------------- public API ---
+
+def fetch_log_incremental(
+    session,
+    url: str,
+    app_key: str,
+    file_key: str,
+    clasificar: Clasificador,
+    timeout: int = 60,
+):
+    """
+    Descarga un .log de Laravel y lo clasifica, pidiendo solo lo agregado desde
+    la corrida anterior cuando el servidor lo permite.
+
+    Args:
+        session: sesión autenticada
+        url: URL del archivo .log crudo
+        app_key: app dueña del archivo
+        file_key: identificador estable del archivo (p.ej. "laravel-2026-02-15.log";
+                  los tokens ?dl= cambian en cada carga y no sirven de clave)
+        clasificar: recibe chunks de texto y devuelve (controlados, no_controlados).
+                    Debe clasificar cada entrada de forma independiente.
+        timeout: timeout del GET
+
+    Returns:
+        ClassifiedLogs con la clasificación del archivo completo; size_bytes y
+        line_count son los de esta descarga (0 si el servidor respondió 304).
+    """
+    from app.logs_scraper import ClassifiedLogs
+
+    estado = load_state(app_key, file_key) if INCREMENTAL_FETCH_ENABLED else None
+
+    resp = session.get(url, headers=_request_headers(estado), timeout=timeout, stream=True)
+    try:
+        if estado is not None and resp.status_code == 304:
+            print(f"   ♻️ {file_key} sin cambios (304), reutilizando clasificación")
+            return ClassifiedLogs(
+                controlados=estado.controlados + estado.ultima_controlados,
+                no_controlados=estado.no_controlados + estado.ultima_no_controlados,
+            )
+
+        if estado is not None and resp.status_code == 416:
+            print(f"   ↩️ {file_key} se achicó o rotó (416), descarga completa")
+            resp.close()
+            invalidate_state(app_key, file_key)
+            return fetch_log_incremental(session, url, app_key, file_key, clasificar, timeout)
+
+        resp.raise_for_status()
+
+        raw = resp.iter_content(chunk_size=_CHUNK_SIZE)
+        base: Optional[FetchState] = None
+        start = 0
+        if resp.status_code == 206:
+            ancla = base64.b64decode(estado.anchor) if estado else b""
+            head = _leer_ancla(raw, len(ancla))
+            if (
+                estado is None
+                or _content_range_start(resp.headers.get("Content-Range")) != estado.offset
+                or not head.startswith(ancla)
+            ):
+                print(f"   ↩️ {file_key} cambió desde la última descarga, descarga completa")
+                resp.close()
+                invalidate_state(app_key, file_key)
+                return fetch_log_incremental(session, url, app_key, file_key, clasificar, timeout)
+            base, start = estado, estado.offset
+            raw = _chain(head, raw)
+        elif estado is not None:
+            print(f"   ↩️ {file_key}: el servidor no respetó Range ({resp.status_code}), descarga completa")
+
+        tracker = _TailTracker(start)
+        controlados, no_controlados = clasificar(tracker.decode(raw))
+    finally:
+        resp.close()
+
+    if base is not None:
+        print(f"   ⏩ {file_key}: descarga incremental desde byte {start:,} ({tracker.received:,} bytes nuevos)")
+
+    resultado = ClassifiedLogs(
+        controlados=(base.controlados if base else []) + controlados,
+        no_controlados=(base.no_controlados if base else []) + no_controlados,
+        size_bytes=tracker.received,
+        line_count=tracker.lines,
+    )
+
+    if INCREMENTAL_FETCH_ENABLED:
+        if tracker.overflow:
+            invalidate_state(app_key, file_key)
+        else:
+            _guardar_estado(app_key, file_key, resp, base, start, tracker,
+                            controlados, no_controlados, clasificar)
+    return resultado
+
+
+def _chain(head: bytes, it):
+    yield head
+    yield from it
+
+
+def _guardar_estado(app_key, file_key, resp, base, start, tracker, controlados, no_controlados, clasificar):
+    """Separa la clasificación de la última entrada (se vuelve a pedir) del resto."""
+    cola = bytes(tracker.cola)
+    if cola:
+        ultima_c, ultima_nc = clasificar([cola.decode("utf-8", errors="ignore")])
+    else:
+        ultima_c, ultima_nc = [], []
+
+    previos_c = _sin_sufijo(controlados, ultima_c)
+    previos_nc = _sin_sufijo(no_controlados, ultima_nc)
+    if previos_c is None or previos_nc is None:
+        # El clasificador no es por-entrada: no hay forma segura de cortar
+        invalidate_state(app_key, file_key)
+        return
+
+    save_state(app_key, file_key, FetchState(
+        etag=resp.headers.get("ETag"),
+        last_modified=resp.headers.get("Last-Modified"),
+        length=start + tracker.received,
+        offset=tracker.cola_offset,
+        anchor=base64.b64encode(cola[:_ANCHOR_LEN]).decode("ascii"),
+        controlados=(base.controlados if base else []) + previos_c,
+        no_controlados=(base.no_controlados if base else []) + previos_nc,
+        ultima_controlados=ultima_c,
+        ultima_no_controlados=ultima_nc,
+    ))
@@ -0,0 +1,157 @@
+# app/log_entry.py
+"""
+LogEntry — registro compacto de un error clasificado.
+
+Antes cada error viajaba como string ya formateado
+("ERROR - production - 2025-11-26 14:04:48 - <contenido completo>") y cada
+consumidor lo volvía a partir con split(" - ", 3), a parsear la fecha con
+strptime y a calcular la firma; el split además copiaba el contenido
+(stacktraces de varios KB) en cada lista/agregado que lo guardaba.
+
+LogEntry guarda los campos por separado, con __slots__:
+  - level / context internados (se repiten en miles de entradas)
+  - la fecha ya parseada (datetime, 48 bytes); el texto original solo se
+    guarda si no se puede reconstruir igual desde el datetime
+  - content: el mismo objeto que salió del parser, sin copias
+  - la firma de aviso se calcula una vez, al pedirla, y se interna
+
+str(entry) (o f"{entry}") reconstruye la línea de siempre, así que archivos,
+historial y código que espera strings ven exactamente lo mismo que antes.
+Una LogEntry es igual (==) a su línea formateada. Una línea que no tiene las
+cuatro partes (from_line) se guarda cruda: str() la devuelve tal cual.
+"""
+from __future__ import annotations
+
+import sys
+from datetime import datetime
+from typing import Optional, Union
+
+_DT_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def _parse_fecha(fecha: str) -> Optional[datetime]:
+    """Mismo criterio que log_stats._parse_log_line (strptime con _DT_FMT)."""
+    fecha = fecha.strip()
+    try:
+        # Camino rápido para la forma habitual; fromisoformat acepta más
+        # variantes que strptime, por eso se exige el espacio en la posición 10
+        if len(fecha) == 19 and fecha[10] == " ":
+            return datetime.fromisoformat(fecha)
+        return datetime.strptime(fecha, _DT_FMT)
+    except ValueError:
+        return None
+
+
+class LogEntry:
+    """Un error clasificado: LEVEL - context - fecha - content."""
+
+    # _fecha = None: línea cruda sin encabezado (ver from_line)
+    __slots__ = ("level", "context", "_fecha", "content", "_signature", "_hash")
+
+    def __init__(self, level: str, context: str, fecha: str, content: str):
+        self.level = sys.intern(level)
+        self.context = sys.intern(context)
+        dt = _parse_fecha(fecha)
+        # str(datetime) da "YYYY-MM-DD HH:MM:SS": si coincide, alcanza con el datetime
+        self._fecha = dt if dt is not None and str(dt) == fecha else sys.intern(fecha)
+        self.content = content
+
+    @classmethod
+    def from_line(cls, line: str) -> "LogEntry":
+        """Inversa de str(): "LEVEL - context - fecha - content"."""
+        partes = line.split(" - ", 3)
+        if len(partes) < 4:
+            # Sin encabezado: se guarda la línea cruda para que str() la devuelva igual
+            entry = cls("", "", "", line)
+            entry._fecha = None
+            return entry
+        return cls(*partes)
+
+    # ------------------------------------------------------------ campos ---
+
+    @property
+    def fecha(self) -> str:
+        """Texto de la fecha tal como venía en el log."""
+        return "" if self._fecha is None else str(self._fecha)
+
+    @property
+    def header(self) -> str:
+        if self._fecha is None:
+            return ""
+        return f"{self.level} - {self.context} - {self.fecha} - "
+
+    @property
+    def line(self) -> str:
+        if self._fecha is None:
+            return self.content
+        return f"{self.level} - {self.context} - {self.fecha} - {self.content}"
+
+    @property
+    def timestamp(self) -> Optional[datetime]:
+        """Fecha del error parseada (None si no tiene el formato esperado)."""
+        if self._fecha is None or isinstance(self._fecha, datetime):
+            return self._fecha
+        return _parse_fecha(self._fecha)
+
+    @property
+    def signature(self) -> str:
+        """Firma de aviso (igual a build_signature(str(self))), internada."""
+        try:
+            return self._signature
+        except AttributeError:
+            from app.signatures import signature_from_parts
+
+            self._signature = sys.intern(signature_from_parts(self.header, self.content))
+            return self._signature
+
+    # ---------------------------------------------------- compatibilidad ---
+
+    def __str__(self) -> str:
+        return self.line
+
+    def __repr__(self) -> str:
+        contenido = self.content if len(self.content) <= 60 else self.content[:57] + "..."
+        return f"LogEntry({self.level!r}, {self.context!r}, {self.fecha!r}, {contenido!r})"
+
+    def __contains__(self, texto: str) -> bool:
+        """`"SQLSTATE" in entry` busca en la línea, como con el string."""
+        return texto in self.content or texto in self.line
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LogEntry):
+            return (
+                self.content == other.content
+                and self._fecha == other._fecha
+                and self.level == other.level
+                and self.context == other.context
+            )
+        if isinstance(other, str):
+            return self.line == other
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # Igual al hash de la línea (una LogEntry == su línea); se arma una sola vez
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(self.line)
+            return self._hash
+
+    def __getstate__(self) -> dict:
+        # _hash no viaja: el hash de un str cambia de un proceso a otro (pool de clasificación)
+        return {k: getattr(self, k) for k in self.__slots__ if k != "_hash" and hasattr(self, k)}
+
+    def __setstate__(self, state: dict) -> None:
+        # pickle trae copias nuevas: se vuelven a internar para compartirlas con el resto de la corrida
+        for k in ("level", "context", "_signature"):
+            if k in state:
+                state[k] = sys.intern(state[k])
+        if isinstance(state.get("_fecha"), str):
+            state["_fecha"] = sys.intern(state["_fecha"])
+        for k, v in state.items():
+            setattr(self, k, v)
+
+
+def as_line(entry: Union[LogEntry, str]) -> str:
+    """Línea formateada de una LogEntry (o el string tal cual)."""
+    return entry.line if isinstance(entry, LogEntry) else entry
@@ -0,0 +1,215 @@
+# app/log_index.py
+"""
+Índice de archivos de la página /logs de cada app: {fecha: (nombre, href)}.
+
+Antes cada fetch bajaba la página /logs, la parseaba entera con BeautifulSoup
+y la recorría hasta tres veces (fecha pedida, día anterior, fecha más
+reciente). Ahora:
+
+  - un solo recorrido con html.parser (sin árbol) junta los <a> y arma el mapa
+  - el mapa se guarda por app con un TTL corto, así las llamadas repetidas de
+    la misma corrida (reintentos, dashboard) no repiten el GET del índice
+  - si la fecha pedida no está en un índice cacheado, se vuelve a pedir una vez
+    (el archivo del día pudo aparecer después de cachearlo)
+
+Variables de entorno:
+  LOG_INDEX_TTL=60   segundos que vale un índice cacheado (0 = sin caché)
+"""
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Tuple
+
+from app.run_metrics import cache_event, stage
+
+LOG_INDEX_TTL = float(os.getenv("LOG_INDEX_TTL", "60"))
+
+# Estilos de página /logs
+LIST_GROUP = "list_group"    # log-viewer: <div class="list-group"><a href="?l=...">
+ALL_LINKS = "all_links"      # T4TRANS / T4App Admin: cualquier <a href> con el nombre exacto
+
+_FECHA_RE = re.compile(r"(\d{4}-\d{2}-\d{2})\.log")
+_LARAVEL_RE = re.compile(r"laravel-(\d{4}-\d{2}-\d{2})\.log")
+
+
+class _LinkCollector(HTMLParser):
+    """Junta (texto, href, dentro_de_list_group) de cada <a> en una pasada."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.links: List[Tuple[str, Optional[str], bool]] = []
+        self._divs: List[bool] = []
+        self._list_group_depth = 0
+        self._href: Optional[str] = None
+        self._texto: Optional[List[str]] = None
+        self._en_list_group = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            es_lg = "list-group" in (dict(attrs).get("class") or "").split()
+            self._divs.append(es_lg)
+            self._list_group_depth += es_lg
+        elif tag == "a":
+            self._cerrar_a()
+            self._href = dict(attrs).get("href")
+            self._texto = []
+            self._en_list_group = self._list_group_depth > 0
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._cerrar_a()
+        elif tag == "div" and self._divs:
+            self._list_group_depth -= self._divs.pop()
+
+    def handle_data(self, data):
+        if self._texto is not None:
+            self._texto.append(data)
+
+    def _cerrar_a(self):
+        if self._texto is not None:
+            self.links.append(("".join(self._texto).strip(), self._href, self._en_list_group))
+            self._texto = None
+
+    def close(self):
+        super().close()
+        self._cerrar_a()
+
+
+@dataclass
+class LogIndex:
+    """Archivos de log listados en la página /logs de una app."""
+
+    files: List[Tuple[str, str]] = field(default_factory=list)    # (nombre, href) en orden de la página
+    by_date: Dict[str, Tuple[str, str]] = field(default_factory=dict)
+    dates: List[str] = field(default_factory=list)    # fechas de todos los archivos (antigüedad)
+    fetched_at: float = field(default_factory=time.time)
+
+    def resolve(self, fecha_str: str) -> Optional[Tuple[str, str]]:
+        """(nombre, href) del archivo de esa fecha, o None."""
+        return self.by_date.get(fecha_str)
+
+    def available_files(self) -> List[str]:
+        return [nombre for nombre, _ in self.files]
+
+    def most_recent(self) -> Tuple[Optional[date], Optional[int]]:
+        """(fecha más reciente, días de antigüedad) o (None, None)."""
+        fechas = []
+        for f in self.dates:
+            try:
+                fechas.append(datetime.strptime(f, "%Y-%m-%d").date())
+            except ValueError:
+                continue
+        if not fechas:
+            return None, None
+        most_recent = max(fechas)
+        return most_recent, (datetime.now().date() - most_recent).days
+
+
+def parse_log_index(html: str, style: str = LIST_GROUP) -> LogIndex:
+    """
+    Arma el índice en una sola pasada sobre el HTML.
+
+    LIST_GROUP: links dentro de div.list-group; por fecha gana "laravel-FECHA.log"
+                y si no existe, el primer "*-FECHA.log" (ej: worker-2025-12-11.log).
+    ALL_LINKS:  cualquier <a href> cuyo texto contenga ".log"; solo cuenta el
+                nombre exacto "laravel-FECHA.log".
+    """
+    collector = _LinkCollector()
+    collector.feed(html)
+    collector.close()
+
+    index = LogIndex()
+    for texto, href, en_list_group in collector.links:
+        if style == LIST_GROUP:
+            if not en_list_group:
+                continue
+            href = href or ""
+            index.files.append((texto, href))
+            m = _FECHA_RE.search(texto)
+            if not m:
+                continue
+            fecha = m.group(1)
+            index.dates.append(fecha)
+            if texto == f"laravel-{fecha}.log":
+                actual = index.by_date.get(fecha)
+                if actual is None or actual[0] != texto:
+                    index.by_date[fecha] = (texto, href)
+            elif texto.endswith(f"-{fecha}.log"):
+                index.by_date.setdefault(fecha, (texto, href))
+        else:
+            if href is None or ".log" not in texto:
+                continue
+            index.files.append((texto, href))
+            m = _LARAVEL_RE.match(texto)
+            if not m:
+                continue
+            index.dates.append(m.group(1))
+            if m.end() == len(texto):
+                index.by_date.setdefault(m.group(1), (texto, href))
+    return index
+
+
+# --------------------------------------------------------------- caché ---
+
+_CACHE: Dict[Tuple[str, str, str], LogIndex] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def invalidate_log_index(app_key: Optional[str] = None) -> None:
+    """Olvida el índice de una app (o de todas)."""
+    with _CACHE_LOCK:
+        for key in [k for k in _CACHE if app_key is None or k[0] == app_key]:
+            del _CACHE[key]
+
+
+def get_log_index(session, app_key: str, logs_url: str, style: str = LIST_GROUP,
+                  headers: Optional[dict] = None, refresh: bool = False,
+                  timeout: int = 60) -> Tuple[LogIndex, bool]:
+    """
+    Índice de /logs de la app, desde caché si tiene menos de LOG_INDEX_TTL segundos.
+
+    Returns:
+        (index, desde_cache)
+    """
+    key = (app_key, logs_url, style)
+    if not refresh and LOG_INDEX_TTL > 0:
+        with _CACHE_LOCK:
+            index = _CACHE.get(key)
+        if index is not None and time.time() - index.fetched_at < LOG_INDEX_TTL:
+            cache_event("log_index", True)
+            return index, True
+        cache_event("log_index", False)
+
+    with stage("index_fetch"):
+        resp = session.get(logs_url, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        index = parse_log_index(resp.text, style)
+
+    if LOG_INDEX_TTL > 0:
+        with _CACHE_LOCK:
+            _CACHE[key] = index
+    return index, False
+
+
+def resolve_log_link(session, app_key: str, logs_url: str, fecha_str: str,
+                     style: str = LIST_GROUP, headers: Optional[dict] = None,
+                     timeout: int = 60) -> Tuple[LogIndex, Optional[Tuple[str, str]]]:
+    """
+    Busca el archivo de fecha_str. Si el índice venía de la caché y la fecha no
+    está, lo vuelve a pedir una vez antes de darlo por inexistente.
+
+    Returns:
+        (index, (nombre, href) o None)
+    """
+    index, desde_cache = get_log_index(session, app_key, logs_url, style, headers, timeout=timeout)
+    link = index.resolve(fecha_str)
+    if link is None and desde_cache:
+        index, _ = get_log_index(session, app_key, logs_url, style, headers, refresh=True, timeout=timeout)
+        link = index.resolve(fecha_str)
+    return index, link
@@ -0,0 +1,215 @@
+# app/log_parser.py
+"""
+Parser incremental (event-driven) de la tabla de logs de Laravel log-viewer.
+
+classify_logs() construía un árbol BeautifulSoup completo de la página del día
+(decenas de MB en los tenants más activos) solo para leer las 4 primeras <td>
+de cada fila. LogTableParser recorre el HTML con html.parser.HTMLParser y emite
+las filas una a una, sin árbol, con el mismo texto que daría
+td.get_text(strip=True).
+
+Uso:
+    for cols in iter_log_rows(html):
+        level, context, fecha, content = cols[:4]
+
+    # También acepta un iterable de chunks (p.ej. resp.iter_content(decode_unicode=True))
+    for row in iter_log_rows(chunks):
+        ...
+
+Para los .log crudos (descarga de archivos grandes), iter_laravel_entries()
+parte el texto en entradas "[fecha] env.LEVEL: mensaje" también por chunks.
+"""
+from __future__ import annotations
+
+import re
+from collections import deque
+from html.parser import HTMLParser
+from typing import Iterable, Iterator, List, Tuple, Union
+
+# Contenido que BeautifulSoup guarda como Script/Stylesheet y get_text() omite
+_SKIP_TEXT_TAGS = ("script", "style", "template")
+
+
+class LogTableParser(HTMLParser):
+    """
+    Emite las celdas de cada fila de "table tbody tr" (mismo selector que
+    usaba classify_logs) a medida que se cierran los </tr>.
+
+    El texto de cada celda replica td.get_text(strip=True) de BeautifulSoup:
+    cada nodo de texto (texto entre dos tags) se hace strip() y se concatenan
+    los no vacíos sin separador. Los comentarios y el contenido de
+    <script>/<style> no cuentan.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows: deque[List[str]] = deque()
+        self._table_depth = 0
+        self._tbody_depth = 0
+        self._tr_depth = 0
+        self._td_depth = 0
+        self._skip_depth = 0
+        self._cells: List[str] = []
+        self._cell_parts: List[str] = []
+        self._text: List[str] = []
+
+    # ------------------------------------------------------------ texto ---
+
+    def _flush_text(self) -> None:
+        """Cierra el nodo de texto actual (equivale a un NavigableString)."""
+        if not self._text:
+            return
+        if self._td_depth and not self._skip_depth:
+            chunk = "".join(self._text).strip()
+            if chunk:
+                self._cell_parts.append(chunk)
+        self._text.clear()
+
+    def handle_data(self, data: str) -> None:
+        if self._td_depth:
+            self._text.append(data)
+
+    def handle_comment(self, data: str) -> None:
+        self._flush_text()
+
+    # ------------------------------------------------------------- tags ---
+
+    def handle_starttag(self, tag: str, attrs) -> None:
+        self._flush_text()
+        if tag == "table":
+            self._table_depth += 1
+        elif tag == "tbody":
+            self._tbody_depth += 1
+        elif tag == "tr":
+            if self._tr_depth == 0:
+                self._cells = []
+            self._tr_depth += 1
+        elif tag == "td":
+            if self._td_depth == 0:
+                self._cell_parts = []
+            self._td_depth += 1
+        elif tag in _SKIP_TEXT_TAGS and self._td_depth:
+            self._skip_depth += 1
+
+    def handle_startendtag(self, tag: str, attrs) -> None:
+        # <br/>, <img/>… no abren contenido; solo cortan el nodo de texto
+        self._flush_text()
+
+    def handle_endtag(self, tag: str) -> None:
+        self._flush_text()
+        if tag == "td" and self._td_depth:
+            self._td_depth -= 1
+            if self._td_depth == 0 and self._tr_depth:
+                self._cells.append("".join(self._cell_parts))
+        elif tag == "tr" and self._tr_depth:
+            self._tr_depth -= 1
+            if self._tr_depth == 0 and self._table_depth and self._tbody_depth:
+                self.rows.append(self._cells)
+            if self._tr_depth == 0:
+                self._cells = []
+        elif tag == "tbody" and self._tbody_depth:
+            self._tbody_depth -= 1
+        elif tag == "table" and self._table_depth:
+            self._table_depth -= 1
+        elif tag in _SKIP_TEXT_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+
+def iter_log_rows(source: Union[str, Iterable[str]]) -> Iterator[List[str]]:
+    """
+    Recorre el HTML de log-viewer y devuelve, fila a fila, la lista de textos
+    de sus <td> (igual que [td.get_text(strip=True) for td in row.find_all("td")]).
+
+    Args:
+        source: HTML completo (str) o un iterable de chunks de texto.
+    """
+    parser = LogTableParser()
+    chunks = (source,) if isinstance(source, str) else source
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        parser.feed(chunk)
+        while parser.rows:
+            yield parser.rows.popleft()
+
+    parser.close()
+    while parser.rows:
+        yield parser.rows.popleft()
+
+
+def _iter_log_rows_soup(html: str) -> Iterator[List[str]]:
+    """
+    Implementación de referencia con BeautifulSoup (la que usaba classify_logs).
+    Se mantiene para comparar resultados y rendimiento en test/test_log_parser.py.
+    """
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, "html.parser")
+    for row in soup.select("table tbody tr"):
+        yield [td.get_text(strip=True) for td in row.find_all("td")]
+
+
+# --------------------------------------------------------------------------
+# Archivos .log crudos (descarga ?dl= de archivos grandes)
+# --------------------------------------------------------------------------
+
+# [2026-02-15 10:55:43] production.ERROR: mensaje...
+_LARAVEL_HEADER_RE = re.compile(
+    r"\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\]\s+(\w+)\.(\w+):(?:\s+(.*)|\s*$)"
+)
+
+
+def iter_laravel_entries(chunks: Iterable[str]) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Parte un .log de Laravel en entradas a medida que llegan los chunks,
+    sin cargar el archivo completo en memoria.
+
+    Una entrada empieza en cada línea "[YYYY-MM-DD HH:MM:SS] env.LEVEL: ...".
+    Igual que el regex que se usaba antes, el mensaje se corta en la primera
+    línea que empieza con "[" (p.ej. "[stacktrace]"); el resto de la entrada
+    se descarta. El mensaje se devuelve con los espacios colapsados.
+
+    Yields:
+        (timestamp, context, LEVEL, mensaje)
+    """
+    actual = None          # [timestamp, context, level, partes_mensaje]
+    cortado = False
+    pendiente = ""
+
+    def _emitir(entrada):
+        mensaje = " ".join(" ".join(entrada[3]).split())
+        return entrada[0], entrada[1], entrada[2].upper(), mensaje
+
+    for chunk in chunks:
+        if not chunk:
+            continue
+        pendiente += chunk
+        lineas = pendiente.split("\n")
+        pendiente = lineas.pop()
+
+        for linea in lineas:
+            m = _LARAVEL_HEADER_RE.match(linea) if linea.startswith("[") else None
+            if m:
+                if actual is not None:
+                    yield _emitir(actual)
+                actual = [m.group(1), m.group(2), m.group(3), [m.group(4) or ""]]
+                cortado = False
+            elif actual is not None and not cortado:
+                if linea.startswith("["):
+                    cortado = True
+                else:
+                    actual[3].append(linea)
+
+    # Última línea sin salto de línea final
+    if pendiente:
+        m = _LARAVEL_HEADER_RE.match(pendiente)
+        if m:
+            if actual is not None:
+                yield _emitir(actual)
+            actual = [m.group(1), m.group(2), m.group(3), [m.group(4) or ""]]
+        elif actual is not None and not cortado and not pendiente.startswith("["):
+            actual[3].append(pendiente)
+
+    if actual is not None:
+        yield _emitir(actual)
@@ -1,9 +1,16 @@
 # app/log_stats.py
-import re
+import hashlib
+import json
+import os
+import threading
 from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime, date
 from pathlib import Path
-from typing import Dict, Tuple, List
+from typing import Dict, Iterator, Tuple, List, Union
+
+from app.log_entry import LogEntry
+from app.signatures import summary_signature
 
 # Mismos nombres que usa writer.save_logs por defecto
 LOG_DIR = Path("salida_logs")
@@ -41,27 +48,265 @@ def _parse_log_line(line: str):
 def _firma_mensaje(mensaje: str) -> str:
     """
     Nos quedamos solo con la parte importante del error.
-    Cortamos antes de:
-      - {"exception":
-      - [stacktrace]
-      - {"Request : "
-    Y, si hay un SQLSTATE=XXXX, nos quedamos hasta ahí.
+    Regla de resúmenes del servicio de firmas (memoizada, ver
+    app.signatures.summary_signature).
+    """
+    return summary_signature(mensaje)
+
+# ---------------------------------------------------------------------------
+# Índice incremental persistido por archivo de log
+# ---------------------------------------------------------------------------
+
+# LOG_STATS_INDEX=0 desactiva la persistencia en disco (el índice sigue en memoria)
+LOG_STATS_INDEX_PERSIST = os.getenv("LOG_STATS_INDEX", "1") != "0"
+# Directorio propio de los índices (nunca se escriben al lado del .log)
+LOG_STATS_INDEX_DIR = Path(os.getenv("LOG_STATS_INDEX_DIR", ".stats_index"))
+_INDEX_VERSION = 1
+_FINGERPRINT_BYTES = 4096
+_DT_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+def _index_path(path: Path) -> Path:
     """
+    salida_logs/errores_x.log → .stats_index/errores_x.log.<hash de la ruta>.stats.json
+    (la ruta absoluta en el nombre evita que dos .log homónimos compartan índice).
+    """
+    ruta = str(Path(path).resolve())
+    return LOG_STATS_INDEX_DIR / f"{Path(path).name}.{_sha1(ruta.encode('utf-8'))[:16]}.stats.json"
+
 
-    # 1) Primero cortamos por exception/stacktrace/Request
-    for marker in ('{"exception":', "[stacktrace]", '{"Request : "'):
-        pos = mensaje.find(marker)
-        if pos != -1:
-            mensaje = mensaje[:pos]
-            break
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+
+def _sumar_linea(firmas: Dict[str, Dict], raw: bytes, pos: int, copiar: bool = False) -> None:
+    """Suma una línea cruda del log al agregado (copiar=True no toca las entradas originales)."""
+    parsed = _parse_log_line(raw.decode("utf-8", errors="replace"))
+    if not parsed:
+        return
+
+    dt = parsed["fecha"]
+    firma = _firma_mensaje(parsed["mensaje"])
+    info = firmas.get(firma)
+    if info is None:
+        info = firmas[firma] = {"total": 0, "first": dt, "last": dt, "days": {}}
+    elif copiar:
+        info = firmas[firma] = {**info, "days": {d: list(v) for d, v in info["days"].items()}}
+
+    info["total"] += 1
+    if dt < info["first"]:
+        info["first"] = dt
+    if dt > info["last"]:
+        info["last"] = dt
+
+    dia = info["days"].get(dt.date())
+    if dia is None:
+        info["days"][dt.date()] = [1, dt, pos]
+    else:
+        dia[0] += 1
+        if dt < dia[1]:
+            dia[1] = dt
+
+
+class LogStatsIndex:
+    """
+    Agregado por firma de un archivo de log, actualizado por offset.
 
-    # 2) Si hay un SQLSTATE=XXXX, nos quedamos hasta el final del código
-    m = re.search(r"SQLSTATE=\w+", mensaje)
-    if m:
-        return mensaje[:m.end()].strip()
+    Guarda hasta qué byte se parseó (`offset`) y, en cada consulta, solo lee
+    las líneas agregadas desde entonces. Si el archivo se reescribió (tamaño
+    menor o huellas del inicio / del último bloque indexado distintas) se
+    reconstruye desde cero. Solo se indexan líneas completas (terminadas en
+    salto de línea).
+
+    firmas = {
+      firma: {
+        "total": int,
+        "first": datetime,           # primera aparición global
+        "last": datetime,
+        "days": {date: [count, first_time_del_dia, pos_primera_linea_del_dia]},
+      }
+    }
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.mtime_ns = 0
+        self.head = ""
+        self.tail = ""
+        self.pending = b""
+        self.firmas: Dict[str, Dict] = {}
+
+    # ---------------------------------------------------------- refresco ---
+
+    def refresh(self) -> "LogStatsIndex":
+        """Incorpora lo agregado al archivo desde la última lectura."""
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            self._reset()
+            _index_path(self.path).unlink(missing_ok=True)
+            return self
+
+        if st.st_size == self.offset + len(self.pending) and st.st_mtime_ns == self.mtime_ns:
+            return self
+
+        with self.path.open("rb") as f:
+            if not self._vigente(f, st.st_size):
+                self._reset()
+            f.seek(self.offset)
+            nuevo = f.read()
+
+        fin = nuevo.rfind(b"\n") + 1
+        self.pending = nuevo[fin:]
+        if fin:
+            self._ingest(nuevo[:fin], self.offset)
+            self.offset += fin
+            with self.path.open("rb") as f:
+                self.head = _sha1(f.read(min(_FINGERPRINT_BYTES, self.offset)))
+                inicio_tail = max(0, self.offset - _FINGERPRINT_BYTES)
+                f.seek(inicio_tail)
+                self.tail = _sha1(f.read(self.offset - inicio_tail))
+        self.mtime_ns = st.st_mtime_ns
+        if fin:
+            self.save()
+        return self
+
+    def _vigente(self, f, size: int) -> bool:
+        """True si los primeros `offset` bytes siguen siendo los ya indexados."""
+        if not self.offset:
+            return True
+        if size < self.offset:
+            return False
+        if _sha1(f.read(min(_FINGERPRINT_BYTES, self.offset))) != self.head:
+            return False
+        inicio_tail = max(0, self.offset - _FINGERPRINT_BYTES)
+        f.seek(inicio_tail)
+        return _sha1(f.read(self.offset - inicio_tail)) == self.tail
+
+    def _ingest(self, data: bytes, base: int) -> None:
+        pos = base
+        for raw in data.splitlines(keepends=True):
+            _sumar_linea(self.firmas, raw, pos)
+            pos += len(raw)
+
+    def view(self) -> Dict[str, Dict]:
+        """
+        Agregado listo para consultar. Si el archivo termina en una línea sin
+        salto de línea, se suma a una copia (no se persiste: puede seguir
+        creciendo).
+        """
+        if not self.pending.strip():
+            return self.firmas
+        firmas = dict(self.firmas)
+        _sumar_linea(firmas, self.pending, self.offset, copiar=True)
+        return firmas
+
+    # ------------------------------------------------------- persistencia ---
+
+    def save(self) -> None:
+        if not LOG_STATS_INDEX_PERSIST:
+            return
+        data = {
+            "version": _INDEX_VERSION,
+            "offset": self.offset,
+            "mtime_ns": self.mtime_ns,
+            "head": self.head,
+            "tail": self.tail,
+            "firmas": {
+                firma: {
+                    "total": info["total"],
+                    "first": info["first"].strftime(_DT_FMT),
+                    "last": info["last"].strftime(_DT_FMT),
+                    "days": {
+                        d.isoformat(): [c, t.strftime(_DT_FMT), p]
+                        for d, (c, t, p) in info["days"].items()
+                    },
+                }
+                for firma, info in self.firmas.items()
+            },
+        }
+        destino = _index_path(self.path)
+        tmp = destino.with_name(destino.name + f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            destino.parent.mkdir(parents=True, exist_ok=True)
+            tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, destino)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    @classmethod
+    def load(cls, path: Path) -> "LogStatsIndex":
+        index = cls(path)
+        if not LOG_STATS_INDEX_PERSIST:
+            return index
+        try:
+            data = json.loads(_index_path(index.path).read_text(encoding="utf-8"))
+            if data.get("version") != _INDEX_VERSION:
+                return index
+            parse_dt = lambda s: datetime.strptime(s, _DT_FMT)
+            index.firmas = {
+                firma: {
+                    "total": info["total"],
+                    "first": parse_dt(info["first"]),
+                    "last": parse_dt(info["last"]),
+                    "days": {
+                        date.fromisoformat(d): [c, parse_dt(t), p]
+                        for d, (c, t, p) in info["days"].items()
+                    },
+                }
+                for firma, info in data["firmas"].items()
+            }
+            index.offset = data["offset"]
+            index.mtime_ns = data["mtime_ns"]
+            index.head = data["head"]
+            index.tail = data["tail"]
+        except (OSError, ValueError, KeyError, TypeError):
+            index._reset()
+        return index
+
+
+_INDEXES: Dict[Path, LogStatsIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def _get_index(path: Path) -> LogStatsIndex:
+    key = Path(path).resolve()
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(key)
+        if index is None:
+            index = _INDEXES[key] = LogStatsIndex.load(Path(path))
+    return index
+
+
+def invalidate_stats_index(path: Path) -> None:
+    """
+    Descarta el índice de `path` (memoria y disco). Lo llama writer.save_logs
+    cuando reescribe el archivo con mode="w".
+    """
+    key = Path(path).resolve()
+    with _INDEXES_LOCK:
+        index = _INDEXES.pop(key, None)
+    if index is not None:
+        with index.lock:
+            index._reset()
+    _index_path(Path(path)).unlink(missing_ok=True)
+
+
+@contextmanager
+def _stats_by_firma(path: Path) -> Iterator[Dict[str, Dict]]:
+    """
+    Agregado por firma de `path` (solo se parsean las líneas nuevas).
+    Se usa dentro del with: el índice queda bloqueado mientras se lee.
+    """
+    index = _get_index(path)
+    with index.lock:
+        yield index.refresh().view()
 
-    # 3) Si no, devolvemos el mensaje tal cual (pero limpiado)
-    return mensaje.strip()
 
 def _build_stats(path: Path) -> Dict[str, Dict]:
     """
@@ -76,39 +321,16 @@ def _build_stats(path: Path) -> Dict[str, Dict]:
       ...
     }
     """
-    stats: Dict[str, Dict] = {}
-
-    if not path.exists():
-        return stats
-
-    with path.open(encoding="utf-8") as f:
-        for line in f:
-            data = _parse_log_line(line)
-            if not data:
-                continue
-
-            dt = data["fecha"]
-            d_date = dt.date()
-            firma = _firma_mensaje(data["mensaje"])
-
-            info = stats.setdefault(
-                firma,
-                {
-                    "total": 0,
-                    "by_date": Counter(),
-                    "first": dt,
-                    "last": dt,
-                },
-            )
-
-            info["total"] += 1
-            info["by_date"][d_date] += 1
-            if dt < info["first"]:
-                info["first"] = dt
-            if dt > info["last"]:
-                info["last"] = dt
-
-    return stats
+    with _stats_by_firma(path) as stats:
+        return {
+            firma: {
+                "total": info["total"],
+                "by_date": Counter({d: v[0] for d, v in info["days"].items()}),
+                "first": info["first"],
+                "last": info["last"],
+            }
+            for firma, info in stats.items()
+        }
 
 
 def resumen_por_fecha(
@@ -129,24 +351,24 @@ def resumen_por_fecha(
         dia: fecha
         umbral_repetidos: umbral para considerarse "repetido"
     """
-    stats = _build_stats(path)
-
     total_hoy = 0
     repetidos = []
     nuevos = []
 
-    for firma, info in stats.items():
-        n_hoy = info["by_date"].get(dia, 0)
-        if not n_hoy:
-            continue
+    with _stats_by_firma(path) as stats:
+        for firma, info in stats.items():
+            del_dia = info["days"].get(dia)
+            if not del_dia:
+                continue
+            n_hoy = del_dia[0]
 
-        total_hoy += n_hoy
+            total_hoy += n_hoy
 
-        if n_hoy >= umbral_repetidos:
-            repetidos.append((firma, n_hoy))
+            if n_hoy >= umbral_repetidos:
+                repetidos.append((firma, n_hoy))
 
-        if info["first"].date() == dia:
-            nuevos.append((firma, info["first"]))
+            if info["first"].date() == dia:
+                nuevos.append((firma, info["first"]))
 
     # Ordenar: repetidos por cantidad (desc), nuevos por fecha (desc)
     repetidos.sort(key=lambda x: x[1], reverse=True)
@@ -174,7 +396,8 @@ def get_daily_errors(
     dia: date
 ) -> List[Dict]:
     """
-    Parsea los logs y retorna una lista de errores para el día especificado.
+    Retorna una lista de errores para el día especificado (desde el índice
+    incremental del archivo; solo se parsean las líneas nuevas).
     
     Retorna una lista de dicts con:
     [
@@ -190,72 +413,40 @@ def get_daily_errors(
         path: ruta del log
         dia: fecha a filtrar
     """
-    stats = _build_stats(path)
-    
-    daily_errors = []
-    
-    for firma, info in stats.items():
-        # Verificamos si hubo errores este día
-        count_today = info["by_date"].get(dia, 0)
-        
-        if count_today > 0:
-            # Necesitamos encontrar la primera ocurrencia *de este día*
-            # Como _build_stats solo guarda 'first' global, necesitamos re-escanear o 
-            # modificar _build_stats. Pero para no romper lo existente,
-            # haremos un escaneo ligero aquí o asumiremos que el sorting en el email 
-            # se encargará si guardamos info. 
-            # 
-            # ERROR: _build_stats no guarda el primer error DEL DIA, guarda el primero GLOBAL.
-            # Necesitamos parsear el archivo de nuevo o modificar _build_stats.
-            # Dado que leer el archivo es "barato" para estos logs, haremos una lectura filtrada directa.
-            pass
-
-    # Re-implementación clean para obtener lo exacto que pide el usuario sin depender de la agregación global
-    # que podría perder la hora exacta del primer error DEL DÍA.
-    
-    errors_map = {} # firma -> {first_time: dt, count: int}
-    
-    if path.exists():
-        with path.open(encoding="utf-8") as f:
-            for line in f:
-                data = _parse_log_line(line)
-                if not data:
-                    continue
-                
-                dt = data["fecha"]
-                if dt.date() != dia:
-                    continue
-                
-                firma = _firma_mensaje(data["mensaje"])
-                
-                if firma not in errors_map:
-                    errors_map[firma] = {
-                        "firma": firma,
-                        "first_time": dt,
-                        "count": 0
-                    }
-                
-                errors_map[firma]["count"] += 1
-                
-                # Actualizar first_time si encontramos uno anterior (aunque log suele ser cronológico)
-                if dt < errors_map[firma]["first_time"]:
-                    errors_map[firma]["first_time"] = dt
-
-    results = list(errors_map.values())
-    
-    # Ordenar por fecha de aparición
-    results.sort(key=lambda x: x["first_time"])
-    
-    return results
+    # (first_time del día, posición de la primera línea del día) → mismo orden
+    # que el recorrido línea a línea del archivo
+    del_dia = []
+    with _stats_by_firma(path) as stats:
+        for firma, info in stats.items():
+            entrada = info["days"].get(dia)
+            if entrada:
+                count, first_time, pos = entrada
+                del_dia.append((first_time, pos, {"firma": firma, "first_time": first_time, "count": count}))
+
+    del_dia.sort(key=lambda x: (x[0], x[1]))
+    return [error for _, _, error in del_dia]
+
+
+def _datos_de_entrada(entry: LogEntry):
+    """Lo mismo que _parse_log_line(str(entry)), sin re-partir ni copiar el contenido."""
+    fecha_dt = entry.timestamp
+    if fecha_dt is None:
+        return None
+    return {
+        "level": entry.level.strip(),
+        "env": entry.context.strip(),
+        "fecha": fecha_dt,
+        "mensaje": entry.content.strip(),
+    }
 
 
-def parse_and_aggregate_log_lines(lines: List[str], dia: date) -> List[Dict]:
+def parse_and_aggregate_log_lines(lines: List[Union[LogEntry, str]], dia: date) -> List[Dict]:
     """
-    Parsea una lista de strings de log y devuelve errores agregados por firma.
+    Parsea una lista de errores de log y devuelve errores agregados por firma.
     Versión en memoria de get_daily_errors, útil cuando ya tenemos los logs en memoria.
     
     Args:
-        lines: lista de strings con formato "ERROR - env - date - msg"
+        lines: LogEntry, o strings con formato "ERROR - env - date - msg"
         dia: fecha para filtrar (aunque normalmente los logs ya vendrán filtrados)
     
     Returns:
@@ -264,7 +455,7 @@ def parse_and_aggregate_log_lines(lines: List[str], dia: date) -> List[Dict]:
     errors_map = {} # firma -> {first_time: dt, count: int, full_content: str}
     
     for line in lines:
-        data = _parse_log_line(line)
+        data = _datos_de_entrada(line) if isinstance(line, LogEntry) else _parse_log_line(line)
         if not data:
             continue
         
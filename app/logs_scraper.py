@@ -2,10 +2,23 @@
 from pathlib import Path
 from urllib.parse import urljoin
 from bs4 import BeautifulSoup
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from typing import Iterable, List, Union
 import re
 
 from app.config import KEYWORDS_NO_CONTROLADO, get_app_urls
+from app.classifier import ClassificationPlan
+from app.incremental_fetch import INCREMENTAL_FETCH_ENABLED, fetch_log_incremental
+from app.log_entry import LogEntry
+from app.log_index import ALL_LINKS, LIST_GROUP, invalidate_log_index, resolve_log_link
+from app.log_parser import iter_log_rows
+from app.parallel_classify import CLASSIFY_WORKERS, LARAVEL, T4TRANS, classify_raw_log
+from app.run_metrics import stage
+
+
+# Clasificación controlado / no controlado (compilada una vez)
+_PLAN = ClassificationPlan(keywords=KEYWORDS_NO_CONTROLADO)
 
 
 class StaleLogsError(Exception):
@@ -17,7 +30,23 @@ class StaleLogsError(Exception):
         self.days_old = days_old
         self.most_recent_date = most_recent_date
 
-def fetch_logs_html(session, fecha_str: str, app_key: str = "driverapp_goto") -> str:
+
+@dataclass
+class ClassifiedLogs:
+    """
+    Logs ya clasificados durante la descarga (archivos grandes >50MB).
+
+    fetch_logs_html() la devuelve en lugar del HTML cuando el archivo se
+    procesó en streaming; classify_logs() la acepta tal cual.
+    """
+
+    controlados: List[LogEntry] = field(default_factory=list)
+    no_controlados: List[LogEntry] = field(default_factory=list)
+    size_bytes: int = 0
+    line_count: int = 0
+
+
+def fetch_logs_html(session, fecha_str: str, app_key: str = "driverapp_goto") -> Union[str, ClassifiedLogs]:
     """
     Obtiene el HTML de los logs para una fecha dada de una aplicación específica.
     
@@ -26,7 +55,8 @@ def fetch_logs_html(session, fecha_str: str, app_key: str = "driverapp_goto") ->
     - Si es fecha HOY o PASADA: intenta con el día anterior (útil para ejecuciones a medianoche)
 
     Hace dos pasos:
-    1) GET /logs -> lista de archivos (laravel-YYYY-MM-DD.log y sus ?l=...)
+    1) GET /logs -> lista de archivos (laravel-YYYY-MM-DD.log y sus ?l=...);
+       el índice queda cacheado por app unos segundos (app/log_index.py)
     2) Busca el enlace correspondiente a la fecha pedida y hace GET a ese ?l=...
     
     NOTE: T4App Admin uses JSON API/HTML tokens, handled separately via auth_type detection.
@@ -47,311 +77,171 @@ def fetch_logs_html(session, fecha_str: str, app_key: str = "driverapp_goto") ->
     # 1) Obtenemos la URL base de logs para esa app
     _, _, logs_url = get_app_urls(app_key)
 
-    # 2) Cargamos la página principal de logs (lista de archivos)
-    resp_index = session.get(logs_url, timeout=60)
-    resp_index.raise_for_status()
-    index_html = resp_index.text
-
-    soup = BeautifulSoup(index_html, "html.parser")
-
-    # Intentar con la fecha original primero
-    link_tag, fecha_usada = _buscar_log_por_fecha(soup, fecha_str)
-    
-    # Si no se encontró, verificar si debemos intentar con el día anterior
-    if link_tag is None:
-        # Obtener fecha actual (sin hora para comparar solo fechas)
-        fecha_hoy = datetime.now().date()
-        fecha_solicitada_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-        
-        # ¿Es fecha futura?
-        if fecha_solicitada_obj > fecha_hoy:
-            # NO usar fallback para fechas futuras
-            available_files = [a.get_text(strip=True) for a in soup.select("div.list-group a")]
-            msg = (
-                f"⚠️ No se puede procesar fecha futura {fecha_str} en {app_key}. "
-                f"La fecha solicitada es posterior a hoy ({fecha_hoy}). "
-                f"Los logs aún no existen. "
-                f"Archivos disponibles: {available_files}"
-            )
-            raise RuntimeError(msg)
-        
-        # Si es fecha HOY o PASADA, intentar con el día anterior
-        fecha_anterior_obj = fecha_solicitada_obj - timedelta(days=1)
-        fecha_anterior_str = fecha_anterior_obj.strftime("%Y-%m-%d")
-        
-        print(f"   ⚠️ No se encontró log para {fecha_str}, intentando con {fecha_anterior_str}...")
-        
-        link_tag, fecha_usada = _buscar_log_por_fecha(soup, fecha_anterior_str)
-        
-        if link_tag is not None:
-            print(f"   ✓ Usando logs del día anterior ({fecha_anterior_str})")
-    
-    # Si después de intentar ambas fechas no hay resultados
-    if link_tag is None:
-        available_files = [a.get_text(strip=True) for a in soup.select("div.list-group a")]
-        
-        # Verificar si los logs están desactualizados (2+ días)
-        most_recent_date, days_old = _get_most_recent_log_date(soup)
-        
-        if most_recent_date and days_old >= 2:
-            # Los logs están desactualizados por 2 o más días
-            msg = (
-                f"WARNING: Log files have not been created for two or more days in {app_key}. "
-                f"Most recent log: {most_recent_date} ({days_old} days old). "
-                f"Requested: {fecha_str}. Available files: {available_files}"
-            )
-            raise StaleLogsError(msg, app_key, fecha_str, days_old, most_recent_date)
-        else:
-            # Error normal - logs no encontrados pero están relativamente actuales
-            msg = (
-                f"No se encontró log para {fecha_str} ni para el día anterior en {app_key}. "
-                f"Archivos disponibles: {available_files}"
-            )
-            raise RuntimeError(msg)
+    # 2) Índice de /logs (cacheado por app) → archivo de la fecha o del día anterior
+    nombre, href, fecha_usada = _resolver_archivo_log(session, app_key, logs_url, fecha_str)
 
     # href viene en formato "?l=eyJpdiI6..."
-    href = link_tag.get("href") or ""
     logs_day_url = urljoin(logs_url, href)
 
     # 3) Cargamos ahora SÍ el log correspondiente a esa fecha
-    resp_day = session.get(logs_day_url, timeout=60)
-    resp_day.raise_for_status()
-    logs_html = resp_day.text
+    with stage("day_fetch"):
+        resp_day = session.get(logs_day_url, timeout=60)
+        if not resp_day.ok:
+            # El href pudo venir de un índice cacheado que ya no es válido
+            invalidate_log_index(app_key)
+        resp_day.raise_for_status()
+        logs_html = resp_day.text
 
     # # DEBUG - Guardamos para depurar, como ya hacías
     # debug_path = Path(f"debug_logs_{app_key}.html")
     # debug_path.write_text(logs_html, encoding="utf-8")
     
     # 4) Verificar si en lugar de la tabla hay un link de descarga (archivos grandes >50MB)
-    soup_check = BeautifulSoup(logs_html, "html.parser")
-    
-    # Buscar link de descarga con patrón ?dl=
-    download_link = soup_check.find('a', href=re.compile(r'\?dl='))
+    # Solo armamos el árbol si la página contiene "?dl=" (evita parsear decenas de MB en vano)
+    download_link = None
+    if "?dl=" in logs_html:
+        soup_check = BeautifulSoup(logs_html, "html.parser")
+        # Buscar link de descarga con patrón ?dl=
+        download_link = soup_check.find('a', href=re.compile(r'\?dl='))
     
     if download_link:
-        # Escenario de archivo grande - descargar y procesar
-        logs_html = _download_and_process_large_log_file(session, logs_day_url, download_link, app_key)
+        # Escenario de archivo grande - descargar y clasificar en streaming
+        with stage("download"):
+            return _download_and_process_large_log_file(
+                session, logs_day_url, download_link, app_key,
+                file_key=nombre or f"{fecha_usada}.log",
+            )
 
     return logs_html
 
 
-def _download_and_process_large_log_file(session, base_url: str, download_link, app_key: str = "unknown") -> str:
+def _download_and_process_large_log_file(session, base_url: str, download_link, app_key: str = "unknown",
+                                        file_key: str = None) -> "ClassifiedLogs":
     """
-    Descarga un archivo de log grande y lo convierte a formato HTML tabla.
+    Descarga un archivo de log grande y lo clasifica mientras llega.
     
     Cuando los archivos de log exceden ~50MB, Laravel log viewer muestra un link
     de descarga en vez de la tabla HTML. Esta función:
-    1. Descarga el archivo usando streaming
-    2. Parsea el contenido línea por línea
-    3. Convierte a formato HTML tabla compatible con classify_logs()
-    4. Limpia el archivo temporal
+    1. Descarga el archivo en streaming (sin archivo temporal ni f.read())
+    2. Parte las entradas "[fecha] env.LEVEL:" a medida que llegan los chunks
+    3. Entrega cada entrada ERROR (e INFO con "error" embebido) directo a la
+       clasificación, sin armar HTML intermedio
+    
+    La memoria usada no depende del tamaño del archivo, solo de la cantidad
+    de errores encontrados.
     
     Args:
         session: Sesión autenticada
         base_url: URL base para construir la URL de descarga
         download_link: Elemento <a> de BeautifulSoup con el href de descarga
-        app_key: Identificador de la aplicación (para nombre de archivo temporal)
+        app_key: Identificador de la aplicación (solo para logs)
+        file_key: Nombre estable del archivo (el token ?dl= cambia en cada carga).
+            Si se indica y INCREMENTAL_FETCH está activo, solo se descarga lo
+            agregado desde la corrida anterior (ver app/incremental_fetch.py).
         
     Returns:
-        str: HTML con tabla conteniendo los logs procesados
-        
-    Raises:
-        requests.exceptions.RequestException: Si falla la descarga
+        ClassifiedLogs: errores ya clasificados + volumen descargado.
+        Si la descarga falla, listas vacías.
     """
-    import time
-    
     # Extraer href del link de descarga (formato: ?dl=encrypted_token)
     href = download_link.get('href') or ''
     if not href:
-        print("   ⚠️ Link de descarga sin href, retornando HTML vacío")
-        return "<html><body><table><tbody></tbody></table></body></html>"
+        print("   ⚠️ Link de descarga sin href, sin errores que procesar")
+        return ClassifiedLogs()
     
     # Construir URL completa de descarga
     download_url = urljoin(base_url, href)
-    
-    # Crear archivo temporal con nombre único
-    temp_file = Path(f"/tmp/log_download_{app_key}_{int(time.time())}.log")
+    resultado = ClassifiedLogs()
     
     try:
-        print(f"   ⚠️ Archivo de logs grande detectado (>50MB), descargando...")
+        print(f"   ⚠️ Archivo de logs grande detectado (>50MB), procesando en streaming ({app_key})...")
+
+        if file_key and INCREMENTAL_FETCH_ENABLED:
+            resultado = fetch_log_incremental(
+                session, download_url, app_key, file_key,
+                clasificar=lambda chunks: classify_raw_log(chunks, LARAVEL),
+                timeout=120,
+            )
+            total = len(resultado.controlados) + len(resultado.no_controlados)
+            print(f"   ✓ Archivo procesado: {resultado.size_bytes / (1024 * 1024):.2f} MB descargados, {total} errores")
+            return resultado
         
-        # Descargar con streaming para no llenar memoria
         resp = session.get(download_url, stream=True, timeout=120)
         resp.raise_for_status()
         
-        # Obtener tamaño del archivo si está disponible
-        file_size = int(resp.headers.get('content-length', 0))
-        file_size_mb = file_size / (1024 * 1024) if file_size > 0 else 0
-        
-        # Escribir a archivo temporal en chunks
-        with open(temp_file, 'wb') as f:
-            for chunk in resp.iter_content(chunk_size=8192):
-                if chunk:
-                    f.write(chunk)
+        try:
+            # Con CLASSIFY_WORKERS>1 los trozos se clasifican en otros procesos
+            # mientras se sigue descargando
+            controlados, no_controlados = classify_raw_log(_decode_chunks(resp, resultado), LARAVEL)
+        finally:
+            resp.close()
         
-        actual_size_mb = temp_file.stat().st_size / (1024 * 1024)
-        print(f"   ✓ Archivo descargado: {temp_file.name} ({actual_size_mb:.2f} MB)")
+        resultado.controlados = controlados
+        resultado.no_controlados = no_controlados
         
-        # Parsear el archivo línea por línea
-        html_rows = []
-        error_count = 0
-        
-        # Patrón para capturar logs de Laravel:
-        # [2026-02-15 10:55:43] production.ERROR: mensaje...
-        log_pattern = re.compile(
-            r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\]\s+(\w+)\.(\w+):\s+(.*?)(?=\n\[|\Z)',
-            re.DOTALL
-        )
-        
-        with open(temp_file, 'r', encoding='utf-8', errors='ignore') as f:
-            content = f.read()
-            
-            for match in log_pattern.finditer(content):
-                timestamp = match.group(1)
-                context = match.group(2)  # production, local, etc.
-                level = match.group(3).upper()  # ERROR, DEBUG, INFO, etc.
-                message = match.group(4).strip()
-                
-                # Limpiar mensaje de saltos de línea excesivos
-                message = ' '.join(message.split())
-                
-                is_error = level == 'ERROR'
-                is_info_with_error = level == 'INFO' and (
-                    '"error":' in message.lower() or
-                    '&quot;error&quot;:' in message.lower() or
-                    '\\"error\\":' in message.lower()
-                )
-                
-                # Solo procesar errores (e INFO con errors embebidos)
-                if is_error or is_info_with_error:
-                    error_count += 1
-                    # Formato de fila HTML compatible con classify_logs()
-                    row_html = f"""
-                    <tr>
-                        <td>error</td>
-                        <td>{context}</td>
-                        <td>{timestamp}</td>
-                        <td>{message}</td>
-                    </tr>
-                    """
-                    html_rows.append(row_html)
+        size_mb = resultado.size_bytes / (1024 * 1024)
+        total = len(controlados) + len(no_controlados)
+        print(f"   ✓ Archivo procesado en streaming: {size_mb:.2f} MB, {total} errores")
         
-        print(f"   ✓ Procesados {error_count} errores del archivo")
-        
-        # Construir HTML tabla completa
-        table_html = f"""
-        <html>
-        <body>
-            <table>
-                <tbody>
-                    {''.join(html_rows)}
-                </tbody>
-            </table>
-        </body>
-        </html>
-        """
-        
-        return table_html
+        return resultado
         
     except Exception as e:
         print(f"   ⚠️ Error procesando archivo grande: {e}")
-        # Retornar HTML vacío en caso de error
-        return "<html><body><table><tbody></tbody></table></body></html>"
-        
-    finally:
-        # Limpiar archivo temporal
-        if temp_file.exists():
-            try:
-                temp_file.unlink()
-                print(f"   🗑️ Archivo temporal eliminado: {temp_file.name}")
-            except Exception as e:
-                print(f"   ⚠️ Error eliminando archivo temporal: {e}")
+        # Sin errores en caso de fallo (mismo comportamiento que el HTML vacío anterior)
+        return ClassifiedLogs()
 
 
+def _decode_chunks(resp, resultado: "ClassifiedLogs", chunk_size: int = 64 * 1024):
+    """
+    Decodifica el cuerpo de la respuesta chunk a chunk (UTF-8, ignorando
+    bytes inválidos) y acumula el volumen descargado en resultado.
+    """
+    import codecs
 
-def _fetch_logs_t4trans(session, fecha_str: str, app_key: str) -> str:
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    for chunk in resp.iter_content(chunk_size=chunk_size):
+        if not chunk:
+            continue
+        resultado.size_bytes += len(chunk)
+        resultado.line_count += chunk.count(b"\n")
+        yield decoder.decode(chunk)
+    yield decoder.decode(b"", final=True)
+
+
+def _filas_de_entradas(entradas):
+    """
+    Convierte entradas (timestamp, context, LEVEL, mensaje) del .log crudo en
+    filas [level, context, fecha, content] como las de la tabla de log-viewer.
+    Solo pasan ERROR e INFO con "error" embebido, marcadas como "error".
+    """
+    for timestamp, context, level, message in entradas:
+        is_error = level == 'ERROR'
+        if not is_error and level == 'INFO':
+            message_lower = message.lower()
+            is_error = (
+                '"error":' in message_lower or
+                '&quot;error&quot;:' in message_lower or
+                '\\"error\\":' in message_lower
+            )
+        if is_error:
+            yield ["error", context, timestamp, message]
+
+
+
+def _fetch_logs_t4trans(session, fecha_str: str, app_key: str) -> Union[str, ClassifiedLogs]:
     """
     Fetches logs from T4TRANS which uses direct log file URLs.
     
     Unlike other Laravel apps that use encrypted token links (?l=...),
     T4TRANS provides direct links like: /t4notification/logs/laravel-2026-02-11.log
+
+    With INCREMENTAL_FETCH (default) the file is fetched with Range/If-None-Match
+    and returned already classified (ClassifiedLogs); otherwise the raw text.
     """
-    from urllib.parse import urljoin
-    from bs4 import BeautifulSoup
-    from datetime import datetime, timedelta
-    from app.config import get_app_urls
-    
     _, _, logs_url = get_app_urls(app_key)
     
-    # Step 1: Get list of available log files
-    resp_index = session.get(logs_url, timeout=60)
-    resp_index.raise_for_status()
-    
-    soup = BeautifulSoup(resp_index.text, "html.parser")
-    
-    # Step 2: Find all links that contain .log
-    log_links = [a for a in soup.find_all('a', href=True) if '.log' in a.get_text()]
-    
-    # Build target filename
-    target_filename = f"laravel-{fecha_str}.log"
-    
-    # Find the link for the requested date
-    link_tag = None
-    for a in log_links:
-        if a.get_text(strip=True) == target_filename:
-            link_tag = a
-            break
-    
-    # If not found, try previous day as fallback
-    if link_tag is None:
-        fecha_hoy = datetime.now().date()
-        fecha_solicitada_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-        
-        # Don't use fallback for future dates
-        if fecha_solicitada_obj > fecha_hoy:
-            available_files = [a.get_text(strip=True) for a in log_links]
-            msg = (
-                f"⚠️ No se puede procesar fecha futura {fecha_str} en {app_key}. "
-                f"Archivos disponibles: {available_files}"
-            )
-            raise RuntimeError(msg)
-        
-        # Try previous day
-        fecha_anterior_obj = fecha_solicitada_obj - timedelta(days=1)
-        fecha_anterior_str = fecha_anterior_obj.strftime("%Y-%m-%d")
-        target_filename_anterior = f"laravel-{fecha_anterior_str}.log"
-        
-        print(f"   ⚠️ No se encontró log para {fecha_str}, intentando con {fecha_anterior_str}...")
-        
-        for a in log_links:
-            if a.get_text(strip=True) == target_filename_anterior:
-                link_tag = a
-                print(f"   ✓ Usando logs del día anterior ({fecha_anterior_str})")
-                break
-    
-    # If still not found, check for stale logs or error
-    if link_tag is None:
-        available_files = [a.get_text(strip=True) for a in log_links]
-        
-        # Check if logs are stale (2+ days old)
-        most_recent_date, days_old = _get_most_recent_log_date_from_links(log_links)
-        
-        if most_recent_date and days_old >= 2:
-            msg = (
-                f"WARNING: Log files have not been created for two or more days in {app_key}. "
-                f"Most recent log: {most_recent_date} ({days_old} days old). "
-                f"Requested: {fecha_str}. Available files: {available_files}"
-            )
-            raise StaleLogsError(msg, app_key, fecha_str, days_old, most_recent_date)
-        else:
-            msg = (
-                f"No se encontró log para {fecha_str} ni para el día anterior en {app_key}. "
-                f"Archivos disponibles: {available_files}"
-            )
-            raise RuntimeError(msg)
-    
-    # Step 3: Get the direct URL from the link
-    href = link_tag.get("href") or ""
+    # Steps 1-3: index of log files (cached per app) → direct URL of the file
+    nombre, href, _ = _resolver_archivo_log(session, app_key, logs_url, fecha_str, style=ALL_LINKS)
     
     # The href can be absolute or relative
     if href.startswith('http'):
@@ -360,48 +250,28 @@ def _fetch_logs_t4trans(session, fecha_str: str, app_key: str) -> str:
         log_file_url = urljoin(logs_url, href)
     
     # Step 4: Fetch the log file content
-    resp_day = session.get(log_file_url, timeout=60)
-    resp_day.raise_for_status()
-    logs_html = resp_day.text
-    
-    return logs_html
-
+    # (the link may come from a cached index: forget it if the fetch fails)
+    # .log crudo y append-only: solo se pide/clasifica lo agregado desde la última corrida
+    if INCREMENTAL_FETCH_ENABLED:
+        try:
+            with stage("download"):
+                return fetch_log_incremental(
+                    session, log_file_url, app_key, nombre,
+                    clasificar=lambda chunks: _imprimir_conteo_t4trans(classify_raw_log(chunks, T4TRANS)),
+                    timeout=60,
+                )
+        except Exception:
+            invalidate_log_index(app_key)
+            raise
 
-def _get_most_recent_log_date_from_links(log_links: list) -> tuple:
-    """
-    Extract the most recent date from a list of log file links.
+    with stage("download"):
+        resp_day = session.get(log_file_url, timeout=60)
+        if not resp_day.ok:
+            invalidate_log_index(app_key)
+        resp_day.raise_for_status()
+        logs_html = resp_day.text
     
-    Args:
-        log_links: List of BeautifulSoup <a> tag elements containing log filenames
-        
-    Returns:
-        tuple: (most_recent_date, days_old) or (None, None) if no valid dates found
-    """
-    import re
-    from datetime import datetime
-    
-    date_pattern = re.compile(r'laravel-(\d{4}-\d{2}-\d{2})\.log')
-    log_dates = []
-    
-    for a in log_links:
-        text = a.get_text(strip=True)
-        match = date_pattern.match(text)
-        if match:
-            try:
-                log_date = datetime.strptime(match.group(1), "%Y-%m-%d").date()
-                log_dates.append(log_date)
-            except ValueError:
-                continue
-    
-    if not log_dates:
-        return None, None
-    
-    most_recent = max(log_dates)
-    today = datetime.now().date()
-    days_old = (today - most_recent).days
-    
-    return most_recent, days_old
-
+    return logs_html
 
 
 def _fetch_logs_from_json_api(session, fecha_str: str, app_key: str) -> str:
@@ -420,84 +290,13 @@ def _fetch_logs_from_json_api(session, fecha_str: str, app_key: str) -> str:
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
     }
     
-    resp_index = session.get(logs_url, headers=headers_html, timeout=60)
-    resp_index.raise_for_status()
-    
-    # Parse HTML to find log file links
-    soup = BeautifulSoup(resp_index.text, "html.parser")
-    
-    # Step 2: Find the log file link for the requested date
-    target_filename = f"laravel-{fecha_str}.log"
-    
-    # Search for the link with the target filename
-    link_tag = None
-    for a in soup.find_all('a', href=True):
-        text = a.get_text(strip=True)
-        if text == target_filename:
-            link_tag = a
-            break
-    
-    if link_tag is None:
-        # Try previous day as fallback
-        fecha_hoy = datetime.now().date()
-        fecha_solicitada_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-        
-        if fecha_solicitada_obj > fecha_hoy:
-            available_files = [a.get_text(strip=True) for a in soup.find_all('a', href=True) if '.log' in a.get_text()]
-            msg = (
-                f"⚠️ No se puede procesar fecha futura {fecha_str} en {app_key}. "
-                f"Archivos disponibles: {available_files}"
-            )
-            raise RuntimeError(msg)
-        
-        fecha_anterior_obj = fecha_solicitada_obj - timedelta(days=1)
-        fecha_anterior_str = fecha_anterior_obj.strftime("%Y-%m-%d")
-        target_filename_anterior = f"laravel-{fecha_anterior_str}.log"
-        
-        print(f"   ⚠️ No se encontró log para {fecha_str}, intentando con {fecha_anterior_str}...")
-        
-        for a in soup.find_all('a', href=True):
-            text = a.get_text(strip=True)
-            if text == target_filename_anterior:
-                link_tag = a
-                target_filename = target_filename_anterior
-                print(f"   ✓ Usando logs del día anterior ({fecha_anterior_str})")
-                break
-        
-        if link_tag is None:
-            # Check for stale logs
-            date_pattern = re.compile(r'laravel-(\d{4}-\d{2}-\d{2})\.log')
-            log_dates = []
-            for a in soup.find_all('a', href=True):
-                text = a.get_text(strip=True)
-                match = date_pattern.match(text)
-                if match:
-                    try:
-                        log_date = datetime.strptime(match.group(1), "%Y-%m-%d").date()
-                        log_dates.append(log_date)
-                    except ValueError:
-                        continue
-            
-            if log_dates:
-                most_recent = max(log_dates)
-                today = datetime.now().date()
-                days_old = (today - most_recent).days
-                
-                if days_old >= 2:
-                    available_files = [a.get_text(strip=True) for a in soup.find_all('a', href=True) if '.log' in a.get_text()]
-                    msg = (
-                        f"WARNING: Log files have not been created for two or more days in {app_key}. "
-                        f"Most recent log: {most_recent} ({days_old} days old). "
-                        f"Requested: {fecha_str}. Available files: {available_files}"
-                    )
-                    raise StaleLogsError(msg, app_key, fecha_str, days_old, most_recent)
-            
-            available_files = [a.get_text(strip=True) for a in soup.find_all('a', href=True) if '.log' in a.get_text()]
-            raise RuntimeError(f"No se encontró log para {fecha_str} ni para el día anterior en {app_key}. Archivos: {available_files}")
+    # Step 2: Find the log file link for the requested date (index cached per app)
+    target_filename, href, _ = _resolver_archivo_log(
+        session, app_key, logs_url, fecha_str, style=ALL_LINKS, headers=headers_html
+    )
     
     # Step 3: Get the encrypted token from the link href
     # href format: ?l=eyJpdiI6I...
-    href = link_tag.get('href') or ''
     if not href.startswith('?l='):
         raise RuntimeError(f"T4App Admin link format unexpected for {target_filename}: {href}")
     
@@ -505,83 +304,87 @@ def _fetch_logs_from_json_api(session, fecha_str: str, app_key: str) -> str:
     log_file_url = urljoin(logs_url, href)
     
     # Step 4: Fetch the specific log file content using the encrypted token
-    resp_content = session.get(log_file_url, headers=headers_html, timeout=60)
-    resp_content.raise_for_status()
+    with stage("day_fetch"):
+        resp_content = session.get(log_file_url, headers=headers_html, timeout=60)
+        if not resp_content.ok:
+            invalidate_log_index(app_key)
+        resp_content.raise_for_status()
+        html = resp_content.text
     
     # Return the HTML (it returns rendered HTML table with log entries)
-    return resp_content.text
+    return html
 
 
-def _get_most_recent_log_date(soup: BeautifulSoup) -> tuple:
-    """
-    Extrae las fechas de todos los archivos de log disponibles y devuelve la más reciente.
-    
-    Returns:
-        tuple: (most_recent_date, days_old) donde most_recent_date es un objeto date
-               y days_old es el número de días desde hoy hasta esa fecha (positivo = pasado)
-               Devuelve (None, None) si no se encuentran archivos de log con fechas válidas.
+def _resolver_archivo_log(session, app_key: str, logs_url: str, fecha_str: str,
+                          style: str = LIST_GROUP, headers: dict = None) -> tuple:
     """
-    # Pattern para extraer fechas YYYY-MM-DD de nombres de archivo
-    date_pattern = re.compile(r'(\d{4}-\d{2}-\d{2})\.log')
-    
-    log_dates = []
-    for a in soup.select("div.list-group a"):
-        text = (a.get_text() or "").strip()
-        match = date_pattern.search(text)
-        if match:
-            try:
-                log_date = datetime.strptime(match.group(1), "%Y-%m-%d").date()
-                log_dates.append(log_date)
-            except ValueError:
-                continue
-    
-    if not log_dates:
-        return None, None
-    
-    most_recent = max(log_dates)
-    today = datetime.now().date()
-    days_old = (today - most_recent).days
-    
-    return most_recent, days_old
+    Busca en el índice de /logs el archivo de fecha_str.
 
+    Si no existe:
+    - Si es fecha FUTURA: lanza error sin fallback
+    - Si es fecha HOY o PASADA: intenta con el día anterior
+    - Si tampoco existe: StaleLogsError si el log más reciente tiene 2+ días,
+      RuntimeError en otro caso
 
-def _buscar_log_por_fecha(soup: BeautifulSoup, fecha_str: str) -> tuple:
-    """
-    Busca un archivo de log para una fecha específica en el HTML parseado.
-    
     Returns:
-        tuple: (link_tag, fecha_usada) donde link_tag es el elemento <a> encontrado 
-               (o None si no se encuentra), y fecha_usada es la fecha del log encontrado
+        tuple: (nombre, href, fecha_usada)
     """
-    # Nombre del archivo estándar
-    target_date_suffix = f"-{fecha_str}.log"
-    strict_target = f"laravel-{fecha_str}.log"
+    index, link = resolve_log_link(session, app_key, logs_url, fecha_str, style, headers)
+    fecha_usada = fecha_str
+
+    if link is None:
+        # Obtener fecha actual (sin hora para comparar solo fechas)
+        fecha_hoy = datetime.now().date()
+        fecha_solicitada_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+
+        # ¿Es fecha futura? NO usar fallback
+        if fecha_solicitada_obj > fecha_hoy:
+            msg = (
+                f"⚠️ No se puede procesar fecha futura {fecha_str} en {app_key}. "
+                f"La fecha solicitada es posterior a hoy ({fecha_hoy}). "
+                f"Los logs aún no existen. "
+                f"Archivos disponibles: {index.available_files()}"
+            )
+            raise RuntimeError(msg)
+
+        # Si es fecha HOY o PASADA, intentar con el día anterior (mismo índice)
+        fecha_anterior_str = (fecha_solicitada_obj - timedelta(days=1)).strftime("%Y-%m-%d")
+        print(f"   ⚠️ No se encontró log para {fecha_str}, intentando con {fecha_anterior_str}...")
+
+        link = index.resolve(fecha_anterior_str)
+        if link is not None:
+            fecha_usada = fecha_anterior_str
+            print(f"   ✓ Usando logs del día anterior ({fecha_anterior_str})")
+
+    # Si después de intentar ambas fechas no hay resultados
+    if link is None:
+        available_files = index.available_files()
+        most_recent_date, days_old = index.most_recent()
+
+        if most_recent_date and days_old >= 2:
+            msg = (
+                f"WARNING: Log files have not been created for two or more days in {app_key}. "
+                f"Most recent log: {most_recent_date} ({days_old} days old). "
+                f"Requested: {fecha_str}. Available files: {available_files}"
+            )
+            raise StaleLogsError(msg, app_key, fecha_str, days_old, most_recent_date)
+
+        msg = (
+            f"No se encontró log para {fecha_str} ni para el día anterior en {app_key}. "
+            f"Archivos disponibles: {available_files}"
+        )
+        raise RuntimeError(msg)
+
+    nombre, href = link
+    return nombre, href, fecha_usada
 
-    link_tag = None
-    
-    # Recorremos todos los links para buscar match
-    for a in soup.select("div.list-group a"):
-        text = (a.get_text() or "").strip()
-        
-        # 1. Prioridad: Coincidencia exacta
-        if text == strict_target:
-            link_tag = a
-            break
-        
-        # 2. Fallback: Coincidencia parcial por fecha (ej: worker-2025-12-11.log)
-        # Solo si no hemos encontrado uno estricto aún
-        if link_tag is None and text.endswith(target_date_suffix):
-            link_tag = a
-            
-    return link_tag, fecha_str
 
 def _es_no_controlado(texto: str) -> bool:
     """
     Devuelve True si el texto parece un error no controlado
     según las palabras clave definidas en KEYWORDS_NO_CONTROLADO.
     """
-    t = texto.lower()
-    return any(keyword in t for keyword in KEYWORDS_NO_CONTROLADO)
+    return _PLAN.is_no_controlado(texto)
 
 
 def _resumir_mensaje(texto: str) -> str:
@@ -623,10 +426,27 @@ def classify_logs_t4trans(html: str):
     - local.ERROR → Errores NO CONTROLADOS
     - local.DEBUG con palabra "error" → Errores CONTROLADOS
     - local.DEBUG sin "error" → Ignorar
+
+    Con CLASSIFY_WORKERS>1 y un .log grande, se clasifica por trozos en el
+    pool de procesos (app/parallel_classify.py).
     
     Returns:
-        (errores_controlados, errores_no_controlados) como listas de strings
+        (errores_controlados, errores_no_controlados) como listas de LogEntry
     """
+    if CLASSIFY_WORKERS > 1:
+        return _imprimir_conteo_t4trans(classify_raw_log([html], T4TRANS))
+    return _imprimir_conteo_t4trans(_clasificar_t4trans(html))
+
+
+def _imprimir_conteo_t4trans(clasificacion):
+    errores_controlados, errores_no_controlados = clasificacion
+    print(f"   ℹ️ T4TRANS parser: {len(errores_no_controlados)} local.ERROR (no controlados), "
+          f"{len(errores_controlados)} local.DEBUG con 'error' (controlados)")
+    return clasificacion
+
+
+def _clasificar_t4trans(html: str):
+    """Clasificación T4TRANS de un texto (sin imprimir; ver classify_logs_t4trans)."""
     from bs4 import BeautifulSoup
     import re
     
@@ -645,9 +465,6 @@ def classify_logs_t4trans(html: str):
     
     matches = re.finditer(pattern, page_text, re.IGNORECASE | re.DOTALL)
     
-    debug_count = 0
-    error_count = 0
-    
     for match in matches:
         timestamp = match.group(1)
         level = match.group(2).upper()
@@ -663,9 +480,7 @@ def classify_logs_t4trans(html: str):
         # Clasificar según el nivel
         if level == "ERROR":
             # local.ERROR → NO CONTROLADO
-            error_count += 1
-            log_line = f"ERROR - local - {timestamp} - {message}"
-            errores_no_controlados.append(log_line)
+            errores_no_controlados.append(LogEntry("ERROR", "local", timestamp, message))
             
         elif level in ("DEBUG", "INFO"):
             # local.DEBUG o INFO → Solo si contiene "error" es CONTROLADO
@@ -677,28 +492,28 @@ def classify_logs_t4trans(html: str):
                             '\"error\"' in message)
             
             if has_error_key:
-                debug_count += 1
-                log_line = f"ERROR - local - {timestamp} - {message}"
-                errores_controlados.append(log_line)
+                errores_controlados.append(LogEntry("ERROR", "local", timestamp, message))
             # Si no tiene "error", se ignora (no se agrega a ninguna lista)
     
-    # Debug: imprimir contadores
-    print(f"   ℹ️ T4TRANS parser: {error_count} local.ERROR (no controlados), {debug_count} local.DEBUG con 'error' (controlados)")
-    
     return errores_controlados, errores_no_controlados
 
 
-def classify_logs(html: str, app_key: str = None):
+def classify_logs(html: Union[str, ClassifiedLogs], app_key: str = None):
     """
     Parsea el HTML, se queda con Level = error,
     y los separa en controlados / no controlados.
     
     Si app_key es 't4trans', usa el parser personalizado.
+    Si recibe un ClassifiedLogs (archivo grande ya clasificado en streaming),
+    devuelve sus listas directamente.
 
-    Devuelve (errores_controlados, errores_no_controlados) como listas de strings,
-    donde cada string tiene el formato:
-        ERROR - production - 2025-11-26 14:30:44 - Mensaje resumido
+    Devuelve (errores_controlados, errores_no_controlados) como listas de
+    LogEntry; str(entry) tiene el formato:
+        ERROR - production - 2025-11-26 14:30:44 - Mensaje completo
     """
+    if isinstance(html, ClassifiedLogs):
+        return html.controlados, html.no_controlados
+
     # Check if this app needs custom parsing
     if app_key == "t4trans":
         return classify_logs_t4trans(html)
@@ -711,11 +526,14 @@ def classify_logs(html: str, app_key: str = None):
         if auth_type == "t4trans_custom":
             return classify_logs_t4trans(html)
     
-    soup = BeautifulSoup(html, "html.parser")
+    return _clasificar_filas(iter_log_rows(html))
 
-    # AJUSTA este selector a tu HTML real si hace falta
-    rows = soup.select("table tbody tr")
 
+def _clasificar_filas(rows: Iterable[List[str]]):
+    """
+    Clasifica filas ya extraídas de la tabla (lista de textos de sus <td>)
+    en (errores_controlados, errores_no_controlados).
+    """
     errores_controlados = []
     errores_no_controlados = []
 
@@ -723,9 +541,7 @@ def classify_logs(html: str, app_key: str = None):
     total_registros = 0       # todos los registros de la tabla (cualquier Level)
     total_errors = 0          # solo registros con Level = error
 
-    for row in rows:
-        cols = [td.get_text(strip=True) for td in row.find_all("td")]
-
+    for cols in rows:
         # Necesitamos al menos: Level, Context/Environment, Fecha, Mensaje
         if len(cols) < 4:
             continue
@@ -735,31 +551,18 @@ def classify_logs(html: str, app_key: str = None):
         # Si la tabla tiene más de 4 columnas, nos quedamos con las primeras 4
         level, context, fecha, content = cols[:4]
 
-        level_lower = level.lower()
-        content_lower = content.lower()
-        
-        is_error = level_lower == "error"
-        is_info_with_error = level_lower == "info" and (
-            '"error":' in content_lower or
-            '&quot;error&quot;:' in content_lower or
-            '\\"error\\":' in content_lower
-        )
-
-        # Solo nos interesan los que tienen Level = error o INFO con payload de error
-        if not (is_error or is_info_with_error):
+        # Solo nos interesan los que tienen Level = error o INFO con payload de error;
+        # nivel + palabras clave en una sola pasada sobre el contenido COMPLETO
+        no_controlado = _PLAN.classify(level, content)
+        if no_controlado is None:
             continue
 
         total_errors += 1
 
-        # Usamos el contenido COMPLETO para clasificar...
-        if _es_no_controlado(content):
-            tipo_lista = errores_no_controlados
-        else:
-            tipo_lista = errores_controlados
+        tipo_lista = errores_no_controlados if no_controlado else errores_controlados
 
-        # Formato completo sin resumir:
+        # Contenido completo sin resumir; str(entry) da la línea de siempre:
         # ERROR - production - 2025-11-26 14:04:48 - Mensaje completo
-        log_line = f"{level.upper()} - {context} - {fecha} - {content}"
-        tipo_lista.append(log_line)
+        tipo_lista.append(LogEntry(level.upper(), context, fecha, content))
 
     return errores_controlados, errores_no_controlados
@@ -27,8 +27,13 @@ class NotificationChannel(ABC):
 
     send_report() — Envía el reporte regular de errores del día.
     send_alert()  — Envía alertas puntuales (fecha futura, stale logs, conexión).
+
+    MAX_CONCURRENCY — envíos simultáneos de este canal en notificar_apps()
+    (el ritmo de envío lo controla app/rate_limit.py).
     """
 
+    MAX_CONCURRENCY: int = 2
+
     @abstractmethod
     def send_report(self, result: "ScrapingResult") -> bool:
         """
@@ -2,10 +2,15 @@
 """
 Orquestador de notificaciones — Strategy Pattern.
 
-Itera sobre CHANNELS enviando send_report() a cada canal.
+Envía send_report() a cada canal de CHANNELS. notificar_apps() reparte el
+envío de todas las apps en paralelo: cada canal tiene su propio pool de
+hilos (NotificationChannel.MAX_CONCURRENCY) y su token bucket
+(app/rate_limit.py), así un canal lento no frena a los demás.
 Para agregar o quitar un canal basta con modificar CHANNELS; este archivo
 no necesita cambios.
 
+NOTIFY_PARALLEL=0 vuelve al envío secuencial (app por app, canal por canal).
+
 Para reactivar SMS:
     from sms.channel import SMSChannel
     SMSChannel.ENABLED = True
@@ -13,9 +18,15 @@ Para reactivar SMS:
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable
 
 from app.notification_channel import NotificationChannel
+from app.run_metrics import stage
 from mailer.channel import EmailChannel
 from slack_comunication.channel import SlackChannel
 from google_chat.channel import GChatChannel
@@ -26,6 +37,8 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+NOTIFY_PARALLEL = os.getenv("NOTIFY_PARALLEL", "1") != "0"
+
 # ------------------------------------------------------------------ registry --
 # Orden de envío: primero el más crítico/confiable.
 # SMSChannel retorna False automáticamente si ENABLED = False.
@@ -37,23 +50,122 @@ CHANNELS: list[NotificationChannel] = [
 ]
 
 
+# ----------------------------------------------------------------- latencia --
+
+@dataclass
+class ChannelLatency:
+    """Tiempos de send_report() de un canal durante la corrida."""
+
+    channel: str
+    llamadas: int = 0
+    enviados: int = 0
+    fallos: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+
+    def registrar(self, segundos: float, enviado: bool, fallo: bool) -> None:
+        self.llamadas += 1
+        self.enviados += int(enviado)
+        self.fallos += int(fallo)
+        self.total_s += segundos
+        self.max_s = max(self.max_s, segundos)
+
+    @property
+    def promedio_s(self) -> float:
+        return self.total_s / self.llamadas if self.llamadas else 0.0
+
+
 # ---------------------------------------------------------------- public API --
 
-def notificar_app(result: "ScrapingResult") -> None:
+def _enviar_reporte(
+    channel: NotificationChannel,
+    result: "ScrapingResult",
+    latencia: ChannelLatency,
+    lock: threading.Lock,
+) -> None:
+    """send_report() de un canal para una app; un fallo no afecta a los demás."""
+    inicio = time.perf_counter()
+    sent = failed = False
+    try:
+        with stage(f"notify:{channel.name()}", app_key=result.app_key):
+            sent = channel.send_report(result)
+        if sent:
+            print(f"✓ {channel.name()} enviado para {result.app_name}")
+    except Exception as e:
+        failed = True
+        print(f"⚠️ {channel.name()} falló para {result.app_name}: {e}")
+        logger.exception("Channel %s failed for %s", channel.name(), result.app_name)
+    finally:
+        with lock:
+            latencia.registrar(time.perf_counter() - inicio, bool(sent), failed)
+
+
+def notificar_apps(results: Iterable["ScrapingResult"]) -> dict[str, ChannelLatency]:
+    """
+    Envía el reporte diario de todas las apps a todos los canales de CHANNELS.
+
+    Cada canal usa su propio pool de MAX_CONCURRENCY hilos, de modo que los
+    canales avanzan en paralelo entre sí y, dentro de un canal, varias apps a
+    la vez. Los fallos quedan aislados por canal y por app.
+
+    Returns:
+        {nombre_canal: ChannelLatency} para el reporte de fin de corrida.
+    """
+    results = list(results)
+    latencias = {channel.name(): ChannelLatency(channel.name()) for channel in CHANNELS}
+    lock = threading.Lock()
+
+    if not NOTIFY_PARALLEL:
+        for result in results:
+            for channel in CHANNELS:
+                _enviar_reporte(channel, result, latencias[channel.name()], lock)
+        return latencias
+
+    pools = [
+        ThreadPoolExecutor(
+            max_workers=max(1, channel.MAX_CONCURRENCY),
+            thread_name_prefix=f"notify-{channel.__class__.__name__}",
+        )
+        for channel in CHANNELS
+    ]
+    try:
+        futuros = [
+            pool.submit(_enviar_reporte, channel, result, latencias[channel.name()], lock)
+            for result in results
+            for channel, pool in zip(CHANNELS, pools)
+        ]
+        for futuro in futuros:
+            futuro.result()
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=True)
+
+    return latencias
+
+
+def notificar_app(result: "ScrapingResult") -> dict[str, ChannelLatency]:
     """
     Envía el reporte diario a todos los canales registrados en CHANNELS.
 
     Args:
         result: ScrapingResult devuelto por procesar_aplicacion().
     """
-    for channel in CHANNELS:
-        try:
-            sent = channel.send_report(result)
-            if sent:
-                print(f"✓ {channel.name()} enviado para {result.app_name}")
-        except Exception as e:
-            print(f"⚠️ {channel.name()} falló para {result.app_name}: {e}")
-            logger.exception("Channel %s failed for %s", channel.name(), result.app_name)
+    return notificar_apps([result])
+
+
+def imprimir_latencias(latencias: dict[str, ChannelLatency], tiempo_total: float | None = None) -> None:
+    """Resumen de fin de corrida: latencia de send_report() por canal."""
+    if not any(lat.llamadas for lat in latencias.values()):
+        return
+    titulo = "\n📨 Latencia de notificaciones por canal"
+    if tiempo_total is not None:
+        titulo += f" ({tiempo_total:.2f}s reales)"
+    print(titulo + ":")
+    for lat in latencias.values():
+        if not lat.llamadas:
+            continue
+        print(f"   • {lat.channel}: {lat.enviados}/{lat.llamadas} enviados, {lat.fallos} fallos | "
+              f"prom {lat.promedio_s:.2f}s / máx {lat.max_s:.2f}s / total {lat.total_s:.2f}s")
 
 
 def _send_alert_all(message: str) -> None:
@@ -0,0 +1,188 @@
+# app/parallel_classify.py
+"""
+Clasificación de .log crudos en un pool de procesos (opcional).
+
+En los tenants con archivos del día de decenas de MB, partir el log en
+entradas, clasificarlas y firmarlas es CPU pura en el proceso principal (y
+con el GIL, frena también a los otros hilos de main.py). Con
+CLASSIFY_WORKERS>1:
+
+  - el texto se corta en trozos de ~CLASSIFY_CHUNK_MB, siempre justo antes de
+    una línea "[YYYY-MM-DD HH:MM:SS] env.LEVEL:" (límite de entrada), así cada
+    trozo se clasifica igual que dentro del archivo completo
+  - los trozos van a un ProcessPoolExecutor (forkserver: los hijos no heredan
+    hilos ni conexiones del padre) mientras se sigue descargando, con un
+    máximo de 2 trozos en vuelo por worker (memoria acotada)
+  - cada worker devuelve LogEntry ya firmadas y se juntan en el orden del archivo
+
+Si el log entra en un solo trozo (o CLASSIFY_WORKERS<=1) se clasifica en el
+proceso, como siempre. Cubre el .log de T4TRANS y las descargas de archivos
+grandes (?dl=), completas o incrementales; la tabla HTML de log-viewer se
+sigue parseando en el proceso (el parser de la tabla necesita el documento
+entero y mandar las filas a otro proceso cuesta más que clasificarlas).
+
+Variables de entorno:
+  CLASSIFY_WORKERS=0     procesos del pool (0/1 = desactivado)
+  CLASSIFY_CHUNK_MB=4    tamaño aproximado de cada trozo
+"""
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import re
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from app.log_entry import LogEntry
+
+CLASSIFY_WORKERS = int(os.getenv("CLASSIFY_WORKERS", "0"))
+CLASSIFY_CHUNK_MB = float(os.getenv("CLASSIFY_CHUNK_MB", "4"))
+
+# Tipos de .log crudo
+LARAVEL = "laravel"    # descargas ?dl=: iter_laravel_entries + _clasificar_filas
+T4TRANS = "t4trans"    # .log directo de T4TRANS: classify_logs_t4trans
+
+# Salto de línea seguido de un header de entrada (misma forma que _LARAVEL_HEADER_RE)
+_LIMITE_RE = re.compile(r"\n(?=\[\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\]\s+\w+\.\w+:)")
+
+Clasificacion = Tuple[List[LogEntry], List[LogEntry]]
+
+
+def split_on_entries(chunks: Iterable[str], chunk_chars: int) -> Iterator[str]:
+    """
+    Junta los chunks de texto y emite trozos de al menos ~chunk_chars que
+    terminan en un límite de entrada (el salto de línea queda en el trozo
+    anterior). Una entrada más grande que chunk_chars no se parte.
+    """
+    partes: List[str] = []
+    tam = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        partes.append(chunk)
+        tam += len(chunk)
+        if tam < chunk_chars:
+            continue
+        texto = "".join(partes)
+        corte = None
+        for corte in _LIMITE_RE.finditer(texto, len(texto) // 2):
+            pass
+        if corte is None:
+            partes, tam = [texto], len(texto)
+            continue
+        yield texto[: corte.start() + 1]
+        resto = texto[corte.start() + 1:]
+        partes, tam = [resto], len(resto)
+    if tam:
+        yield "".join(partes)
+
+
+def _clasificar_en_proceso(chunks: Iterable[str], kind: str) -> Clasificacion:
+    from app.log_parser import iter_laravel_entries
+    from app.logs_scraper import _clasificar_filas, _clasificar_t4trans, _filas_de_entradas
+
+    if kind == T4TRANS:
+        return _clasificar_t4trans("".join(chunks))
+    return _clasificar_filas(_filas_de_entradas(iter_laravel_entries(chunks)))
+
+
+def _clasificar_trozo(kind: str, texto: str) -> Clasificacion:
+    """Tarea del worker: clasifica un trozo y deja las firmas calculadas."""
+    controlados, no_controlados = _clasificar_en_proceso([texto], kind)
+    for entry in controlados:
+        entry.signature
+    for entry in no_controlados:
+        entry.signature
+    return controlados, no_controlados
+
+
+# ----------------------------------------------------------------- pool ---
+
+_POOL: Optional[ProcessPoolExecutor] = None
+_POOL_PID: Optional[int] = None
+_POOL_WORKERS = 0
+_POOL_LOCK = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """Pool del proceso actual (se crea perezosamente; un hijo de fork arma el suyo)."""
+    global _POOL, _POOL_PID, _POOL_WORKERS
+    with _POOL_LOCK:
+        if _POOL is not None and (_POOL_PID != os.getpid() or _POOL_WORKERS != workers):
+            if _POOL_PID == os.getpid():
+                _POOL.shutdown(wait=False, cancel_futures=True)
+            _POOL = None
+        if _POOL is None:
+            metodos = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in metodos else "spawn")
+            _POOL = ProcessPoolExecutor(max_workers=workers, mp_context=ctx)
+            _POOL_PID, _POOL_WORKERS = os.getpid(), workers
+        return _POOL
+
+
+def shutdown_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL_PID == os.getpid():
+            _POOL.shutdown(wait=True, cancel_futures=True)
+        _POOL = None
+
+
+atexit.register(shutdown_pool)
+
+
+# ---------------------------------------------------------- public API ---
+
+def classify_raw_log(
+    chunks: Iterable[str],
+    kind: str = LARAVEL,
+    workers: Optional[int] = None,
+    chunk_mb: Optional[float] = None,
+) -> Clasificacion:
+    """
+    Clasifica un .log crudo (chunks de texto) en (controlados, no_controlados).
+
+    Con workers>1 (default CLASSIFY_WORKERS) y más de un trozo, usa el pool de
+    procesos; el resultado es el mismo que clasificarlo en el proceso.
+    """
+    workers = CLASSIFY_WORKERS if workers is None else workers
+    if workers <= 1:
+        return _clasificar_en_proceso(chunks, kind)
+
+    chunk_chars = int((CLASSIFY_CHUNK_MB if chunk_mb is None else chunk_mb) * 1024 * 1024)
+    trozos = split_on_entries(chunks, chunk_chars)
+    primero = next(trozos, None)
+    segundo = next(trozos, None)
+    if segundo is None:
+        return _clasificar_en_proceso([primero or ""], kind)
+
+    pool = _get_pool(workers)
+    controlados: List[LogEntry] = []
+    no_controlados: List[LogEntry] = []
+    en_vuelo: deque = deque()
+
+    def _juntar(futuro):
+        c, nc = futuro.result()
+        controlados.extend(c)
+        no_controlados.extend(nc)
+
+    try:
+        for texto in _con_primeros(primero, segundo, trozos):
+            en_vuelo.append(pool.submit(_clasificar_trozo, kind, texto))
+            if len(en_vuelo) >= 2 * workers:
+                _juntar(en_vuelo.popleft())
+        while en_vuelo:
+            _juntar(en_vuelo.popleft())
+    finally:
+        for futuro in en_vuelo:
+            futuro.cancel()
+    return controlados, no_controlados
+
+
+def _con_primeros(primero: str, segundo: str, resto: Iterator[str]) -> Iterator[str]:
+    yield primero
+    yield segundo
+    yield from resto
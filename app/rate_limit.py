@@ -0,0 +1,86 @@
+# app/rate_limit.py
+"""
+Token buckets por canal de notificación.
+
+Reemplazan los time.sleep() fijos después de cada envío: el hilo solo espera
+si realmente se agotó el cupo del canal, y varios hilos comparten el mismo
+cupo (un bucket por canal y por proceso).
+
+Configuración por variables de entorno (envíos por segundo y ráfaga):
+    NOTIFY_RATE_SMS=0.333   NOTIFY_BURST_SMS=1     (Twilio trial: 1 SMS/s, con margen)
+    NOTIFY_RATE_GCHAT=1     NOTIFY_BURST_GCHAT=1   (Google Chat: 1 msg/s por espacio)
+    NOTIFY_RATE_SLACK=1     NOTIFY_BURST_SLACK=1   (Slack webhooks: 1 msg/s)
+    NOTIFY_RATE_EMAIL=0     (0 = sin límite)
+
+Uso:
+    from app.rate_limit import throttle
+    throttle("sms")          # bloquea hasta que haya un token
+    cliente.enviar_sms(msg)
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+# canal → (envíos por segundo, ráfaga); rate 0 = sin límite
+_DEFAULT_RATES: Dict[str, tuple[float, int]] = {
+    "sms": (1 / 3, 1),
+    "gchat": (1.0, 1),
+    "slack": (1.0, 1),
+    "email": (0.0, 1),
+}
+
+
+class TokenBucket:
+    """
+    Token bucket thread-safe: `rate` tokens por segundo, hasta `capacity`.
+    acquire() bloquea lo justo para que haya un token disponible.
+    """
+
+    def __init__(self, rate: float, capacity: int = 1):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Toma `tokens`; devuelve los segundos que tuvo que esperar."""
+        esperado = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return esperado
+                espera = (tokens - self._tokens) / self.rate
+            time.sleep(espera)
+            esperado += espera
+
+
+_BUCKETS: Dict[str, Optional[TokenBucket]] = {}
+_BUCKETS_LOCK = threading.Lock()
+
+
+def get_bucket(canal: str) -> Optional[TokenBucket]:
+    """Bucket compartido del canal (None si el canal no tiene límite)."""
+    with _BUCKETS_LOCK:
+        if canal not in _BUCKETS:
+            rate_def, burst_def = _DEFAULT_RATES.get(canal, (0.0, 1))
+            rate = float(os.getenv(f"NOTIFY_RATE_{canal.upper()}", rate_def))
+            burst = int(os.getenv(f"NOTIFY_BURST_{canal.upper()}", burst_def))
+            _BUCKETS[canal] = TokenBucket(rate, burst) if rate > 0 else None
+        return _BUCKETS[canal]
+
+
+def throttle(canal: str) -> float:
+    """Espera el turno del canal antes de un envío. Devuelve los segundos esperados."""
+    bucket = get_bucket(canal)
+    return bucket.acquire() if bucket else 0.0
@@ -7,11 +7,28 @@ Ventajas sobre dict:
   - Sin .get() con defaults manuales
   - Métodos helper (has_errors, has_uncontrolled, etc.)
   - Backward-compatible a través de __getitem__ y to_dict()
+  - Vista agregada por firma (aggregated_errors) calculada una vez y
+    compartida por todos los canales de notificación
+  - Los errores son LogEntry (app/log_entry.py); to_dict() los entrega como
+    las líneas de siempre para el código que espera strings
 """
 from __future__ import annotations
 
+import threading
 from dataclasses import dataclass, field
 from datetime import date
+from typing import Optional
+
+from app.log_entry import LogEntry, as_line
+
+_LISTAS = (
+    "no_controlados_nuevos",
+    "no_controlados_avisados",
+    "controlados_nuevos",
+    "controlados_avisados",
+)
+# Claves de to_dict(), en orden
+_CAMPOS = ("app_key", "app_name", "dia", "fecha_str") + _LISTAS
 
 
 @dataclass
@@ -26,10 +43,19 @@ class ScrapingResult:
     dia: date
     fecha_str: str
 
-    no_controlados_nuevos: list[str] = field(default_factory=list)
-    no_controlados_avisados: list[str] = field(default_factory=list)
-    controlados_nuevos: list[str] = field(default_factory=list)
-    controlados_avisados: list[str] = field(default_factory=list)
+    no_controlados_nuevos: list[LogEntry] = field(default_factory=list)
+    no_controlados_avisados: list[LogEntry] = field(default_factory=list)
+    controlados_nuevos: list[LogEntry] = field(default_factory=list)
+    controlados_avisados: list[LogEntry] = field(default_factory=list)
+
+    # Memo de aggregated_errors(); no forma parte del resultado serializado
+    _aggregated: Optional[tuple[list[dict], list[dict]]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+    # Los canales de notificar_apps() piden la vista agregada desde hilos distintos
+    _aggregated_lock: threading.Lock = field(
+        default_factory=threading.Lock, init=False, repr=False, compare=False
+    )
 
     # ------------------------------------------------------------------ helpers
 
@@ -58,28 +84,65 @@ class ScrapingResult:
     def total_controlados(self) -> int:
         return len(self.controlados_nuevos) + len(self.controlados_avisados)
 
+    # -------------------------------------------------------- vista agregada ---
+
+    def aggregated_errors(self) -> tuple[list[dict], list[dict]]:
+        """
+        Errores NUEVOS del día agregados por firma: (no_controlados, controlados).
+
+        Cada lista tiene dicts {"firma", "full_content", "count", "first_time"}
+        ordenados por first_time; es lo mismo que get_daily_errors() leería de
+        los .log que save_logs() escribe en esta corrida, pero sin volver a
+        disco. Se calcula la primera vez y se reutiliza en todos los canales
+        (aunque la pidan a la vez desde hilos distintos).
+        """
+        if self._aggregated is not None:
+            return self._aggregated
+        with self._aggregated_lock:
+            if self._aggregated is None:
+                from app.log_stats import parse_and_aggregate_log_lines
+
+                self._aggregated = (
+                    parse_and_aggregate_log_lines(self.no_controlados_nuevos, self.dia),
+                    parse_and_aggregate_log_lines(self.controlados_nuevos, self.dia),
+                )
+        return self._aggregated
+
     # ------------------------------------------------ backward-compatibility ---
 
     def to_dict(self) -> dict:
         """
         Serialización a dict para código externo que todavía usa
-        resultado.get("no_controlados_nuevos", []).
+        resultado.get("no_controlados_nuevos", []). Los errores van como
+        líneas "LEVEL - context - fecha - contenido" (strings).
+        """
+        return {key: self._legacy(key) for key in _CAMPOS}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScrapingResult":
         """
-        return {
-            "app_key": self.app_key,
-            "app_name": self.app_name,
-            "dia": self.dia,
-            "fecha_str": self.fecha_str,
-            "no_controlados_nuevos": self.no_controlados_nuevos,
-            "no_controlados_avisados": self.no_controlados_avisados,
-            "controlados_nuevos": self.controlados_nuevos,
-            "controlados_avisados": self.controlados_avisados,
-        }
+        Inversa de to_dict() (p. ej. resultados que vuelven de una tarea de
+        Celery serializados en JSON). dia puede venir como date o "YYYY-MM-DD".
+        """
+        dia = data["dia"]
+        return cls(
+            app_key=data["app_key"],
+            app_name=data["app_name"],
+            dia=dia if isinstance(dia, date) else date.fromisoformat(dia),
+            fecha_str=data["fecha_str"],
+            **{key: [LogEntry.from_line(line) for line in data.get(key, [])] for key in _LISTAS},
+        )
+
+    def _legacy(self, key: str):
+        valor = getattr(self, key)
+        return [as_line(e) for e in valor] if key in _LISTAS else valor
 
     def __getitem__(self, key: str):
         """Permite resultado["app_key"] igual que un dict (backward-compat)."""
-        return self.to_dict()[key]
+        if key not in _CAMPOS:
+            raise KeyError(key)
+        return self._legacy(key)
 
     def get(self, key: str, default=None):
         """Permite resultado.get("app_key", ...) igual que un dict (backward-compat)."""
-        return self.to_dict().get(key, default)
+        return self._legacy(key) if key in _CAMPOS else default
@@ -0,0 +1,289 @@
+# app/run_metrics.py
+"""
+Tiempos por etapa de cada corrida de main.py (por app).
+
+Cada app se procesa dentro de track_app(app_key); el código de más abajo
+(login, /logs, descarga, clasificación, BD, archivos) marca sus etapas con
+stage("nombre") sin recibir la app por parámetro: la app actual viaja en un
+ContextVar del hilo que la procesa.
+
+Etapas:
+  scrape          procesar_aplicacion completo (incluye las de abajo salvo stats_snapshot y notify)
+  login           sesión autenticada (caché de sesión o login)
+  index_fetch     GET + parseo de la página /logs (solo si no estaba en caché)
+  day_fetch       GET de la página del día (?l=)
+  download        .log crudo / archivo grande (streaming: incluye clasificar)
+  classify        classify_logs
+  db_dedupe       dividir_nuevos_y_avisados (alerted_errors)
+  file_write      save_logs
+  history_insert  insert_error_history_batch
+  stats_snapshot  guardar el resultado de /api/stats/view (stats_cache)
+  notify:<Canal>  send_report() de cada canal
+
+Al final de la corrida write_run_report() deja el reporte en JSON y,
+opcionalmente, en formato de texto de Prometheus (textfile collector de
+node_exporter).
+
+Procesos de larga vida (el backend Flask) no tienen "corrida": se suscriben
+con add_listener() y reciben cada etapa, contador y acierto/fallo de caché
+(cache_event) al momento, haya o no una app en curso.
+
+Variables de entorno:
+  RUN_REPORT_PATH=salida_logs/run_report.json   reporte JSON ("" = no se escribe)
+  RUN_REPORT_PROM=                              archivo .prom (vacío = no se escribe)
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+RUN_REPORT_PATH = os.getenv("RUN_REPORT_PATH", "salida_logs/run_report.json")
+RUN_REPORT_PROM = os.getenv("RUN_REPORT_PROM", "")
+
+_APP_ACTUAL: ContextVar[Optional[str]] = ContextVar("run_metrics_app", default=None)
+
+# listener(kind, name, value, app_key): kind es "stage" (value = segundos),
+# "count" (value = lo sumado) o "cache" (name = caché, value = 1.0 acierto / 0.0 fallo)
+Listener = Callable[[str, str, float, Optional[str]], None]
+_LISTENERS: List[Listener] = []
+
+
+@dataclass
+class StageStat:
+    """Acumulado de una etapa para una app."""
+
+    count: int = 0
+    seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    def add(self, segundos: float) -> None:
+        self.count += 1
+        self.seconds += segundos
+        self.max_seconds = max(self.max_seconds, segundos)
+
+
+class RunMetrics:
+    """Tiempos por app y etapa de una corrida (thread-safe)."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.stages: Dict[str, Dict[str, StageStat]] = {}
+        self.totals: Dict[str, float] = {}
+        self.status: Dict[str, str] = {}
+        self.counters: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, app_key: str, stage: str, segundos: float) -> None:
+        with self._lock:
+            self.stages.setdefault(app_key, {}).setdefault(stage, StageStat()).add(segundos)
+
+    def count(self, app_key: str, name: str, value: float) -> None:
+        """Suma a un contador de la app (bytes descargados, líneas, errores...)."""
+        with self._lock:
+            contadores = self.counters.setdefault(app_key, {})
+            contadores[name] = contadores.get(name, 0) + value
+
+    def finish_app(self, app_key: str, segundos: float, status: str) -> None:
+        with self._lock:
+            self.totals[app_key] = segundos
+            self.status[app_key] = status
+
+    def _app_dict(self, app_key: str) -> dict:
+        return {
+            "total_seconds": round(self.totals.get(app_key, 0.0), 4),
+            "status": self.status.get(app_key, "unknown"),
+            "stages": {
+                nombre: {
+                    "count": s.count,
+                    "seconds": round(s.seconds, 4),
+                    "max_seconds": round(s.max_seconds, 4),
+                }
+                for nombre, s in self.stages.get(app_key, {}).items()
+            },
+            "counters": dict(self.counters.get(app_key, {})),
+        }
+
+    def pop_app(self, app_key: str) -> dict:
+        """
+        Saca la app de la corrida y devuelve su parte de to_dict()["apps"]
+        (las tareas por app de Celery la mandan al callback que arma el reporte).
+        """
+        with self._lock:
+            data = self._app_dict(app_key)
+            for tabla in (self.stages, self.totals, self.status, self.counters):
+                tabla.pop(app_key, None)
+        return data
+
+    def load_app(self, app_key: str, data: dict) -> None:
+        """Inversa de pop_app(): suma a la corrida lo medido en otro proceso."""
+        with self._lock:
+            etapas = self.stages.setdefault(app_key, {})
+            for nombre, s in data.get("stages", {}).items():
+                stat = etapas.setdefault(nombre, StageStat())
+                stat.count += s["count"]
+                stat.seconds += s["seconds"]
+                stat.max_seconds = max(stat.max_seconds, s["max_seconds"])
+            contadores = self.counters.setdefault(app_key, {})
+            for nombre, valor in data.get("counters", {}).items():
+                contadores[nombre] = contadores.get(nombre, 0) + valor
+            self.totals[app_key] = data.get("total_seconds", 0.0)
+            self.status[app_key] = data.get("status", "unknown")
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            apps = {app_key: self._app_dict(app_key)
+                    for app_key in sorted(set(self.stages) | set(self.totals))}
+        return {
+            "started_at": self.started_at,
+            "finished_at": time.time(),
+            "apps": apps,
+        }
+
+    def to_prometheus(self, prefix: str = "t4alerts_run") -> str:
+        """Formato de texto de Prometheus (gauges de la última corrida)."""
+        data = self.to_dict()
+        lineas = [
+            f"# HELP {prefix}_stage_seconds Segundos por etapa y app en la última corrida",
+            f"# TYPE {prefix}_stage_seconds gauge",
+        ]
+        for app_key, app in data["apps"].items():
+            for nombre, s in app["stages"].items():
+                lineas.append(f'{prefix}_stage_seconds{{app="{_esc(app_key)}",stage="{_esc(nombre)}"}} {s["seconds"]}')
+        lineas += [
+            f"# HELP {prefix}_app_seconds Segundos totales por app en la última corrida",
+            f"# TYPE {prefix}_app_seconds gauge",
+        ]
+        for app_key, app in data["apps"].items():
+            lineas.append(f'{prefix}_app_seconds{{app="{_esc(app_key)}",status="{_esc(app["status"])}"}} '
+                          f'{app["total_seconds"]}')
+        lineas += [
+            f"# HELP {prefix}_app_counter Contadores por app en la última corrida",
+            f"# TYPE {prefix}_app_counter gauge",
+        ]
+        for app_key, app in data["apps"].items():
+            for nombre, valor in app["counters"].items():
+                lineas.append(f'{prefix}_app_counter{{app="{_esc(app_key)}",name="{_esc(nombre)}"}} {valor}')
+        lineas += [
+            f"# HELP {prefix}_finished_timestamp_seconds Fin de la última corrida",
+            f"# TYPE {prefix}_finished_timestamp_seconds gauge",
+            f"{prefix}_finished_timestamp_seconds {data['finished_at']:.0f}",
+        ]
+        return "\n".join(lineas) + "\n"
+
+
+def _esc(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# ------------------------------------------------------------ corrida ---
+
+_RUN = RunMetrics()
+
+
+def current_run() -> RunMetrics:
+    return _RUN
+
+
+def reset_run() -> RunMetrics:
+    """Empieza una corrida nueva (main.py lo llama al arrancar)."""
+    global _RUN
+    _RUN = RunMetrics()
+    return _RUN
+
+
+# ---------------------------------------------------------- public API ---
+
+@contextmanager
+def track_app(app_key: str) -> Iterator[None]:
+    """Las etapas marcadas dentro de este bloque (en este hilo) son de app_key."""
+    token = _APP_ACTUAL.set(app_key)
+    try:
+        yield
+    finally:
+        _APP_ACTUAL.reset(token)
+
+
+@contextmanager
+def stage(nombre: str, app_key: Optional[str] = None) -> Iterator[None]:
+    """Mide el bloque y lo suma a la etapa de la app actual (si hay una)."""
+    app_key = app_key or _APP_ACTUAL.get()
+    if app_key is None and not _LISTENERS:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        if app_key is not None:
+            _RUN.record(app_key, nombre, segundos)
+        _avisar("stage", nombre, segundos, app_key)
+
+
+def count(nombre: str, valor: float, app_key: Optional[str] = None) -> None:
+    """Suma a un contador de la app actual (si hay una)."""
+    app_key = app_key or _APP_ACTUAL.get()
+    if app_key is not None:
+        _RUN.count(app_key, nombre, valor)
+    _avisar("count", nombre, valor, app_key)
+
+
+def cache_event(cache: str, hit: bool, app_key: Optional[str] = None) -> None:
+    """Acierto o fallo de una caché (log_index, session...): cuenta <cache>_cache_hits/misses."""
+    app_key = app_key or _APP_ACTUAL.get()
+    if app_key is not None:
+        _RUN.count(app_key, f"{cache}_cache_{'hits' if hit else 'misses'}", 1)
+    _avisar("cache", cache, 1.0 if hit else 0.0, app_key)
+
+
+def add_listener(fn: Listener) -> None:
+    """Suscribe fn a las etapas, contadores y eventos de caché de este proceso."""
+    if fn not in _LISTENERS:
+        _LISTENERS.append(fn)
+
+
+def remove_listener(fn: Listener) -> None:
+    if fn in _LISTENERS:
+        _LISTENERS.remove(fn)
+
+
+def _avisar(kind: str, nombre: str, valor: float, app_key: Optional[str]) -> None:
+    for fn in list(_LISTENERS):
+        try:
+            fn(kind, nombre, valor, app_key)
+        except Exception as e:
+            # Una métrica rota no puede tumbar el scraping
+            print(f"⚠️ Listener de métricas falló ({kind}:{nombre}): {e}")
+
+
+def write_run_report(extra: Optional[dict] = None) -> Optional[Path]:
+    """
+    Escribe el reporte JSON (RUN_REPORT_PATH) y el .prom (RUN_REPORT_PROM).
+    extra se agrega al JSON (fecha procesada, latencias de canales, etc.).
+    """
+    data = _RUN.to_dict()
+    data.update(extra or {})
+    destino = None
+    if RUN_REPORT_PATH:
+        destino = Path(RUN_REPORT_PATH)
+        _escribir(destino, json.dumps(data, indent=2, default=str))
+    if RUN_REPORT_PROM:
+        _escribir(Path(RUN_REPORT_PROM), _RUN.to_prometheus())
+    return destino
+
+
+def _escribir(destino: Path, texto: str) -> None:
+    try:
+        destino.parent.mkdir(parents=True, exist_ok=True)
+        tmp = destino.with_name(f".{destino.name}.{os.getpid()}.tmp")
+        tmp.write_text(texto, encoding="utf-8")
+        os.replace(tmp, destino)
+    except OSError as e:
+        print(f"⚠️ No se pudo escribir {destino}: {e}")
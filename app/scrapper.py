@@ -1,13 +1,18 @@
 # app/scrapper.py
-from datetime import date
+import re
+from datetime import date, datetime
 from typing import Any, Dict
 
 from app.config import get_app_credentials
 from app.session_manager import create_logged_session
-from app.logs_scraper import fetch_logs_html, classify_logs
+from app.logs_scraper import fetch_logs_html, classify_logs, ClassifiedLogs
 from app.writer import save_logs
-from app.error_filter import dividir_nuevos_y_avisados
+from app.error_filter import desmarcar_si_falla, dividir_nuevos_y_avisados
 from app.result import ScrapingResult
+from app.run_metrics import count, stage, track_app
+
+# Regex común para: "2025-12-29 11:12:39" (fecha real del error para el historial)
+_HIST_DATE_RE = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
 
 
 def procesar_aplicacion(app_key: str, fecha_str: str, dia: date, max_retries: int = 3, timeout: int = None) -> ScrapingResult:
@@ -16,7 +21,15 @@ def procesar_aplicacion(app_key: str, fecha_str: str, dia: date, max_retries: in
     para una aplicación, PERO NO ENVÍA CORREOS.
 
     Devuelve un dict con info útil (app_name, etc.).
+
+    Todo el procesamiento cuenta como etapa "scrape" de la app (también
+    cuando lo dispara el dashboard, fuera de main.py).
     """
+    with track_app(app_key), stage("scrape"):
+        return _procesar_aplicacion(app_key, fecha_str, dia, max_retries, timeout)
+
+
+def _procesar_aplicacion(app_key: str, fecha_str: str, dia: date, max_retries: int, timeout) -> ScrapingResult:
     app_name, _, _ = get_app_credentials(app_key)
 
     print(f"\n{'='*70}")
@@ -35,69 +48,81 @@ def procesar_aplicacion(app_key: str, fecha_str: str, dia: date, max_retries: in
         # except Exception as e:
         #     print(f"Error saving debug file: {e}")
 
-        controlados, no_controlados = classify_logs(html, app_key)
+        with stage("classify"):
+            controlados, no_controlados = classify_logs(html, app_key)
 
     # 2) Separar en NUEVOS vs AVISADOS usando la BD
-    controlados_nuevos, controlados_avisados = dividir_nuevos_y_avisados(
-        controlados, app_key, dia, "controlado"
-    )
-    no_controlados_nuevos, no_controlados_avisados = dividir_nuevos_y_avisados(
-        no_controlados, app_key, dia, "no_controlado"
-    )
+    with stage("db_dedupe"):
+        controlados_nuevos, controlados_avisados = dividir_nuevos_y_avisados(
+            controlados, app_key, dia, "controlado"
+        )
+        no_controlados_nuevos, no_controlados_avisados = dividir_nuevos_y_avisados(
+            no_controlados, app_key, dia, "no_controlado"
+        )
 
-    print(f"  • Errores controlados nuevos: {len(controlados_nuevos)}")
-    print(f"  • Errores controlados avisados antes: {len(controlados_avisados)}")
-    print(f"  • Errores NO controlados nuevos: {len(no_controlados_nuevos)}")
-    print(f"  • Errores NO controlados avisados antes: {len(no_controlados_avisados)}")
-
-    # Metrícas de volumen
-    log_size_kb = len(html.encode('utf-8')) / 1024
-    log_lines = html.count('\n')
-    print(f"  • Volumen de logs: {log_size_kb:.2f} KB ({log_lines} líneas)")
-
-    # 3) Guardar SOLO los nuevos
-    save_logs(
-        controlados_nuevos,
-        no_controlados_nuevos,
-        mode="w",
-        app_key=app_key,
-    )
-    print("✓ Logs guardados en carpeta 'salida_logs' (solo nuevos)")
-
-    # 4) Guardar Historial Global (Error History Module)
-    # Solo nos interesan los NO controlados para este historial crítico
-    # Intentamos guardar TANTO los nuevos como los avisados.
-    # La BD se encarga de ignorar duplicados (ON CONFLICT DO NOTHING).
-    todos_no_controlados = no_controlados_nuevos + no_controlados_avisados
-    
-    if todos_no_controlados:
-        try:
-            from db.error_history import insert_error_history, init_error_history_db
-            import re
-            from datetime import datetime
-            
-            # Asegurar que la tabla existe (idempotente)
-            init_error_history_db()
-            
-            count_hist = 0
-            # Regex común para: "2025-12-29 11:12:39"
-            date_pattern = re.compile(r'(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})')
-            
-            for error_str in todos_no_controlados:
-                # Intentar extraer fecha real del texto
-                match = date_pattern.search(error_str)
-                timestamp = None
-                if match:
-                    try:
-                        timestamp = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S')
-                    except ValueError:
-                        pass # Usar default NOW() si falla parsing
-                
-                insert_error_history(app_name, error_str, timestamp)
-                count_hist += 1
-            print(f"✓ Historial actualizado: {count_hist} errores procesados para deduplicación")
-        except Exception as e_hist:
-            print(f"⚠️ Error al guardar historial: {e_hist}")
+    # Si algo falla de acá al return, el resultado no se entrega ni se notifica:
+    # las firmas recién marcadas vuelven a quedar como nuevas para el reintento
+    with desmarcar_si_falla(app_key, dia, {"controlado": controlados_nuevos,
+                                           "no_controlado": no_controlados_nuevos}):
+        print(f"  • Errores controlados nuevos: {len(controlados_nuevos)}")
+        print(f"  • Errores controlados avisados antes: {len(controlados_avisados)}")
+        print(f"  • Errores NO controlados nuevos: {len(no_controlados_nuevos)}")
+        print(f"  • Errores NO controlados avisados antes: {len(no_controlados_avisados)}")
+
+        # Metrícas de volumen
+        if isinstance(html, ClassifiedLogs):
+            # Archivo grande: se clasificó en streaming, solo tenemos los contadores
+            log_size_kb = html.size_bytes / 1024
+            log_lines = html.line_count
+        else:
+            log_size_kb = len(html.encode('utf-8')) / 1024
+            log_lines = html.count('\n')
+        print(f"  • Volumen de logs: {log_size_kb:.2f} KB ({log_lines} líneas)")
+        count("bytes_fetched", round(log_size_kb * 1024))
+        count("log_lines", log_lines)
+        count("errors", len(controlados) + len(no_controlados))
+
+        # 3) Guardar SOLO los nuevos
+        with stage("file_write"):
+            save_logs(
+                controlados_nuevos,
+                no_controlados_nuevos,
+                mode="w",
+                app_key=app_key,
+            )
+        print("✓ Logs guardados en carpeta 'salida_logs' (solo nuevos)")
+
+        # 4) Guardar Historial Global (Error History Module)
+        # Solo nos interesan los NO controlados para este historial crítico
+        # Intentamos guardar TANTO los nuevos como los avisados.
+        # La BD se encarga de ignorar duplicados (ON CONFLICT DO NOTHING).
+        todos_no_controlados = no_controlados_nuevos + no_controlados_avisados
+
+        if todos_no_controlados:
+            try:
+                from db.error_history import insert_error_history_batch
+
+                errores_hist = []
+                for entry in todos_no_controlados:
+                    # Fecha real del error (ya parseada en la LogEntry); si no tiene
+                    # el formato esperado se busca en la línea, y si no, NOW()
+                    timestamp = entry.timestamp
+                    if timestamp is None:
+                        match = _HIST_DATE_RE.search(str(entry))
+                        if match:
+                            try:
+                                timestamp = datetime.strptime(match.group(1), '%Y-%m-%d %H:%M:%S')
+                            except ValueError:
+                                pass
+                    errores_hist.append((str(entry), timestamp))
+
+                # La tabla se crea una sola vez por proceso dentro del batch
+                with stage("history_insert"):
+                    resumen_hist = insert_error_history_batch(app_name, errores_hist)
+                print(f"✓ Historial actualizado: {len(errores_hist)} errores procesados para deduplicación "
+                      f"({resumen_hist['inserted']} nuevos, {resumen_hist['duplicates']} duplicados)")
+            except Exception as e_hist:
+                print(f"⚠️ Error al guardar historial: {e_hist}")
 
     return ScrapingResult(
         app_key=app_key,
@@ -0,0 +1,210 @@
+# app/session_cache.py
+"""
+Caché de sesiones autenticadas (cookies + bearer JWT) por app_key.
+
+AppSession la usa para no repetir GET CSRF + POST login + redirects en cada
+scraping / chequeo sintético / request del dashboard: mientras la sesión
+guardada no haya vencido se restaura tal cual, y solo se vuelve a hacer
+login cuando vence o cuando el servidor la rechaza (ver AppSession).
+
+Backends (SESSION_CACHE_URL):
+  - directorio (default ".session_cache"): un JSON por app, permisos 0600
+  - redis://host:6379/1: compartido entre procesos/contenedores (usa `redis`)
+
+Otras variables:
+  SESSION_CACHE=0          desactiva la caché
+  SESSION_CACHE_TTL=21600  vida máxima de una entrada (segundos); también es
+                           la vida por defecto si ni cookies ni JWT la indican
+"""
+from __future__ import annotations
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+
+import requests
+
+SESSION_CACHE_ENABLED = os.getenv("SESSION_CACHE", "1") != "0"
+SESSION_CACHE_URL = os.getenv("SESSION_CACHE_URL", ".session_cache")
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", str(6 * 3600)))
+
+# La sesión se da por vencida este margen antes de su expiración real
+_EXPIRY_MARGIN = 60
+_KEY_PREFIX = "t4alerts:session:"
+
+
+def credentials_fingerprint(app_key: str, base_url: str, username: str, password: str) -> str:
+    """Huella de las credenciales: si cambian, la sesión guardada no se usa."""
+    raw = f"{app_key}|{base_url}|{username}|{password}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _jwt_exp(token: str) -> Optional[float]:
+    """Lee el claim `exp` del JWT (sin verificar la firma)."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload)).get("exp")
+        return float(exp) if exp else None
+    except (IndexError, ValueError, TypeError):
+        return None
+
+
+@dataclass
+class CachedSession:
+    """Lo necesario para reconstruir una requests.Session autenticada."""
+
+    auth_type: str
+    cred_fp: str
+    expires_at: float
+    cookies: list[dict] = field(default_factory=list)
+    headers: dict = field(default_factory=dict)
+    created_at: float = field(default_factory=time.time)
+
+    def is_valid(self, cred_fp: str) -> bool:
+        return self.cred_fp == cred_fp and time.time() < self.expires_at - _EXPIRY_MARGIN
+
+    def apply(self, session: requests.Session) -> None:
+        for c in self.cookies:
+            session.cookies.set(
+                c["name"], c["value"],
+                domain=c.get("domain", ""), path=c.get("path", "/"),
+                expires=c.get("expires"), secure=c.get("secure", False),
+                rest=c.get("rest") or {},
+            )
+        session.headers.update(self.headers)
+
+    @classmethod
+    def from_session(cls, session: requests.Session, auth_type: str, cred_fp: str) -> "CachedSession":
+        now = time.time()
+        expires_at = now + SESSION_CACHE_TTL
+
+        cookies = []
+        for c in session.cookies:
+            cookies.append({
+                "name": c.name, "value": c.value, "domain": c.domain, "path": c.path,
+                "expires": c.expires, "secure": c.secure,
+                "rest": {"HttpOnly": None} if c.has_nonstandard_attr("HttpOnly") else {},
+            })
+            if c.expires:
+                expires_at = min(expires_at, float(c.expires))
+
+        headers = {}
+        auth = session.headers.get("Authorization")
+        if auth:
+            headers["Authorization"] = auth
+            if auth.startswith("Bearer "):
+                exp = _jwt_exp(auth[len("Bearer "):])
+                if exp:
+                    expires_at = min(expires_at, exp)
+
+        return cls(auth_type=auth_type, cred_fp=cred_fp, expires_at=expires_at,
+                   cookies=cookies, headers=headers, created_at=now)
+
+
+# ------------------------------------------------------------ backends ---
+
+class FileSessionStore:
+    """Un JSON por app_key en un directorio local (escritura atómica, 0600)."""
+
+    def __init__(self, directory: str):
+        self.dir = Path(directory)
+
+    def _path(self, app_key: str) -> Path:
+        return self.dir / f"{app_key}.json"
+
+    def get(self, app_key: str) -> Optional[dict]:
+        try:
+            return json.loads(self._path(app_key).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+
+    def set(self, app_key: str, data: dict, ttl: int) -> None:
+        self.dir.mkdir(parents=True, exist_ok=True, mode=0o700)
+        destino = self._path(app_key)
+        tmp = destino.with_name(f".{destino.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, destino)
+
+    def delete(self, app_key: str) -> None:
+        self._path(app_key).unlink(missing_ok=True)
+
+
+class RedisSessionStore:
+    """Entradas en Redis con expiración nativa (SET ... EX)."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self.client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+
+    def get(self, app_key: str) -> Optional[dict]:
+        raw = self.client.get(_KEY_PREFIX + app_key)
+        return json.loads(raw) if raw else None
+
+    def set(self, app_key: str, data: dict, ttl: int) -> None:
+        self.client.set(_KEY_PREFIX + app_key, json.dumps(data), ex=max(1, ttl))
+
+    def delete(self, app_key: str) -> None:
+        self.client.delete(_KEY_PREFIX + app_key)
+
+
+_STORE = None
+_STORE_LOCK = threading.Lock()
+
+
+def get_store():
+    global _STORE
+    with _STORE_LOCK:
+        if _STORE is None:
+            if SESSION_CACHE_URL.startswith(("redis://", "rediss://")):
+                _STORE = RedisSessionStore(SESSION_CACHE_URL)
+            else:
+                _STORE = FileSessionStore(SESSION_CACHE_URL)
+        return _STORE
+
+
+# ---------------------------------------------------------- public API ---
+
+def load_session(app_key: str, cred_fp: str) -> Optional[CachedSession]:
+    """Sesión guardada y vigente para app_key, o None."""
+    if not SESSION_CACHE_ENABLED:
+        return None
+    try:
+        data = get_store().get(app_key)
+        if not data:
+            return None
+        entrada = CachedSession(**data)
+    except Exception as e:
+        print(f"   ⚠️ Caché de sesión no disponible ({type(e).__name__}): {e}")
+        return None
+    return entrada if entrada.is_valid(cred_fp) else None
+
+
+def save_session(app_key: str, entrada: CachedSession) -> None:
+    if not SESSION_CACHE_ENABLED:
+        return
+    ttl = int(entrada.expires_at - time.time())
+    if ttl <= _EXPIRY_MARGIN:
+        return
+    try:
+        get_store().set(app_key, asdict(entrada), ttl)
+    except Exception as e:
+        print(f"   ⚠️ No se pudo guardar la sesión en caché ({type(e).__name__}): {e}")
+
+
+def invalidate_session(app_key: str) -> None:
+    if not SESSION_CACHE_ENABLED:
+        return
+    try:
+        get_store().delete(app_key)
+    except Exception as e:
+        print(f"   ⚠️ No se pudo invalidar la sesión en caché ({type(e).__name__}): {e}")
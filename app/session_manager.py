@@ -11,18 +11,27 @@ Uso:
     with AppSession(app_key) as session:
         html = session.get(url).text
 
+Las sesiones autenticadas (cookies / bearer) se guardan en app/session_cache.py
+y se reutilizan entre corridas hasta que vencen. Si el servidor rechaza una
+sesión restaurada (401/419 o redirección al login), se hace login de nuevo y
+el GET se repite una vez, sin que el llamador lo note.
+
 Compatibilidad hacia atrás:
     create_logged_session() sigue existiendo como alias de fábrica.
 """
 from __future__ import annotations
 
 import time
+from urllib.parse import urlparse
+
 import requests
 from bs4 import BeautifulSoup
 from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
 from urllib3.util.retry import Retry
 
+from . import session_cache
+from .run_metrics import cache_event, stage
 from .config import get_app_credentials, get_app_urls
 
 
@@ -39,29 +48,129 @@ class AppSession:
         self.max_retries = max_retries
         self.timeout = timeout
         self._session: requests.Session | None = None
+        self._from_cache = False
+        self._reauthenticating = False
+        self._rejected = False
 
     # ------------------------------------------------ context manager API ---
 
     def __enter__(self) -> requests.Session:
-        self._session = self._authenticate()
+        with stage("login"):
+            self._session = self._open_session()
         return self._session
 
     def __exit__(self, exc_type, exc_val, exc_tb) -> None:
         if self._session is not None:
+            # Laravel rota las cookies en cada respuesta: guardamos las últimas
+            if not self._rejected:
+                self._save_to_cache(self._session)
             self._session.close()
             self._session = None
 
+    # ------------------------------------------------------ session cache ---
+
+    def _auth_type(self) -> str:
+        from .config import APPS_CONFIG
+        config = APPS_CONFIG.get(self.app_key, {})
+        if config.get("auth_type") == "jwt_api":
+            return "jwt_api"
+        if self.app_key == "t4tms_backend":
+            return "basic"
+        return "form"
+
+    def _cred_fp(self) -> str:
+        _, username, password = get_app_credentials(self.app_key)
+        base_url, _, _ = get_app_urls(self.app_key)
+        return session_cache.credentials_fingerprint(self.app_key, base_url, username, password)
+
+    def _open_session(self) -> requests.Session:
+        """Restaura la sesión guardada si sigue vigente; si no, hace login."""
+        entrada = session_cache.load_session(self.app_key, self._cred_fp())
+        reutilizable = entrada is not None and entrada.auth_type == self._auth_type()
+        cache_event("session", reutilizable)
+        if reutilizable:
+            session = self._make_session()
+            entrada.apply(session)
+            if entrada.auth_type == "basic":
+                _, username, password = get_app_credentials(self.app_key)
+                session.auth = HTTPBasicAuth(username, password)
+            session.hooks["response"].append(self._on_response)
+            self._from_cache = True
+            restante = int(entrada.expires_at - time.time())
+            print(f"♻️ Sesión reutilizada para {self.app_key} (vence en {restante // 60} min)")
+            return session
+
+        session = self._authenticate()
+        self._save_to_cache(session)
+        return session
+
+    def _save_to_cache(self, session: requests.Session) -> None:
+        entrada = session_cache.CachedSession.from_session(session, self._auth_type(), self._cred_fp())
+        session_cache.save_session(self.app_key, entrada)
+
+    def _is_auth_failure(self, resp: requests.Response) -> bool:
+        """401/419, o redirección (Laravel: 302) hacia la página de login."""
+        if resp.status_code in (401, 419):
+            return True
+        if resp.is_redirect:
+            _, login_url, _ = get_app_urls(self.app_key)
+            login_path = urlparse(login_url).path.rstrip("/")
+            destino = urlparse(resp.headers.get("Location", "")).path.rstrip("/")
+            return bool(login_path) and destino == login_path
+        return False
+
+    def _on_response(self, resp: requests.Response, *args, **kwargs) -> requests.Response:
+        """
+        Hook de las sesiones restauradas de caché: si el servidor ya no
+        acepta la sesión, se invalida, se hace login y se repite el GET.
+        """
+        if self._reauthenticating or not self._from_cache or not self._is_auth_failure(resp):
+            return resp
+
+        # El hook corre en cada salto de redirección: resp.request es el GET original
+        original = resp.request
+        print(f"🔄 Sesión en caché rechazada por {self.app_key}; autenticando de nuevo...")
+        session_cache.invalidate_session(self.app_key)
+        self._rejected = True
+        self._reauthenticating = True
+        try:
+            fresca = self._authenticate()
+            session = self._session
+            session.cookies.clear()
+            session.cookies.update(fresca.cookies)
+            session.headers.update(fresca.headers)
+            session.auth = fresca.auth
+            fresca.close()
+            self._from_cache = False
+            self._rejected = False
+            self._save_to_cache(session)
+
+            if original.method not in ("GET", "HEAD"):
+                return resp
+            # Se repiten los headers del pedido (Accept, Range, If-None-Match...);
+            # Cookie y Authorization eran los de la sesión vieja: salen de la nueva
+            headers = {k: v for k, v in original.headers.items()
+                       if k.lower() not in ("cookie", "authorization")}
+            return session.request(
+                original.method,
+                original.url,
+                headers=headers,
+                timeout=kwargs.get("timeout"),
+                stream=kwargs.get("stream", False),
+                verify=kwargs.get("verify", True),
+            )
+        finally:
+            self._reauthenticating = False
+
     # ---------------------------------------------------- authentication ---
 
     def _authenticate(self) -> requests.Session:
         """Elige la estrategia de autenticación según config."""
-        from .config import APPS_CONFIG
-        config = APPS_CONFIG.get(self.app_key, {})
-        auth_type = config.get("auth_type")
+        auth_type = self._auth_type()
 
         if auth_type == "jwt_api":
             return self._login_jwt()
-        elif self.app_key == "t4tms_backend":
+        elif auth_type == "basic":
             return self._login_basic()
         else:
             return self._login_form()
@@ -1,35 +1,161 @@
 # app/signatures.py
+"""
+Servicio canónico de firmas de error.
+
+Todo el pipeline firma acá; nadie recorta mensajes por su cuenta:
+
+  - build_signature(linea): identidad de un error para avisos. Es la que se
+    guarda en alerted_errors (error_filter) y la que agrupa la ruta de stats
+    del dashboard. Corta en el primer token de CUT_TOKENS y al final del
+    primer SQLSTATE[...].
+  - summary_signature(mensaje): agrupación de los resúmenes por día
+    (log_stats → correos / Google Chat). Corta en el primer marcador de
+    _SUMMARY_MARKERS y se queda hasta el SQLSTATE=XXXX, para que el correo
+    siga mostrando el texto del SQL0911N & co.
+
+Son dos reglas a propósito: unificarlas cambiaría las firmas ya persistidas
+en alerted_errors (se re-avisaría todo lo del día) o dejaría los resúmenes
+sin el detalle del error. Lo que sí se comparte es la implementación: cada
+texto distinto se firma una sola vez por proceso y queda en un LRU acotado
+(functools.lru_cache). La clave es el texto mismo: la firma termina en
+alerted_errors, y una clave derivada (hash, digest) que colisione haría pasar
+un error nuevo por ya avisado. El costo es que el LRU retiene hasta
+SIGNATURE_CACHE_SIZE textos (con sus trazas); por eso el default es 20000 y
+un worker de larga vida puede bajarlo.
+
+Los LogEntry (app/log_entry.py) firman con signature_from_parts(): misma
+regla de aviso, pero sin pasar por el LRU; la firma queda guardada en el
+propio registro. Por eso error_filter y LogEntry.signature no suman aciertos
+ni fallos al LRU: signature_cache_stats() las cuenta aparte ("entry").
+
+Variables de entorno:
+  SIGNATURE_CACHE_SIZE=20000    entradas de cada LRU (0 = sin memo)
+"""
+import os
 import re
+import threading
+from functools import lru_cache
+
+from .classifier import CUT_TOKENS, SQLSTATE_RE, ClassificationPlan
+
+SIGNATURE_CACHE_SIZE = int(os.getenv("SIGNATURE_CACHE_SIZE", "20000"))
 
 # Tokens a partir de los cuales ya no nos importa el resto del mensaje
-_CUT_TOKENS = [
-    "[stacktrace]",
-    '{"Request :',
-    "Accept:",
-    "Host:",
-    "User-Agent:",
-]
+_CUT_TOKENS = list(CUT_TOKENS)
 
-_SQLSTATE_RE = re.compile(r"(SQLSTATE\[[0-9A-Z]+\])")
+_SQLSTATE_RE = SQLSTATE_RE
 
+_PLAN = ClassificationPlan(cut_tokens=_CUT_TOKENS, sqlstate_re=_SQLSTATE_RE)
 
-def build_signature(line: str) -> str:
+# Resúmenes: gana el primer marcador de la lista que aparezca (no el primero en el texto)
+_SUMMARY_MARKERS = ('{"exception":', "[stacktrace]", '{"Request : "')
+_SQLSTATE_CODE_RE = re.compile(r"SQLSTATE=\w+")
+
+
+def _compute_signature(line: str) -> str:
     """
     Construye una firma estable para un error a partir de la línea completa.
     La idea es que errores "iguales" generen la misma firma aunque
     cambien detalles (IDs, stacktrace, headers, etc).
+
+    Corta antes del primer token de _CUT_TOKENS y, si antes hay un
+    SQLSTATE[...], al final de ese código (ver ClassificationPlan.cut_index).
     """
-    msg = line
+    return _PLAN.signature(line)
 
-    # Cortar por tokens conocidos
-    for token in _CUT_TOKENS:
-        idx = msg.find(token)
-        if idx != -1:
-            msg = msg[:idx]
 
-    # Cortar al final del SQLSTATE si existe
-    m = _SQLSTATE_RE.search(msg)
+def _compute_summary_signature(mensaje: str) -> str:
+    """
+    Nos quedamos solo con la parte importante del error.
+    Cortamos antes de:
+      - {"exception":
+      - [stacktrace]
+      - {"Request : "
+    Y, si hay un SQLSTATE=XXXX, nos quedamos hasta ahí.
+    """
+    for marker in _SUMMARY_MARKERS:
+        pos = mensaje.find(marker)
+        if pos != -1:
+            mensaje = mensaje[:pos]
+            break
+
+    m = _SQLSTATE_CODE_RE.search(mensaje)
     if m:
-        msg = msg[: m.end()]
+        return mensaje[:m.end()].strip()
+    return mensaje.strip()
+
+
+def _memo(fn):
+    return lru_cache(maxsize=SIGNATURE_CACHE_SIZE)(fn) if SIGNATURE_CACHE_SIZE > 0 else None
+
+
+_MEMOS = {
+    "alert": _memo(_compute_signature),
+    "summary": _memo(_compute_summary_signature),
+}
+_alert_memo = _MEMOS["alert"] or _compute_signature
+_summary_memo = _MEMOS["summary"] or _compute_summary_signature
+# Firmas de LogEntry (signature_from_parts): se calculan sin LRU, solo se cuentan
+_ENTRY_COMPUTED = 0
+_ENTRY_LOCK = threading.Lock()
+
+
+# ---------------------------------------------------------- public API ---
+
+def build_signature(line: str) -> str:
+    """Firma de aviso de la línea (memoizada, ver _compute_signature)."""
+    return _alert_memo(line)
+
+
+def signature_from_parts(header: str, content: str) -> str:
+    """
+    build_signature(header + content) sin armar la línea completa: si el
+    encabezado ("LEVEL - context - fecha - ") no tiene tokens de corte, el
+    corte cae en el contenido. Lo usa LogEntry, que guarda la firma en el
+    propio registro (no pasa por el LRU: no retiene copias de la línea).
+    """
+    global _ENTRY_COMPUTED
+    with _ENTRY_LOCK:
+        _ENTRY_COMPUTED += 1
+    if _PLAN.cut_index(header) == len(header):
+        return (header + content[: _PLAN.cut_index(content)]).strip()
+    return _compute_signature(header + content)
+
+
+def summary_signature(mensaje: str) -> str:
+    """Firma de resumen del mensaje (memoizada, ver _compute_summary_signature)."""
+    return _summary_memo(mensaje)
+
+
+def signature_cache_stats() -> dict:
+    """
+    Aciertos / fallos de los LRU de firmas en este proceso: totales y por
+    tipo ("alert", "summary"). "entry" cuenta las firmas de LogEntry, que se
+    calculan sin LRU (una por registro) y no entran en hits / misses / hit_rate.
+    """
+    stats = {}
+    for nombre, memo in _MEMOS.items():
+        if memo is None:
+            stats[nombre] = {"hits": 0, "misses": 0, "size": 0, "maxsize": 0}
+        else:
+            info = memo.cache_info()
+            stats[nombre] = {"hits": info.hits, "misses": info.misses,
+                             "size": info.currsize, "maxsize": info.maxsize}
+    hits = sum(s["hits"] for s in stats.values())
+    misses = sum(s["misses"] for s in stats.values())
+    stats.update(
+        hits=hits,
+        misses=misses,
+        hit_rate=hits / (hits + misses) if hits + misses else 0.0,
+        entry={"computed": _ENTRY_COMPUTED},
+    )
+    return stats
+
 
-    return msg.strip()
+def clear_signature_cache() -> None:
+    global _ENTRY_COMPUTED
+    for memo in _MEMOS.values():
+        if memo is not None:
+            memo.cache_clear()
+    with _ENTRY_LOCK:
+        _ENTRY_COMPUTED = 0
@@ -0,0 +1,222 @@
+# app/stats_snapshot.py
+"""
+Resultado de /api/stats/view armado a partir de un ScrapingResult.
+
+Antes vivía en t4alerts_backend/stats/routes.py y solo se calculaba cuando
+alguien abría el dashboard (scrapeando en vivo). Ahora lo arma también la
+corrida programada de main.py y se guarda en la tabla stats_cache
+(db/stats_cache.py), de donde lo sirve el backend.
+
+Variables de entorno:
+  STATS_CACHE_ENABLED=1   0 = no se guardan snapshots (el dashboard vuelve a scrapear)
+"""
+import os
+from datetime import datetime
+
+from app.result import ScrapingResult
+from app.run_metrics import stage
+
+STATS_CACHE_ENABLED = os.getenv("STATS_CACHE_ENABLED", "1") != "0"
+
+
+def agregar_errores_por_firma(errores_lista, dia):
+    """
+    Agrupa errores por firma (signature) y cuenta recurrencias.
+    
+    Args:
+        errores_lista: Lista de dicts con 'firma', 'full_content', 'timestamp', etc.
+        dia: fecha del día (para defaults)
+    
+    Returns:
+        Lista de dicts: [{firma: str, full_content: str, count: int, first_time: datetime}, ...]
+        Ordenados por tiempo de primera aparición
+    """
+    from collections import defaultdict
+    
+    agregado = defaultdict(lambda: {'count': 0, 'first_time': None, 'full_content': None})
+    
+    for error in errores_lista:
+        firma = error.get('firma', 'Unknown error')
+        full_content = error.get('full_content', firma)  # Use full content if available
+        
+        # El timestamp puede venir de diferentes campos según la fuente
+        timestamp = error.get('timestamp') or error.get('fecha') or datetime.combine(dia, datetime.min.time())
+        
+        agregado[firma]['count'] += 1
+        
+        # Guardar timestamp más temprano y su contenido completo correspondiente
+        if agregado[firma]['first_time'] is None or timestamp < agregado[firma]['first_time']:
+            agregado[firma]['first_time'] = timestamp
+            agregado[firma]['full_content'] = full_content  # Store full content from first occurrence
+    
+    # Convertir a lista
+    result = []
+    for firma, data in agregado.items():
+        result.append({
+            'firma': firma,
+            'full_content': data['full_content'] or firma,  # Fallback to firma if no full content
+            'count': data['count'],
+            'first_time': data['first_time'] or datetime.combine(dia, datetime.min.time())
+        })
+    
+    # Ordenar por tiempo de primera aparición
+    result.sort(key=lambda x: x['first_time'])
+    
+    return result
+
+
+def format_errors_for_frontend(aggregated_errors):
+    """
+    Formatea errores agregados para el frontend.
+    
+    Args:
+        aggregated_errors: Lista de dicts con firma, full_content, count, first_time
+    
+    Returns:
+        Lista de dicts con timestamp, message, count (formato esperado por JS)
+    """
+    formatted = []
+    for err in aggregated_errors:
+        formatted.append({
+            "timestamp": err["first_time"].strftime('%Y-%m-%d %H:%M:%S'),
+            "message": err.get("full_content", err["firma"]),  # Use full content instead of signature
+            "count": err["count"]
+        })
+    return formatted
+
+
+def extract_sqlstate_distribution(aggregated_errors):
+    """
+    Extrae y agrupa errores por código SQLSTATE.
+    
+    Args:
+        aggregated_errors: Lista de errores con firma, count, first_time
+    
+    Returns:
+        Lista ordenada por first_time: [
+            {
+                'sqlstate': 'SQLSTATE[40001]',
+                'count': 3,
+                'first_time': '2025-12-21 01:00:41'
+            },
+            ...
+        ]
+    """
+    import re
+    from collections import defaultdict
+    
+    # Pattern para extraer SQLSTATE[XXXXX]
+    pattern = re.compile(r'SQLSTATE\[\w+\]')
+    
+    sqlstate_data = defaultdict(lambda: {'count': 0, 'first_time': None})
+    
+    for error in aggregated_errors:
+        firma = error['firma']
+        match = pattern.search(firma)
+        
+        if match:
+            sqlstate = match.group(0)
+            sqlstate_data[sqlstate]['count'] += error['count']
+            
+            # Guardar el timestamp más temprano
+            if sqlstate_data[sqlstate]['first_time'] is None or \
+               error['first_time'] < sqlstate_data[sqlstate]['first_time']:
+                sqlstate_data[sqlstate]['first_time'] = error['first_time']
+    
+    # Convertir a lista y ordenar por first_time
+    result = []
+    for sqlstate, data in sqlstate_data.items():
+        result.append({
+            'sqlstate': sqlstate,
+            'count': data['count'],
+            'first_time': data['first_time'].strftime('%Y-%m-%d %H:%M:%S') if data['first_time'] else None
+        })
+    
+    # Ordenar por tiempo de primera aparición
+    result.sort(key=lambda x: x['first_time'] if x['first_time'] else '')
+    
+    return result
+
+
+def es_error_sql(mensaje):
+    """
+    Detecta si un error es de tipo SQL.
+    Usa los mismos keywords que sms_notifier para consistencia.
+    
+    Args:
+        mensaje: texto del mensaje de error
+    
+    Returns:
+        bool: True si es error SQL, False si no
+    """
+    msg_upper = mensaje.upper()
+    return any(keyword in msg_upper for keyword in ['SQL', 'SQLSTATE', 'DATABASE', 'PDO'])
+
+
+# ---------------------------------------------------------- public API ---
+
+def build_stats_payload(resultado: ScrapingResult) -> dict:
+    """
+    Datos de la vista de stats de una app/día (todos los errores del día,
+    nuevos + ya avisados, agrupados por firma).
+    """
+    dia = resultado.dia
+    controlados_all = resultado.controlados_nuevos + resultado.controlados_avisados
+    no_controlados_all = resultado.no_controlados_nuevos + resultado.no_controlados_avisados
+
+    def convert_to_dict_format(error_lines):
+        """Convert list of LogEntry to list of dicts with firma and full content"""
+        return [{
+            'firma': entry.signature,
+            'full_content': str(entry),  # Preserve original full error content
+            'timestamp': datetime.combine(dia, datetime.min.time())
+        } for entry in error_lines]
+
+    nc_aggregated = agregar_errores_por_firma(convert_to_dict_format(no_controlados_all), dia)
+    c_aggregated = agregar_errores_por_firma(convert_to_dict_format(controlados_all), dia)
+
+    sql_count = 0
+    non_sql_count = 0
+    for err in nc_aggregated:
+        if es_error_sql(err['firma']):
+            sql_count += err['count']
+        else:
+            non_sql_count += err['count']
+
+    return {
+        "logs": {
+            "uncontrolled": format_errors_for_frontend(nc_aggregated),
+            "controlled": format_errors_for_frontend(c_aggregated)
+        },
+        "stats": {
+            "sqlstate_distribution": extract_sqlstate_distribution(nc_aggregated),
+            "sql_errors": sql_count,  # Keep for backward compatibility
+            "non_sql_errors": non_sql_count
+        },
+        "source": "real-time-scraping"
+    }
+
+
+def store_stats_snapshot(resultado: ScrapingResult, payload: dict = None,
+                         computed_at: datetime = None) -> bool:
+    """
+    Guarda el resultado de la vista de stats en stats_cache. Nunca lanza: si
+    la BD no está, el dashboard seguirá scrapeando en vivo como antes.
+
+    computed_at es el momento en que EMPEZÓ el scraping (los logs leídos son
+    de antes de esa hora); por defecto, ahora.
+    """
+    if not STATS_CACHE_ENABLED:
+        return False
+    try:
+        from db.stats_cache import save_stats_snapshot
+
+        with stage("stats_snapshot"):
+            computed_at = computed_at or datetime.now()
+            if payload is None:
+                payload = build_stats_payload(resultado)
+            save_stats_snapshot(resultado.app_key, resultado.dia, payload, computed_at)
+        return True
+    except Exception as e:
+        print(f"⚠️ No se pudo guardar el snapshot de stats de {resultado.app_key}: {e}")
+        return False
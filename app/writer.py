@@ -1,11 +1,14 @@
 # app/writer.py
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, Optional, Union
+
+from app.log_entry import LogEntry
+from app.log_stats import invalidate_stats_index
 
 
 def save_logs(
-    controlados: Iterable[str],
-    no_controlados: Iterable[str],
+    controlados: Iterable[Union[LogEntry, str]],
+    no_controlados: Iterable[Union[LogEntry, str]],
     output_dir: str = "salida_logs",
     archivo_controlados: str = "errores_controlados.log",
     archivo_no_controlados: str = "errores_no_controlados.log",
@@ -16,8 +19,8 @@ def save_logs(
     Guarda los logs en dos archivos dentro de output_dir.
     
     Args:
-        controlados: iterador de líneas de errores controlados
-        no_controlados: iterador de líneas de errores no controlados
+        controlados: iterador de errores controlados (LogEntry o líneas)
+        no_controlados: iterador de errores no controlados (LogEntry o líneas)
         output_dir: directorio donde guardar los logs
         archivo_controlados: nombre base del archivo de controlados
         archivo_no_controlados: nombre base del archivo de no controlados
@@ -40,10 +43,15 @@ def save_logs(
     controlados_path = output_path / archivo_controlados
     no_controlados_path = output_path / archivo_no_controlados
 
+    # Al reescribir, el índice incremental de log_stats deja de ser válido
+    if "w" in mode:
+        invalidate_stats_index(controlados_path)
+        invalidate_stats_index(no_controlados_path)
+
     with controlados_path.open(mode, encoding="utf-8") as f:
         for line in controlados:
-            f.write(line + "\n")
+            f.write(f"{line}\n")
 
     with no_controlados_path.open(mode, encoding="utf-8") as f:
         for line in no_controlados:
-            f.write(line + "\n")
+            f.write(f"{line}\n")
@@ -3,14 +3,18 @@ from .alerted_errors import (
     init_db,
     get_alerted_signatures,
     add_alerted_signatures,
+    remove_alerted_signatures,
     reset_all_alerted_errors,          # <- nuevo
     reset_alerted_errors_for_date,     # <- nuevo
 )
+from .connection import get_pool_stats
 
 __all__ = [
     "init_db",
     "get_alerted_signatures",
     "add_alerted_signatures",
+    "remove_alerted_signatures",
     "reset_all_alerted_errors",
     "reset_alerted_errors_for_date",
+    "get_pool_stats",
 ]
@@ -3,6 +3,8 @@ import os
 from datetime import date
 from typing import Iterable, Set
 
+from psycopg2.extras import execute_values
+
 from .connection import get_cursor
 
 # Scope de alertas: separa la "memoria" de errores por perfil/grupo de destinatarios
@@ -111,25 +113,70 @@ def add_alerted_signatures(
     fecha: date,
     tipo: str,
     signatures: Iterable[str],
-) -> None:
+    page_size: int = 1000,
+) -> Set[str]:
     """
     Marca en BD esas firmas como ya avisadas para el ALERT_SCOPE actual.
     Idempotente gracias al UNIQUE (app_key, fecha, tipo, signature, alert_scope).
+
+    Inserta en lotes: un INSERT multi-fila (execute_values) por cada
+    page_size firmas, en lugar de un round trip por firma.
+
+    Returns:
+        Las firmas que realmente se insertaron (las que ya existían quedan fuera).
+    """
+    # dict.fromkeys: quita duplicados conservando el orden
+    signatures = list(dict.fromkeys(signatures))
+    if not signatures:
+        return set()
+
+    with get_cursor() as cur:
+        rows = execute_values(
+            cur,
+            """
+            INSERT INTO alerted_errors (app_key, fecha, tipo, signature, alert_scope)
+            VALUES %s
+            ON CONFLICT (app_key, fecha, tipo, signature, alert_scope) DO NOTHING
+            RETURNING signature;
+            """,
+            [(app_key, fecha, tipo, sig, ALERT_SCOPE) for sig in signatures],
+            page_size=page_size,
+            fetch=True,
+        )
+    return {r[0] for r in rows}
+
+
+def remove_alerted_signatures(
+    app_key: str,
+    fecha: date,
+    tipo: str,
+    signatures: Iterable[str],
+) -> int:
     """
-    signatures = list(signatures)
+    Desmarca esas firmas (solo del ALERT_SCOPE actual): vuelven a contar como
+    nuevas. Inversa de add_alerted_signatures() para un procesamiento que
+    marcó firmas y falló antes de entregar el resultado.
+
+    Returns:
+        Cantidad de filas borradas.
+    """
+    signatures = list(dict.fromkeys(signatures))
     if not signatures:
-        return
+        return 0
 
     with get_cursor() as cur:
-        for sig in signatures:
-            cur.execute(
-                """
-                INSERT INTO alerted_errors (app_key, fecha, tipo, signature, alert_scope)
-                VALUES (%s, %s, %s, %s, %s)
-                ON CONFLICT (app_key, fecha, tipo, signature, alert_scope) DO NOTHING;
-                """,
-                (app_key, fecha, tipo, sig, ALERT_SCOPE),
-            )
+        cur.execute(
+            """
+            DELETE FROM alerted_errors
+            WHERE app_key     = %s
+              AND fecha       = %s
+              AND tipo        = %s
+              AND alert_scope = %s
+              AND signature   = ANY(%s);
+            """,
+            (app_key, fecha, tipo, ALERT_SCOPE, signatures),
+        )
+        return cur.rowcount
 
 
 def reset_all_alerted_errors() -> None:
@@ -1,35 +1,251 @@
-# db/connection.py
 import os
+import threading
+import time
+import weakref
 from contextlib import contextmanager
 
 import psycopg2
+from psycopg2 import extensions, pool as pg_pool
+
+# Pool de conexiones (por proceso). Variables de entorno:
+#   PG_POOL_ENABLED    → "0" para volver a una conexión nueva por get_cursor()
+#   PG_POOL_MIN        → conexiones que se abren al crear el pool
+#   PG_POOL_MAX        → máximo de conexiones simultáneas por proceso
+#   PG_POOL_TIMEOUT    → segundos máximos esperando una conexión libre
+#   PG_POOL_PING_AFTER → si una conexión estuvo ociosa más de N segundos, se valida con SELECT 1
+PG_POOL_ENABLED = os.getenv("PG_POOL_ENABLED", "1") != "0"
+PG_POOL_MIN = int(os.getenv("PG_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("PG_POOL_MAX", "10"))
+PG_POOL_TIMEOUT = float(os.getenv("PG_POOL_TIMEOUT", "30"))
+PG_POOL_PING_AFTER = float(os.getenv("PG_POOL_PING_AFTER", "30"))
+
+
+def _connect_kwargs() -> dict:
+    return dict(
+        host=os.getenv("PGHOST", "localhost"),
+        port=int(os.getenv("PGPORT", 5433)),
+        dbname=os.getenv("PGDATABASE", "postgres"),
+        user=os.getenv("PGUSER", "postgres"),      # <- default postgres
+        password=os.getenv("PGPASSWORD", "logs_password"),
+    )
 
 
 def get_connection():
     """
     Crea una conexión a Postgres usando variables de entorno:
     PGHOST, PGPORT, PGUSER, PGPASSWORD, PGDATABASE.
+
+    Conexión directa (fuera del pool); quien la pide debe cerrarla.
+    """
+    return psycopg2.connect(**_connect_kwargs())
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe con espera acotada, health check y métricas.
+
+    psycopg2.pool.ThreadedConnectionPool lanza PoolError apenas se agota; aquí
+    un semáforo hace que los hilos esperen (hasta PG_POOL_TIMEOUT) a que se
+    libere una conexión, y se mide cuánto esperaron.
     """
-    return psycopg2.connect(
-    host=os.getenv("PGHOST", "localhost"),
-    port=int(os.getenv("PGPORT", 5433)),
-    dbname=os.getenv("PGDATABASE", "postgres"),
-    user=os.getenv("PGUSER", "postgres"),      # <- default postgres
-    password=os.getenv("PGPASSWORD", "logs_password"),
-)
 
+    def __init__(self, minconn: int, maxconn: int, timeout: float, ping_after: float):
+        self.minconn = minconn
+        self.maxconn = max(maxconn, minconn, 1)
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.pid = os.getpid()
+
+        self._pool = pg_pool.ThreadedConnectionPool(self.minconn, self.maxconn, **_connect_kwargs())
+        self._slots = threading.BoundedSemaphore(self.maxconn)
+        self._lock = threading.Lock()
+        # Clave = la conexión misma (débil): un id() se puede reutilizar tras cerrarla
+        self._last_used: "weakref.WeakKeyDictionary[extensions.connection, float]" = weakref.WeakKeyDictionary()
+
+        self._checkouts = 0
+        self._in_use = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+    # ------------------------------------------------------- checkout ---
+
+    def getconn(self):
+        inicio = time.perf_counter()
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self._timeouts += 1
+            raise pg_pool.PoolError(
+                f"Sin conexiones libres en el pool tras {self.timeout:.0f}s (max={self.maxconn})"
+            )
+        try:
+            conn = self._healthy_conn()
+        except BaseException:
+            self._slots.release()
+            raise
+
+        espera = time.perf_counter() - inicio
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._wait_total += espera
+            self._wait_max = max(self._wait_max, espera)
+        return conn
+
+    def putconn(self, conn, close: bool = False) -> None:
+        try:
+            if close:
+                self._last_used.pop(conn, None)
+                with self._lock:
+                    self._discarded += 1
+            else:
+                self._last_used[conn] = time.monotonic()
+            self._pool.putconn(conn, close=close)
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._slots.release()
+
+    def _healthy_conn(self):
+        """Entrega una conexión viva; descarta y reemplaza las rotas (una vez)."""
+        for _ in range(2):
+            conn = self._pool.getconn()
+            if self._is_alive(conn):
+                return conn
+            self._last_used.pop(conn, None)
+            with self._lock:
+                self._discarded += 1
+            self._pool.putconn(conn, close=True)
+        return self._pool.getconn()
+
+    def _is_alive(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        ociosa = time.monotonic() - self._last_used.get(conn, time.monotonic())
+        if ociosa < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    # -------------------------------------------------------- métricas ---
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "min": self.minconn,
+                "max": self.maxconn,
+                "in_use": self._in_use,
+                "checkouts": self._checkouts,
+                "wait_total_seconds": round(self._wait_total, 6),
+                "wait_max_seconds": round(self._wait_max, 6),
+                "wait_avg_seconds": round(self._wait_total / self._checkouts, 6) if self._checkouts else 0.0,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+            }
+
+    def closeall(self) -> None:
+        self._pool.closeall()
+        self._last_used.clear()
+
+
+_POOL: ConnectionPool | None = None
+_POOL_LOCK = threading.Lock()
+# Pools heredados por fork: se conservan referenciados para que el GC del hijo
+# no cierre los sockets que siguen siendo del proceso padre.
+_INHERITED_POOLS: list = []
+
+
+def get_pool() -> ConnectionPool:
+    """Devuelve el pool del proceso actual (lo crea perezosamente)."""
+    global _POOL
+    pool = _POOL
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL.pid != os.getpid():
+            _INHERITED_POOLS.append(_POOL)
+            _POOL = None
+        if _POOL is None:
+            _POOL = ConnectionPool(PG_POOL_MIN, PG_POOL_MAX, PG_POOL_TIMEOUT, PG_POOL_PING_AFTER)
+        return _POOL
+
+
+def _reset_pool_after_fork() -> None:
+    """Worker de gunicorn / Celery prefork: el hijo arma su propio pool."""
+    global _POOL, _POOL_LOCK
+    if _POOL is not None:
+        _INHERITED_POOLS.append(_POOL)
+    _POOL = None
+    _POOL_LOCK = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+
+def close_pool() -> None:
+    """Cierra todas las conexiones del pool del proceso actual."""
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is not None and _POOL.pid == os.getpid():
+            _POOL.closeall()
+        _POOL = None
+
+
+def get_pool_stats() -> dict:
+    """
+    Métricas del pool: checkouts, tiempo de espera (total/máx/promedio),
+    conexiones en uso, timeouts y conexiones descartadas por health check.
+    """
+    if not PG_POOL_ENABLED or _POOL is None or _POOL.pid != os.getpid():
+        return {"enabled": PG_POOL_ENABLED, "checkouts": 0}
+    return {"enabled": True, **_POOL.stats()}
 
 
 @contextmanager
 def get_cursor():
     """
     Context manager que entrega un cursor y hace commit al final.
-    Cierra la conexión automáticamente.
+    Toma la conexión del pool del proceso y la devuelve al terminar
+    (rollback si hubo error; se descarta si la conexión quedó rota).
+    Con PG_POOL_ENABLED=0 abre y cierra una conexión por llamada.
     """
-    conn = get_connection()
+    if not PG_POOL_ENABLED:
+        conn = get_connection()
+        try:
+            cur = conn.cursor()
+            yield cur
+            conn.commit()
+        finally:
+            conn.close()
+        return
+
+    pool = get_pool()
+    conn = pool.getconn()
+    broken = False
     try:
         cur = conn.cursor()
-        yield cur
+        try:
+            yield cur
+        finally:
+            cur.close()
         conn.commit()
+    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+        broken = True
+        raise
+    except BaseException:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            broken = True
+        raise
     finally:
-        conn.close()
+        pool.putconn(conn, close=broken or bool(conn.closed))
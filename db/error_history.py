@@ -1,11 +1,23 @@
 import hashlib
+import os
+import threading
 from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+from psycopg2.extras import execute_values
+
 from .connection import get_cursor
 
+# PID del proceso que ya creó/verificó la tabla (None = todavía no)
+_TABLE_READY_PID: Optional[int] = None
+_TABLE_LOCK = threading.Lock()
+
+
 def init_error_history_db() -> None:
     """
     Crea la tabla error_history si no existe.
     """
+    global _TABLE_READY_PID
     with get_cursor() as cur:
         cur.execute(
             """
@@ -18,6 +30,26 @@ def init_error_history_db() -> None:
             );
             """
         )
+    _TABLE_READY_PID = os.getpid()
+
+
+def ensure_error_history_db() -> None:
+    """
+    Igual que init_error_history_db() pero solo la primera vez en cada proceso
+    (los hilos de main.py y los workers comparten el resultado).
+    """
+    if _TABLE_READY_PID == os.getpid():
+        return
+    with _TABLE_LOCK:
+        if _TABLE_READY_PID != os.getpid():
+            init_error_history_db()
+
+
+def _error_hash(web_name: str, error_content: str) -> str:
+    """SHA-256 de "web_name:error_content" (mismo hash que insert_error_history)."""
+    unique_string = f"{web_name}:{error_content}"
+    return hashlib.sha256(unique_string.encode('utf-8')).hexdigest()
+
 
 def insert_error_history(web_name: str, error_content: str, timestamp: datetime = None) -> None:
     """
@@ -28,8 +60,7 @@ def insert_error_history(web_name: str, error_content: str, timestamp: datetime
     # Generar Hash SHA-256 único para (web + contenido)
     # Así distinguimos el mismo error en webs distintas si fuera necesario,
     # aunque 'web_name' ya es parte del input.
-    unique_string = f"{web_name}:{error_content}"
-    error_hash = hashlib.sha256(unique_string.encode('utf-8')).hexdigest()
+    error_hash = _error_hash(web_name, error_content)
 
     with get_cursor() as cur:
         if timestamp:
@@ -51,6 +82,56 @@ def insert_error_history(web_name: str, error_content: str, timestamp: datetime
                 (web_name, error_content, error_hash)
             )
 
+def insert_error_history_batch(
+    web_name: str,
+    errores: Iterable[Tuple[str, Optional[datetime]]],
+    page_size: int = 1000,
+) -> dict:
+    """
+    Inserta muchos errores de una misma web en un solo INSERT multi-fila
+    (un round trip por cada `page_size` filas), con ON CONFLICT DO NOTHING.
+
+    param errores: iterable de (error_content, timestamp); timestamp None → NOW().
+    Dentro del lote se conserva la primera aparición de cada error.
+
+    Returns:
+        {"inserted": n, "duplicates": m} donde duplicates cuenta tanto los
+        repetidos dentro del lote como los que ya existían en la tabla.
+    """
+    # El prefijo "web_name:" se hashea una sola vez y se copia para cada error
+    prefijo = hashlib.sha256(f"{web_name}:".encode('utf-8'))
+    filas = {}
+    total = 0
+    for error_content, timestamp in errores:
+        total += 1
+        h = prefijo.copy()
+        h.update(error_content.encode('utf-8'))
+        error_hash = h.hexdigest()
+        if error_hash not in filas:
+            filas[error_hash] = (web_name, error_content, error_hash, timestamp)
+
+    if not filas:
+        return {"inserted": 0, "duplicates": total}
+
+    ensure_error_history_db()
+    with get_cursor() as cur:
+        insertadas = execute_values(
+            cur,
+            """
+            INSERT INTO error_history (web_name, error_content, error_hash, first_seen)
+            VALUES %s
+            ON CONFLICT (error_hash) DO NOTHING
+            RETURNING error_hash;
+            """,
+            list(filas.values()),
+            template="(%s, %s, %s, COALESCE(%s::timestamp, NOW()))",
+            page_size=page_size,
+            fetch=True,
+        )
+
+    return {"inserted": len(insertadas), "duplicates": total - len(insertadas)}
+
+
 def get_error_history(limit: int = 100, offset: int = 0) -> list:
     """
     Obtiene los errores históricos ordenados por fecha desc (más recientes primero).
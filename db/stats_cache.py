@@ -0,0 +1,127 @@
+# db/stats_cache.py
+"""
+Resultados pre-calculados de /api/stats/view por (app_key, fecha).
+
+Los llena la corrida programada (main.py) y el backend cada vez que scrapea;
+el dashboard los lee en vez de scrapear en vivo (ver
+t4alerts_backend/stats/cache.py).
+
+refresh_started_at hace de "lease" entre procesos: el worker de gunicorn que
+lo toma con claim_refresh() es el único que refresca esa fila hasta que
+termina o vence el lease.
+"""
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Optional
+
+from .connection import get_cursor
+
+# PID del proceso que ya creó/verificó la tabla (None = todavía no)
+_TABLE_READY_PID: Optional[int] = None
+_TABLE_LOCK = threading.Lock()
+
+
+def init_stats_cache_db() -> None:
+    """
+    Crea la tabla stats_cache si no existe.
+    """
+    global _TABLE_READY_PID
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            CREATE TABLE IF NOT EXISTS stats_cache (
+                app_key            TEXT NOT NULL,
+                fecha              DATE NOT NULL,
+                payload            JSONB,
+                computed_at        TIMESTAMP,
+                refresh_started_at TIMESTAMP,
+                PRIMARY KEY (app_key, fecha)
+            );
+            """
+        )
+    _TABLE_READY_PID = os.getpid()
+
+
+def ensure_stats_cache_db() -> None:
+    """init_stats_cache_db() una sola vez por proceso."""
+    if _TABLE_READY_PID == os.getpid():
+        return
+    with _TABLE_LOCK:
+        if _TABLE_READY_PID != os.getpid():
+            init_stats_cache_db()
+
+
+def save_stats_snapshot(app_key: str, fecha: date, payload: dict, computed_at: datetime) -> None:
+    """Guarda (o reemplaza) el resultado del día y libera el lease de refresco."""
+    ensure_stats_cache_db()
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO stats_cache (app_key, fecha, payload, computed_at, refresh_started_at)
+            VALUES (%s, %s, %s::jsonb, %s, NULL)
+            ON CONFLICT (app_key, fecha) DO UPDATE
+            SET payload = EXCLUDED.payload,
+                computed_at = EXCLUDED.computed_at,
+                refresh_started_at = NULL
+            WHERE stats_cache.computed_at IS NULL
+               OR stats_cache.computed_at <= EXCLUDED.computed_at;
+            """,
+            (app_key, fecha, json.dumps(payload, default=str), computed_at),
+        )
+
+
+def load_stats_snapshot(app_key: str, fecha: date, lease_seconds: int = 600) -> Optional[dict]:
+    """
+    Returns:
+        {"payload": dict, "computed_at": datetime, "refreshing": bool} o None
+        si todavía no hay resultado para ese día. refreshing solo cuenta un
+        lease vigente: uno vencido (worker muerto) deja que otro lo retome.
+    """
+    ensure_stats_cache_db()
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            SELECT payload, computed_at,
+                   COALESCE(refresh_started_at >= NOW() - make_interval(secs => %s), FALSE)
+            FROM stats_cache
+            WHERE app_key = %s AND fecha = %s AND payload IS NOT NULL;
+            """,
+            (lease_seconds, app_key, fecha),
+        )
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return {"payload": row[0], "computed_at": row[1], "refreshing": row[2]}
+
+
+def claim_refresh(app_key: str, fecha: date, lease_seconds: int) -> bool:
+    """
+    Toma el lease de refresco de la fila (la crea vacía si no existe).
+    False si otro proceso lo tiene y no venció.
+    """
+    ensure_stats_cache_db()
+    with get_cursor() as cur:
+        cur.execute(
+            """
+            INSERT INTO stats_cache (app_key, fecha, refresh_started_at)
+            VALUES (%s, %s, NOW())
+            ON CONFLICT (app_key, fecha) DO UPDATE
+            SET refresh_started_at = NOW()
+            WHERE stats_cache.refresh_started_at IS NULL
+               OR stats_cache.refresh_started_at < NOW() - make_interval(secs => %s)
+            RETURNING 1;
+            """,
+            (app_key, fecha, lease_seconds),
+        )
+        return cur.fetchone() is not None
+
+
+def release_refresh(app_key: str, fecha: date) -> None:
+    """Suelta el lease sin guardar resultado (el refresco falló)."""
+    with get_cursor() as cur:
+        cur.execute(
+            "UPDATE stats_cache SET refresh_started_at = NULL WHERE app_key = %s AND fecha = %s;",
+            (app_key, fecha),
+        )
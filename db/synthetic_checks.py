@@ -0,0 +1,130 @@
+# db/synthetic_checks.py
+"""
+Serie de tiempo del monitoreo sintético (synth_monitoring/monitor.py).
+
+Una fila por chequeo y app, con el tiempo de cada fase en ms (NULL si la
+fase no llegó a correr). latency_baselines() calcula, en una sola consulta,
+los percentiles del historial reciente de cada app: contra eso se decide si
+un chequeo está degradado, en vez de un umbral fijo igual para todas.
+"""
+import os
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from psycopg2.extras import execute_values
+
+from .connection import get_cursor
+
+# Fases medidas, en el orden en que ocurren (columnas <fase>_ms)
+PHASES = ("dns", "connect", "tls", "login", "logs_ttfb", "total")
+
+# PID del proceso que ya creó/verificó la tabla (None = todavía no)
+_TABLE_READY_PID: Optional[int] = None
+_TABLE_LOCK = threading.Lock()
+
+
+def init_synthetic_checks_db() -> None:
+    """
+    Crea la tabla synthetic_checks si no existe.
+    """
+    global _TABLE_READY_PID
+    columnas = ",\n".join(f"                {fase}_ms REAL" for fase in PHASES)
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            CREATE TABLE IF NOT EXISTS synthetic_checks (
+                id         BIGSERIAL PRIMARY KEY,
+                app_key    TEXT NOT NULL,
+                checked_at TIMESTAMP NOT NULL,
+                success    BOOLEAN NOT NULL,
+{columnas},
+                error      TEXT
+            );
+            """
+        )
+        cur.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_synthetic_checks_app_time
+            ON synthetic_checks (app_key, checked_at DESC);
+            """
+        )
+    _TABLE_READY_PID = os.getpid()
+
+
+def ensure_synthetic_checks_db() -> None:
+    """init_synthetic_checks_db() una sola vez por proceso."""
+    if _TABLE_READY_PID == os.getpid():
+        return
+    with _TABLE_LOCK:
+        if _TABLE_READY_PID != os.getpid():
+            init_synthetic_checks_db()
+
+
+def save_synthetic_checks(results: Iterable[dict]) -> int:
+    """
+    Guarda una ronda de chequeos (un INSERT multi-fila por cada 1000 chequeos).
+
+    Cada result trae app_key, checked_at (datetime), success, error y
+    phases_ms {fase: ms}.
+
+    Returns:
+        filas insertadas
+    """
+    filas = [
+        (r["app_key"], r["checked_at"], r["success"],
+         *(r.get("phases_ms", {}).get(fase) for fase in PHASES), r.get("error"))
+        for r in results
+    ]
+    if not filas:
+        return 0
+    ensure_synthetic_checks_db()
+    columnas = ", ".join(f"{fase}_ms" for fase in PHASES)
+    with get_cursor() as cur:
+        # execute_values: un INSERT multi-fila (executemany haría un round trip por fila)
+        execute_values(
+            cur,
+            f"INSERT INTO synthetic_checks (app_key, checked_at, success, {columnas}, error) VALUES %s;",
+            filas,
+            page_size=1000,
+        )
+    return len(filas)
+
+
+def latency_baselines(app_keys: Iterable[str], since: datetime) -> Dict[str, dict]:
+    """
+    p50/p95/p99 de cada fase sobre los chequeos exitosos desde `since`.
+
+    Returns:
+        {app_key: {"samples": n, "<fase>": {"p50": ms, "p95": ms, "p99": ms}}}
+        (solo las apps con historial)
+    """
+    app_keys = list(app_keys)
+    if not app_keys:
+        return {}
+    ensure_synthetic_checks_db()
+    percentiles = ",\n".join(
+        f"                percentile_cont(ARRAY[0.5, 0.95, 0.99]) WITHIN GROUP (ORDER BY {fase}_ms)"
+        for fase in PHASES
+    )
+    with get_cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT app_key, COUNT(*),
+{percentiles}
+            FROM synthetic_checks
+            WHERE success AND app_key = ANY(%s) AND checked_at >= %s
+            GROUP BY app_key;
+            """,
+            (app_keys, since),
+        )
+        rows = cur.fetchall()
+
+    baselines = {}
+    for app_key, samples, *valores in rows:
+        base = {"samples": samples}
+        for fase, pcts in zip(PHASES, valores):
+            if pcts is not None and pcts[0] is not None:
+                base[fase] = {"p50": pcts[0], "p95": pcts[1], "p99": pcts[2]}
+        baselines[app_key] = base
+    return baselines
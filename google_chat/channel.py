@@ -23,7 +23,9 @@ class GChatChannel(NotificationChannel):
         """
         from google_chat.notifier import enviar_gchat_errores_no_controlados
 
-        return enviar_gchat_errores_no_controlados(result.to_dict())
+        return enviar_gchat_errores_no_controlados(
+            result.to_dict(), errores=result.aggregated_errors()
+        )
 
     def send_alert(self, message: str) -> bool:
         """Envía una alerta puntual de texto a Google Chat."""
@@ -4,11 +4,12 @@ Notification functions for Google Chat integration with T4Alerts
 These functions are called from app/notifier.py
 """
 
-from typing import Dict, Any
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import date
 from pathlib import Path
 import logging
 
+from app.rate_limit import throttle
 from google_chat.config import get_gchat_config
 from google_chat.auth import ChatAuthConfig
 from google_chat.client import GoogleChatClient
@@ -142,7 +143,10 @@ def _format_error_message_email_style(app_name: str, app_key: str, dia: date, nc
     return "\n".join(lines)
 
 
-def enviar_gchat_errores_no_controlados(resultado: Dict[str, Any]) -> bool:
+def enviar_gchat_errores_no_controlados(
+    resultado: Dict[str, Any],
+    errores: Optional[Tuple[List[Dict], List[Dict]]] = None,
+) -> bool:
     """
     Send Google Chat notification for uncontrolled errors
     Called from app/notifier.py
@@ -154,6 +158,9 @@ def enviar_gchat_errores_no_controlados(resultado: Dict[str, Any]) -> bool:
             - app_name: Application name
             - app_key: Application key
             - dia: Date string or date object
+        errores: (nc_errors, c_errors) already aggregated in memory
+            (ScrapingResult.aggregated_errors()). If None, the per-app
+            .log files are read with get_daily_errors().
     
     Returns:
         True if notification was sent, False otherwise
@@ -178,10 +185,13 @@ def enviar_gchat_errores_no_controlados(resultado: Dict[str, Any]) -> bool:
             from datetime import datetime
             dia = datetime.strptime(dia, "%Y-%m-%d").date()
         
-        # Get log paths and read errors (same as email)
-        no_controlados_path, controlados_path = _get_log_paths(app_key)
-        nc_errors = get_daily_errors(no_controlados_path, dia)
-        c_errors = get_daily_errors(controlados_path, dia)
+        if errores is not None:
+            nc_errors, c_errors = errores
+        else:
+            # Get log paths and read errors (same as email)
+            no_controlados_path, controlados_path = _get_log_paths(app_key)
+            nc_errors = get_daily_errors(no_controlados_path, dia)
+            c_errors = get_daily_errors(controlados_path, dia)
         
         # Format message
         message = _format_error_message_email_style(app_name, app_key, dia, nc_errors, c_errors)
@@ -197,6 +207,7 @@ def enviar_gchat_errores_no_controlados(resultado: Dict[str, Any]) -> bool:
         auth_config = ChatAuthConfig(mode=config["mode"])
         client = GoogleChatClient(auth_config)
         
+        throttle("gchat")
         client.send_text(
             space_name=config["space_name"],
             text=message,
@@ -242,6 +253,7 @@ def enviar_aviso_gchat(mensaje: str) -> bool:
         # Send to general thread or no thread
         thread_key = "avisos" if config["thread_strategy"] != "none" else None
         
+        throttle("gchat")
         client.send_text(
             space_name=config["space_name"],
             text=mensaje,
@@ -204,7 +204,12 @@ def _get_sender_name(app_key: str, subject: str) -> str:
     return sender_name
 
 
-def enviar_resumen_por_correo(dia: date, app_name: str = "DriverApp GO2", app_key: str = "driverapp_goto") -> None:
+def enviar_resumen_por_correo(
+    dia: date,
+    app_name: str = "DriverApp GO2",
+    app_key: str = "driverapp_goto",
+    forced_data: dict = None,
+) -> None:
     """
     Envía el resumen de errores por correo.
     
@@ -212,8 +217,9 @@ def enviar_resumen_por_correo(dia: date, app_name: str = "DriverApp GO2", app_ke
         dia: fecha del reporte
         app_name: nombre de la aplicación
         app_key: clave de la aplicación
+        forced_data: (opcional) errores ya agregados, ver construir_html_resumen()
     """
-    html, total_nc, total_c = construir_html_resumen(dia, app_name, app_key)
+    html, total_nc, total_c = construir_html_resumen(dia, app_name, app_key, forced_data)
 
     # Enviar si hay errores controlados O no controlados (informar de cualquier actividad de error)
     if total_nc == 0 and total_c == 0:
@@ -27,7 +27,13 @@ class EmailChannel(NotificationChannel):
         if total == 0:
             return False
 
-        enviar_resumen_por_correo(result.dia, result.app_name, result.app_key)
+        nc_errors, c_errors = result.aggregated_errors()
+        enviar_resumen_por_correo(
+            result.dia,
+            result.app_name,
+            result.app_key,
+            forced_data={"nc_errors": nc_errors, "c_errors": c_errors},
+        )
         return True
 
     def send_alert(self, message: str) -> bool:
@@ -1,24 +1,41 @@
 # mailer/client.py
 # Moved from app/alerts.py
 # Cliente SMTP del proyecto T4Alerts.
+import atexit
 import os
 import smtplib
 import logging
+import threading
 from email.message import EmailMessage
 from uuid import uuid4
-from time import time
+from time import time, monotonic
+from typing import Iterable, Optional, Tuple
 
 from dotenv import load_dotenv
 
+from app.rate_limit import throttle
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
+# Conexión SMTP reutilizable (por proceso). Variables de entorno:
+#   MAIL_KEEPALIVE=0           → una conexión nueva por correo (comportamiento anterior)
+#   MAIL_KEEPALIVE_IDLE=60     → segundos ociosa antes de cerrarla y reconectar
+#   MAIL_KEEPALIVE_MAX_MSGS=100 → correos por conexión antes de renovarla
+MAIL_KEEPALIVE = os.getenv("MAIL_KEEPALIVE", "1") != "0"
+MAIL_KEEPALIVE_IDLE = float(os.getenv("MAIL_KEEPALIVE_IDLE", "60"))
+MAIL_KEEPALIVE_MAX_MSGS = int(os.getenv("MAIL_KEEPALIVE_MAX_MSGS", "100"))
+
+# (subject, html_body, to_addrs, sender_name)
+EmailSpec = Tuple[str, str, list, Optional[str]]
+
 
 def _smtp_client():
     """
     Cliente SMTP muy parecido al de t4ssl, pero sin nada de anti-spam ni DB.
     Usa las mismas variables de entorno:
       MAIL_HOST, MAIL_PORT, MAIL_USERNAME, MAIL_PASSWORD, MAIL_ENCRYPTION
+    MAIL_ENCRYPTION: tls (default), ssl o none (SMTP plano, p.ej. relay local).
     """
     host = os.getenv("MAIL_HOST", "smtp.gmail.com")
     port = int(os.getenv("MAIL_PORT", "587"))
@@ -28,6 +45,9 @@ def _smtp_client():
 
     if enc == "ssl":
         server = smtplib.SMTP_SSL(host, port, timeout=20)
+    elif enc == "none":
+        server = smtplib.SMTP(host, port, timeout=20)
+        server.ehlo()
     else:
         server = smtplib.SMTP(host, port, timeout=20)
         server.ehlo()
@@ -40,15 +60,124 @@ def _smtp_client():
     return server
 
 
-def send_email(subject: str, html_body: str, to_addrs: list[str], sender_name: str | None = None):
+class SMTPSender:
     """
-    Envío directo, sin anti-spam.
+    Conexión SMTP autenticada que se reutiliza entre envíos.
+
+    - Se abre en el primer envío y se mantiene hasta MAIL_KEEPALIVE_IDLE
+      segundos sin uso o MAIL_KEEPALIVE_MAX_MSGS correos.
+    - Si el servidor cortó la conexión (SMTPServerDisconnected, o el socket
+      murió), reconecta y reintenta el correo una sola vez.
+    - Thread-safe: los envíos por la misma conexión se serializan.
+    """
+
+    def __init__(self):
+        self.pid = os.getpid()
+        self._server: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._sent_on_conn = 0
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.reconnects = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        self._close()
+        self._server = _smtp_client()
+        self._sent_on_conn = 0
+        self.connects += 1
+        return self._server
+
+    def _close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            try:
+                self._server.close()
+            except OSError:
+                pass
+        self._server = None
+
+    def _ensure(self) -> smtplib.SMTP:
+        expirada = (
+            monotonic() - self._last_used > MAIL_KEEPALIVE_IDLE
+            or self._sent_on_conn >= MAIL_KEEPALIVE_MAX_MSGS
+        )
+        if self._server is None or expirada:
+            return self._connect()
+        return self._server
+
+    def _send_locked(self, msg: EmailMessage) -> None:
+        try:
+            self._ensure().send_message(msg)
+        except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+            logger.info("SMTP reconectando tras desconexión: %s", e)
+            self._close()
+            self.reconnects += 1
+            self._connect().send_message(msg)
+        except smtplib.SMTPResponseException as e:
+            # 421: el servidor cierra la sesión (timeout/límite); reintentar con conexión nueva
+            if e.smtp_code != 421:
+                raise
+            logger.info("SMTP reconectando tras 421: %s", e)
+            self._close()
+            self.reconnects += 1
+            self._connect().send_message(msg)
+        self._sent_on_conn += 1
+        self._last_used = monotonic()
+
+    def send(self, msg: EmailMessage) -> None:
+        with self._lock:
+            self._send_locked(msg)
+
+    def send_many(self, msgs: Iterable[EmailMessage]) -> int:
+        """Envía todos los correos por la misma conexión. Devuelve cuántos se enviaron."""
+        enviados = 0
+        with self._lock:
+            for msg in msgs:
+                throttle("email")
+                self._send_locked(msg)
+                enviados += 1
+        return enviados
+
+    def close(self) -> None:
+        with self._lock:
+            self._close()
+
+
+_SENDER: Optional[SMTPSender] = None
+_SENDER_LOCK = threading.Lock()
+
+
+def get_smtp_sender() -> SMTPSender:
+    """Sender compartido del proceso actual (uno nuevo después de un fork)."""
+    global _SENDER
+    with _SENDER_LOCK:
+        if _SENDER is None or _SENDER.pid != os.getpid():
+            _SENDER = SMTPSender()
+        return _SENDER
+
+
+def close_smtp() -> None:
+    """Cierra (QUIT) la conexión SMTP compartida, si la hay."""
+    if _SENDER is not None and _SENDER.pid == os.getpid():
+        _SENDER.close()
+
+
+atexit.register(close_smtp)
+
+
+def build_message(subject: str, html_body: str, to_addrs: list[str], sender_name: str | None = None) -> Optional[EmailMessage]:
+    """
+    Arma el EmailMessage (From/To/Subject, token de trazado, texto + HTML).
+    Devuelve None si no quedan destinatarios válidos.
     """
     # Limpia direcciones vacías, espacios, etc.
     to_addrs = [a.strip() for a in (to_addrs or []) if a and a.strip()]
     if not to_addrs:
         logger.info("SMTP SKIP (sin destinatarios): subject=%s", subject)
-        return
+        return None
 
     msg = EmailMessage()
 
@@ -66,9 +195,52 @@ def send_email(subject: str, html_body: str, to_addrs: list[str], sender_name: s
 
     msg.set_content("Please view the HTML version.")
     msg.add_alternative(html_body, subtype="html")
+    return msg
+
+
+def send_email(subject: str, html_body: str, to_addrs: list[str], sender_name: str | None = None):
+    """
+    Envío directo, sin anti-spam.
+    Reutiliza la conexión SMTP del proceso (MAIL_KEEPALIVE=0 para abrir una por correo).
+    """
+    msg = build_message(subject, html_body, to_addrs, sender_name)
+    if msg is None:
+        return
+
+    throttle("email")
+    if not MAIL_KEEPALIVE:
+        with _smtp_client() as s:
+            s.send_message(msg)
+        return
+
+    get_smtp_sender().send(msg)
+
+
+def send_many(emails: Iterable[EmailSpec]) -> int:
+    """
+    Envía varios correos por una sola conexión SMTP autenticada.
+
+    Args:
+        emails: iterable de (subject, html_body, to_addrs, sender_name)
+
+    Returns:
+        Cantidad de correos enviados (los que no tienen destinatarios se omiten).
+    """
+    msgs = [
+        msg for msg in (build_message(*spec) for spec in emails)
+        if msg is not None
+    ]
+    if not msgs:
+        return 0
+
+    if not MAIL_KEEPALIVE:
+        with _smtp_client() as s:
+            for msg in msgs:
+                throttle("email")
+                s.send_message(msg)
+        return len(msgs)
 
-    with _smtp_client() as s:
-        s.send_message(msg)
+    return get_smtp_sender().send_many(msgs)
 
 
 def default_recipients(owner_email: str | None = None) -> list[str]:
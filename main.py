@@ -1,32 +1,54 @@
 # t4alerts_automation/main.py
+import cProfile
+import io
 import os
+import pstats
 import sys
+import time
+# Desde acá hasta que arranca el scraping (imports + create_app + init_db) es el
+# costo fijo que paga cada corrida de main.py como proceso nuevo (ver scraper_worker.py)
+_INICIO_PROCESO = time.perf_counter()
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime
+from urllib.parse import urlparse
 
 # Ensure the root directory is in sys.path to find shared modules (app, db, sms, etc.)
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 if BASE_DIR not in sys.path:
     sys.path.append(BASE_DIR)
 
-from app.config import get_apps_config
+from app.config import get_apps_config, get_app_urls
 from db import (
     init_db,
     reset_all_alerted_errors,
     reset_alerted_errors_for_date,
+    get_pool_stats,
 )
 from app.scrapper import procesar_aplicacion
-from app.notifier import notificar_app, notificar_fecha_futura, notificar_logs_desactualizados, notificar_error_conexion
+from app.notifier import notificar_apps, imprimir_latencias, notificar_fecha_futura, notificar_logs_desactualizados, notificar_error_conexion
 from app.logs_scraper import StaleLogsError
+from app.signatures import signature_cache_stats
+from app.stats_snapshot import store_stats_snapshot
+from app.run_metrics import RUN_REPORT_PATH, reset_run, track_app, write_run_report
 
+# --profile: cProfile de cada app; al final se guarda/imprime el de la más lenta.
+# Las apps corren de a una (un solo profiler activo: desde Python 3.12 cProfile
+# usa sys.monitoring y un segundo Profile().enable() falla). Cada perfil ve solo
+# el hilo de su app: no incluye la clasificación en procesos (CLASSIFY_WORKERS)
+# ni los hilos de las notificaciones.
+PROFILE = "--profile" in sys.argv[1:]
 
-def resolver_fecha() -> tuple[str, date]:
+
+def resolver_fecha(argv: list[str] | None = None) -> tuple[str, date]:
     """
     Toma los argumentos de línea de comandos (sys.argv)
     y decide qué fecha usar.
     """
-    if len(sys.argv) >= 2:
-        fecha_str = sys.argv[1]
+    args = [a for a in (sys.argv[1:] if argv is None else argv) if not a.startswith("--")]
+    if args:
+        fecha_str = args[0]
         dia = date.fromisoformat(fecha_str)
     else:
         dia = date.today()
@@ -45,24 +67,196 @@ def aplicar_resets(dia: date, fecha_str: str) -> None:
         reset_alerted_errors_for_date(dia)
         print(f"⚠️ RESET_ALERTED_ERRORS_FOR_DATE=1 → borrar registros de fecha {fecha_str} en alerted_errors")
 
-def main() -> None:
-    # 1) Contexto de aplicación (opcional pero recomendado para cargar apps de DB)
-    apps_config = {}
+# Concurrencia del scraping:
+#   SCRAPER_MAX_WORKERS  → cuántas apps se procesan en paralelo (1 = secuencial, como antes)
+#   SCRAPER_MAX_PER_HOST → cuántas apps del MISMO host pueden correr a la vez
+SCRAPER_MAX_WORKERS = int(os.getenv("SCRAPER_MAX_WORKERS", "4"))
+SCRAPER_MAX_PER_HOST = int(os.getenv("SCRAPER_MAX_PER_HOST", "1"))
+
+
+def host_de_app(app_key: str) -> str:
+    """Hostname de la app (o su app_key si no tiene URL válida)."""
     try:
-        # Intentamos cargar el contexto para acceder a MonitoredApp
-        from t4alerts_backend.app import create_app
-        flask_app = create_app()
+        base_url, _, _ = get_app_urls(app_key)
+        return urlparse(base_url).hostname or app_key
+    except Exception:
+        return app_key
+
+
+def carriles_por_host(app_keys: list[str], max_per_host: int = SCRAPER_MAX_PER_HOST) -> list[list[str]]:
+    """
+    Reparte las apps en carriles que se procesan uno detrás de otro: las de un
+    mismo host quedan en a lo sumo max_per_host carriles, así nunca corren más
+    de max_per_host a la vez contra ese servidor (lo mismo que _HostLimiter,
+    pero para procesos separados como las tareas de Celery).
+    """
+    por_host: dict[str, list[list[str]]] = {}
+    for app_key in app_keys:
+        carriles = por_host.setdefault(host_de_app(app_key), [])
+        if len(carriles) < max(1, max_per_host):
+            carriles.append([app_key])
+        else:
+            min(carriles, key=len).append(app_key)
+    return [carril for carriles in por_host.values() for carril in carriles]
+
+
+class _HostLimiter:
+    """
+    Un semáforo por hostname para no abrir demasiadas sesiones simultáneas
+    contra el mismo servidor (varias apps pueden compartir host).
+    """
+
+    def __init__(self, max_per_host: int):
+        self._max_per_host = max(1, max_per_host)
+        self._semaforos: dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def para(self, app_key: str) -> threading.BoundedSemaphore:
+        host = host_de_app(app_key)
+        with self._lock:
+            if host not in self._semaforos:
+                self._semaforos[host] = threading.BoundedSemaphore(self._max_per_host)
+            return self._semaforos[host]
+
+
+def procesar_app(app_key: str, fecha_str: str, dia: date, flask_app=None):
+    """
+    Scraping + clasificación + guardado de una app, SIN manejo de errores
+    (la tarea scrape_app de Celery lo usa así para poder reintentar).
+
+    Returns:
+        el ScrapingResult
+    """
+    inicio = datetime.now()
+    # Si tenemos flask_app, lo usamos para cada aplicación por si hay consultas a BD internas
+    if flask_app is not None:
         with flask_app.app_context():
-            apps_config = get_apps_config(static_only=True)
+            resultado = procesar_aplicacion(app_key, fecha_str, dia)
+    else:
+        resultado = procesar_aplicacion(app_key, fecha_str, dia)
+    # El dashboard (/api/stats/view) lee este resultado en vez de scrapear
+    store_stats_snapshot(resultado, computed_at=inicio)
+    return resultado
+
+
+def es_error_definitivo(e: Exception) -> bool:
+    """Errores que no se arreglan reintentando (fecha futura, logs desactualizados)."""
+    if isinstance(e, StaleLogsError):
+        return True
+    return isinstance(e, RuntimeError) and "No se puede procesar fecha futura" in str(e)
+
+
+def manejar_error_app(e: Exception, app_key: str, apps_config: dict, fecha_str: str) -> tuple:
+    """
+    Manejo de errores por app (fecha futura, stale logs, error de conexión,
+    error genérico): notifica lo que corresponda.
+
+    Returns:
+        (None, error_info): error_info es un dict si fue un error genérico, None en otro caso.
+
+    Raises:
+        RuntimeError: si es un RuntimeError que no corresponde a fecha futura.
+    """
+    app_name = apps_config.get(app_key, {}).get('name', app_key)
+
+    if isinstance(e, RuntimeError):
+        msg = str(e)
+        if "No se puede procesar fecha futura" in msg:
+            print(f"⚠️ {app_name}: Fecha futura detectada ({fecha_str}). Enviando notificaciones...")
+            notificar_fecha_futura(app_key, app_name, fecha_str)
+            return None, None
+        raise e
+
+    if isinstance(e, StaleLogsError):
+        print(f"🚨 {app_name}: STALE LOGS - {e.days_old} days old")
+        notificar_logs_desactualizados(
+            app_key=e.app_key,
+            app_name=app_name,
+            fecha_str=e.fecha_str,
+            days_old=e.days_old,
+            most_recent_date=str(e.most_recent_date)
+        )
+        return None, None
+
+    if isinstance(e, requests.exceptions.ConnectionError):
+        # Error de conexión recurrente después de múltiples intentos
+        error_msg = str(e)
+        print(f"🚨 {app_name}: CONNECTION ERROR - {error_msg}")
+
+        # Enviar notificaciones críticas
+        notificar_error_conexion(
+            app_key=app_key,
+            app_name=app_name,
+            fecha_str=fecha_str,
+            error_message=error_msg,
+            max_retries=3
+        )
+        return None, None
+
+    error_info = {
+        'app_key': app_key,
+        'app_name': app_name,
+        'error_type': type(e).__name__,
+        'error_msg': str(e)
+    }
+    print(f"⚠️ Error al procesar {app_name}: {type(e).__name__} - {e}")
+    print(f"   Continuando con las demás aplicaciones...\n")
+    return None, error_info
+
+
+def procesar_app_seguro(app_key: str, apps_config: dict, fecha_str: str, dia: date, flask_app=None) -> tuple:
+    """
+    Procesa una aplicación aplicando el mismo manejo de errores por app
+    (fecha futura, stale logs, error de conexión, error genérico).
+
+    Returns:
+        (resultado, error_info): resultado es el ScrapingResult o None;
+        error_info es un dict si hubo un error genérico, None en otro caso.
+
+    Raises:
+        RuntimeError: si es un RuntimeError que no corresponde a fecha futura
+        (se propaga igual que en la ejecución secuencial).
+    """
+    try:
+        return procesar_app(app_key, fecha_str, dia, flask_app), None
+    except Exception as e:
+        return manejar_error_app(e, app_key, apps_config, fecha_str)
+
+
+def crear_contexto():
+    """
+    Contexto de aplicación (opcional pero recomendado para cargar apps de DB).
+    create_app() también crea las tablas: se hace una vez por proceso.
+
+    Returns:
+        la app Flask, o None si no se pudo crear
+    """
+    try:
+        from t4alerts_backend.app import create_app
+        return create_app()
     except Exception as e:
         print(f"⚠️ Info: Running without Flask context. Attempting static loading fallback. Error: {e}")
+        return None
+
+
+def cargar_apps(flask_app=None) -> dict:
+    """Config de las apps a procesar (se relee en cada corrida)."""
+    try:
+        if flask_app is not None:
+            # Intentamos cargar el contexto para acceder a MonitoredApp
+            with flask_app.app_context():
+                return get_apps_config(static_only=True)
         # Fallback to static config from app.config
-        try:
-            # get_apps_config is already imported at top level
-            apps_config = get_apps_config(static_only=True)
-        except:
-            from app.config import APPS_CONFIG_LEGACY
-            apps_config = APPS_CONFIG_LEGACY
+        return get_apps_config(static_only=True)
+    except Exception:
+        from app.config import APPS_CONFIG_LEGACY
+        return APPS_CONFIG_LEGACY
+
+
+def main() -> None:
+    # 1) Contexto de aplicación + apps
+    flask_app = crear_contexto()
+    apps_config = cargar_apps(flask_app)
 
     # 2) Inicializar la base de datos de alertas
     init_db()
@@ -73,89 +267,90 @@ def main() -> None:
     # 4) Aplicar resets
     aplicar_resets(dia, fecha_str)
 
+    # 5-6) Scraping + notificaciones. Si una app rompió con un error inesperado,
+    # las demás igual se procesan y notifican, y el proceso sale con error (como antes)
+    ejecutar_ronda(fecha_str, dia, flask_app, apps_config,
+                   setup_seconds=time.perf_counter() - _INICIO_PROCESO, raise_on_crash=True)
+
+
+def ejecutar_ronda(fecha_str: str, dia: date, flask_app, apps_config: dict,
+                   setup_seconds: float | None = None, raise_on_crash: bool = False) -> dict:
+    """
+    Una corrida completa: scraping de todas las apps, notificaciones y reporte.
+    main() la llama una vez; scraper_worker.ScraperWorker, una vez por tick.
+
+    Cada app queda aislada: sus errores se reportan como errores de esa app y
+    no cortan la ronda de las demás.
+
+    Args:
+        setup_seconds: costo fijo antes de empezar a scrapear (va al reporte)
+        raise_on_crash: re-lanza, al final, la primera excepción inesperada de una app
+
+    Returns:
+        resumen de la corrida (apto para JSON)
+    """
     # Obtener hora actual de ejecución
     hora_actual = datetime.now().strftime("%I:%M:%S %p")
     
     print(f"📅 Fecha y hora de reporte: {fecha_str} {hora_actual}")
-    print(f"📧 Procesando {len(apps_config)} aplicaciones...\n")
+    # --profile: de a una app, para que nunca haya dos cProfile activos a la vez
+    workers = 1 if PROFILE else max(1, SCRAPER_MAX_WORKERS)
+    print(f"📧 Procesando {len(apps_config)} aplicaciones "
+          f"(workers={workers}, por host={SCRAPER_MAX_PER_HOST})...\n")
 
-    # 5) Scraping + clasificación + guardado
+    # 5) Scraping + clasificación + guardado (en paralelo, acotado global y por host)
     resultados = []
     errores = []
-    
-    for app_key in apps_config.keys():
-        try:
-            # Procesar aplicación
-            # NOTA: procesar_aplicacion usa internamente get_app_credentials que ahora es dinámico
-            # pero como ya cargamos apps_config aquí, podríamos pasarlo o dejar que use su fallback.
-            # Para mayor robustez, nos aseguramos de que el contexto de Flask esté activo si es posible.
-            
-            # Si tenemos flask_app, lo usamos para cada aplicación por si hay consultas a BD internas
-            if 'flask_app' in locals():
-                with flask_app.app_context():
-                    resultado = procesar_aplicacion(app_key, fecha_str, dia)
-            else:
-                resultado = procesar_aplicacion(app_key, fecha_str, dia)
-                
-            resultados.append(resultado)
-            
-        except RuntimeError as e:
-            msg = str(e)
-            if "No se puede procesar fecha futura" in msg:
-                 app_name = apps_config.get(app_key, {}).get('name', app_key)
-                 print(f"⚠️ {app_name}: Fecha futura detectada ({fecha_str}). Enviando notificaciones...")
-                 notificar_fecha_futura(app_key, app_name, fecha_str)
-                 continue
-            else:
-                 raise e
-        
-        except StaleLogsError as e:
-            app_name_stale = apps_config.get(app_key, {}).get('name', app_key)
-            print(f"🚨 {app_name_stale}: STALE LOGS - {e.days_old} days old")
-            notificar_logs_desactualizados(
-                app_key=e.app_key,
-                app_name=app_name_stale,
-                fecha_str=e.fecha_str,
-                days_old=e.days_old,
-                most_recent_date=str(e.most_recent_date)
-            )
-            continue
-            
-        except requests.exceptions.ConnectionError as e:
-            # Error de conexión recurrente después de múltiples intentos
-            app_name_conn = apps_config.get(app_key, {}).get('name', app_key)
-            error_msg = str(e)
-            print(f"🚨 {app_name_conn}: CONNECTION ERROR - {error_msg}")
-            
-            # Enviar notificaciones críticas
-            notificar_error_conexion(
-                app_key=app_key,
-                app_name=app_name_conn,
-                fecha_str=fecha_str,
-                error_message=error_msg,
-                max_retries=3
-            )
-            continue
-            
-        except Exception as e:
-            app_name_error = apps_config.get(app_key, {}).get('name', app_key)
-            error_info = {
-                'app_key': app_key,
-                'app_name': app_name_error,
-                'error_type': type(e).__name__,
-                'error_msg': str(e)
-            }
-            errores.append(error_info)
-            print(f"⚠️ Error al procesar {app_name_error}: {type(e).__name__} - {e}")
-            print(f"   Continuando con las demás aplicaciones...\n")
-
-    # 6) Envío de correos
-    for resultado in resultados:
-        try:
-            notificar_app(resultado)
-        except Exception as e:
-            app_name = resultado.get('app_name', 'Desconocida')
-            print(f"⚠️ Error al notificar {app_name}: {e}")
+    caidas = []
+    duraciones: dict[str, float] = {}
+    perfiles: dict[str, cProfile.Profile] = {}
+    limitador = _HostLimiter(SCRAPER_MAX_PER_HOST)
+    run = reset_run()
+
+    def ejecutar(app_key: str) -> tuple:
+        with limitador.para(app_key), track_app(app_key):
+            perfil = cProfile.Profile() if PROFILE else None
+            inicio = time.perf_counter()
+            estado = "error"
+            try:
+                if perfil is not None:
+                    perfil.enable()
+                resultado, error_info = procesar_app_seguro(app_key, apps_config, fecha_str, dia, flask_app)
+                estado = "ok" if resultado is not None else ("error" if error_info else "skipped")
+                return resultado, error_info
+            finally:
+                if perfil is not None:
+                    perfil.disable()
+                    perfiles[app_key] = perfil
+                duraciones[app_key] = time.perf_counter() - inicio
+                run.finish_app(app_key, duraciones[app_key], estado)
+
+    inicio_ronda = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as pool:
+        futuros = {app_key: pool.submit(ejecutar, app_key) for app_key in apps_config.keys()}
+
+        # Recogemos en el orden original de apps_config para que el reporte sea estable
+        for app_key, futuro in futuros.items():
+            try:
+                resultado, error_info = futuro.result()
+            except Exception as e:
+                # Error inesperado de una app: queda como error de esa app, la ronda sigue
+                app_name = apps_config.get(app_key, {}).get('name', app_key)
+                print(f"💥 {app_name}: {type(e).__name__} - {e}")
+                resultado = None
+                error_info = {'app_key': app_key, 'app_name': app_name,
+                              'error_type': type(e).__name__, 'error_msg': str(e)}
+                caidas.append(e)
+            if resultado is not None:
+                resultados.append(resultado)
+            if error_info is not None:
+                errores.append(error_info)
+    tiempo_ronda = time.perf_counter() - inicio_ronda
+
+    # 6) Envío de notificaciones (todas las apps y canales en paralelo)
+    inicio_notif = time.perf_counter()
+    latencias = notificar_apps(resultados)
+    tiempo_notif = time.perf_counter() - inicio_notif
 
     print(f"\n{'='*70}")
     print("✅ Scrapping completado para todas las aplicaciones")
@@ -167,6 +362,12 @@ def main() -> None:
         print(f"\n⚠️ Aplicaciones con errores: {len(errores)}")
         for error in errores:
             print(f"   • {error['app_name']}: {error['error_type']}")
+
+    _imprimir_tiempos(duraciones, tiempo_ronda, apps_config, setup_seconds)
+    imprimir_latencias(latencias, tiempo_notif)
+    escribir_reporte(fecha_str, tiempo_ronda, tiempo_notif, latencias, setup_seconds)
+    if perfiles:
+        _volcar_perfil(perfiles, duraciones)
     
     # Twilio
     twilio_number = os.getenv("TWILIO_TO_NUMBER")
@@ -175,6 +376,82 @@ def main() -> None:
         
     print(f"{'='*70}\n")
 
+    if caidas and raise_on_crash:
+        raise caidas[0]
+
+    return {
+        "fecha": fecha_str,
+        "apps": len(apps_config),
+        "ok": [r.app_key for r in resultados],
+        "errors": errores,
+        "setup_seconds": round(setup_seconds, 4) if setup_seconds is not None else None,
+        "scrape_seconds": round(tiempo_ronda, 4),
+        "notify_seconds": round(tiempo_notif, 4),
+    }
+
+
+def _imprimir_tiempos(duraciones: dict, tiempo_ronda: float, apps_config: dict,
+                      setup_seconds: float | None = None) -> None:
+    """Muestra el tiempo real de la ronda frente a la suma de tiempos por app."""
+    if setup_seconds is not None:
+        print(f"\n⚙️ Preparación antes de scrapear (imports, create_app, init_db, config): {setup_seconds:.2f}s")
+    if not duraciones:
+        return
+    suma = sum(duraciones.values())
+    speedup = suma / tiempo_ronda if tiempo_ronda > 0 else 1.0
+    print(f"\n⏱️ Tiempo de scraping: {tiempo_ronda:.2f}s reales vs {suma:.2f}s sumados por app "
+          f"(speedup x{speedup:.2f})")
+    for app_key, segundos in sorted(duraciones.items(), key=lambda x: x[1], reverse=True):
+        app_name = apps_config.get(app_key, {}).get('name', app_key)
+        print(f"   • {app_name}: {segundos:.2f}s")
+
+    pool = get_pool_stats()
+    if pool.get("checkouts"):
+        print(f"🗄️ Pool Postgres: {pool['checkouts']} checkouts, espera prom "
+              f"{pool['wait_avg_seconds'] * 1000:.1f} ms / máx {pool['wait_max_seconds'] * 1000:.1f} ms "
+              f"(max {pool['max']} conexiones)")
+
+    firmas = signature_cache_stats()
+    if firmas["hits"] or firmas["misses"]:
+        print(f"🔏 Firmas (LRU): {firmas['misses']} calculadas, {firmas['hits']} desde caché "
+              f"({firmas['hit_rate'] * 100:.1f}% hits)")
+    if firmas["entry"]["computed"]:
+        print(f"🔏 Firmas de registros (sin LRU): {firmas['entry']['computed']}")
+
+
+def escribir_reporte(fecha_str: str, tiempo_ronda: float, tiempo_notif: float, latencias: dict,
+                      setup_seconds: float | None = None) -> None:
+    """Reporte JSON (y .prom opcional) con los tiempos por app y etapa."""
+    destino = write_run_report({
+        "fecha": fecha_str,
+        "setup_seconds": round(setup_seconds, 4) if setup_seconds is not None else None,
+        "scrape_seconds": round(tiempo_ronda, 4),
+        "notify_seconds": round(tiempo_notif, 4),
+        "channels": {
+            nombre: {"calls": lat.llamadas, "sent": lat.enviados, "failed": lat.fallos,
+                     "seconds": round(lat.total_s, 4), "max_seconds": round(lat.max_s, 4)}
+            for nombre, lat in latencias.items()
+        },
+        "signature_cache": signature_cache_stats(),
+        "db_pool": get_pool_stats(),
+    })
+    if destino is not None:
+        print(f"🧾 Reporte de tiempos por etapa: {destino}")
+
+
+def _volcar_perfil(perfiles: dict, duraciones: dict) -> None:
+    """--profile: guarda el cProfile de la app más lenta e imprime su top 20."""
+    app_key = max(perfiles, key=lambda k: duraciones.get(k, 0.0))
+    base = os.path.dirname(RUN_REPORT_PATH) or "."
+    os.makedirs(base, exist_ok=True)
+    destino = os.path.join(base, f"profile_{app_key}.prof")
+    perfiles[app_key].dump_stats(destino)
+
+    salida = io.StringIO()
+    pstats.Stats(perfiles[app_key], stream=salida).sort_stats("cumulative").print_stats(20)
+    print(f"\n🔬 Perfil de la app más lenta ({app_key}, {duraciones[app_key]:.2f}s): {destino}")
+    print(salida.getvalue())
+
 
 if __name__ == "__main__":
     main()
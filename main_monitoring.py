@@ -45,6 +45,17 @@ def main():
             any_failure = True
             
     print("=" * 70)
+
+    print("\n⏱️ Fases (ms): dns / connect / tls / login / logs_ttfb")
+    for app_key, res in results.items():
+        fases = res.get("phases_ms", {})
+        valores = " / ".join(
+            f"{fases[f]:.0f}" if fases.get(f) is not None else "-"
+            for f in ("dns", "connect", "tls", "login", "logs_ttfb")
+        )
+        deg = res.get("degradation")
+        marca = f"  🐢 > {deg['level']}" if deg else ""
+        print(f"   {app_key:<25} {valores}{marca}")
     
     if any_failure:
         print("\n⚠️ Se detectaron problemas en una o más aplicaciones.")
@@ -2,4 +2,6 @@ from t4alerts_backend.app import create_app
 
 if __name__ == "__main__":
     app = create_app()
+    from t4alerts_backend.common.metrics import init_metrics
+    init_metrics(app)
     app.run(debug=True, port=5001)
@@ -26,3 +26,8 @@ if ENV == "prod":
     INTERVAL = {"hours": 7}
 else:
     INTERVAL = {"minutes": 1}
+
+# Modo de ejecución de cada tick:
+#   1 -> la ronda de main.py corre dentro del scheduler (imports y pools calientes)
+#   0 -> se lanza main.py como subproceso en cada tick (modo anterior)
+SCHED_INPROCESS = os.getenv("SCHED_INPROCESS", "1") != "0"
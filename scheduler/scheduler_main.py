@@ -5,8 +5,8 @@ from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
-from config import INTERVAL, ENV
-from utils import get_logger, run_main_script
+from config import INTERVAL, ENV, SCHED_INPROCESS
+from utils import get_logger, run_main_inprocess, run_main_script
 
 logger = get_logger()
 
@@ -15,7 +15,10 @@ logger.info("Comenzando envio de correos automatizado, espera un poco . . .")
 def job():
     try:
         logger.info("Ejecutando job: main.py")
-        run_main_script(logger)
+        if SCHED_INPROCESS:
+            run_main_inprocess(logger)
+        else:
+            run_main_script(logger)
         logger.info("Job ejecutado correctamente")
     except Exception as e:
         logger.exception(f"Error al ejecutar job: {e}")
@@ -1,8 +1,10 @@
 # scheduler/utils.py
+import json
 import logging
 import subprocess
 import sys
 import os
+import time
 
 from config import (
     MAIN_PATH,
@@ -28,9 +30,50 @@ def get_logger() -> logging.Logger:
     return logger
 
 
+def _raiz_en_path() -> None:
+    """El scheduler corre desde scheduler/: la raíz del proyecto tiene que ser importable."""
+    if str(BASE_DIR) not in sys.path:
+        sys.path.insert(0, str(BASE_DIR))
+
+
+def run_main_inprocess(logger: logging.Logger) -> dict:
+    """
+    Ejecuta la ronda de main.py dentro de este proceso (scraper_worker.py):
+    imports, create_app e init_db solo en el primer tick.
+    """
+    _raiz_en_path()
+    from scraper_worker import run_tick
+
+    logger.info("Ejecutando la ronda de main.py en el proceso del scheduler")
+    inicio = time.perf_counter()
+    resumen = run_tick()
+    logger.info(
+        f"Tick {resumen['tick']} terminado en {time.perf_counter() - inicio:.2f}s "
+        f"(overhead {resumen['overhead_seconds']:.2f}s, preparación {resumen['setup_seconds']:.2f}s)"
+    )
+    return resumen
+
+
+def _overhead_subproceso(wall_seconds: float) -> float | None:
+    """Overhead de un main.py como subproceso, a partir de su reporte de tiempos."""
+    _raiz_en_path()
+    from scraper_worker import tick_overhead
+
+    try:
+
+        ruta = os.getenv("RUN_REPORT_PATH", "salida_logs/run_report.json")
+        if not ruta:
+            return None
+        with open(BASE_DIR / ruta, encoding="utf-8") as f:
+            return tick_overhead(wall_seconds, json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
 def run_main_script(logger: logging.Logger) -> None:
     """Ejecuta main.py como si hicieras 'python main.py' en la raíz del proyecto."""
     logger.info("Lanzando main.py desde scheduler")
+    inicio = time.perf_counter()
     
     try:
         # Usar Popen para streaming en tiempo real
@@ -57,7 +100,12 @@ def run_main_script(logger: logging.Logger) -> None:
             logger.error(f"main.py terminó con código de error: {returncode}")
             raise subprocess.CalledProcessError(returncode, [sys.executable, str(MAIN_PATH)])
         
-        logger.info("main.py terminó correctamente")
+        wall = time.perf_counter() - inicio
+        overhead = _overhead_subproceso(wall)
+        if overhead is not None:
+            logger.info(f"main.py terminó correctamente en {wall:.2f}s (overhead {overhead:.2f}s)")
+        else:
+            logger.info("main.py terminó correctamente")
         
     except subprocess.TimeoutExpired:
         process.kill()
@@ -38,6 +38,35 @@ task_soft_time_limit = 3_300   # segundos
 # Evita que una tarea "robada" quede sin ejecutarse si el worker cae.
 task_acks_late = True
 
+# ──────────────────────────────────────────────
+# Fan-out por app (chord de scrape_app → aggregate_and_notify)
+# ──────────────────────────────────────────────
+# CELERY_FANOUT=1: run_scraper solo reparte — una tarea scrape_app por app, cada
+# una con sus reintentos, y un callback que junta los resultados y notifica una
+# vez. Varios workers se reparten las apps. 0 = una sola tarea con toda la ronda.
+FANOUT = os.getenv("CELERY_FANOUT", "1") != "0"
+
+# Procesos por worker (el flag --concurrency de la línea de comandos tiene prioridad)
+worker_concurrency = int(os.getenv("CELERY_WORKER_CONCURRENCY", "4"))
+# Tareas largas: cada proceso toma de a una, así las apps se reparten parejo
+worker_prefetch_multiplier = 1
+
+# Colas: por defecto todo va a "celery" (la que consume un worker sin -Q).
+# Para separar, p. ej. CELERY_SCRAPE_QUEUE=scrape y un worker con -Q scrape.
+SCRAPE_QUEUE = os.getenv("CELERY_SCRAPE_QUEUE", "celery")
+NOTIFY_QUEUE = os.getenv("CELERY_NOTIFY_QUEUE", "celery")
+task_routes = {
+    "scheduler_celery.tasks.scrape_app": {"queue": SCRAPE_QUEUE},
+    "scheduler_celery.tasks.aggregate_and_notify": {"queue": NOTIFY_QUEUE},
+}
+
+# Reintentos de cada app: espera base * 2^intento (1 → 2 → 4 min)
+SCRAPE_APP_MAX_RETRIES = int(os.getenv("SCRAPE_APP_MAX_RETRIES", "3"))
+SCRAPE_APP_RETRY_BASE_SECONDS = int(os.getenv("SCRAPE_APP_RETRY_BASE_SECONDS", "60"))
+# Límites por app (la ronda completa conserva task_time_limit)
+SCRAPE_APP_TIME_LIMIT = int(os.getenv("SCRAPE_APP_TIME_LIMIT", "1800"))
+SCRAPE_APP_SOFT_TIME_LIMIT = int(os.getenv("SCRAPE_APP_SOFT_TIME_LIMIT", "1700"))
+
 # ──────────────────────────────────────────────
 # Beat schedule — intervalo según entorno
 # ──────────────────────────────────────────────
@@ -68,4 +97,5 @@ beat_schedule = {
 beat_scheduler = "celery.beat.PersistentScheduler"
 beat_schedule_filename = "/tmp/celerybeat-schedule"
 
-print(f"[celery_config] SCHED_ENV={_env!r} → schedule: {_schedule_str}")
+print(f"[celery_config] SCHED_ENV={_env!r} → schedule: {_schedule_str}"
+      f"{' · fan-out por app' if FANOUT else ''}")
@@ -1,27 +1,51 @@
 # scheduler_celery/tasks.py
 """
-Tarea principal de scraping para Celery.
+Tareas de scraping para Celery.
 
-Flujo de resiliencia:
+Fan-out por app (CELERY_FANOUT=1, por defecto):
+  1. run_scraper (worker_ready / Beat) solo reparte: arma un chord con una tarea
+     scrape_app(app_key, fecha) por app y aggregate_and_notify como callback.
+     Las apps de un mismo host van encadenadas (a lo sumo SCRAPER_MAX_PER_HOST
+     cadenas por host), así el límite por host de main.py se respeta aunque
+     las tareas corran en procesos o máquinas distintas.
+  2. Cada scrape_app corre en cualquier worker (cola CELERY_SCRAPE_QUEUE), con
+     el proceso caliente de scraper_worker.py, y reintenta SOLO esa app con
+     exponential backoff (SCRAPE_APP_RETRY_BASE_SECONDS · 2^intento) ante errores
+     transitorios. Agotados los reintentos aplica el manejo de errores de siempre
+     (aviso de error de conexión, etc.) y devuelve el error: nunca rompe el chord.
+  3. aggregate_and_notify junta los ScrapingResult de todas las apps y envía
+     las notificaciones una sola vez: una app caída no re-scrapea ni re-notifica
+     a las sanas. También escribe el reporte de tiempos por etapa
+     (RUN_REPORT_PATH), con las métricas que cada scrape_app le manda.
+
+Ronda completa en una tarea (CELERY_FANOUT=0), flujo de resiliencia:
   1. Al arrancar el worker, se dispara run_scraper() INMEDIATAMENTE via worker_ready.
   2. Celery Beat dispara run_scraper() según el intervalo configurado (7 h / 1 min).
-  3. El worker ejecuta main.py como subproceso con un timeout estricto de 3600 s.
+  3. El worker ejecuta la ronda de main.py dentro del proceso hijo de Celery
+     (scraper_worker.py: imports, create_app e init_db solo en la primera tarea;
+     pools y cachés calientes entre ticks). Con SCHED_INPROCESS=0 la ejecuta como
+     subproceso (como antes) con un timeout estricto de 3600 s.
   4. Si el subproceso falla, la tarea reintenta con exponential backoff:
        - Intento 1: espera 5  minutos  (retry #1)
        - Intento 2: espera 10 minutos  (retry #2)
        - Intento 3: espera 20 minutos  (retry #3)
   5. Tras 3 intentos fallidos, Celery marca la tarea como FAILURE.
 """
+import json
 import os
 import sys
 import subprocess
 import logging
+import time
 from pathlib import Path
 
-from celery import Task
+from celery import Task, chain, chord
 from celery.exceptions import SoftTimeLimitExceeded
 
+import scheduler_celery.celery_config as _cfg
+from app.run_metrics import current_run, reset_run, track_app
 from scheduler_celery.celery_app import app
+from scraper_worker import SCHED_INPROCESS, get_worker, run_tick, tick_overhead
 
 # ──────────────────────────────────────────────
 # Logger
@@ -56,21 +80,38 @@ _RETRY_BASE_MINUTES = int(os.getenv("RETRY_BASE_MINUTES", "5"))
 )
 def run_scraper(self: Task) -> dict:
     """
-    Ejecuta main.py como subproceso y devuelve un dict con el resultado.
+    Con CELERY_FANOUT=1 reparte la ronda en tareas por app (chord) y devuelve
+    enseguida. Si no, ejecuta la ronda de main.py (en proceso o como
+    subproceso) y devuelve un dict con el resultado.
     En caso de fallo reintenta con exponential backoff.
     """
     attempt = self.request.retries + 1
+    modo = "fan-out por app" if _cfg.FANOUT else ("en proceso" if SCHED_INPROCESS else "subproceso")
     logger.info(
         "═══════════════════════════════════════════════════════\n"
         f"  Iniciando run_scraper — intento {attempt}/{self.max_retries + 1}\n"
-        f"  main.py: {_MAIN_PY}\n"
+        f"  main.py: {_MAIN_PY} ({modo})\n"
         "═══════════════════════════════════════════════════════"
     )
 
     try:
+        if _cfg.FANOUT:
+            result = dispatch_round()
+            logger.info(f"✅ run_scraper repartió {len(result['apps'])} apps (chord {result['chord_id']}).")
+            return result
+
+        if SCHED_INPROCESS:
+            result = _run_inprocess()
+            logger.info(
+                f"✅ run_scraper completado exitosamente en intento {attempt} "
+                f"(tick {result['tick']} de este worker, overhead {result['overhead_seconds']:.2f}s)."
+            )
+            return result
+
         result = _run_subprocess()
         logger.info(
-            f"✅ run_scraper completado exitosamente en intento {attempt}.\n"
+            f"✅ run_scraper completado exitosamente en intento {attempt} "
+            f"(overhead {result['overhead_seconds']}s).\n"
             f"   Salida (últimas 10 líneas):\n{result['tail']}"
         )
         return result
@@ -104,15 +145,192 @@ def run_scraper(self: Task) -> dict:
             raise  # Propaga la excepción → tarea queda en estado FAILURE
 
 
+
+# ──────────────────────────────────────────────
+# Fan-out por app
+# ──────────────────────────────────────────────
+def dispatch_round(fecha_str: str = None) -> dict:
+    """
+    Arma el chord de la ronda: scrape_app por app → aggregate_and_notify.
+    La config de apps y los resets se aplican una sola vez, acá.
+    """
+    main, flask_app = get_worker().contexto()
+    apps_config = main.cargar_apps(flask_app)
+    fecha_str, dia = main.resolver_fecha([fecha_str] if fecha_str else [])
+    main.aplicar_resets(dia, fecha_str)
+
+    # Las apps de un mismo host van en cadena (a lo sumo SCRAPER_MAX_PER_HOST
+    # cadenas por host), igual que el semáforo por host de main.ejecutar_ronda
+    carriles = main.carriles_por_host(list(apps_config), main.SCRAPER_MAX_PER_HOST)
+    cabecera = [
+        chain(scrape_app.s([], carril[0], fecha_str), *(scrape_app.s(k, fecha_str) for k in carril[1:]))
+        for carril in carriles
+    ]
+    resultado = chord(cabecera)(aggregate_and_notify.s(fecha_str, time.time()))
+    return {"mode": "fanout", "fecha": fecha_str, "apps": list(apps_config),
+            "lanes": len(carriles), "chord_id": resultado.id}
+
+
+@app.task(
+    bind=True,
+    name="scheduler_celery.tasks.scrape_app",
+    max_retries=_cfg.SCRAPE_APP_MAX_RETRIES,
+    acks_late=True,
+    reject_on_worker_lost=True,
+    time_limit=_cfg.SCRAPE_APP_TIME_LIMIT,
+    soft_time_limit=_cfg.SCRAPE_APP_SOFT_TIME_LIMIT,
+)
+def scrape_app(self: Task, anteriores: list, app_key: str, fecha_str: str) -> list:
+    """
+    Scraping de una app. Nunca falla (salvo para reintentar): la cadena de su
+    host sigue y el chord siempre llega al callback.
+
+    anteriores son las salidas de las apps previas de la misma cadena ([] en
+    la primera); se devuelven con la de esta app agregada al final.
+
+    Returns:
+        anteriores + [{"app_key", "status": "ok" | "skipped" | "error",
+        "result": to_dict() o None, "error": dict o None, "attempts", "seconds",
+        "metrics": etapas y contadores de run_metrics}]
+    """
+    main, flask_app = get_worker().contexto()
+    fecha_str, dia = main.resolver_fecha([fecha_str])
+    attempt = self.request.retries + 1
+    inicio = time.perf_counter()
+
+    resultado, error_info = None, None
+    try:
+        with track_app(app_key):
+            resultado = main.procesar_app(app_key, fecha_str, dia, flask_app)
+    except SoftTimeLimitExceeded as exc:
+        logger.error(f"⏰ scrape_app({app_key}) superó el límite de tiempo suave.")
+        error_info = _error_de_app(app_key, main.cargar_apps(flask_app), exc)
+    except Exception as exc:
+        if not main.es_error_definitivo(exc) and self.request.retries < self.max_retries:
+            wait_seconds = _cfg.SCRAPE_APP_RETRY_BASE_SECONDS * (2 ** self.request.retries)
+            logger.warning(
+                f"⚠️  scrape_app({app_key}) falló en intento {attempt}: {type(exc).__name__}: {exc}\n"
+                f"   Reintentando solo esta app en {wait_seconds}s "
+                f"(retry #{self.request.retries + 1}/{self.max_retries})…"
+            )
+            raise self.retry(exc=exc, countdown=wait_seconds)
+        # Definitivo o reintentos agotados: manejo de errores de siempre (notifica lo que corresponda)
+        apps_config = main.cargar_apps(flask_app)
+        try:
+            _, error_info = main.manejar_error_app(exc, app_key, apps_config, fecha_str)
+        except Exception as inesperado:
+            error_info = _error_de_app(app_key, apps_config, inesperado)
+
+    if resultado is not None:
+        estado = "ok"
+    else:
+        estado = "error" if error_info else "skipped"
+    segundos = time.perf_counter() - inicio
+    # Las métricas de la app viajan al callback; el proceso no las acumula entre rondas
+    run = current_run()
+    run.finish_app(app_key, segundos, estado)
+    return list(anteriores) + [{
+        "app_key": app_key,
+        "status": estado,
+        "result": _serializar(resultado) if resultado is not None else None,
+        "error": error_info,
+        "attempts": attempt,
+        "seconds": round(segundos, 4),
+        "metrics": run.pop_app(app_key),
+    }]
+
+
+@app.task(
+    name="scheduler_celery.tasks.aggregate_and_notify",
+    acks_late=True,
+    reject_on_worker_lost=True,
+)
+def aggregate_and_notify(carriles: list, fecha_str: str, repartido_en: float = None) -> dict:
+    """
+    Callback del chord: rearma los ScrapingResult de cada app, envía las
+    notificaciones de la ronda (todas las apps y canales, una sola vez) y
+    escribe el reporte de tiempos (RUN_REPORT_PATH) con las etapas de todas las apps.
+
+    carriles: la salida de cada cadena (una lista de salidas de scrape_app).
+    """
+    from app.result import ScrapingResult
+
+    main, _ = get_worker().contexto()
+    resultados = [r for carril in carriles for r in carril]
+    ok = [ScrapingResult.from_dict(r["result"]) for r in resultados if r["status"] == "ok"]
+    errores = [r["error"] for r in resultados if r["error"]]
+    # Tiempo real de la ronda (colas incluidas); sin dato, el de la app más lenta
+    if repartido_en is not None:
+        tiempo_ronda = max(0.0, time.time() - repartido_en)
+    else:
+        tiempo_ronda = max((r["seconds"] for r in resultados), default=0.0)
+
+    run = reset_run()
+    for r in resultados:
+        if r.get("metrics"):
+            run.load_app(r["app_key"], r["metrics"])
+
+    inicio = time.perf_counter()
+    latencias = main.notificar_apps(ok)
+    tiempo_notif = time.perf_counter() - inicio
+
+    print(f"\n{'='*70}")
+    print(f"✅ Ronda {fecha_str}: {len(ok)}/{len(resultados)} apps procesadas")
+    for r in sorted(resultados, key=lambda r: r["seconds"], reverse=True):
+        reintentos = f", {r['attempts']} intentos" if r["attempts"] > 1 else ""
+        print(f"   • {r['app_key']}: {r['status']} en {r['seconds']:.2f}s{reintentos}")
+    if errores:
+        print(f"\n⚠️ Aplicaciones con errores: {len(errores)}")
+        for error in errores:
+            print(f"   • {error['app_name']}: {error['error_type']}")
+    main.imprimir_latencias(latencias, tiempo_notif)
+    main.escribir_reporte(fecha_str, tiempo_ronda, tiempo_notif, latencias)
+    print(f"{'='*70}\n")
+
+    return {
+        "fecha": fecha_str,
+        "apps": len(resultados),
+        "ok": [r.app_key for r in ok],
+        "errors": errores,
+        "retried": {r["app_key"]: r["attempts"] for r in resultados if r["attempts"] > 1},
+        "scrape_seconds": round(tiempo_ronda, 4),
+        "notify_seconds": round(tiempo_notif, 4),
+    }
+
+
+def _serializar(resultado) -> dict:
+    """ScrapingResult → dict apto para JSON (dia como "YYYY-MM-DD")."""
+    data = resultado.to_dict()
+    data["dia"] = resultado.dia.isoformat()
+    return data
+
+
+def _error_de_app(app_key: str, apps_config: dict, exc: BaseException) -> dict:
+    return {
+        "app_key": app_key,
+        "app_name": apps_config.get(app_key, {}).get("name", app_key),
+        "error_type": type(exc).__name__,
+        "error_msg": str(exc),
+    }
+
 # ──────────────────────────────────────────────
-# Helper interno
+# Helpers internos
 # ──────────────────────────────────────────────
+def _run_inprocess() -> dict:
+    """
+    Corre la ronda de main.py en este proceso hijo. Los errores de cada app
+    quedan en result["errors"]; solo un fallo del tick entero lanza excepción.
+    """
+    return run_tick()
+
+
 def _run_subprocess() -> dict:
     """
     Lanza main.py como subproceso capturando stdout/stderr combinados.
     Lanza excepción si el proceso termina con código ≠ 0 o excede el timeout.
     """
     logger.info(f"Lanzando: {sys.executable} -u {_MAIN_PY}")
+    inicio = time.perf_counter()
 
     process = subprocess.Popen(
         [sys.executable, "-u", str(_MAIN_PY)],
@@ -154,9 +372,22 @@ def _run_subprocess() -> dict:
         "returncode": returncode,
         "lines_captured": len(lines),
         "tail": tail,
+        "overhead_seconds": _overhead_subproceso(time.perf_counter() - inicio),
     }
 
 
+def _overhead_subproceso(wall_seconds: float):
+    """Overhead del subproceso (intérprete + imports + setup), según su reporte de tiempos."""
+    ruta = os.getenv("RUN_REPORT_PATH", "salida_logs/run_report.json")
+    if not ruta:
+        return None
+    try:
+        with open(_BASE_DIR / ruta, encoding="utf-8") as f:
+            return tick_overhead(wall_seconds, json.load(f))
+    except (OSError, ValueError):
+        return None
+
+
 # ──────────────────────────────────────────────
 # Ejecución inmediata al arrancar el worker
 # ──────────────────────────────────────────────
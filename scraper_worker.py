@@ -0,0 +1,105 @@
+# scraper_worker.py
+"""
+Worker de scraping de larga vida (scheduler/ y scheduler_celery/).
+
+Lanzar main.py como subproceso en cada tick paga siempre lo mismo: un
+intérprete nuevo, importar bs4, requests, Flask, SQLAlchemy y los SDKs de
+Google/Slack/Twilio, create_app() (db.create_all()) e init_db(), y arrancar
+con el pool de Postgres, las sesiones y las cachés (firmas, índice de logs)
+en frío. ScraperWorker hace la preparación una sola vez por proceso y en cada
+tick llama a main.ejecutar_ronda(): lo único que se repite es releer la
+config de apps (para ver las apps nuevas) y los resets por variable de entorno.
+
+Aislamiento: cada app sigue corriendo con su propio manejo de errores
+(procesar_app_seguro) y una excepción inesperada de una app queda como error
+de esa app, sin cortar la ronda ni el worker. Si falla el tick entero (por
+ejemplo, la BD caída antes de empezar), se propaga al scheduler y el próximo
+tick reintenta la preparación.
+
+Cada tick informa setup_seconds (desde que empieza el tick hasta que arranca
+el scraping) y overhead_seconds (todo lo que no es scraping ni notificación);
+con SCHED_INPROCESS=0 el scheduler mide lo mismo para el subproceso.
+
+Variables de entorno:
+  SCHED_INPROCESS=1   0 = lanzar main.py como subproceso en cada tick (como antes)
+"""
+import os
+import threading
+import time
+from datetime import date
+from typing import Optional
+
+SCHED_INPROCESS = os.getenv("SCHED_INPROCESS", "1") != "0"
+
+
+def tick_overhead(wall_seconds: float, resumen: dict) -> float:
+    """Tiempo del tick que no fue scraping ni notificación."""
+    util = (resumen.get("scrape_seconds") or 0.0) + (resumen.get("notify_seconds") or 0.0)
+    return round(max(0.0, wall_seconds - util), 4)
+
+
+class ScraperWorker:
+    """
+    Corre la ronda de main.py dentro del proceso, una vez por tick, reutilizando
+    la app Flask, el pool de Postgres y las cachés entre ticks.
+    """
+
+    def __init__(self):
+        self.flask_app = None
+        self.ticks = 0
+        self._preparado = False
+        self._lock = threading.RLock()
+
+    def contexto(self):
+        """
+        (módulo main, app Flask) listos para usar: imports, create_app e
+        init_db solo la primera vez (también lo usan las tareas por app de Celery).
+        """
+        with self._lock:
+            import main  # la primera vez paga los imports; después ya están
+
+            if not self._preparado:
+                self.flask_app = main.crear_contexto()
+                main.init_db()
+                self._preparado = True
+            return main, self.flask_app
+
+    def tick(self, fecha_str: Optional[str] = None) -> dict:
+        """
+        Una corrida de main.py (fecha_str: "YYYY-MM-DD"; por defecto hoy).
+
+        Returns:
+            el resumen de main.ejecutar_ronda() + tick y overhead_seconds
+        """
+        # Dos ticks no se pisan (p. ej. el disparo inicial y el primero del intervalo)
+        with self._lock:
+            inicio = time.perf_counter()
+            main, _ = self.contexto()
+            apps_config = main.cargar_apps(self.flask_app)
+            fecha_str, dia = main.resolver_fecha([fecha_str] if fecha_str else [])
+            main.aplicar_resets(dia, fecha_str)
+
+            resumen = main.ejecutar_ronda(fecha_str, dia, self.flask_app, apps_config,
+                                          setup_seconds=time.perf_counter() - inicio)
+            self.ticks += 1
+            resumen["tick"] = self.ticks
+            resumen["overhead_seconds"] = tick_overhead(time.perf_counter() - inicio, resumen)
+            return resumen
+
+
+_WORKER: Optional[ScraperWorker] = None
+_WORKER_PID: Optional[int] = None
+
+
+def get_worker() -> ScraperWorker:
+    """Worker del proceso actual (cada proceso hijo de Celery arma el suyo)."""
+    global _WORKER, _WORKER_PID
+    if _WORKER is None or _WORKER_PID != os.getpid():
+        _WORKER = ScraperWorker()
+        _WORKER_PID = os.getpid()
+    return _WORKER
+
+
+def run_tick(fecha_str: Optional[str] = None) -> dict:
+    """get_worker().tick(): lo que llaman los schedulers."""
+    return get_worker().tick(fecha_str)
@@ -3,6 +3,7 @@ import logging
 from typing import Dict, Any, List, Optional
 from datetime import date
 
+from app.rate_limit import throttle
 from .slack_client import SlackClient
 from app.config import get_app_urls
 
@@ -313,7 +314,8 @@ def enviar_slack_errores_no_controlados(resultado: Dict[str, Any]) -> bool:
         # Crear bloques enriquecidos
         bloques = formatter.crear_bloques_enriquecidos(resultado)
         
-        # Enviar notificación
+        # Enviar notificación (respetando el rate limit del webhook)
+        throttle("slack")
         exito = cliente.enviar_mensaje(
             texto=mensaje_texto,
             bloques=bloques
@@ -357,6 +359,7 @@ def enviar_aviso_slack(mensaje: str) -> bool:
         if not cliente.enabled:
             return False
             
+        throttle("slack")
         exito = cliente.enviar_mensaje(mensaje)
         
         if exito:
@@ -22,6 +22,7 @@ class SMSChannel(NotificationChannel):
     """
 
     ENABLED: bool = False
+    MAX_CONCURRENCY: int = 1
 
     def send_report(self, result: "ScrapingResult") -> bool:
         if not self.ENABLED:
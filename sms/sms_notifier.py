@@ -1,9 +1,9 @@
 # sms/sms_notifier.py
 import logging
-import time
 from typing import Dict, Any
 from datetime import date
 
+from app.rate_limit import throttle
 from .twilio_client import TwilioSMSClient
 
 logger = logging.getLogger(__name__)
@@ -140,6 +140,10 @@ def enviar_sms_errores_no_controlados(resultado: Dict[str, Any]) -> bool:
         # Generar mensaje
         mensaje = _generar_mensaje_sms(resultado)
         
+        # Rate limit de Twilio Trial (1 SMS/segundo): token bucket compartido,
+        # por defecto 1 SMS cada 3 segundos para dar margen y evitar errores 404
+        throttle("sms")
+        
         # Enviar SMS
         exito = cliente.enviar_sms(mensaje)
         
@@ -148,9 +152,6 @@ def enviar_sms_errores_no_controlados(resultado: Dict[str, Any]) -> bool:
                 f"✅ SMS enviado para {app_name}: "
                 f"{sql_count} errores SQL detectados"
             )
-            # Delay para cumplir con rate limit de Twilio Trial (1 SMS/segundo)
-            # Usamos 3 segundos para dar margen y evitar errores 404
-            time.sleep(3)
         else:
             logger.warning(
                 f"⚠️ No se pudo enviar SMS para {app_name}"
@@ -179,11 +180,11 @@ def enviar_aviso_sms(mensaje: str) -> bool:
     """
     try:
         cliente = _obtener_cliente_twilio()
+        throttle("sms")
         exito = cliente.enviar_sms(mensaje)
         
         if exito:
             logger.info("✅ Aviso SMS enviado")
-            time.sleep(1) # Pequeña pausa por cortesía/rate limit
         else:
             logger.warning("⚠️ No se pudo enviar aviso SMS")
             
@@ -5,13 +5,17 @@ import logging
 import pytz
 import os
 import select
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from OpenSSL import SSL
 from cryptography import x509
+from cryptography.hazmat.primitives import hashes
 from cryptography.x509.oid import NameOID
 from collections import namedtuple
 
 from app.config import APPS_CONFIG
+from app.run_metrics import stage
 from mailer.client import send_email, default_recipients
 
 # Setup Logging
@@ -19,6 +23,33 @@ logger = logging.getLogger(__name__)
 
 HostInfo = namedtuple(field_names='cert hostname peername', typename='HostInfo')
 
+# Barrido concurrente (check_domains / run): hilos y tope de tiempo de todo el barrido
+SSL_CHECK_WORKERS = int(os.getenv('SSL_CHECK_WORKERS', 16))
+SSL_CHECK_DEADLINE = float(os.getenv('SSL_CHECK_DEADLINE', 30))
+
+
+class _ConnectTimeout(TimeoutError):
+    """El TCP connect no respondió: no tiene sentido reintentar con OpenSSL."""
+
+
+def severity_for(days_left):
+    """(status, color) para los días que le quedan a un certificado."""
+    if days_left <= 3:
+        return "CRITICAL", "red"
+    if days_left < 8:
+        return "WARNING", "#FFBF00"  # Mustard/Amber
+    return "OK", "green"
+
+
+def _restante(deadline, tope):
+    """Timeout de una operación: tope, recortado a lo que queda hasta deadline (monotonic)."""
+    if deadline is None:
+        return tope
+    restante = deadline - time.monotonic()
+    if restante <= 0:
+        raise TimeoutError("SSL check deadline exceeded")
+    return min(tope, restante)
+
 class SSLChecker:
     def __init__(self):
         self.port = 443
@@ -41,14 +72,19 @@ class SSLChecker:
         # Remove duplicates if any
         return list(set(domains))
 
-    def get_certificate(self, hostname):
+    def get_certificate(self, hostname, port=None, deadline=None):
         """
         Safely retrieves SSL certificate for a hostname.
         Returns None on any error to prevent worker crashes.
         Tries standard library ssl first (more reliable), falls back to OpenSSL if needed.
+
+        deadline (time.monotonic()) recorta todos los timeouts: el chequeo
+        termina a más tardar ahí. Si ni DNS ni TCP responden no se reintenta
+        con OpenSSL (solo sirve para handshakes que la stdlib no negocia).
         """
         sock = None
         sock_ssl = None
+        port = port or self.port
         try:
             # Validate hostname
             if not hostname or not isinstance(hostname, str):
@@ -57,7 +93,9 @@ class SSLChecker:
             
             # Try using Python's standard ssl library first (more reliable)
             try:
-                return self._get_certificate_stdlib(hostname)
+                return self._get_certificate_stdlib(hostname, port, deadline)
+            except (socket.gaierror, socket.herror, ConnectionRefusedError, _ConnectTimeout):
+                raise
             except Exception as stdlib_error:
                 logger.debug(f"Standard library SSL failed for {hostname}, trying OpenSSL: {stdlib_error}")
                 # Fall back to OpenSSL method
@@ -66,15 +104,15 @@ class SSLChecker:
             hostname_idna = idna.encode(hostname)
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             # Use shorter timeout for initial connection (5 seconds)
-            sock.settimeout(5)
+            sock.settimeout(_restante(deadline, 5))
             # Set socket options for better reliability
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
 
-            sock.connect((hostname, self.port))
+            sock.connect((hostname, port))
             peername = sock.getpeername()
             
             # Set longer timeout for SSL operations (10 seconds)
-            sock.settimeout(10)
+            sock.settimeout(_restante(deadline, 10))
             
             ctx = SSL.Context(SSL.TLS_CLIENT_METHOD)
             ctx.check_hostname = False
@@ -185,7 +223,7 @@ class SSLChecker:
             # Always return None instead of raising - this prevents worker crashes
             return None
     
-    def _get_certificate_stdlib(self, hostname):
+    def _get_certificate_stdlib(self, hostname, port=None, deadline=None):
         """
         Alternative method using Python's standard ssl library.
         More reliable for network issues.
@@ -193,8 +231,12 @@ class SSLChecker:
         sock = None
         try:
             # Create socket with timeout
-            sock = socket.create_connection((hostname, self.port), timeout=8)
+            try:
+                sock = socket.create_connection((hostname, port or self.port), timeout=_restante(deadline, 8))
+            except socket.timeout as e:
+                raise _ConnectTimeout(f"TCP connect timeout: {e}") from e
             peername = sock.getpeername()
+            sock.settimeout(_restante(deadline, 8))
             
             # Wrap with SSL context
             context = ssl_lib.create_default_context()
@@ -312,14 +354,15 @@ class SSLChecker:
         except Exception as e:
             return "Unknown Issuer"
 
-    def check_domain(self, hostname):
+    def check_domain(self, hostname, port=None, deadline=None):
         """
         Checks SSL status for a domain and returns a dictionary with the results.
         Does NOT send alerts.
         """
         logger.info(f"Checking SSL for {hostname}...")
         try:
-            hostinfo = self.get_certificate(hostname)
+            with stage("ssl_check"):
+                hostinfo = self.get_certificate(hostname, port, deadline)
         except Exception as e:
             logger.error(f"Unexpected error in check_domain for {hostname}: {type(e).__name__}: {e}")
             return {
@@ -354,15 +397,7 @@ class SSLChecker:
 
             logger.info(f"{hostname} - Days Left: {days_left}, Expires: {not_after_str}")
 
-            if days_left <= 3:
-                severity = "CRITICAL"
-                color = "red"
-            elif days_left < 8:
-                severity = "WARNING"
-                color = "#FFBF00" # Mustard/Amber
-            else:
-                severity = "OK"
-                color = "green"
+            severity, color = severity_for(days_left)
             
             return {
                 "hostname": hostname,
@@ -370,7 +405,10 @@ class SSLChecker:
                 "days_left": days_left,
                 "expires": not_after_str,
                 "issuer": issuer,
-                "color": color
+                "color": color,
+                # Para guardar el snapshot (certificates/snapshots.py)
+                "not_after": notafter_dt.isoformat(),
+                "fingerprint_sha256": hostinfo.cert.fingerprint(hashes.SHA256()).hex(),
             }
 
         except Exception as e:
@@ -385,13 +423,68 @@ class SSLChecker:
                 "color": "red"
             }
 
+    def check_domains(self, domains, workers=None, deadline_seconds=None):
+        """
+        Checks many domains concurrently (bounded thread pool) under one global deadline.
+
+        domains: hostnames or (hostname, port) tuples.
+        Returns the check_domain() dicts in the same order, each with
+        "elapsed_ms" (time spent on that host). Hosts still pending when the
+        deadline expires come back as ERROR ("Deadline exceeded").
+        """
+        objetivos = [d if isinstance(d, tuple) else (d, None) for d in domains]
+        if not objetivos:
+            return []
+        workers = SSL_CHECK_WORKERS if workers is None else workers
+        deadline_seconds = SSL_CHECK_DEADLINE if deadline_seconds is None else deadline_seconds
+        inicio = time.monotonic()
+        deadline = inicio + deadline_seconds
+
+        def _chequear(hostname, port):
+            t0 = time.monotonic()
+            result = self.check_domain(hostname, port, deadline)
+            result["elapsed_ms"] = round((time.monotonic() - t0) * 1000, 1)
+            return result
+
+        pool = ThreadPoolExecutor(max_workers=max(1, min(workers, len(objetivos))),
+                                  thread_name_prefix="ssl-check")
+        try:
+            futuros = [pool.submit(_chequear, hostname, port) for hostname, port in objetivos]
+            wait(futuros, timeout=max(0.0, deadline - time.monotonic()) + 1.0)
+        finally:
+            # Los hilos que siguen vivos terminan solos: sus timeouts ya están recortados al deadline
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        results = []
+        for (hostname, port), futuro in zip(objetivos, futuros):
+            if futuro.done() and not futuro.cancelled() and futuro.exception() is None:
+                results.append(futuro.result())
+                continue
+            error = futuro.exception() if futuro.done() and not futuro.cancelled() else None
+            results.append({
+                "hostname": hostname,
+                "status": "ERROR",
+                "days_left": 0,
+                "expires": "Unknown",
+                "issuer": "Unknown",
+                "color": "gray",
+                "error": str(error) if error else f"Deadline exceeded ({deadline_seconds:g}s)",
+                "elapsed_ms": round((time.monotonic() - inicio) * 1000, 1),
+            })
+        lentos = sorted(results, key=lambda r: r["elapsed_ms"], reverse=True)[:3]
+        detalle = ", ".join(f"{r['hostname']} {r['elapsed_ms']:.0f}ms" for r in lentos)
+        logger.info(f"SSL sweep: {len(results)} domains in {time.monotonic() - inicio:.2f}s (slowest: {detalle})")
+        return results
+
     def process_domain(self, hostname):
         """
         Original method (kept for backward compatibility).
         Checks domain and sends alerts if needed.
         """
-        result = self.check_domain(hostname)
-        
+        self._alert_if_needed(self.check_domain(hostname))
+
+    def _alert_if_needed(self, result):
+        hostname = result["hostname"]
         # If there was a connection error (status ERROR without valid data), skip alerting or handle differently
         if result["status"] == "ERROR" and result["expires"] == "Unknown":
             return
@@ -440,11 +533,12 @@ class SSLChecker:
         except Exception as e:
             logger.error(f"Failed to send alert for {hostname}: {e}")
 
-    def run(self):
-        domains = self.get_domains()
+    def run(self, domains=None):
+        """Checks every domain concurrently and sends the alerts (domains: default get_domains())."""
+        domains = self.get_domains() if domains is None else domains
         logger.info(f"Starting SSL check for {len(domains)} domains.")
         try:
-            for domain in domains:
-                self.process_domain(domain)
+            for result in self.check_domains(domains):
+                self._alert_if_needed(result)
         except Exception as e:
             logger.error(f"Critical error in run loop: {e}")
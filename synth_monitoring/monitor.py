@@ -1,82 +1,233 @@
+"""
+Monitoreo sintético: login + acceso a la página de logs de cada app.
+
+Las apps se chequean a la vez (un hilo por app, hasta SYNTH_WORKERS) y cada
+chequeo se desglosa por fase, en ms:
+
+  dns         resolución del host de login
+  connect     TCP connect
+  tls         handshake TLS (solo https)
+  login       POST de login (siempre un login real: no usa la caché de sesiones)
+  logs_ttfb   hasta el primer byte de la página de logs
+  total       el chequeo completo
+
+Cada ronda queda en la tabla synthetic_checks (db/synthetic_checks.py). La
+degradación se mide contra el historial de la propia app (últimos
+SYNTH_HISTORY_DAYS días): por encima de su p95 se avisa en el log, por encima
+de su p99 se manda alerta a Slack con la fase que más se alejó de su p50.
+Mientras una app no junte SYNTH_MIN_SAMPLES chequeos se usa el umbral fijo
+SYNTH_SLOW_SECONDS.
+
+Variables de entorno:
+  SYNTH_WORKERS=8                 apps chequeadas a la vez
+  SYNTH_HISTORY_DAYS=7            historial usado para los percentiles
+  SYNTH_MIN_SAMPLES=20            chequeos necesarios para usar percentiles
+  SYNTH_MIN_DEGRADATION_MS=1000   exceso mínimo sobre el p50 para alertar (evita ruido)
+  SYNTH_SLOW_SECONDS=10           umbral fijo mientras no hay historial
+"""
 import logging
+import os
+import socket
+import ssl
 import time
-import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
+from urllib.parse import urlparse
 
-from app.config import APPS_CONFIG, get_app_credentials, get_app_urls
-from app.session_manager import create_logged_session
+from app.config import APPS_CONFIG, get_app_urls
+from app.session_manager import AppSession
 from slack_comunication import enviar_aviso_slack
 from sms import enviar_aviso_sms
 
 logger = logging.getLogger(__name__)
 
+SYNTH_WORKERS = int(os.getenv("SYNTH_WORKERS", "8"))
+SYNTH_HISTORY_DAYS = int(os.getenv("SYNTH_HISTORY_DAYS", "7"))
+SYNTH_MIN_SAMPLES = int(os.getenv("SYNTH_MIN_SAMPLES", "20"))
+SYNTH_MIN_DEGRADATION_MS = float(os.getenv("SYNTH_MIN_DEGRADATION_MS", "1000"))
+SYNTH_SLOW_SECONDS = float(os.getenv("SYNTH_SLOW_SECONDS", "10"))
+
+_NET_TIMEOUT = 10
+
+
+def _ms(desde: float) -> float:
+    return round((time.perf_counter() - desde) * 1000, 1)
+
+
+def _medir_red(url: str, phases: Dict[str, float]) -> None:
+    """DNS, TCP connect y handshake TLS contra el host de `url` (anota en phases)."""
+    parsed = urlparse(url)
+    https = parsed.scheme == "https"
+    port = parsed.port or (443 if https else 80)
+
+    t0 = time.perf_counter()
+    family, socktype, proto, _, sockaddr = socket.getaddrinfo(parsed.hostname, port, type=socket.SOCK_STREAM)[0]
+    phases["dns"] = _ms(t0)
+
+    sock = socket.socket(family, socktype, proto)
+    try:
+        sock.settimeout(_NET_TIMEOUT)
+        t0 = time.perf_counter()
+        sock.connect(sockaddr)
+        phases["connect"] = _ms(t0)
+        if https:
+            t0 = time.perf_counter()
+            ssl.create_default_context().wrap_socket(sock, server_hostname=parsed.hostname).close()
+            phases["tls"] = _ms(t0)
+    finally:
+        sock.close()
+
+
+class _SesionSonda(AppSession):
+    """
+    AppSession para el monitoreo: siempre hace login (no restaura ni guarda
+    la caché de sesiones) y anota cada respuesta para medir el POST de login.
+    """
+
+    def __init__(self, app_key: str, max_retries: int = 2):
+        super().__init__(app_key, max_retries=max_retries)
+        self.respuestas = []
+
+    def _open_session(self):
+        return self._authenticate()
+
+    def _save_to_cache(self, session) -> None:
+        pass
+
+    def _make_session(self):
+        session = super()._make_session()
+        session.hooks["response"].append(lambda resp, *args, **kwargs: self.respuestas.append(resp))
+        return session
+
+    def login_ms(self) -> Optional[float]:
+        """Tiempo del último POST de login (HTTP Basic: del GET que autentica)."""
+        posts = [r for r in self.respuestas if r.request.method == "POST"]
+        ultima = posts[-1] if posts else (self.respuestas[-1] if self.respuestas else None)
+        return round(ultima.elapsed.total_seconds() * 1000, 1) if ultima is not None else None
+
+
+def detect_degradation(result: Dict[str, Any], baseline: Optional[dict]) -> Optional[Dict[str, Any]]:
+    """
+    Compara un chequeo exitoso con el historial de su app.
+
+    Returns:
+        None si está dentro de lo normal; si no, {"level": "p99" | "p95" | "fixed",
+        "total_ms", "threshold_ms", "phase", "phase_ms", "phase_p50_ms"}
+    """
+    phases = result.get("phases_ms", {})
+    total = phases.get("total")
+    if not result.get("success") or total is None:
+        return None
+
+    baseline = baseline or {}
+    if baseline.get("samples", 0) < SYNTH_MIN_SAMPLES or "total" not in baseline:
+        umbral = SYNTH_SLOW_SECONDS * 1000
+        if total <= umbral:
+            return None
+        return {"level": "fixed", "total_ms": total, "threshold_ms": umbral,
+                "phase": None, "phase_ms": None, "phase_p50_ms": None}
+
+    pcts = baseline["total"]
+    if total - pcts["p50"] < SYNTH_MIN_DEGRADATION_MS:
+        return None
+    if total > pcts["p99"]:
+        level, umbral = "p99", pcts["p99"]
+    elif total > pcts["p95"]:
+        level, umbral = "p95", pcts["p95"]
+    else:
+        return None
+
+    # Fase que más se alejó de su mediana
+    excesos = {
+        fase: ms - baseline[fase]["p50"]
+        for fase, ms in phases.items()
+        if fase != "total" and ms is not None and fase in baseline
+    }
+    fase = max(excesos, key=excesos.get) if excesos else None
+    return {
+        "level": level,
+        "total_ms": total,
+        "threshold_ms": round(umbral, 1),
+        "phase": fase,
+        "phase_ms": phases.get(fase) if fase else None,
+        "phase_p50_ms": round(baseline[fase]["p50"], 1) if fase else None,
+    }
+
+
 class SyntheticMonitor:
     """
     Realiza monitoreo sintético (health checks, performance, E2E) de las aplicaciones.
     """
 
-    def __init__(self):
+    def __init__(self, workers: Optional[int] = None):
         self.results = {}
+        self.workers = workers or SYNTH_WORKERS
 
     def check_app(self, app_key: str) -> Dict[str, Any]:
         """
         Ejecuta un chequeo completo para una app específica.
-        
+
         Mide:
         - Disponibilidad (Login exitoso)
-        - Performance (Tiempo de login)
+        - Performance (tiempo de cada fase, ver phases_ms)
         - E2E (Acceso a página interna)
         """
-        start_time = time.time()
+        start = time.perf_counter()
+        phases: Dict[str, float] = {}
         result = {
             "app_key": app_key,
             "success": False,
             "duration_seconds": 0.0,
             "error": None,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "checked_at": datetime.now(),
+            "phases_ms": phases,
         }
-        
+
         app_name = APPS_CONFIG.get(app_key, {}).get("name", app_key)
-        
+
         try:
             logger.info(f"🩺 Iniciando monitoreo sintético para {app_name}...")
-            
-            # 1. Disponibilidad & Performance (Login)
-            # Reusamos create_logged_session que ya hace requests con retry y valida el login
-            session = create_logged_session(app_key, max_retries=2)
-            
-            # 2. E2E (Verificar acceso a una página interna post-login)
-            # Usamos la URL de logs que sabemos que debería existir (aunque esté vacía)
-            _, _, logs_url = get_app_urls(app_key)
-            resp = session.get(logs_url, timeout=10)
-            
+            _, login_url, logs_url = get_app_urls(app_key)
+
+            # 1. Red: DNS / connect / TLS del host de login
+            _medir_red(login_url, phases)
+
+            # 2. Disponibilidad & Performance (Login real, sin caché de sesiones)
+            sonda = _SesionSonda(app_key, max_retries=2)
+            with sonda as session:
+                phases["login"] = sonda.login_ms()
+
+                # 3. E2E (Verificar acceso a una página interna post-login)
+                # Usamos la URL de logs que sabemos que debería existir (aunque esté vacía);
+                # stream=True: basta con los headers, no se baja el log entero
+                resp = session.get(logs_url, timeout=10, stream=True)
+                phases["logs_ttfb"] = round(resp.elapsed.total_seconds() * 1000, 1)
+                resp.close()
+
             if resp.status_code != 200:
                 raise ValueError(f"E2E check failed: {logs_url} returned {resp.status_code}")
-                
-            duration = time.time() - start_time
+
+            phases["total"] = _ms(start)
             result["success"] = True
-            result["duration_seconds"] = round(duration, 2)
-            
-            logger.info(f"✅ {app_name} OK - Tiempo: {result['duration_seconds']}s")
-            
-            # Alerta de degradación de performance (ej: si tarda más de 10s)
-            if duration > 10.0:
-                msg = f"⚠️ Performance Warning: {app_name} login took {duration:.2f}s"
-                logger.warning(msg)
-                # Opcional: enviar aviso slack si es muy lento
-                
+            result["duration_seconds"] = round(phases["total"] / 1000, 2)
+
+            logger.info(f"✅ {app_name} OK - Tiempo: {result['duration_seconds']}s {phases}")
+
         except Exception as e:
-            duration = time.time() - start_time
+            phases["total"] = _ms(start)
+            duration = phases["total"] / 1000
             error_msg = str(e)
             result["success"] = False
             result["duration_seconds"] = round(duration, 2)
             result["error"] = error_msg
-            
+
             logger.error(f"❌ {app_name} DOWN - Error: {error_msg}")
-            
+
             # Notificar caída inmediatamente
             self._notify_failure(app_name, error_msg, duration)
-            
+
         return result
 
     def _notify_failure(self, app_name: str, error: str, duration: float):
@@ -87,18 +238,65 @@ class SyntheticMonitor:
             f"⏱️ Duration before fail: {duration:.2f}s\n"
             f"⚠️ Check service status immediately."
         )
-        
+
         # Slack
         enviar_aviso_slack(msg_text)
-        
+
         # SMS (Más breve)
         sms_text = f"🚨 ALERT: {app_name} DOWN. Error: {error[:30]}..."
         enviar_aviso_sms(sms_text)
 
+    def _notify_degradation(self, app_name: str, deg: Dict[str, Any]):
+        """Log (p95 / umbral fijo) o alerta por Slack (p99) de un chequeo lento."""
+        total = deg["total_ms"] / 1000
+        umbral = deg["threshold_ms"] / 1000
+        if deg["level"] == "fixed":
+            logger.warning(f"⚠️ Performance Warning: {app_name} took {total:.2f}s (> {umbral:.0f}s)")
+            return
+
+        detalle = ""
+        if deg["phase"]:
+            detalle = f" — fase más lenta: {deg['phase']} {deg['phase_ms']:.0f} ms (p50 {deg['phase_p50_ms']:.0f} ms)"
+        msg = f"⚠️ Performance Warning: {app_name} took {total:.2f}s (> {deg['level']} {umbral:.2f}s){detalle}"
+        logger.warning(msg)
+        if deg["level"] == "p99":
+            enviar_aviso_slack(f"🐢 *{app_name} degradado*\n{msg}")
+
+    def _load_baselines(self, app_keys) -> Dict[str, dict]:
+        try:
+            from db.synthetic_checks import latency_baselines
+
+            return latency_baselines(app_keys, datetime.now() - timedelta(days=SYNTH_HISTORY_DAYS))
+        except Exception as e:
+            logger.warning(f"⚠️ Historial de latencias no disponible (se usa el umbral fijo): {e}")
+            return {}
+
+    def _save(self, results) -> None:
+        try:
+            from db.synthetic_checks import save_synthetic_checks
+
+            save_synthetic_checks(results)
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron guardar los chequeos sintéticos: {e}")
+
     def run_all_checks(self) -> Dict[str, Dict[str, Any]]:
-        """Ejecuta chequeos para todas las apps configuradas."""
+        """Ejecuta chequeos para todas las apps configuradas (en paralelo)."""
         logger.info("🚀 Iniciando ronda de monitoreo sintético...")
-        for app_key in APPS_CONFIG.keys():
-            self.results[app_key] = self.check_app(app_key)
-        
+        app_keys = list(APPS_CONFIG.keys())
+        # Historial previo a esta ronda: la ronda no se compara contra sí misma
+        baselines = self._load_baselines(app_keys)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(app_keys) or 1)),
+                                thread_name_prefix="synth") as pool:
+            for app_key, result in zip(app_keys, pool.map(self.check_app, app_keys)):
+                self.results[app_key] = result
+
+        for app_key in app_keys:
+            result = self.results[app_key]
+            deg = detect_degradation(result, baselines.get(app_key))
+            result["degradation"] = deg
+            if deg:
+                self._notify_degradation(APPS_CONFIG.get(app_key, {}).get("name", app_key), deg)
+
+        self._save([self.results[k] for k in app_keys])
         return self.results
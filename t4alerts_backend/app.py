@@ -88,7 +88,7 @@ def create_app():
         # Import models to register them with SQLAlchemy
         from t4alerts_backend.admin.models import UserPermission
         from t4alerts_backend.apps_manager.models import MonitoredApp
-        from t4alerts_backend.certificates.models import SSLCertificate
+        from t4alerts_backend.certificates.models import SSLCertificate, SSLCertificateSnapshot
         from t4alerts_backend.notifications.models import NotificationSettings
         
         db.create_all()
@@ -120,4 +120,7 @@ def create_app():
 app = create_app()
 
 if __name__ == "__main__":
+    # Prometheus (/metrics) solo en el proceso web; con gunicorn lo hace gunicorn.conf.py
+    from t4alerts_backend.common.metrics import init_metrics
+    init_metrics(app)
     app.run(debug=True, port=5001, threaded=True)
@@ -16,3 +16,38 @@ class SSLCertificate(db.Model):
             'port': self.port,
             'created_at': self.created_at.isoformat()
         }
+
+
+class SSLCertificateSnapshot(db.Model):
+    """
+    Último certificado visto de cada host (estático o dinámico).
+
+    /api/certificates/status lee de acá; el refresco en segundo plano
+    (certificates/snapshots.py) lo actualiza cuando vence next_check_at.
+    Fechas en UTC (naive, como SSLCertificate.created_at).
+    """
+    __tablename__ = 'ssl_certificate_snapshots'
+
+    hostname = db.Column(db.String(255), primary_key=True)
+    port = db.Column(db.Integer, default=443, nullable=False)
+    fingerprint_sha256 = db.Column(db.String(64))
+    not_after = db.Column(db.DateTime)
+    issuer = db.Column(db.String(255))
+    checked_at = db.Column(db.DateTime)            # último chequeo exitoso
+    last_attempt_at = db.Column(db.DateTime)
+    error = db.Column(db.Text)                     # error del último intento (None = OK)
+    elapsed_ms = db.Column(db.Float)
+    next_check_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True)
+    refresh_started_at = db.Column(db.DateTime)    # lease entre workers de gunicorn
+
+    def to_dict(self):
+        return {
+            'hostname': self.hostname,
+            'port': self.port,
+            'fingerprint_sha256': self.fingerprint_sha256,
+            'not_after': self.not_after.isoformat() if self.not_after else None,
+            'issuer': self.issuer,
+            'checked_at': self.checked_at.isoformat() if self.checked_at else None,
+            'next_check_at': self.next_check_at.isoformat() if self.next_check_at else None,
+            'error': self.error,
+        }
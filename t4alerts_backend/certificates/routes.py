@@ -1,8 +1,10 @@
-from flask import Blueprint, jsonify, request
+from datetime import datetime
+from flask import Blueprint, current_app, jsonify, request
 from flask_jwt_extended import jwt_required
 from t4alerts_backend.common.decorators import permission_required
 from ssl_checker.checker import SSLChecker
-from t4alerts_backend.certificates.models import SSLCertificate
+from t4alerts_backend.certificates.models import SSLCertificate, SSLCertificateSnapshot
+from t4alerts_backend.certificates import snapshots
 from t4alerts_backend.common.database import db
 import logging
 
@@ -15,47 +17,46 @@ logger = logging.getLogger(__name__)
 def get_certificates_status():
     """
     Returns the SSL status for all configured domains (static + dynamic).
+    Served from the stored snapshots (see certificates/snapshots.py), so the
+    latency does not depend on how many domains there are; days left and
+    severity are recomputed against notAfter on every request.
     """
     try:
         checker = SSLChecker()
-        
-        # 1. Get Static Domains from Config
-        static_domains = checker.get_domains()
-        
-        # 2. Get Dynamic Domains from DB
-        dynamic_certs = SSLCertificate.query.all()
-        dynamic_domains_map = {cert.hostname: cert.id for cert in dynamic_certs}
-        
-        # 3. Merge lists (unique)
-        all_domains = list(set(static_domains + list(dynamic_domains_map.keys())))
-        
+        domains = snapshots.monitored_domains(checker)
+
+        if not snapshots.ensure_refresher(current_app._get_current_object()):
+            # CERT_REFRESH_ENABLED=0: live sweep, concurrently under one global deadline
+            results = checker.check_domains([(hostname, port) for hostname, port, _ in domains])
+            for status, (_, _, cert_id) in zip(results, domains):
+                status['id'] = cert_id
+                status['is_dynamic'] = cert_id is not None
+            return jsonify(results), 200
+
+        now = datetime.utcnow()
+        stored = {
+            snap.hostname: snap
+            for snap in SSLCertificateSnapshot.query.filter(
+                SSLCertificateSnapshot.hostname.in_([hostname for hostname, _, _ in domains])
+            ).all()
+        }
         results = []
-        for domain in all_domains:
-            try:
-                # We use the new check_domain method that returns a dict
-                status = checker.check_domain(domain)
-                
-                # Add certificate ID and is_dynamic flag
-                is_dynamic = domain in dynamic_domains_map
-                status['id'] = dynamic_domains_map.get(domain, None)
-                status['is_dynamic'] = is_dynamic
-                
-                results.append(status)
-            except Exception as domain_error:
-                # Log error but continue with other domains
-                logger.error(f"Error checking domain {domain}: {domain_error}")
-                results.append({
-                    "hostname": domain,
-                    "status": "ERROR",
-                    "days_left": 0,
-                    "expires": "Unknown",
-                    "issuer": "Unknown",
-                    "color": "gray",
-                    "id": dynamic_domains_map.get(domain, None),
-                    "is_dynamic": domain in dynamic_domains_map,
-                    "error": str(domain_error)
-                })
-            
+        refresh_needed = False
+        for hostname, _, cert_id in domains:
+            snap = stored.get(hostname)
+            if snap is None:
+                status = snapshots.pending_status(hostname)
+                refresh_needed = True
+            else:
+                status = snapshots.status_from_snapshot(snap, now)
+                refresh_needed = refresh_needed or snap.checked_at is None or snap.next_check_at <= now
+            # Add certificate ID and is_dynamic flag
+            status['id'] = cert_id
+            status['is_dynamic'] = cert_id is not None
+            results.append(status)
+
+        if refresh_needed:
+            snapshots.wake_refresher()
         return jsonify(results), 200
     except Exception as e:
         logger.error(f"Error fetching certificates status: {e}", exc_info=True)
@@ -65,7 +66,8 @@ def get_certificates_status():
 @jwt_required()
 def check_certificate():
     """
-    Checks SSL status for a specific domain on demand.
+    Checks SSL status for a specific domain on demand (forced refresh:
+    the result is stored as the domain's snapshot).
     """
     try:
         data = request.get_json()
@@ -78,7 +80,8 @@ def check_certificate():
         # Clean domain just in case user pastes full URL
         hostname = checker.clean_domain(hostname)
         
-        result = checker.check_domain(hostname)
+        cert = SSLCertificate.query.filter_by(hostname=hostname).first()
+        result = snapshots.force_refresh(hostname, cert.port if cert else None, checker)
         return jsonify(result), 200
     except Exception as e:
         logger.error(f"Error checking certificate for {hostname}: {e}")
@@ -109,6 +112,7 @@ def add_certificate():
         new_cert = SSLCertificate(hostname=hostname, port=port)
         db.session.add(new_cert)
         db.session.commit()
+        snapshots.wake_refresher()
         
         return jsonify({"message": "Certificate added successfully", "certificate": new_cert.to_dict()}), 201
     except Exception as e:
@@ -132,6 +136,8 @@ def delete_certificate(cert_id):
         hostname = cert.hostname
         db.session.delete(cert)
         db.session.commit()
+        if hostname not in SSLChecker().get_domains():
+            snapshots.forget(hostname)
         
         logger.info(f"Certificate deleted: {hostname} (ID: {cert_id})")
         return jsonify({"message": "Certificate deleted successfully"}), 200
@@ -174,6 +180,10 @@ def update_certificate(cert_id):
         old_hostname = cert.hostname
         cert.hostname = new_hostname
         db.session.commit()
+        if old_hostname != new_hostname:
+            if old_hostname not in checker.get_domains():
+                snapshots.forget(old_hostname)
+            snapshots.wake_refresher()
         
         logger.info(f"Certificate updated: {old_hostname} → {new_hostname} (ID: {cert_id})")
         return jsonify({
@@ -0,0 +1,275 @@
+# t4alerts_backend/certificates/snapshots.py
+"""
+Snapshots de certificados para /api/certificates/status.
+
+Antes cada carga de la vista hacía un handshake TLS con cada host, aunque el
+notAfter de un certificado cambia unas pocas veces al año. Ahora el último
+certificado visto de cada host queda en ssl_certificate_snapshots
+(SSLCertificateSnapshot) y la vista lee de ahí: los días restantes y la
+severidad se recalculan contra notAfter en cada pedido, así que siguen al
+día aunque el snapshot tenga horas.
+
+Un hilo por worker de gunicorn refresca en segundo plano los hosts cuyo
+next_check_at ya pasó; el intervalo se achica a medida que se acerca el
+vencimiento:
+
+  más de 30 días   cada 24 h
+  8 a 30 días      cada 6 h
+  7 días o menos   cada 1 h
+  error            reintento a los CERT_RETRY_MINUTES (se sigue mostrando
+                   el último certificado conocido, marcado "stale")
+
+POST /api/certificates/check fuerza el chequeo de un host y guarda el
+resultado. Entre workers, refresh_started_at hace de lease: un host lo
+refresca un solo worker a la vez.
+
+Variables de entorno:
+  CERT_REFRESH_ENABLED=1          0 = sin snapshots: /status chequea en vivo como antes
+  CERT_REFRESH_POLL_SECONDS=60    cada cuánto se buscan hosts por refrescar
+  CERT_REFRESH_LEASE=300          segundos que un worker retiene un host
+  CERT_RETRY_MINUTES=15           reintento tras un chequeo fallido
+"""
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+
+from ssl_checker.checker import SSLChecker, severity_for
+from t4alerts_backend.certificates.models import SSLCertificate, SSLCertificateSnapshot
+from t4alerts_backend.common.database import db
+
+logger = logging.getLogger(__name__)
+
+CERT_REFRESH_ENABLED = os.getenv("CERT_REFRESH_ENABLED", "1") != "0"
+CERT_REFRESH_POLL_SECONDS = float(os.getenv("CERT_REFRESH_POLL_SECONDS", "60"))
+CERT_REFRESH_LEASE = int(os.getenv("CERT_REFRESH_LEASE", "300"))
+CERT_RETRY_MINUTES = int(os.getenv("CERT_RETRY_MINUTES", "15"))
+
+# (días restantes mayores a, próximo chequeo en)
+_INTERVALOS = ((30, timedelta(hours=24)), (7, timedelta(hours=6)))
+_INTERVALO_CERCANO = timedelta(hours=1)
+
+Dominio = Tuple[str, Optional[int], Optional[int]]   # (hostname, port, id de SSLCertificate)
+
+
+def next_check_delay(days_left: Optional[int], ok: bool) -> timedelta:
+    """Cuánto esperar hasta el próximo chequeo de un host."""
+    if not ok or days_left is None:
+        return timedelta(minutes=CERT_RETRY_MINUTES)
+    for umbral, intervalo in _INTERVALOS:
+        if days_left > umbral:
+            return intervalo
+    return _INTERVALO_CERCANO
+
+
+def monitored_domains(checker: SSLChecker) -> List[Dominio]:
+    """Dominios estáticos (APPS_CONFIG) + dinámicos (ssl_certificates), sin repetir."""
+    dinamicos = {cert.hostname: cert for cert in SSLCertificate.query.all()}
+    dominios = [(h, None, None) for h in checker.get_domains() if h not in dinamicos]
+    dominios += [(cert.hostname, cert.port, cert.id) for cert in dinamicos.values()]
+    return dominios
+
+
+# ------------------------------------------------------------ snapshots ---
+
+def save_result(result: dict, port: Optional[int] = None, ahora: Optional[datetime] = None) -> SSLCertificateSnapshot:
+    """Guarda un resultado de SSLChecker.check_domain() como snapshot del host."""
+    ahora = ahora or datetime.utcnow()
+    snap = db.session.get(SSLCertificateSnapshot, result["hostname"])
+    if snap is None:
+        snap = SSLCertificateSnapshot(hostname=result["hostname"])
+        db.session.add(snap)
+    snap.port = port or snap.port or 443
+    snap.last_attempt_at = ahora
+    snap.elapsed_ms = result.get("elapsed_ms")
+    ok = bool(result.get("not_after"))
+    if ok:
+        snap.not_after = datetime.fromisoformat(result["not_after"]).replace(tzinfo=None)
+        snap.fingerprint_sha256 = result.get("fingerprint_sha256")
+        snap.issuer = result.get("issuer")
+        snap.checked_at = ahora
+        snap.error = None
+    else:
+        # Se conserva el último certificado conocido: un corte de red no lo borra
+        snap.error = result.get("error") or "Unknown error"
+    snap.next_check_at = ahora + next_check_delay(result.get("days_left") if ok else None, ok)
+    snap.refresh_started_at = None
+    db.session.commit()
+    return snap
+
+
+def pending_status(hostname: str) -> dict:
+    """Host todavía sin chequear (el refresco ya está en camino)."""
+    return {
+        "hostname": hostname,
+        "status": "PENDING",
+        "days_left": 0,
+        "expires": "Unknown",
+        "issuer": "Unknown",
+        "color": "gray",
+        "checked_at": None,
+    }
+
+
+def status_from_snapshot(snap: SSLCertificateSnapshot, ahora: Optional[datetime] = None) -> dict:
+    """Mismo formato que check_domain(), con días/severidad recalculados a ahora."""
+    ahora = ahora or datetime.utcnow()
+    if snap.not_after is None:
+        if not snap.error:
+            return pending_status(snap.hostname)
+        return {
+            "hostname": snap.hostname,
+            "status": "ERROR",
+            "days_left": 0,
+            "expires": "Unknown",
+            "issuer": "Unknown",
+            "color": "gray",
+            "error": snap.error,
+            "checked_at": None,
+        }
+    days_left = (snap.not_after - ahora).days
+    severity, color = severity_for(days_left)
+    status = {
+        "hostname": snap.hostname,
+        "status": severity,
+        "days_left": days_left,
+        "expires": snap.not_after.strftime("%Y-%m-%d - %H:%M:%S"),
+        "issuer": snap.issuer,
+        "color": color,
+        "fingerprint_sha256": snap.fingerprint_sha256,
+        "checked_at": snap.checked_at.isoformat() if snap.checked_at else None,
+        "age_seconds": int((ahora - snap.checked_at).total_seconds()) if snap.checked_at else None,
+        "elapsed_ms": snap.elapsed_ms,
+    }
+    if snap.error:
+        status["error"] = snap.error
+        status["stale"] = True
+    return status
+
+
+def _asegurar_filas(dominios: List[Dominio], ahora: datetime) -> None:
+    """Crea la fila (vencida) de los hosts que todavía no tienen snapshot."""
+    existentes = {h for (h,) in db.session.query(SSLCertificateSnapshot.hostname).all()}
+    nuevos = [(h, p) for h, p, _ in dominios if h not in existentes]
+    if not nuevos:
+        return
+    for hostname, port in nuevos:
+        db.session.add(SSLCertificateSnapshot(hostname=hostname, port=port or 443, next_check_at=ahora))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Otro worker las creó al mismo tiempo
+        db.session.rollback()
+
+
+def _tomar(hostname: str, ahora: datetime) -> bool:
+    """Lease del host: solo un worker lo refresca a la vez."""
+    vencido = ahora - timedelta(seconds=CERT_REFRESH_LEASE)
+    filas = (SSLCertificateSnapshot.query
+             .filter(SSLCertificateSnapshot.hostname == hostname,
+                     SSLCertificateSnapshot.next_check_at <= ahora,
+                     or_(SSLCertificateSnapshot.refresh_started_at.is_(None),
+                         SSLCertificateSnapshot.refresh_started_at < vencido))
+             .update({SSLCertificateSnapshot.refresh_started_at: ahora}, synchronize_session=False))
+    db.session.commit()
+    return filas == 1
+
+
+# ---------------------------------------------------------- public API ---
+
+def refresh_due(checker: Optional[SSLChecker] = None) -> int:
+    """
+    Chequea (en paralelo, SSLChecker.check_domains) los hosts monitoreados
+    cuyo next_check_at ya pasó y guarda los snapshots. Requiere app context.
+
+    Returns:
+        cantidad de hosts chequeados por este proceso
+    """
+    checker = checker or SSLChecker()
+    ahora = datetime.utcnow()
+    dominios = monitored_domains(checker)
+    _asegurar_filas(dominios, ahora)
+
+    puertos = {h: p for h, p, _ in dominios}
+    vencidos = (SSLCertificateSnapshot.query
+                .filter(SSLCertificateSnapshot.next_check_at <= ahora,
+                        SSLCertificateSnapshot.hostname.in_(list(puertos)))
+                .all())
+    tomados = [(s.hostname, puertos[s.hostname] or s.port) for s in vencidos if _tomar(s.hostname, ahora)]
+    if not tomados:
+        return 0
+
+    logger.info(f"🔐 Refrescando {len(tomados)} certificados")
+    for result, (hostname, port) in zip(checker.check_domains(tomados), tomados):
+        try:
+            save_result(result, port)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error saving certificate snapshot for {hostname}: {e}")
+    return len(tomados)
+
+
+def force_refresh(hostname: str, port: Optional[int] = None, checker: Optional[SSLChecker] = None) -> dict:
+    """Chequeo inmediato de un host (POST /check): guarda y devuelve el resultado."""
+    checker = checker or SSLChecker()
+    inicio = datetime.utcnow()
+    result = checker.check_domain(hostname, port)
+    result["elapsed_ms"] = round((datetime.utcnow() - inicio).total_seconds() * 1000, 1)
+    try:
+        save_result(result, port)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Error saving certificate snapshot for {hostname}: {e}")
+    return result
+
+
+def forget(hostname: str) -> None:
+    """Borra el snapshot de un host que se dejó de monitorear."""
+    SSLCertificateSnapshot.query.filter_by(hostname=hostname).delete()
+    db.session.commit()
+
+
+# -------------------------------------------------- refresco de fondo ---
+
+_HILO: Optional[threading.Thread] = None
+_HILO_PID: Optional[int] = None
+_HILO_LOCK = threading.Lock()
+_DESPERTAR = threading.Event()
+
+
+def _loop(app) -> None:
+    while True:
+        try:
+            with app.app_context():
+                refresh_due()
+        except Exception as e:
+            logger.error(f"Certificate refresher failed: {e}", exc_info=True)
+        finally:
+            with app.app_context():
+                db.session.remove()
+        _DESPERTAR.wait(CERT_REFRESH_POLL_SECONDS)
+        _DESPERTAR.clear()
+
+
+def ensure_refresher(app) -> bool:
+    """Arranca el hilo de refresco de este proceso (una vez por worker de gunicorn)."""
+    global _HILO, _HILO_PID
+    if not CERT_REFRESH_ENABLED:
+        return False
+    if _HILO is not None and _HILO_PID == os.getpid() and _HILO.is_alive():
+        return True
+    with _HILO_LOCK:
+        if _HILO is None or _HILO_PID != os.getpid() or not _HILO.is_alive():
+            _HILO = threading.Thread(target=_loop, args=(app,), name="cert-refresher", daemon=True)
+            _HILO.start()
+            _HILO_PID = os.getpid()
+    return True
+
+
+def wake_refresher() -> None:
+    """Adelanta la próxima vuelta del refresco (hosts nuevos o sin snapshot)."""
+    _DESPERTAR.set()
@@ -0,0 +1,288 @@
+# t4alerts_backend/common/metrics.py
+"""
+Métricas Prometheus del backend (GET /metrics).
+
+Qué se mide:
+  - t4alerts_http_request_duration_seconds{endpoint,method,status}
+      latencia de cada ruta de los blueprints (endpoint = "stats.get_app_stats",
+      "dashboard.get_error_stats"...). Las respuestas en streaming (/api/stats/view)
+      se miden hasta que se termina de enviar el cuerpo, no hasta el primer byte.
+  - t4alerts_scrape_duration_seconds{app}     procesar_aplicacion completo
+  - t4alerts_scrape_stage_seconds{app,stage}  login, day_fetch, classify, db_dedupe...
+  - t4alerts_scrape_bytes_fetched_total{app}  bytes de log descargados
+  - t4alerts_scrape_items_total{app,name}     líneas de log y errores clasificados
+  - t4alerts_ssl_check_duration_seconds       cada check_domain() del SSLChecker
+  - t4alerts_db_query_duration_seconds{query} consultas medidas con track_query()
+  - t4alerts_db_pool_*                        pool de psycopg2 (db.get_pool_stats)
+  - t4alerts_cache_requests_total{cache,result}
+      aciertos/fallos de las cachés (log_index, session, firmas...). Las de
+      firmas (signature_alert / signature_summary) son solo las que pasan por
+      el LRU (build_signature / summary_signature).
+  - t4alerts_signatures_uncached_total
+      firmas de LogEntry (error_filter, agregados): se calculan una vez por
+      registro, sin LRU
+
+Las etapas, contadores y eventos de caché llegan de app.run_metrics (el mismo
+instrumentado que usa main.py): acá solo se suscribe un listener.
+
+Solo el proceso web llama init_metrics() (gunicorn.conf.py post_worker_init o
+el servidor de desarrollo). create_app() no: main.py, scraper_worker y las
+tareas de Celery también la usan, y sin listener stage() no mide fuera de una
+corrida ni se escriben archivos por PID en PROMETHEUS_MULTIPROC_DIR.
+
+Gunicorn con varios workers: cada worker es un proceso con sus propias
+métricas, y /metrics lo atiende cualquiera. Con PROMETHEUS_MULTIPROC_DIR
+definido (antes de arrancar gunicorn) prometheus_client guarda los valores en
+archivos mmap de ese directorio y /metrics suma los de todos los workers
+(MultiProcessCollector). gunicorn.conf.py limpia el directorio al arrancar y
+marca los workers muertos para que sus gauges dejen de contar.
+
+Variables de entorno:
+  METRICS_ENABLED=1           0 = sin /metrics ni instrumentación
+  PROMETHEUS_MULTIPROC_DIR=   directorio compartido por los workers (vacío = un solo proceso)
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from flask import Response, g, request
+
+from app import run_metrics
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        REGISTRY,
+        CollectorRegistry,
+        Counter,
+        Gauge,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+except ImportError:  # pragma: no cover - prometheus_client está en requirements.txt
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+    Counter = Gauge = Histogram = None
+
+logger = logging.getLogger(__name__)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") != "0"
+MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR", "")
+
+# Rutas rápidas (auth, menú) y lentas (scraping en vivo en /api/stats/view)
+_HTTP_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+_SCRAPE_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600)
+_FAST_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+class _Metricas:
+    """Los Counter/Gauge/Histogram del backend (se crean en init_metrics)."""
+
+    def __init__(self):
+        self.HTTP_REQUEST_SECONDS = Histogram(
+            "t4alerts_http_request_duration_seconds", "Latencia de las rutas del backend",
+            ["endpoint", "method", "status"], buckets=_HTTP_BUCKETS,
+        )
+        self.SCRAPE_SECONDS = Histogram(
+            "t4alerts_scrape_duration_seconds", "Duración de procesar_aplicacion por app",
+            ["app"], buckets=_SCRAPE_BUCKETS,
+        )
+        self.SCRAPE_STAGE_SECONDS = Histogram(
+            "t4alerts_scrape_stage_seconds", "Duración de cada etapa del scraping por app",
+            ["app", "stage"], buckets=_FAST_BUCKETS,
+        )
+        self.SCRAPE_BYTES = Counter(
+            "t4alerts_scrape_bytes_fetched", "Bytes de log descargados por app", ["app"],
+        )
+        self.SCRAPE_ITEMS = Counter(
+            "t4alerts_scrape_items", "Líneas de log y errores clasificados por app", ["app", "name"],
+        )
+        self.SSL_CHECK_SECONDS = Histogram(
+            "t4alerts_ssl_check_duration_seconds", "Duración de cada chequeo SSL",
+            buckets=_FAST_BUCKETS,
+        )
+        self.DB_QUERY_SECONDS = Histogram(
+            "t4alerts_db_query_duration_seconds", "Duración de consultas a la BD de scraping",
+            ["query"], buckets=_FAST_BUCKETS,
+        )
+        self.CACHE_REQUESTS = Counter(
+            "t4alerts_cache_requests", "Aciertos y fallos de las cachés", ["cache", "result"],
+        )
+        self.SIGNATURES_UNCACHED = Counter(
+            "t4alerts_signatures_uncached", "Firmas de LogEntry calculadas sin LRU (una por registro)",
+        )
+        self.DB_POOL_IN_USE = Gauge(
+            "t4alerts_db_pool_connections_in_use", "Conexiones del pool prestadas",
+            multiprocess_mode="livesum",
+        )
+        self.DB_POOL_MAX = Gauge(
+            "t4alerts_db_pool_connections_max", "Máximo de conexiones del pool (suma de workers vivos)",
+            multiprocess_mode="livesum",
+        )
+        self.DB_POOL_CHECKOUTS = Counter(
+            "t4alerts_db_pool_checkouts", "Conexiones pedidas al pool",
+        )
+        self.DB_POOL_WAIT = Counter(
+            "t4alerts_db_pool_wait_seconds", "Segundos esperando una conexión del pool",
+        )
+        self.DB_POOL_TIMEOUTS = Counter(
+            "t4alerts_db_pool_timeouts", "Pedidos al pool que vencieron esperando",
+        )
+
+
+# Recién se crean en init_metrics(): con PROMETHEUS_MULTIPROC_DIR crear una
+# métrica ya abre su archivo por PID, y procesos que solo importan este módulo
+# (main.py, workers de Celery vía create_app) no deben dejar archivos ahí
+_M: Optional[_Metricas] = None
+_M_LOCK = threading.Lock()
+
+
+def _activo() -> bool:
+    return _M is not None
+
+
+# ------------------------------------------------------ run_metrics -> prom ---
+
+def _on_event(kind: str, nombre: str, valor: float, app_key: Optional[str]) -> None:
+    app = app_key or "-"
+    if kind == "stage":
+        if nombre == "scrape":
+            _M.SCRAPE_SECONDS.labels(app).observe(valor)
+        elif nombre == "ssl_check":
+            _M.SSL_CHECK_SECONDS.observe(valor)
+        else:
+            _M.SCRAPE_STAGE_SECONDS.labels(app, nombre).observe(valor)
+    elif kind == "count":
+        if nombre == "bytes_fetched":
+            _M.SCRAPE_BYTES.labels(app).inc(valor)
+        else:
+            _M.SCRAPE_ITEMS.labels(app, nombre).inc(valor)
+    elif kind == "cache":
+        _M.CACHE_REQUESTS.labels(nombre, "hit" if valor else "miss").inc()
+
+
+# ------------------------------------------- contadores acumulados (deltas) ---
+
+# signature_cache_stats() y get_pool_stats() son acumulados del proceso: en
+# cada request se pasa a los Counter solo lo que creció desde la última vez.
+_ULTIMOS: Dict[str, float] = {}
+_ULTIMOS_PID: Optional[int] = None
+_ULTIMOS_LOCK = threading.Lock()
+
+
+def _delta(clave: str, actual: float) -> float:
+    anterior = _ULTIMOS.get(clave, 0.0)
+    _ULTIMOS[clave] = actual
+    # Un contador que baja (pool o LRU recreados) vuelve a empezar desde 0
+    return actual - anterior if actual >= anterior else actual
+
+
+def _sync_process_stats() -> None:
+    global _ULTIMOS_PID
+    from app.signatures import signature_cache_stats
+    from db.connection import get_pool_stats
+
+    firmas = signature_cache_stats()
+    pool = get_pool_stats()
+    with _ULTIMOS_LOCK:
+        if _ULTIMOS_PID != os.getpid():
+            _ULTIMOS.clear()
+            _ULTIMOS_PID = os.getpid()
+        for tipo in ("alert", "summary"):
+            for campo, result in (("hits", "hit"), ("misses", "miss")):
+                delta = _delta(f"sig_{tipo}_{campo}", firmas[tipo][campo])
+                if delta:
+                    _M.CACHE_REQUESTS.labels(f"signature_{tipo}", result).inc(delta)
+        delta = _delta("sig_entry_computed", firmas["entry"]["computed"])
+        if delta:
+            _M.SIGNATURES_UNCACHED.inc(delta)
+        for clave, contador in (("checkouts", _M.DB_POOL_CHECKOUTS),
+                                ("wait_total_seconds", _M.DB_POOL_WAIT),
+                                ("timeouts", _M.DB_POOL_TIMEOUTS)):
+            delta = _delta(f"pool_{clave}", pool.get(clave, 0))
+            if delta:
+                contador.inc(delta)
+    _M.DB_POOL_IN_USE.set(pool.get("in_use", 0))
+    _M.DB_POOL_MAX.set(pool.get("max", 0))
+
+
+# ------------------------------------------------------------- requests ---
+
+def _before_request() -> None:
+    g._metrics_start = time.perf_counter()
+
+
+def _after_request(response):
+    inicio = g.pop("_metrics_start", None)
+    if inicio is None:
+        return response
+    endpoint = request.endpoint or "unmatched"
+    method = request.method
+    status = str(response.status_code)
+
+    def _observar():
+        _M.HTTP_REQUEST_SECONDS.labels(endpoint, method, status).observe(time.perf_counter() - inicio)
+        try:
+            _sync_process_stats()
+        except Exception as e:
+            logger.warning(f"⚠️ No se pudieron leer las métricas del proceso: {e}")
+
+    # call_on_close corre cuando el servidor termina de mandar el cuerpo:
+    # en streaming eso es después del último chunk
+    response.call_on_close(_observar)
+    return response
+
+
+def _metrics_view():
+    if not _activo():
+        return Response("prometheus_client no está instalado\n", status=501, mimetype="text/plain")
+    if MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry, path=MULTIPROC_DIR)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+# ---------------------------------------------------------- public API ---
+
+@contextmanager
+def track_query(nombre: str) -> Iterator[None]:
+    """Mide una consulta (o grupo de consultas) de la BD: `with track_query("errors_by_app"):`."""
+    if not _activo():
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        _M.DB_QUERY_SECONDS.labels(nombre).observe(time.perf_counter() - inicio)
+
+
+def init_metrics(app) -> None:
+    """
+    Registra /metrics, los hooks de latencia y el listener de run_metrics.
+
+    Solo para el proceso web (gunicorn.conf.py post_worker_init, o el servidor
+    de desarrollo): create_app() no lo llama, porque main.py, scraper_worker y
+    las tareas de Celery también arman la app y no deben medir para /metrics.
+    """
+    global _M
+    if not METRICS_ENABLED:
+        return
+    if Histogram is None:
+        print("⚠️ prometheus_client no está instalado: /metrics responde 501")
+    else:
+        with _M_LOCK:
+            if _M is None:
+                _M = _Metricas()
+        run_metrics.add_listener(_on_event)
+        app.before_request(_before_request)
+        app.after_request(_after_request)
+        if MULTIPROC_DIR:
+            print(f"📈 Métricas Prometheus en modo multiproceso ({MULTIPROC_DIR})")
+    app.add_url_rule("/metrics", "metrics", _metrics_view, methods=["GET"])
@@ -2,6 +2,7 @@ from flask import Blueprint, jsonify
 from flask_jwt_extended import jwt_required
 from t4alerts_backend.common.decorators import permission_required
 from db.connection import get_cursor
+from t4alerts_backend.common.metrics import track_query
 import logging
 
 dashboard_bp = Blueprint('dashboard', __name__)
@@ -24,40 +25,43 @@ def get_error_stats():
     try:
         with get_cursor() as cur:
             # 1. Bar Chart: Errors per App (Uncontrolled)
-            cur.execute("""
-                SELECT app_key, COUNT(*) 
-                FROM alerted_errors 
-                WHERE tipo = 'no_controlado' 
-                GROUP BY app_key 
-                ORDER BY COUNT(*) DESC
-            """)
-            rows = cur.fetchall()
+            with track_query("dashboard_errors_by_app"):
+                cur.execute("""
+                    SELECT app_key, COUNT(*) 
+                    FROM alerted_errors 
+                    WHERE tipo = 'no_controlado' 
+                    GROUP BY app_key 
+                    ORDER BY COUNT(*) DESC
+                """)
+                rows = cur.fetchall()
             stats["errors_by_app"] = [{"label": r[0], "value": r[1]} for r in rows]
             
             # 2. Donut Chart: Distribution of Error Types (Controlado vs No Controlado)
-            cur.execute("""
-                SELECT tipo, COUNT(*) 
-                FROM alerted_errors 
-                GROUP BY tipo
-            """)
-            rows = cur.fetchall()
+            with track_query("dashboard_errors_by_type"):
+                cur.execute("""
+                    SELECT tipo, COUNT(*) 
+                    FROM alerted_errors 
+                    GROUP BY tipo
+                """)
+                rows = cur.fetchall()
             stats["errors_by_type"] = [{"label": r[0], "value": r[1]} for r in rows]
             
             # 3. Notifications/Direct Feed: Recent Errors with Recurrence
             # Shows 'no_controlado' errors, grouping by signature to show recurrence count
-            cur.execute("""
-                SELECT 
-                    app_key, 
-                    signature, 
-                    MAX(first_seen_at) as last_seen, 
-                    COUNT(*) as recurrence 
-                FROM alerted_errors 
-                WHERE tipo = 'no_controlado'
-                GROUP BY app_key, signature 
-                ORDER BY last_seen DESC 
-                LIMIT 20
-            """)
-            rows = cur.fetchall()
+            with track_query("dashboard_recent_errors"):
+                cur.execute("""
+                    SELECT 
+                        app_key, 
+                        signature, 
+                        MAX(first_seen_at) as last_seen, 
+                        COUNT(*) as recurrence 
+                    FROM alerted_errors 
+                    WHERE tipo = 'no_controlado'
+                    GROUP BY app_key, signature 
+                    ORDER BY last_seen DESC 
+                    LIMIT 20
+                """)
+                rows = cur.fetchall()
             stats["recent_errors"] = [{
                 "app": r[0], 
                 "signature": r[1], 
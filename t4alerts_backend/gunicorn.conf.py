@@ -0,0 +1,42 @@
+# t4alerts_backend/gunicorn.conf.py
+"""
+Configuración de gunicorn para el backend.
+
+Las métricas Prometheus (/metrics) se registran acá, en cada worker
+(post_worker_init), y no en create_app(): main.py, scraper_worker y las
+tareas de Celery también llaman create_app() y no deben medir ni escribir en
+PROMETHEUS_MULTIPROC_DIR.
+
+Con PROMETHEUS_MULTIPROC_DIR cada worker escribe sus métricas en archivos de
+ese directorio y /metrics las suma (ver common/metrics.py). Acá:
+  - al arrancar el master se vacía el directorio (valores de una corrida anterior)
+  - cuando muere un worker se marca muerto, así sus gauges "livesum" dejan de contar
+"""
+import os
+import shutil
+
+bind = "0.0.0.0:5000"
+workers = int(os.getenv("GUNICORN_WORKERS", "4"))
+timeout = 120
+
+
+def on_starting(server):
+    directorio = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+    if not directorio:
+        return
+    shutil.rmtree(directorio, ignore_errors=True)
+    os.makedirs(directorio, exist_ok=True)
+
+
+def post_worker_init(worker):
+    from t4alerts_backend.common.metrics import init_metrics
+
+    init_metrics(worker.wsgi)
+
+
+def child_exit(server, worker):
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        return
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
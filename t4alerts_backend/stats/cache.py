@@ -0,0 +1,175 @@
+# t4alerts_backend/stats/cache.py
+"""
+Caché de resultados de /api/stats/view (stale-while-revalidate).
+
+Cada resultado de (app_key, fecha) queda en stats_cache (db/stats_cache.py);
+lo guardan la corrida programada de main.py y cualquier scraping en vivo del
+backend. Al abrir el dashboard:
+
+  final   fecha pasada calculada después de que terminó el día: se sirve
+          siempre desde la caché, no se vuelve a scrapear
+  fresh   calculado hace menos de STATS_CACHE_TTL segundos: se sirve tal cual
+  stale   más viejo (o de un día pasado calculado antes de que terminara):
+          se sirve igual y se refresca en segundo plano
+  miss    no hay resultado: se scrapea en vivo (como antes) y se guarda
+
+La respuesta lleva "cache": {"status", "computed_at", "age_seconds",
+"refreshing"} para que el frontend muestre la antigüedad de los datos.
+
+Los refrescos corren en un pool de hilos por worker de gunicorn; dos pedidos
+del mismo (app, fecha) en un worker comparten el mismo scraping, y entre
+workers el lease de la fila (claim_refresh) evita refrescos duplicados.
+
+Variables de entorno:
+  STATS_CACHE_TTL=300          segundos que un resultado de hoy se sirve sin refrescar
+  STATS_REFRESH_LEASE=600      segundos que un worker retiene el refresco de una fila
+  STATS_REFRESH_WORKERS=4      hilos de scraping en segundo plano por worker
+"""
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, datetime, time, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from app.run_metrics import cache_event
+from app.stats_snapshot import STATS_CACHE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", "300"))
+STATS_REFRESH_LEASE = int(os.getenv("STATS_REFRESH_LEASE", "600"))
+STATS_REFRESH_WORKERS = int(os.getenv("STATS_REFRESH_WORKERS", "4"))
+
+FINAL = "final"
+FRESH = "fresh"
+STALE = "stale"
+
+
+def snapshot_status(computed_at: datetime, dia: date, ahora: Optional[datetime] = None) -> str:
+    """final / fresh / stale de un resultado calculado en computed_at."""
+    ahora = ahora or datetime.now()
+    if computed_at >= datetime.combine(dia + timedelta(days=1), time.min):
+        return FINAL
+    if (ahora - computed_at).total_seconds() < STATS_CACHE_TTL:
+        return FRESH
+    return STALE
+
+
+# ------------------------------------------------------------ executor ---
+
+_EXECUTOR: Optional[ThreadPoolExecutor] = None
+_EXECUTOR_PID: Optional[int] = None
+_EN_CURSO: Dict[Tuple[str, str], Future] = {}
+_LOCK = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    """Pool del proceso actual (cada worker de gunicorn arma el suyo)."""
+    global _EXECUTOR, _EXECUTOR_PID
+    if _EXECUTOR is None or _EXECUTOR_PID != os.getpid():
+        _EN_CURSO.clear()
+        _EXECUTOR = ThreadPoolExecutor(max_workers=max(1, STATS_REFRESH_WORKERS),
+                                       thread_name_prefix="stats-refresh")
+        _EXECUTOR_PID = os.getpid()
+    return _EXECUTOR
+
+
+def _en_contexto(flask_app, fn: Callable, *args):
+    with flask_app.app_context():
+        return fn(*args)
+
+
+# ---------------------------------------------------------- public API ---
+
+def lookup(app_key: str, dia: date, ahora: Optional[datetime] = None) -> Optional[dict]:
+    """
+    Resultado guardado de (app_key, dia) con su metadata "cache", o None si
+    no hay (o la caché está apagada / la BD no responde).
+    """
+    if not STATS_CACHE_ENABLED:
+        return None
+    try:
+        from db.stats_cache import load_stats_snapshot
+
+        snapshot = load_stats_snapshot(app_key, dia, STATS_REFRESH_LEASE)
+    except Exception as e:
+        logger.warning(f"⚠️ stats_cache no disponible: {e}")
+        return None
+
+    cache_event("stats", snapshot is not None)
+    if snapshot is None:
+        return None
+
+    ahora = ahora or datetime.now()
+    computed_at = snapshot["computed_at"]
+    data = dict(snapshot["payload"])
+    data["source"] = "stats-cache"
+    data["cache"] = {
+        "status": snapshot_status(computed_at, dia, ahora),
+        "computed_at": computed_at.isoformat(),
+        "age_seconds": max(0, int((ahora - computed_at).total_seconds())),
+        "refreshing": snapshot["refreshing"],
+    }
+    return data
+
+
+def submit_once(flask_app, app_key: str, date_str: str, fn: Callable) -> Future:
+    """
+    Corre fn(app_key, date_str) en el pool, dentro del contexto de flask_app.
+    Si ya hay uno en curso para (app_key, date_str) en este proceso, devuelve ese.
+    """
+    clave = (app_key, date_str)
+    with _LOCK:
+        executor = _get_executor()
+        futuro = _EN_CURSO.get(clave)
+        if futuro is not None and not futuro.done():
+            return futuro
+        futuro = executor.submit(_en_contexto, flask_app, fn, app_key, date_str)
+        _EN_CURSO[clave] = futuro
+
+    def _limpiar(f):
+        with _LOCK:
+            if _EN_CURSO.get(clave) is f:
+                del _EN_CURSO[clave]
+
+    futuro.add_done_callback(_limpiar)
+    return futuro
+
+
+def refresh_in_background(flask_app, app_key: str, date_str: str, dia: date, fn: Callable) -> bool:
+    """
+    Refresca (app_key, dia) en segundo plano si nadie más lo está haciendo.
+    fn(app_key, date_str) scrapea y guarda el snapshot (get_app_stats_logic).
+
+    Returns:
+        True si se lanzó (o ya estaba en curso en este proceso).
+    """
+    with _LOCK:
+        futuro = _EN_CURSO.get((app_key, date_str))
+    if futuro is not None and not futuro.done():
+        return True
+    try:
+        from db.stats_cache import claim_refresh
+
+        if not claim_refresh(app_key, dia, STATS_REFRESH_LEASE):
+            return False
+    except Exception as e:
+        logger.warning(f"⚠️ No se pudo tomar el refresco de {app_key} {date_str}: {e}")
+        return False
+
+    def _refrescar(app_key, date_str):
+        try:
+            return fn(app_key, date_str)
+        finally:
+            # Si fn guardó el snapshot el lease ya está libre; si falló, se suelta acá
+            try:
+                from db.stats_cache import release_refresh
+
+                release_refresh(app_key, dia)
+            except Exception as e:
+                logger.warning(f"⚠️ No se pudo liberar el refresco de {app_key} {date_str}: {e}")
+
+    logger.info(f"🔄 Refrescando stats de {app_key} {date_str} en segundo plano")
+    submit_once(flask_app, app_key, date_str, _refrescar)
+    return True
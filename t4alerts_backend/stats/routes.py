@@ -26,6 +26,16 @@ import logging
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
 
 from app.config import APPS_CONFIG
+# Agregación por firma y formato del frontend: compartidos con main.py (snapshots de stats_cache)
+from app.stats_snapshot import (
+    agregar_errores_por_firma,
+    build_stats_payload,
+    es_error_sql,
+    extract_sqlstate_distribution,
+    format_errors_for_frontend,
+    store_stats_snapshot,
+)
+from t4alerts_backend.stats import cache as stats_cache
 # Note: app.scrapper is imported on-demand in get_app_stats_logic to avoid circular imports
 
 stats_bp = Blueprint('stats', __name__)
@@ -88,33 +98,45 @@ def debug_stats_view(app_key):
 def get_app_stats(app_key):
     """
     Returns logs and statistics for a specific app and date.
-    Uses Streaming Response to avoid 504 Gateway Timeout.
+
+    Served from the stats cache (stale-while-revalidate, see stats/cache.py);
+    only a day with no stored result (or ?refresh=1) scrapes live, using a
+    Streaming Response to avoid 504 Gateway Timeout.
     """
     from flask import Response, stream_with_context, request
     import json
     import time
-    from concurrent.futures import ThreadPoolExecutor
     
     date_str = request.args.get('date', datetime.now().strftime('%Y-%m-%d'))
-    logger.info(f"⚡ RECEIVED STATS VIEW REQUEST for {app_key} on {date_str} (STREAMING)")
-    
+    logger.info(f"⚡ RECEIVED STATS VIEW REQUEST for {app_key} on {date_str}")
+
+    # Capture real app object to pass context to background threads
+    app = current_app._get_current_object()
+
+    try:
+        dia = datetime.strptime(date_str, '%Y-%m-%d').date()
+    except ValueError:
+        dia = None  # get_app_stats_logic responde el 400
+
+    if dia is not None and request.args.get('refresh') != '1':
+        cached = stats_cache.lookup(app_key, dia)
+        if cached is not None:
+            info = cached["cache"]
+            if info["status"] == stats_cache.STALE and not info["refreshing"]:
+                info["refreshing"] = stats_cache.refresh_in_background(
+                    app, app_key, date_str, dia, get_app_stats_logic
+                )
+            logger.info(f"  ✓ Served from stats cache ({info['status']}, {info['age_seconds']}s old)")
+            return jsonify(cached), 200
+
+    logger.info(f"  ↪ No cached stats for {app_key} on {date_str}: live scraping (STREAMING)")
+
     def generate():
         # Flush buffer immediately with 2KB of spaces
         yield " " * 2048
         
-        # Setup Executor
-        executor = ThreadPoolExecutor(max_workers=1)
-        
-        # Capture real app object to pass context to thread
-        app = current_app._get_current_object()
-        
-        def run_logic():
-            # Call the existing logic which does scraping or file reading
-            # It returns (response_object, status_code)
-            with app.app_context():
-                return get_app_stats_logic(app_key, date_str)
-
-        future = executor.submit(run_logic)
+        # Same (app, date) requested twice in this worker shares one scraping
+        future = stats_cache.submit_once(app, app_key, date_str, get_app_stats_logic)
         
         # Heartbeat loop
         while not future.done():
@@ -189,6 +211,7 @@ def get_app_stats_logic(app_key, date_str):
         
         from app.scrapper import procesar_aplicacion
         
+        inicio = datetime.now()
         resultado = procesar_aplicacion(app_key, date_str, dia)
         
         logger.info(f"  ✓ Scraping completed for {app_key}")
@@ -196,76 +219,25 @@ def get_app_stats_logic(app_key, date_str):
         # DETAILED LOGGING - Show breakdown of new vs alerted
         logger.info(f"📊 DETAILED BREAKDOWN for {app_key} on {date_str}:")
         logger.info(f"  Controlled errors:")
-        logger.info(f"    - Nuevos (new): {len(resultado['controlados_nuevos'])}")
-        logger.info(f"    - Avisados (already alerted): {len(resultado['controlados_avisados'])}")
-        logger.info(f"    - TOTAL: {len(resultado['controlados_nuevos']) + len(resultado['controlados_avisados'])}")
+        logger.info(f"    - Nuevos (new): {len(resultado.controlados_nuevos)}")
+        logger.info(f"    - Avisados (already alerted): {len(resultado.controlados_avisados)}")
+        logger.info(f"    - TOTAL: {len(resultado.controlados_nuevos) + len(resultado.controlados_avisados)}")
         logger.info(f"  Uncontrolled errors:")
-        logger.info(f"    - Nuevos (new): {len(resultado['no_controlados_nuevos'])}")
-        logger.info(f"    - Avisados (already alerted): {len(resultado['no_controlados_avisados'])}")
-        logger.info(f"    - TOTAL: {len(resultado['no_controlados_nuevos']) + len(resultado['no_controlados_avisados'])}")
-        
-        # Get ALL errors (new + previously alerted)
-        controlados_all = resultado['controlados_nuevos'] + resultado['controlados_avisados']
-        no_controlados_all = resultado['no_controlados_nuevos'] + resultado['no_controlados_avisados']
-        
-        # Convert strings to dict format for aggregation
-        # Each error line is a string, but agregar_errores_por_firma expects dicts with 'firma' field
-        from app.signatures import build_signature
+        logger.info(f"    - Nuevos (new): {len(resultado.no_controlados_nuevos)}")
+        logger.info(f"    - Avisados (already alerted): {len(resultado.no_controlados_avisados)}")
+        logger.info(f"    - TOTAL: {len(resultado.no_controlados_nuevos) + len(resultado.no_controlados_avisados)}")
         
-        def convert_to_dict_format(error_lines, dia):
-            """Convert list of error strings to list of dicts with firma and full content"""
-            result = []
-            for line in error_lines:
-                firma = build_signature(line)
-                result.append({
-                    'firma': firma,
-                    'full_content': line,  # Preserve original full error content
-                    'timestamp': datetime.combine(dia, datetime.min.time())
-                })
-            return result
+        # Aggregate ALL errors (new + previously alerted) by signature, format for frontend
+        response_data = build_stats_payload(resultado)
         
-        controlados_dict = convert_to_dict_format(controlados_all, dia)
-        no_controlados_dict = convert_to_dict_format(no_controlados_all, dia)
+        # Next dashboard opens for this app/date are served from stats_cache
+        store_stats_snapshot(resultado, response_data, computed_at=inicio)
         
-        # Aggregate by signature
-        nc_aggregated = agregar_errores_por_firma(no_controlados_dict, dia)
-        c_aggregated = agregar_errores_por_firma(controlados_dict, dia)
-        
-        logger.info(f"  • Unique NC signatures: {len(nc_aggregated)}")
-        logger.info(f"  • Unique C signatures: {len(c_aggregated)}")
-        
-        # Format for frontend
-        uncontrolled_logs = format_errors_for_frontend(nc_aggregated)
-        controlled_logs = format_errors_for_frontend(c_aggregated)
-        
-        # Calculate SQL stats
-        sql_count = 0
-        non_sql_count = 0
-        
-        for err in nc_aggregated:
-            if es_error_sql(err['firma']):
-                sql_count += err['count']
-            else:
-                non_sql_count += err['count']
-        
-        logger.info(f"  • SQL errors: {sql_count}, Non-SQL: {non_sql_count}")
-        
-        # Extract SQLSTATE distribution for bar chart
-        sqlstate_dist = extract_sqlstate_distribution(nc_aggregated)
-        logger.info(f"  • SQLSTATE distribution: {len(sqlstate_dist)} unique codes")
-        
-        response_data = {
-            "logs": {
-                "uncontrolled": uncontrolled_logs,
-                "controlled": controlled_logs
-            },
-            "stats": {
-                "sqlstate_distribution": sqlstate_dist,
-                "sql_errors": sql_count,  # Keep for backward compatibility
-                "non_sql_errors": non_sql_count
-            },
-            "source": "real-time-scraping"
-        }
+        uncontrolled_logs = response_data["logs"]["uncontrolled"]
+        controlled_logs = response_data["logs"]["controlled"]
+        sql_count = response_data["stats"]["sql_errors"]
+        non_sql_count = response_data["stats"]["non_sql_errors"]
+        sqlstate_dist = response_data["stats"]["sqlstate_distribution"]
         
         # FINAL LOG - What we're actually sending to frontend
         logger.info(f"📤 SENDING TO FRONTEND:")
@@ -356,138 +328,6 @@ def get_app_stats_logic(app_key, date_str):
             }), 500
 
 
-def agregar_errores_por_firma(errores_lista, dia):
-    """
-    Agrupa errores por firma (signature) y cuenta recurrencias.
-    
-    Args:
-        errores_lista: Lista de dicts con 'firma', 'full_content', 'timestamp', etc.
-        dia: fecha del día (para defaults)
-    
-    Returns:
-        Lista de dicts: [{firma: str, full_content: str, count: int, first_time: datetime}, ...]
-        Ordenados por tiempo de primera aparición
-    """
-    from collections import defaultdict
-    
-    agregado = defaultdict(lambda: {'count': 0, 'first_time': None, 'full_content': None})
-    
-    for error in errores_lista:
-        firma = error.get('firma', 'Unknown error')
-        full_content = error.get('full_content', firma)  # Use full content if available
-        
-        # El timestamp puede venir de diferentes campos según la fuente
-        timestamp = error.get('timestamp') or error.get('fecha') or datetime.combine(dia, datetime.min.time())
-        
-        agregado[firma]['count'] += 1
-        
-        # Guardar timestamp más temprano y su contenido completo correspondiente
-        if agregado[firma]['first_time'] is None or timestamp < agregado[firma]['first_time']:
-            agregado[firma]['first_time'] = timestamp
-            agregado[firma]['full_content'] = full_content  # Store full content from first occurrence
-    
-    # Convertir a lista
-    result = []
-    for firma, data in agregado.items():
-        result.append({
-            'firma': firma,
-            'full_content': data['full_content'] or firma,  # Fallback to firma if no full content
-            'count': data['count'],
-            'first_time': data['first_time'] or datetime.combine(dia, datetime.min.time())
-        })
-    
-    # Ordenar por tiempo de primera aparición
-    result.sort(key=lambda x: x['first_time'])
-    
-    return result
-
-
-def format_errors_for_frontend(aggregated_errors):
-    """
-    Formatea errores agregados para el frontend.
-    
-    Args:
-        aggregated_errors: Lista de dicts con firma, full_content, count, first_time
-    
-    Returns:
-        Lista de dicts con timestamp, message, count (formato esperado por JS)
-    """
-    formatted = []
-    for err in aggregated_errors:
-        formatted.append({
-            "timestamp": err["first_time"].strftime('%Y-%m-%d %H:%M:%S'),
-            "message": err.get("full_content", err["firma"]),  # Use full content instead of signature
-            "count": err["count"]
-        })
-    return formatted
-
-
-def extract_sqlstate_distribution(aggregated_errors):
-    """
-    Extrae y agrupa errores por código SQLSTATE.
-    
-    Args:
-        aggregated_errors: Lista de errores con firma, count, first_time
-    
-    Returns:
-        Lista ordenada por first_time: [
-            {
-                'sqlstate': 'SQLSTATE[40001]',
-                'count': 3,
-                'first_time': '2025-12-21 01:00:41'
-            },
-            ...
-        ]
-    """
-    import re
-    from collections import defaultdict
-    
-    # Pattern para extraer SQLSTATE[XXXXX]
-    pattern = re.compile(r'SQLSTATE\[\w+\]')
-    
-    sqlstate_data = defaultdict(lambda: {'count': 0, 'first_time': None})
-    
-    for error in aggregated_errors:
-        firma = error['firma']
-        match = pattern.search(firma)
-        
-        if match:
-            sqlstate = match.group(0)
-            sqlstate_data[sqlstate]['count'] += error['count']
-            
-            # Guardar el timestamp más temprano
-            if sqlstate_data[sqlstate]['first_time'] is None or \
-               error['first_time'] < sqlstate_data[sqlstate]['first_time']:
-                sqlstate_data[sqlstate]['first_time'] = error['first_time']
-    
-    # Convertir a lista y ordenar por first_time
-    result = []
-    for sqlstate, data in sqlstate_data.items():
-        result.append({
-            'sqlstate': sqlstate,
-            'count': data['count'],
-            'first_time': data['first_time'].strftime('%Y-%m-%d %H:%M:%S') if data['first_time'] else None
-        })
-    
-    # Ordenar por tiempo de primera aparición
-    result.sort(key=lambda x: x['first_time'] if x['first_time'] else '')
-    
-    return result
-
-
-def es_error_sql(mensaje):
-    """
-    Detecta si un error es de tipo SQL.
-    Usa los mismos keywords que sms_notifier para consistencia.
-    
-    Args:
-        mensaje: texto del mensaje de error
-    
-    Returns:
-        bool: True si es error SQL, False si no
-    """
-    msg_upper = mensaje.upper()
-    return any(keyword in msg_upper for keyword in ['SQL', 'SQLSTATE', 'DATABASE', 'PDO'])
 @stats_bp.route('/send-email', methods=['POST'])
 @jwt_required()
 def send_error_email_endpoint():
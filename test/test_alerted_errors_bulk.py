@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# test_alerted_errors_bulk.py
+"""
+Benchmark de add_alerted_signatures() contra un Postgres local.
+
+Compara el INSERT por firma (implementación anterior) con el INSERT
+multi-fila por lotes, para 10, 1k y 100k firmas, y verifica que el
+resultado devuelto contenga solo las firmas realmente insertadas.
+
+Requiere PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE (mismos defaults que db/connection.py).
+
+Uso:
+    python test/test_alerted_errors_bulk.py            # 10, 1k, 100k
+    python test/test_alerted_errors_bulk.py 10 5000    # tamaños a medida
+"""
+
+import sys
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import init_db, add_alerted_signatures
+from db.alerted_errors import ALERT_SCOPE
+from db.connection import get_cursor
+
+BENCH_APP = "bench_bulk_insert"
+FECHA = date(2000, 1, 1)
+TIPO = "no_controlado"
+
+# Por encima de este tamaño el método anterior tarda demasiado; se omite
+LEGACY_MAX = 10_000
+
+
+def _limpiar() -> None:
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM alerted_errors WHERE app_key LIKE %s;", (BENCH_APP + "%",))
+
+
+def _insert_uno_por_uno(app_key: str, firmas: list) -> None:
+    """Implementación anterior: un INSERT (un round trip) por firma."""
+    with get_cursor() as cur:
+        for sig in firmas:
+            cur.execute(
+                """
+                INSERT INTO alerted_errors (app_key, fecha, tipo, signature, alert_scope)
+                VALUES (%s, %s, %s, %s, %s)
+                ON CONFLICT (app_key, fecha, tipo, signature, alert_scope) DO NOTHING;
+                """,
+                (app_key, FECHA, TIPO, sig, ALERT_SCOPE),
+            )
+
+
+def test_devuelve_solo_insertadas():
+    init_db()
+    _limpiar()
+    try:
+        primeras = add_alerted_signatures(BENCH_APP, FECHA, TIPO, ["a", "b", "b"])
+        assert primeras == {"a", "b"}
+        segundas = add_alerted_signatures(BENCH_APP, FECHA, TIPO, ["b", "c"])
+        assert segundas == {"c"}
+        assert add_alerted_signatures(BENCH_APP, FECHA, TIPO, []) == set()
+    finally:
+        _limpiar()
+
+
+def benchmark(tamanos=(10, 1_000, 100_000)) -> None:
+    init_db()
+    print("=" * 70)
+    print("BENCHMARK add_alerted_signatures (firmas/segundo)")
+    print("=" * 70)
+    print(f"{'firmas':>10} | {'uno por uno':>16} | {'por lotes':>16} | speedup")
+
+    for n in tamanos:
+        firmas = [f"SQLSTATE[{i:05d}] firma de prueba {i}" for i in range(n)]
+        _limpiar()
+
+        t_legacy = None
+        if n <= LEGACY_MAX:
+            inicio = time.perf_counter()
+            _insert_uno_por_uno(BENCH_APP + "_legacy", firmas)
+            t_legacy = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        insertadas = add_alerted_signatures(BENCH_APP, FECHA, TIPO, firmas)
+        t_bulk = time.perf_counter() - inicio
+        assert len(insertadas) == n
+
+        legacy_str = f"{n / t_legacy:12.0f} /s" if t_legacy else f"{'(omitido)':>14}"
+        speedup = f"x{t_legacy / t_bulk:.1f}" if t_legacy else "-"
+        print(f"{n:>10} | {legacy_str:>16} | {n / t_bulk:12.0f} /s | {speedup}")
+
+    _limpiar()
+
+
+if __name__ == "__main__":
+    test_devuelve_solo_insertadas()
+    print("✅ add_alerted_signatures devuelve solo las firmas nuevas\n")
+    tamanos = tuple(int(x) for x in sys.argv[1:]) or (10, 1_000, 100_000)
+    benchmark(tamanos)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# test_backend_metrics.py
+"""
+Prueba de /metrics del backend (t4alerts_backend/common/metrics.py).
+
+- Latencia por endpoint, incluida una respuesta en streaming (se mide hasta
+  el último chunk, no hasta el primer byte).
+- Etapas / contadores / cachés de app.run_metrics llegan a Prometheus aunque
+  no haya una corrida de main.py (scrape por app, bytes, ssl_check, log_index).
+- track_query() y las métricas del pool de BD.
+- Modo multiproceso (gunicorn con varios workers): dos procesos atienden
+  requests y un tercero, con el mismo PROMETHEUS_MULTIPROC_DIR, las suma.
+- Un proceso que solo importa el módulo (main.py, Celery) no escribe en
+  PROMETHEUS_MULTIPROC_DIR ni suscribe el listener; gunicorn.conf.py sí
+  registra /metrics en cada worker (post_worker_init).
+
+Uso:
+    python test/test_backend_metrics.py
+"""
+
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from flask import Flask, Response
+from prometheus_client.parser import text_string_to_metric_families
+
+from app import run_metrics
+
+
+def _app():
+    from t4alerts_backend.common.metrics import init_metrics
+
+    app = Flask(__name__)
+    init_metrics(app)
+
+    @app.route("/api/ping")
+    def ping():
+        return {"ok": True}
+
+    @app.route("/api/lento")
+    def lento():
+        def generate():
+            yield " "
+            time.sleep(0.3)
+            yield "{}"
+        return Response(generate(), mimetype="application/json")
+
+    return app
+
+
+def _muestras(texto):
+    """{(nombre, labels ordenados): valor} de la salida de /metrics."""
+    muestras = {}
+    for familia in text_string_to_metric_families(texto):
+        for m in familia.samples:
+            muestras[(m.name, tuple(sorted(m.labels.items())))] = m.value
+    return muestras
+
+
+def _get_metrics(client):
+    resp = client.get("/metrics")
+    assert resp.status_code == 200, resp.status_code
+    return _muestras(resp.get_data(as_text=True))
+
+
+def test_latencia_por_endpoint_y_streaming():
+    app = _app()
+    client = app.test_client()
+    for _ in range(3):
+        client.get("/api/ping").close()
+    resp = client.get("/api/lento")
+    assert resp.get_data(as_text=True).endswith("{}")
+    resp.close()
+    client.get("/no-existe").close()
+
+    m = _get_metrics(client)
+    ping = (("endpoint", "ping"), ("method", "GET"), ("status", "200"))
+    lento = (("endpoint", "lento"), ("method", "GET"), ("status", "200"))
+    assert m[("t4alerts_http_request_duration_seconds_count", ping)] >= 3
+    assert m[("t4alerts_http_request_duration_seconds_sum", lento)] >= 0.3
+    assert m[("t4alerts_http_request_duration_seconds_count",
+              (("endpoint", "unmatched"), ("method", "GET"), ("status", "404")))] >= 1
+
+
+def test_eventos_de_run_metrics():
+    app = _app()
+    client = app.test_client()
+    with run_metrics.track_app("demo_app"):
+        with run_metrics.stage("scrape"):
+            with run_metrics.stage("classify"):
+                pass
+            run_metrics.count("bytes_fetched", 2048)
+            run_metrics.count("errors", 7)
+    with run_metrics.stage("ssl_check"):
+        pass
+    run_metrics.cache_event("log_index", True)
+    run_metrics.cache_event("log_index", False)
+
+    m = _get_metrics(client)
+    assert m[("t4alerts_scrape_duration_seconds_count", (("app", "demo_app"),))] >= 1
+    assert m[("t4alerts_scrape_stage_seconds_count", (("app", "demo_app"), ("stage", "classify")))] >= 1
+    assert m[("t4alerts_scrape_bytes_fetched_total", (("app", "demo_app"),))] >= 2048
+    assert m[("t4alerts_scrape_items_total", (("app", "demo_app"), ("name", "errors")))] >= 7
+    assert m[("t4alerts_ssl_check_duration_seconds_count", ())] >= 1
+    assert m[("t4alerts_cache_requests_total", (("cache", "log_index"), ("result", "hit")))] >= 1
+    assert m[("t4alerts_cache_requests_total", (("cache", "log_index"), ("result", "miss")))] >= 1
+
+
+def test_consultas_pool_y_firmas():
+    from app.signatures import build_signature
+    from t4alerts_backend.common.metrics import track_query
+
+    app = _app()
+    client = app.test_client()
+    with track_query("dashboard_errors_by_app"):
+        time.sleep(0.01)
+    build_signature("ERROR - production - 2026-02-15 10:00:00 - metrica unica")
+    build_signature("ERROR - production - 2026-02-15 10:00:00 - metrica unica")
+    # Las métricas acumuladas del proceso se pasan al cerrar cada request
+    client.get("/api/ping").close()
+
+    m = _get_metrics(client)
+    assert m[("t4alerts_db_query_duration_seconds_sum", (("query", "dashboard_errors_by_app"),))] >= 0.01
+    assert m[("t4alerts_cache_requests_total", (("cache", "signature_alert"), ("result", "hit")))] >= 1
+    assert ("t4alerts_db_pool_connections_in_use", ()) in m
+
+
+_WORKER = """
+import os, sys
+sys.path.insert(0, {root!r})
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+sys.path.insert(0, os.path.join({root!r}, "test"))
+from test_backend_metrics import _app
+client = _app().test_client()
+for _ in range({n}):
+    client.get("/api/ping").close()
+if {imprimir}:
+    sys.stdout.write("--- metrics ---\\n" + client.get("/metrics").get_data(as_text=True))
+"""
+
+
+def test_multiproceso():
+    with tempfile.TemporaryDirectory() as directorio:
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directorio)
+
+        def correr(n, imprimir):
+            codigo = _WORKER.format(root=str(ROOT), n=n, imprimir=imprimir)
+            return subprocess.run([sys.executable, "-c", codigo], env=env, check=True,
+                                  capture_output=True, text=True).stdout
+
+        correr(2, False)
+        correr(3, False)
+        salida = correr(0, True)
+
+    m = _muestras(salida.split("--- metrics ---\n", 1)[1])
+    ping = (("endpoint", "ping"), ("method", "GET"), ("status", "200"))
+    assert m[("t4alerts_http_request_duration_seconds_count", ping)] == 5, m
+
+
+_SOLO_IMPORTA = """
+import os, sys
+sys.path.insert(0, {root!r})
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+from app import run_metrics
+import t4alerts_backend.common.metrics
+from t4alerts_backend.common.metrics import track_query
+with track_query("scraper_query"):
+    pass
+with run_metrics.track_app("scraper_app"):
+    with run_metrics.stage("scrape"):
+        pass
+assert not run_metrics._LISTENERS, run_metrics._LISTENERS
+"""
+
+
+def test_sin_init_no_escribe_metricas():
+    with tempfile.TemporaryDirectory() as directorio:
+        env = dict(os.environ, PROMETHEUS_MULTIPROC_DIR=directorio)
+        subprocess.run([sys.executable, "-c", _SOLO_IMPORTA.format(root=str(ROOT))],
+                       env=env, check=True, capture_output=True, text=True)
+        assert os.listdir(directorio) == [], os.listdir(directorio)
+
+
+def test_gunicorn_registra_metrics_en_el_worker():
+    conf = runpy.run_path(str(ROOT / "t4alerts_backend" / "gunicorn.conf.py"))
+    app = Flask(__name__)
+    assert "metrics" not in app.view_functions
+
+    class Worker:
+        wsgi = app
+
+    conf["post_worker_init"](Worker())
+    assert "metrics" in app.view_functions
+    assert app.test_client().get("/metrics").status_code == 200
+
+
+if __name__ == "__main__":
+    test_latencia_por_endpoint_y_streaming()
+    test_eventos_de_run_metrics()
+    test_consultas_pool_y_firmas()
+    test_multiproceso()
+    test_sin_init_no_escribe_metricas()
+    test_gunicorn_registra_metrics_en_el_worker()
+    print("✅ /metrics: latencia por ruta, scraping, cachés, BD y modo multiproceso")
@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# test_celery_fanout.py
+"""
+Prueba del fan-out por app en Celery (scheduler_celery/tasks.py) en modo
+eager (sin broker): chord de scrape_app → aggregate_and_notify.
+
+- cada app se scrapea en su propia tarea; los reintentos son solo de esa app
+- una app con error transitorio reintenta y termina bien; las sanas se
+  scrapean una sola vez
+- logs desactualizados (error definitivo) no reintenta y avisa como siempre
+- una app que nunca responde agota sus reintentos, avisa el error de conexión
+  y no rompe el chord: el callback igual notifica a las demás
+- si una app falla después de marcar sus firmas en alerted_errors (p. ej. al
+  guardar los .log), el reintento las vuelve a ver como nuevas y se notifican
+- las apps de un mismo host van en cadena (SCRAPER_MAX_PER_HOST) y el
+  callback escribe el reporte de tiempos con las etapas de todas las apps
+- los ScrapingResult viajan como JSON y se rearman iguales en el callback
+- las colas de scrape_app / aggregate_and_notify salen de celery_config.py
+
+El scraping y el envío se reemplazan por funciones locales: acá se prueba el
+reparto, los reintentos y la agregación, no la red. El caso de alerted_errors
+usa un Postgres local (PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE).
+
+Uso:
+    python test/test_celery_fanout.py
+"""
+
+import json
+import os
+from contextlib import contextmanager
+import sys
+import tempfile
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='fanout_')}/t4alerts.db")
+os.environ.setdefault("RUN_REPORT_PATH", "")
+os.environ["SCRAPE_APP_RETRY_BASE_SECONDS"] = "0"
+os.environ["SCRAPE_APP_MAX_RETRIES"] = "2"
+os.environ["CELERY_SCRAPE_QUEUE"] = "scrape"
+
+import requests
+
+from app.log_entry import LogEntry
+from app.logs_scraper import StaleLogsError
+from app.result import ScrapingResult
+from scheduler_celery import tasks
+from scheduler_celery.celery_app import app as celery_app
+
+APPS = {
+    "fanout_sana": {"name": "Sana"},
+    "fanout_inestable": {"name": "Inestable"},
+    "fanout_vieja": {"name": "Vieja"},
+    "fanout_caida": {"name": "Caida"},
+}
+LLAMADAS = []
+NOTIFICADAS = []
+AVISOS = []
+
+
+def _procesar_falso(app_key, fecha_str, dia):
+    LLAMADAS.append(app_key)
+    if app_key == "fanout_inestable" and LLAMADAS.count(app_key) < 3:
+        raise requests.exceptions.ConnectionError("reset by peer")
+    if app_key == "fanout_caida":
+        raise requests.exceptions.ConnectionError("timeout")
+    if app_key == "fanout_vieja":
+        raise StaleLogsError("logs viejos", app_key=app_key, fecha_str=fecha_str, days_old=3, most_recent_date=dia)
+    error = LogEntry("ERROR", "production", f"{fecha_str} 10:00:00", "SQLSTATE[40001] x - y\n#0 a.php")
+    return ScrapingResult(app_key=app_key, app_name=APPS[app_key]["name"], dia=dia, fecha_str=fecha_str,
+                          no_controlados_nuevos=[error])
+
+
+def _parchar():
+    import main
+
+    # sana e inestable comparten host; vieja y caída tienen uno propio cada una
+    main.host_de_app = lambda app_key: "compartido" if app_key in ("fanout_sana", "fanout_inestable") else app_key
+
+    main.procesar_aplicacion = _procesar_falso
+    main.cargar_apps = lambda flask_app=None: dict(APPS)
+    main.store_stats_snapshot = lambda *args, **kwargs: False
+    main.notificar_apps = lambda resultados: NOTIFICADAS.append(list(resultados)) or {}
+    main.notificar_logs_desactualizados = lambda **kwargs: AVISOS.append(("stale", kwargs["app_key"]))
+    main.notificar_error_conexion = lambda **kwargs: AVISOS.append(("conexion", kwargs["app_key"]))
+    celery_app.conf.task_always_eager = True
+
+
+def test_chord_por_app():
+    from app import run_metrics
+
+    _parchar()
+    hoy = str(date.today())
+    reporte = Path(tempfile.mkdtemp(prefix="fanout_report_")) / "run_report.json"
+    run_metrics.RUN_REPORT_PATH = str(reporte)
+    try:
+        resumen = tasks.dispatch_round(hoy)
+    finally:
+        run_metrics.RUN_REPORT_PATH = ""
+    assert resumen["apps"] == list(APPS)
+    assert resumen["lanes"] == 3  # sana → inestable en cadena (mismo host)
+
+    # Reintentos solo de cada app: la sana una vez, la inestable 3, la caída 1 + 2 reintentos
+    assert LLAMADAS.count("fanout_sana") == 1
+    assert LLAMADAS.count("fanout_inestable") == 3
+    assert LLAMADAS.count("fanout_vieja") == 1           # definitivo: sin reintentos
+    assert LLAMADAS.count("fanout_caida") == 3
+    assert sorted(AVISOS) == [("conexion", "fanout_caida"), ("stale", "fanout_vieja")]
+
+    # Una sola ronda de notificaciones, con los resultados rearmados
+    assert len(NOTIFICADAS) == 1
+    notificados = {r.app_key: r for r in NOTIFICADAS[0]}
+    assert set(notificados) == {"fanout_sana", "fanout_inestable"}
+    sana = notificados["fanout_sana"]
+    assert sana.dia == date.today() and sana.no_controlados_nuevos == _procesar_falso(
+        "fanout_sana", hoy, date.today()).no_controlados_nuevos
+    # Reporte de la ronda con las etapas medidas en cada scrape_app
+    datos = json.loads(reporte.read_text())
+    assert set(datos["apps"]) == set(APPS)
+    assert datos["apps"]["fanout_sana"]["status"] == "ok"
+    assert datos["apps"]["fanout_caida"]["status"] == "skipped"  # error de conexión ya avisado
+    assert "stats_snapshot" not in datos["apps"]["fanout_sana"]["stages"]  # snapshot parchado
+    assert not run_metrics.current_run().to_dict()["apps"].keys() - set(APPS)
+    print(f"  chord de {len(APPS)} apps: {len(LLAMADAS)} scrapes en total, 1 ronda de notificaciones")
+
+
+def test_reintento_no_pierde_los_nuevos():
+    import main
+    from app import scrapper
+    from db import init_db
+    from db import error_history
+    from db.connection import get_cursor
+
+    _parchar()
+    app_key = "fanout_rollback"
+    error = LogEntry("ERROR", "production", f"{date.today()} 10:00:00", "Undefined index: fanout")
+    guardados = []
+
+    def _guardar_falla_una_vez(controlados, no_controlados, **kwargs):
+        guardados.append(list(no_controlados))
+        if len(guardados) == 1:
+            raise OSError("disco lleno")
+
+    @contextmanager
+    def _sesion(*args, **kwargs):
+        yield None
+
+    parches = {
+        "get_app_credentials": lambda key: ("Rollback", "u", "p"),
+        "create_logged_session": _sesion,
+        "fetch_logs_html": lambda session, fecha_str, key: "<html/>",
+        "classify_logs": lambda html, key: ([], [error]),
+        "save_logs": _guardar_falla_una_vez,
+    }
+    originales = {nombre: getattr(scrapper, nombre) for nombre in parches}
+    historial = error_history.insert_error_history_batch
+    init_db()
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM alerted_errors WHERE app_key = %s;", (app_key,))
+    try:
+        for nombre, fn in parches.items():
+            setattr(scrapper, nombre, fn)
+        error_history.insert_error_history_batch = lambda app_name, errores: {"inserted": 0, "duplicates": 0}
+        main.procesar_aplicacion = scrapper.procesar_aplicacion
+
+        [salida] = tasks.scrape_app.apply(args=([], app_key, str(date.today()))).get()
+    finally:
+        for nombre, fn in originales.items():
+            setattr(scrapper, nombre, fn)
+        error_history.insert_error_history_batch = historial
+        with get_cursor() as cur:
+            cur.execute("DELETE FROM alerted_errors WHERE app_key = %s;", (app_key,))
+
+    # El primer intento marcó la firma y falló al guardar: el segundo la ve nueva
+    assert salida["status"] == "ok" and salida["attempts"] == 2, salida
+    assert guardados == [[error], [error]]
+    assert salida["result"]["no_controlados_nuevos"] == [str(error)]
+    assert salida["result"]["no_controlados_avisados"] == []
+
+
+def test_resultado_de_scrape_app_es_json():
+    _parchar()
+    [salida] = tasks.scrape_app.apply(args=([], "fanout_sana", str(date.today()))).get()
+    assert salida["status"] == "ok" and salida["attempts"] == 1
+    ida_y_vuelta = json.loads(json.dumps(salida))
+    assert ScrapingResult.from_dict(ida_y_vuelta["result"]).to_dict() == salida["result"] | {"dia": date.today()}
+
+
+def test_carriles_por_host():
+    import main
+
+    _parchar()
+    carriles = main.carriles_por_host(list(APPS), 1)
+    assert carriles == [["fanout_sana", "fanout_inestable"], ["fanout_vieja"], ["fanout_caida"]]
+    assert main.carriles_por_host(list(APPS), 2) == [["fanout_sana"], ["fanout_inestable"],
+                                                     ["fanout_vieja"], ["fanout_caida"]]
+
+
+def test_rutas_configurables():
+    rutas = celery_app.conf.task_routes
+    assert rutas["scheduler_celery.tasks.scrape_app"] == {"queue": "scrape"}
+    assert rutas["scheduler_celery.tasks.aggregate_and_notify"] == {"queue": "celery"}
+    assert celery_app.conf.worker_prefetch_multiplier == 1
+    assert tasks.scrape_app.max_retries == 2
+
+
+if __name__ == "__main__":
+    test_chord_por_app()
+    test_reintento_no_pierde_los_nuevos()
+    test_resultado_de_scrape_app_es_json()
+    test_carriles_por_host()
+    test_rutas_configurables()
+    print("✅ Fan-out Celery: una tarea por app, reintentos por app y una sola notificación agregada")
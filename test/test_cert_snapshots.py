@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# test_cert_snapshots.py
+"""
+Prueba de los snapshots de certificados (t4alerts_backend/certificates/snapshots.py)
+con una BD sqlite temporal y servidores TLS locales autofirmados:
+
+- el intervalo de refresco se achica a medida que se acerca el vencimiento
+- GET /api/certificates/status sin snapshots: PENDING y despierta al refresco
+- el hilo de refresco guarda fingerprint / notAfter / emisor y /status sirve
+  desde la BD (sin handshakes) con los días recalculados
+- POST /check fuerza el chequeo; si falla, se conserva el último certificado
+  conocido marcado "stale"
+- lease entre workers: un host lo toma un solo proceso
+
+Uso:
+    python test/test_cert_snapshots.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from ssl_checker.checker import SSLChecker
+from t4alerts_backend.certificates import certificates_bp
+from t4alerts_backend.certificates import snapshots
+from t4alerts_backend.certificates.models import SSLCertificate, SSLCertificateSnapshot
+from t4alerts_backend.common.database import db
+
+sys.path.insert(0, str(ROOT / "test"))
+from test_ssl_checker_concurrent import _puerto_cerrado, _servidor_tls  # noqa: E402
+
+# Solo los dominios dinámicos del test: nada de salir a los hosts reales de APPS_CONFIG
+SSLChecker.get_domains = lambda self: []
+snapshots.CERT_REFRESH_POLL_SECONDS = 0.2
+
+
+def _app():
+    flask_app = Flask(__name__)
+    flask_app.config["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp(prefix='certs_')}/t4alerts.db"
+    flask_app.config["JWT_SECRET_KEY"] = "clave-de-prueba-de-al-menos-32-bytes"
+    db.init_app(flask_app)
+    JWTManager(flask_app)
+    flask_app.register_blueprint(certificates_bp, url_prefix="/api/certificates")
+    with flask_app.app_context():
+        db.create_all()
+        token = create_access_token(identity="tester", additional_claims={"role": "admin"})
+    return flask_app, {"Authorization": f"Bearer {token}"}
+
+
+def _esperar(flask_app, hostnames, timeout=10):
+    """Espera a que el refresco de fondo guarde un chequeo de cada host."""
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        with flask_app.app_context():
+            listos = SSLCertificateSnapshot.query.filter(
+                SSLCertificateSnapshot.hostname.in_(hostnames),
+                SSLCertificateSnapshot.last_attempt_at.isnot(None),
+            ).count()
+        if listos == len(hostnames):
+            return
+        time.sleep(0.05)
+    raise AssertionError("el refresco de fondo no guardó los snapshots")
+
+
+def test_intervalos():
+    assert snapshots.next_check_delay(90, True) == timedelta(hours=24)
+    assert snapshots.next_check_delay(20, True) == timedelta(hours=6)
+    assert snapshots.next_check_delay(7, True) == timedelta(hours=1)
+    assert snapshots.next_check_delay(-2, True) == timedelta(hours=1)
+    assert snapshots.next_check_delay(None, False) == timedelta(minutes=snapshots.CERT_RETRY_MINUTES)
+
+
+def test_status_desde_snapshots():
+    sano = _servidor_tls(60, "snap_sano")
+    por_vencer = _servidor_tls(5, "snap_por_vencer")
+    flask_app, headers = _app()
+    with flask_app.app_context():
+        db.session.add(SSLCertificate(hostname="localhost", port=sano))
+        db.session.add(SSLCertificate(hostname="127.0.0.1", port=por_vencer))
+        db.session.commit()
+    client = flask_app.test_client()
+
+    # Primera carga: todavía no hay snapshots
+    resp = client.get("/api/certificates/status", headers=headers)
+    assert resp.status_code == 200, resp.data
+    assert {r["status"] for r in resp.get_json()} == {"PENDING"}
+    _esperar(flask_app, ["localhost", "127.0.0.1"])
+
+    t0 = time.perf_counter()
+    resp = client.get("/api/certificates/status", headers=headers)
+    ms = (time.perf_counter() - t0) * 1000
+    por_host = {r["hostname"]: r for r in resp.get_json()}
+    ok, critico = por_host["localhost"], por_host["127.0.0.1"]
+    assert ok["status"] == "OK" and ok["days_left"] == 60, ok
+    assert ok["issuer"] == "Test CA snap_sano" and len(ok["fingerprint_sha256"]) == 64
+    assert ok["checked_at"] and ok["is_dynamic"] and ok["id"]
+    assert critico["status"] == "WARNING" and critico["days_left"] == 5, critico
+
+    with flask_app.app_context():
+        snap = db.session.get(SSLCertificateSnapshot, "localhost")
+        assert snap.next_check_at - snap.checked_at == timedelta(hours=24)
+        assert db.session.get(SSLCertificateSnapshot, "127.0.0.1").next_check_at \
+            - snap.checked_at <= timedelta(hours=1, seconds=5)
+        # Los días se recalculan contra notAfter: mañana el mismo snapshot dice 59
+        manana = snapshots.status_from_snapshot(snap, datetime.utcnow() + timedelta(days=1))
+        assert manana["days_left"] == 59
+
+    # /check forzado contra un puerto caído: error, pero sigue el último certificado conocido
+    with flask_app.app_context():
+        SSLCertificate.query.filter_by(hostname="localhost").first().port = _puerto_cerrado()
+        db.session.commit()
+    resp = client.post("/api/certificates/check", json={"hostname": "https://localhost/"}, headers=headers)
+    assert resp.get_json()["status"] == "ERROR"
+    ok = {r["hostname"]: r for r in client.get("/api/certificates/status", headers=headers).get_json()}["localhost"]
+    assert ok["status"] == "OK" and ok["stale"] and ok["error"], ok
+    with flask_app.app_context():
+        snap = db.session.get(SSLCertificateSnapshot, "localhost")
+        assert snap.next_check_at - snap.last_attempt_at == timedelta(minutes=snapshots.CERT_RETRY_MINUTES)
+
+    # Borrar un dominio dinámico borra su snapshot
+    with flask_app.app_context():
+        cert_id = SSLCertificate.query.filter_by(hostname="127.0.0.1").first().id
+    assert client.delete(f"/api/certificates/{cert_id}", headers=headers).status_code == 200
+    with flask_app.app_context():
+        assert db.session.get(SSLCertificateSnapshot, "127.0.0.1") is None
+    print(f"  /api/certificates/status desde snapshots: {ms:.1f} ms")
+
+
+def test_lease():
+    flask_app, _ = _app()
+    with flask_app.app_context():
+        ahora = datetime.utcnow()
+        db.session.add(SSLCertificateSnapshot(hostname="lease.test", port=443, next_check_at=ahora))
+        db.session.commit()
+        assert snapshots._tomar("lease.test", ahora)
+        assert not snapshots._tomar("lease.test", ahora)  # otro worker
+        vencido = ahora + timedelta(seconds=snapshots.CERT_REFRESH_LEASE + 1)
+        assert snapshots._tomar("lease.test", vencido)    # worker muerto: se retoma
+
+
+if __name__ == "__main__":
+    test_intervalos()
+    test_status_desde_snapshots()
+    test_lease()
+    print("✅ Snapshots de certificados: /status sin handshakes, refresco según vencimiento y /check forzado")
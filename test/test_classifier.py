@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# test_classifier.py
+"""
+Prueba del plan de clasificación precompilado (app/classifier.py).
+
+- Sobre un corpus sintético variado, _clasificar_filas() y build_signature()
+  dan exactamente lo mismo que las implementaciones anteriores (copiadas acá).
+- Micro-benchmark sobre 1.000.000 de entradas: clasificación + firma por fila,
+  implementación anterior vs plan compilado (y, como referencia, una regex
+  combinada de una sola pasada sobre una muestra).
+
+Uso:
+    python test/test_classifier.py            # equivalencia + benchmark 1M
+    python test/test_classifier.py 200000     # benchmark más corto
+"""
+
+import itertools
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app.classifier import ClassificationPlan
+from app.config import KEYWORDS_NO_CONTROLADO
+from app.logs_scraper import _clasificar_filas
+from app.signatures import build_signature
+
+# --- implementaciones anteriores (copiadas antes del cambio) ---
+
+_LEGACY_CUT_TOKENS = ["[stacktrace]", '{"Request :', "Accept:", "Host:", "User-Agent:"]
+_LEGACY_SQLSTATE_RE = re.compile(r"(SQLSTATE\[[0-9A-Z]+\])")
+
+
+def _legacy_signature(line, tokens=_LEGACY_CUT_TOKENS):
+    msg = line
+    for token in tokens:
+        idx = msg.find(token)
+        if idx != -1:
+            msg = msg[:idx]
+    m = _LEGACY_SQLSTATE_RE.search(msg)
+    if m:
+        msg = msg[: m.end()]
+    return msg.strip()
+
+
+def _legacy_es_no_controlado(texto):
+    t = texto.lower()
+    return any(keyword in t for keyword in KEYWORDS_NO_CONTROLADO)
+
+
+def _legacy_clasificar(level, content):
+    level_lower = level.lower()
+    content_lower = content.lower()
+    is_error = level_lower == "error"
+    is_info_with_error = level_lower == "info" and (
+        '"error":' in content_lower or
+        '&quot;error&quot;:' in content_lower or
+        '\\"error\\":' in content_lower
+    )
+    if not (is_error or is_info_with_error):
+        return None
+    return _legacy_es_no_controlado(content)
+
+
+def _legacy_clasificar_filas(rows):
+    controlados, no_controlados = [], []
+    for cols in rows:
+        if len(cols) < 4:
+            continue
+        level, context, fecha, content = cols[:4]
+        r = _legacy_clasificar(level, content)
+        if r is None:
+            continue
+        (no_controlados if r else controlados).append(f"{level.upper()} - {context} - {fecha} - {content}")
+    return controlados, no_controlados
+
+
+# --- corpus sintético ---
+
+_PIEZAS = [
+    "SQLSTATE[40001]: Serialization failure",
+    "SQLSTATE[HY000] [2002] Connection refused",
+    "sqlstate[23000] en minúsculas",
+    "SQLSTATE[4200 sin cerrar",
+    '{"exception":"[object] (PDOException(code: 40001) at /app/x.php:12)',
+    "[stacktrace]\n#0 /app/vendor/laravel/framework/src/Illuminate/Database/Connection.php(671)",
+    '{"Request : "POST /api/orders"}',
+    "Accept: application/json",
+    "Host: api.example.com",
+    "User-Agent: okhttp/4.9",
+    "host: minúsculas no cortan",
+    '{"error":"token expirado"}',
+    '&quot;error&quot;: &quot;sin saldo&quot;',
+    '{\\"error\\":\\"anidado\\"}',
+    '"Error": mayúscula',
+    "Undefined index: foo",
+    "İstanbul ÆØÅ ß unicode",
+    "Exception: mayúsculas",
+    "PDOException",
+    "x" * 300,
+    "",
+]
+
+
+def _entrada(rnd):
+    level = rnd.choice(["error", "ERROR", "info", "INFO", "debug", "warning", "Info"])
+    partes = rnd.sample(_PIEZAS, rnd.randint(0, 5))
+    content = f"msg {rnd.randint(0, 10**6)} " + " ".join(partes)
+    return [level, rnd.choice(["production", "local"]), "2026-02-15 10:00:00", content]
+
+
+def _corpus(n, seed=7):
+    rnd = random.Random(seed)
+    return [_entrada(rnd) for _ in range(n)]
+
+
+def test_clasificacion_identica():
+    filas = _corpus(20000)
+    assert _clasificar_filas(filas) == _legacy_clasificar_filas(filas)
+
+
+def test_firma_identica():
+    for cols in _corpus(20000, seed=11):
+        linea = f"{cols[0].upper()} - {cols[1]} - {cols[2]} - {cols[3]}"
+        assert build_signature(linea) == _legacy_signature(linea), linea
+    for pieza in _PIEZAS:
+        for otra in _PIEZAS:
+            linea = f"ERROR - production - x - {pieza}{otra}"
+            assert build_signature(linea) == _legacy_signature(linea), linea
+
+
+def test_tokens_que_se_solapan_con_sqlstate():
+    """Un token que empieza dentro de SQLSTATE[...] corta antes, como antes."""
+    tokens = ["STATE[4", "0001]", "SQL", "Host:"]
+    for linea in ["x SQLSTATE[40001]: y Host: z", "SQLSTATE[HY000] Host:", "a SQLSTATE[50001] b",
+                  "SQLSTATE[", "QLSTATE[40001]", "Host: SQLSTATE[40001]"]:
+        for ts in (tokens, tokens[1:], tokens[3:], []):
+            plan = ClassificationPlan(cut_tokens=ts)
+            assert plan.signature(linea) == _legacy_signature(linea, ts), (linea, ts)
+
+
+def test_palabras_redundantes():
+    plan = ClassificationPlan(keywords=["sqlstate", "exception", "pdoexception", "SQLSTATE"])
+    assert plan.keywords == ("sqlstate", "exception")
+
+
+# --- benchmark ---
+
+def _combinada():
+    """Referencia: una sola regex con todas las alternativas (ver docstring del módulo)."""
+    alternativas = [r"SQLSTATE\[[0-9A-Z]+\]"] + sorted(
+        [re.escape(t) for t in _LEGACY_CUT_TOKENS]
+        + ["(?i:%s)" % re.escape(k) for k in KEYWORDS_NO_CONTROLADO]
+        + ["(?i:%s)" % re.escape(m) for m in ('"error":', '&quot;error&quot;:', '\\"error\\":')],
+        key=len, reverse=True,
+    )
+    rx = re.compile("|".join(alternativas))
+    kws = [k.lower() for k in KEYWORDS_NO_CONTROLADO]
+
+    def clasificar(level, content):
+        level_lower = level.lower()
+        if level_lower not in ("error", "info"):
+            return None
+        pos, corte, nc, err = 0, None, False, False
+        while True:
+            m = rx.search(content, pos)
+            if not m:
+                break
+            t = m.group()
+            tl = t.lower()
+            if corte is None:
+                if t.startswith("SQLSTATE["):
+                    corte = m.end()
+                elif t in _LEGACY_CUT_TOKENS:
+                    corte = m.start()
+            nc = nc or any(k in tl for k in kws)
+            err = err or "error" in tl
+            pos = m.start() + 1
+        if level_lower == "info" and not err:
+            return None
+        return nc, corte
+    return clasificar
+
+
+def _bench_corpus(distintas=20000, seed=3):
+    """Entradas realistas: INFO sin error, INFO con payload, ERROR con stacktrace largo."""
+    rnd = random.Random(seed)
+    filas = []
+    for i in range(distintas):
+        r = i % 10
+        if r < 4:
+            filas.append(("info", f"request ok id={i} " + "x" * rnd.randint(50, 400)))
+        elif r < 6:
+            filas.append(("info", f'respuesta {{"error":"token {i}"}} Host: api.x.com Accept: */*'))
+        elif r < 9:
+            traza = "#0 /app/vendor/laravel/framework/src/Illuminate/Database/Connection.php(671): run()\n"
+            filas.append(("error", f"SQLSTATE[40001]: Serialization failure id={i} "
+                                   f"{{\"exception\":\"[object] (PDOException(code: 40001))\n[stacktrace]\n"
+                                   + traza * rnd.randint(5, 40) + '"}'))
+        else:
+            filas.append(("error", f"Undefined index: foo in /app/x.php line {i} " + "y" * rnd.randint(20, 200)))
+    return filas
+
+
+def _medir(fn, filas, n):
+    t0 = time.perf_counter()
+    for level, content in itertools.islice(itertools.cycle(filas), n):
+        fn(level, content)
+    return time.perf_counter() - t0
+
+
+def bench(n=1_000_000):
+    filas = _bench_corpus()
+    plan = ClassificationPlan(keywords=KEYWORDS_NO_CONTROLADO)
+
+    def anterior(level, content):
+        if _legacy_clasificar(level, content) is not None:
+            _legacy_signature(content)
+
+    def compilado(level, content):
+        if plan.classify(level, content) is not None:
+            plan.cut_index(content)
+
+    t_ant = _medir(anterior, filas, n)
+    t_comp = _medir(compilado, filas, n)
+    muestra = max(1, n // 20)
+    t_rx = _medir(_combinada(), filas, muestra) * (n / muestra)
+
+    print(f"\nClasificación + firma, {n:,} entradas:")
+    print(f"  anterior (varias pasadas):     {t_ant:6.2f} s  ({n / t_ant:>11,.0f} entradas/s)")
+    print(f"  plan compilado:                {t_comp:6.2f} s  ({n / t_comp:>11,.0f} entradas/s)  x{t_ant / t_comp:.2f}")
+    print(f"  regex combinada (estimado):    {t_rx:6.2f} s  ({n / t_rx:>11,.0f} entradas/s)  x{t_ant / t_rx:.2f}")
+
+
+if __name__ == "__main__":
+    test_clasificacion_identica()
+    test_firma_identica()
+    test_tokens_que_se_solapan_con_sqlstate()
+    test_palabras_redundantes()
+    print("✅ Plan compilado: misma clasificación y mismas firmas que antes")
+
+    bench(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# test_db_pool.py
+"""
+Prueba del pool de conexiones de db/connection.py contra un Postgres local.
+
+- Muchos hilos usando get_cursor() a la vez con un pool chico: nadie recibe
+  PoolError, se espera y las métricas de espera/checkout se registran.
+- Una conexión rota (terminada por el servidor) se descarta y se reemplaza.
+- Un proceso hijo (fork) arma su propio pool sin tocar las conexiones del padre.
+- Benchmark: conexión nueva por consulta vs pool.
+
+Requiere PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE (mismos defaults que db/connection.py).
+
+Uso:
+    python test/test_db_pool.py [consultas]
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db import connection
+from db.connection import get_connection, get_cursor, get_pool, get_pool_stats, close_pool, ConnectionPool
+
+
+def _select_1(_=None):
+    with get_cursor() as cur:
+        cur.execute("SELECT 1")
+        return cur.fetchone()[0]
+
+
+def _nuevo_pool(maxconn: int, ping_after: float = 30.0) -> None:
+    close_pool()
+    connection._POOL = ConnectionPool(1, maxconn, timeout=10, ping_after=ping_after)
+
+
+def test_concurrencia_con_pool_chico():
+    _nuevo_pool(maxconn=2)
+
+    def _lenta(_):
+        with get_cursor() as cur:
+            cur.execute("SELECT pg_sleep(0.05)")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(_lenta, range(16)))
+
+    stats = get_pool_stats()
+    assert stats["checkouts"] == 16
+    assert stats["in_use"] == 0
+    assert stats["timeouts"] == 0
+    assert stats["wait_max_seconds"] > 0.04, stats   # hubo hilos esperando
+    close_pool()
+
+
+def test_rollback_en_error():
+    _nuevo_pool(maxconn=1)
+    try:
+        with get_cursor() as cur:
+            cur.execute("SELECT * FROM tabla_que_no_existe_xyz")
+    except Exception:
+        pass
+    # La misma conexión vuelve usable (sin "current transaction is aborted")
+    assert _select_1() == 1
+    close_pool()
+
+
+def test_conexion_rota_se_reemplaza():
+    _nuevo_pool(maxconn=1, ping_after=0)
+    with get_cursor() as cur:
+        cur.execute("SELECT pg_backend_pid()")
+        pid_backend = cur.fetchone()[0]
+
+    admin = get_connection()
+    admin.autocommit = True
+    with admin.cursor() as cur:
+        cur.execute("SELECT pg_terminate_backend(%s)", (pid_backend,))
+    admin.close()
+    time.sleep(0.2)
+
+    assert _select_1() == 1
+    assert get_pool_stats()["discarded"] >= 1
+    close_pool()
+
+
+def test_fork_arma_pool_propio():
+    _nuevo_pool(maxconn=2)
+    assert _select_1() == 1
+    pool_padre = get_pool()
+
+    pid = os.fork()
+    if pid == 0:
+        ok = _select_1() == 1 and get_pool() is not pool_padre
+        os._exit(0 if ok else 1)
+    _, estado = os.waitpid(pid, 0)
+    assert os.WEXITSTATUS(estado) == 0
+    # El padre sigue usando sus conexiones sin problemas
+    assert get_pool() is pool_padre and _select_1() == 1
+    close_pool()
+
+
+def benchmark(consultas: int = 500) -> None:
+    print("=" * 70)
+    print(f"BENCHMARK get_cursor(): {consultas} consultas SELECT 1 (8 hilos)")
+    print("=" * 70)
+
+    def _sin_pool(_):
+        conn = get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.commit()
+        finally:
+            conn.close()
+
+    for nombre, fn in (("conexión nueva", _sin_pool), ("pool", _select_1)):
+        _nuevo_pool(maxconn=4)
+        inicio = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(fn, range(consultas)))
+        total = time.perf_counter() - inicio
+        print(f"{nombre:>15}: {consultas / total:8.0f} consultas/s")
+
+    stats = get_pool_stats()
+    print(f"   pool stats : checkouts={stats['checkouts']} "
+          f"espera prom={stats['wait_avg_seconds'] * 1000:.2f} ms máx={stats['wait_max_seconds'] * 1000:.2f} ms")
+    close_pool()
+
+
+if __name__ == "__main__":
+    test_concurrencia_con_pool_chico()
+    test_rollback_en_error()
+    test_conexion_rota_se_reemplaza()
+    test_fork_arma_pool_propio()
+    print("✅ Pool: espera acotada, rollback, reemplazo de conexiones rotas y fork OK\n")
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# test_error_history_batch.py
+"""
+Prueba de insert_error_history_batch() contra un Postgres local.
+
+- El hash es el mismo que calcula insert_error_history() (no se duplican
+  errores ya guardados con la API anterior).
+- Cuenta insertados vs duplicados (dentro del lote y contra la tabla).
+- Benchmark: un insert_error_history() por error vs un batch.
+
+Requiere PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE (mismos defaults que db/connection.py).
+
+Uso:
+    python test/test_error_history_batch.py [cantidad]
+"""
+
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from db.connection import get_cursor
+from db.error_history import (
+    ensure_error_history_db,
+    insert_error_history,
+    insert_error_history_batch,
+)
+
+BENCH_WEB = "bench_error_history"
+TS = datetime(2000, 1, 1, 12, 0, 0)
+
+
+def _limpiar() -> None:
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM error_history WHERE web_name LIKE %s;", (BENCH_WEB + "%",))
+
+
+def test_batch_cuenta_insertados_y_duplicados():
+    ensure_error_history_db()
+    _limpiar()
+    try:
+        insert_error_history(BENCH_WEB, "error viejo", TS)
+        resumen = insert_error_history_batch(
+            BENCH_WEB,
+            [("error viejo", TS), ("error nuevo", TS), ("error nuevo", None), ("sin fecha", None)],
+        )
+        assert resumen == {"inserted": 2, "duplicates": 2}, resumen
+
+        with get_cursor() as cur:
+            cur.execute(
+                "SELECT error_content, first_seen FROM error_history WHERE web_name = %s ORDER BY id;",
+                (BENCH_WEB,),
+            )
+            filas = cur.fetchall()
+        assert [f[0] for f in filas] == ["error viejo", "error nuevo", "sin fecha"]
+        assert filas[1][1] == TS and filas[2][1] is not None
+
+        assert insert_error_history_batch(BENCH_WEB, []) == {"inserted": 0, "duplicates": 0}
+    finally:
+        _limpiar()
+
+
+def benchmark(n: int = 2_000) -> None:
+    ensure_error_history_db()
+    errores = [(f"SQLSTATE[{i:05d}] error de prueba {i}", TS) for i in range(n)]
+    print("=" * 70)
+    print(f"BENCHMARK error_history: {n} errores")
+    print("=" * 70)
+
+    _limpiar()
+    inicio = time.perf_counter()
+    for contenido, ts in errores:
+        insert_error_history(BENCH_WEB + "_legacy", contenido, ts)
+    t_legacy = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resumen = insert_error_history_batch(BENCH_WEB, errores)
+    t_batch = time.perf_counter() - inicio
+    assert resumen["inserted"] == n
+
+    print(f"uno por uno : {n / t_legacy:10.0f} errores/s")
+    print(f"por lotes   : {n / t_batch:10.0f} errores/s  (x{t_legacy / t_batch:.1f})")
+    _limpiar()
+
+
+if __name__ == "__main__":
+    test_batch_cuenta_insertados_y_duplicados()
+    print("✅ insert_error_history_batch cuenta insertados/duplicados correctamente\n")
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 2_000)
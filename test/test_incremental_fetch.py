@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# test_incremental_fetch.py
+"""
+Prueba de la descarga incremental de .log (app/incremental_fetch.py) contra un
+servidor HTTP local que sirve un laravel-*.log que va creciendo.
+
+- Con soporte de ETag/Range: tras cada append solo se descargan los bytes
+  nuevos y la clasificación es idéntica a clasificar el archivo completo
+  (incluida una entrada cuyo stacktrace termina de escribirse en otra corrida).
+- Sin cambios → 304 y 0 bytes descargados.
+- Servidor que ignora Range → 200 completo, mismo resultado.
+- Archivo rotado (más chico) → 416 / ancla distinta → descarga completa.
+
+Uso:
+    python test/test_incremental_fetch.py
+"""
+
+import hashlib
+import os
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+os.environ["INCREMENTAL_FETCH_DIR"] = tempfile.mkdtemp(prefix="fetch_state_")
+
+import requests
+
+from app.incremental_fetch import fetch_log_incremental, invalidate_state
+from app.log_parser import iter_laravel_entries
+from app.logs_scraper import (
+    _clasificar_filas,
+    _filas_de_entradas,
+    classify_logs_t4trans,
+)
+
+
+class _LogServer:
+    """Servidor local: un único archivo en memoria, con o sin soporte de Range."""
+
+    def __init__(self, soporta_range: bool = True):
+        self.data = b""
+        self.soporta_range = soporta_range
+        self.requests = []
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                data = servidor.data
+                etag = '"%s"' % hashlib.md5(data).hexdigest()
+                servidor.requests.append(dict(self.headers))
+
+                if servidor.soporta_range and self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.end_headers()
+                    return
+
+                rango = self.headers.get("Range") if servidor.soporta_range else None
+                if rango:
+                    inicio = int(re.match(r"bytes=(\d+)-", rango).group(1))
+                    if inicio >= len(data):
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{len(data)}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    cuerpo = data[inicio:]
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {inicio}-{len(data) - 1}/{len(data)}")
+                else:
+                    cuerpo = data
+                    self.send_response(200)
+                if servidor.soporta_range:
+                    self.send_header("ETag", etag)
+                    self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Type", "text/plain")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/logs/laravel-2026-02-15.log"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def _clasificar_laravel(chunks):
+    return _clasificar_filas(_filas_de_entradas(iter_laravel_entries(chunks)))
+
+
+def _clasificar_t4trans(chunks):
+    return classify_logs_t4trans("".join(chunks))
+
+
+def _entrada(i: int, env: str = "production") -> str:
+    if i % 5 == 0:
+        return f"[2026-02-15 10:{i // 60:02d}:{i % 60:02d}] {env}.ERROR: SQLSTATE fallo {i}\n[stacktrace]\n#0 /app/x.php(12)\n"
+    if i % 7 == 0:
+        return f"[2026-02-15 10:{i // 60:02d}:{i % 60:02d}] {env}.INFO: respuesta {{\"error\":\"token {i}\"}}\n"
+    return f"[2026-02-15 10:{i // 60:02d}:{i % 60:02d}] {env}.INFO: ok {i} {'x' * 200}\n"
+
+
+def _escenario(clasificar, env: str, file_key: str):
+    srv = _LogServer()
+    sesion = requests.Session()
+    try:
+        texto = "".join(_entrada(i, env) for i in range(200))
+        srv.data = texto.encode()
+        r = fetch_log_incremental(sesion, srv.url, "test", file_key, clasificar)
+        assert (r.controlados, r.no_controlados) == clasificar([texto])
+        assert r.size_bytes == len(srv.data)
+
+        # Sin cambios: 304, nada descargado, misma clasificación
+        r = fetch_log_incremental(sesion, srv.url, "test", file_key, clasificar)
+        assert r.size_bytes == 0
+        assert (r.controlados, r.no_controlados) == clasificar([texto])
+
+        # Entrada a medio escribir: el stacktrace se completa en la corrida siguiente
+        texto += f"[2026-02-15 11:00:00] {env}.ERROR: cortado a la mitad"
+        srv.data = texto.encode()
+        r = fetch_log_incremental(sesion, srv.url, "test", file_key, clasificar)
+        assert (r.controlados, r.no_controlados) == clasificar([texto])
+        assert r.size_bytes < 1000, r.size_bytes
+
+        texto += " y terminado\n[stacktrace]\n#0 {main}\n" + "".join(_entrada(i, env) for i in range(200, 260))
+        srv.data = texto.encode()
+        r = fetch_log_incremental(sesion, srv.url, "test", file_key, clasificar)
+        assert (r.controlados, r.no_controlados) == clasificar([texto])
+        assert any("cortado a la mitad y terminado" in linea for linea in r.controlados + r.no_controlados)
+        assert srv.requests[-1]["Range"].startswith("bytes=")
+        assert r.size_bytes < len(srv.data) // 2
+
+        # Rotación: archivo nuevo más chico → 416 y descarga completa
+        texto = "".join(_entrada(i, env) for i in range(3))
+        srv.data = texto.encode()
+        r = fetch_log_incremental(sesion, srv.url, "test", file_key, clasificar)
+        assert (r.controlados, r.no_controlados) == clasificar([texto])
+        assert r.size_bytes == len(srv.data)
+    finally:
+        invalidate_state("test", file_key)
+        srv.close()
+
+
+def test_incremental_laravel():
+    _escenario(_clasificar_laravel, "production", "laravel-2026-02-15.log")
+
+
+def test_incremental_t4trans():
+    _escenario(_clasificar_t4trans, "local", "t4trans-2026-02-15.log")
+
+
+def test_servidor_sin_range_descarga_completa():
+    srv = _LogServer(soporta_range=False)
+    sesion = requests.Session()
+    try:
+        texto = "".join(_entrada(i) for i in range(50))
+        srv.data = texto.encode()
+        fetch_log_incremental(sesion, srv.url, "test", "sin-range.log", _clasificar_laravel)
+
+        texto += "".join(_entrada(i) for i in range(50, 80))
+        srv.data = texto.encode()
+        r = fetch_log_incremental(sesion, srv.url, "test", "sin-range.log", _clasificar_laravel)
+        assert "Range" in srv.requests[-1]
+        assert r.size_bytes == len(srv.data)
+        assert (r.controlados, r.no_controlados) == _clasificar_laravel([texto])
+    finally:
+        invalidate_state("test", "sin-range.log")
+        srv.close()
+
+
+def test_archivo_reemplazado():
+    """Otro archivo con el mismo nombre: el 206 no empieza con el ancla → completo."""
+    srv = _LogServer()
+    sesion = requests.Session()
+    try:
+        texto = "".join(_entrada(i) for i in range(50))
+        srv.data = texto.encode()
+        fetch_log_incremental(sesion, srv.url, "test", "reemplazo.log", _clasificar_laravel)
+
+        texto = "".join(_entrada(i + 1000) for i in range(60))
+        srv.data = texto.encode()
+        r = fetch_log_incremental(sesion, srv.url, "test", "reemplazo.log", _clasificar_laravel)
+        assert (r.controlados, r.no_controlados) == _clasificar_laravel([texto])
+    finally:
+        invalidate_state("test", "reemplazo.log")
+        srv.close()
+
+
+if __name__ == "__main__":
+    test_incremental_laravel()
+    test_incremental_t4trans()
+    test_servidor_sin_range_descarga_completa()
+    test_archivo_reemplazado()
+    print("✅ Descarga incremental: mismos errores que la descarga completa")
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# test_large_log_streaming.py
+"""
+Prueba del procesamiento en streaming de archivos .log grandes (descarga ?dl=).
+
+- Compara iter_laravel_entries() con el regex DOTALL que se usaba antes sobre
+  el archivo completo.
+- Verifica que el pico de memoria de _download_and_process_large_log_file()
+  no crece con el tamaño del archivo.
+
+Uso:
+    python test/test_large_log_streaming.py
+"""
+
+import os
+import re
+import sys
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app.log_parser import iter_laravel_entries
+from app.logs_scraper import _download_and_process_large_log_file, classify_logs
+
+# Regex original de _download_and_process_large_log_file (archivo completo en memoria)
+_LEGACY_RE = re.compile(
+    r'\[(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2})\]\s+(\w+)\.(\w+):\s+(.*?)(?=\n\[|\Z)',
+    re.DOTALL
+)
+
+SAMPLE_LOG = (
+    "[2026-02-15 10:55:40] production.INFO: Inicio de proceso\n"
+    "[2026-02-15 10:55:41] production.ERROR: SQLSTATE[40001]: Serialization failure "
+    "{\"exception\":\"[object] (PDOException(code: 40001): deadlock at /app/x.php:12)\n"
+    "[stacktrace]\n"
+    "#0 /app/vendor/laravel/framework/src/Illuminate/Database/Connection.php(671)\n"
+    "#1 {main}\n"
+    "\"}\n"
+    "[2026-02-15 10:55:42] production.INFO: respuesta {\"error\":\"token expirado\"}\n"
+    "[2026-02-15 10:55:43] production.ERROR: Mensaje\n"
+    "   en varias\n"
+    "   lineas\n"
+    "[2026-02-15 10:55:44] local.DEBUG: nada que ver\n"
+    "[2026-02-15 10:55:45] production.ERROR: ultimo sin salto final"
+)
+
+
+def _legacy_entries(text: str):
+    for m in _LEGACY_RE.finditer(text):
+        yield m.group(1), m.group(2), m.group(3).upper(), " ".join(m.group(4).strip().split())
+
+
+FILLER_BLOCK = "".join(
+    f"[2026-02-15 11:{i // 60:02d}:{i % 60:02d}] production.INFO: request ok id={i} payload={'x' * 80}\n"
+    for i in range(1000)
+)
+
+
+class _FakeStreamResponse:
+    """
+    Respuesta HTTP local que entrega un .log sintético por chunks:
+    SAMPLE_LOG una vez y luego `relleno` bloques de líneas INFO sin errores.
+    """
+
+    def __init__(self, relleno: int):
+        self.relleno = relleno
+        self.headers = {}
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size=8192):
+        yield (SAMPLE_LOG + "\n").encode("utf-8")
+        bloque = FILLER_BLOCK.encode("utf-8")
+        for _ in range(self.relleno):
+            yield bloque
+
+    def close(self):
+        pass
+
+
+class _FakeSession:
+    def __init__(self, relleno: int):
+        self.relleno = relleno
+
+    def get(self, url, stream=False, timeout=None):
+        return _FakeStreamResponse(self.relleno)
+
+
+class _Link(dict):
+    """Imita el <a href="?dl=..."> de BeautifulSoup (solo .get)."""
+
+
+def test_entradas_igual_que_regex_legacy():
+    assert list(iter_laravel_entries([SAMPLE_LOG])) == list(_legacy_entries(SAMPLE_LOG))
+
+
+def test_entradas_independientes_del_chunking():
+    chunks = [SAMPLE_LOG[i:i + 7] for i in range(0, len(SAMPLE_LOG), 7)]
+    assert list(iter_laravel_entries(chunks)) == list(_legacy_entries(SAMPLE_LOG))
+
+
+def test_clasificacion_streaming():
+    resultado = _download_and_process_large_log_file(
+        _FakeSession(3), "https://example.test/logs", _Link(href="?dl=abc"), "test"
+    )
+    controlados, no_controlados = classify_logs(resultado)
+    assert len(no_controlados) == 1 and "SQLSTATE[40001]" in no_controlados[0]
+    assert len(controlados) == 3
+    assert all(str(linea).startswith("ERROR - ") for linea in controlados + no_controlados)
+
+
+def _pico_memoria_mb(relleno: int) -> float:
+    tracemalloc.start()
+    _download_and_process_large_log_file(
+        _FakeSession(relleno), "https://example.test/logs", _Link(href="?dl=abc"), "test"
+    )
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return pico / (1024 * 1024)
+
+
+if __name__ == "__main__":
+    test_entradas_igual_que_regex_legacy()
+    test_entradas_independientes_del_chunking()
+    test_clasificacion_streaming()
+    print("✅ Entradas y clasificación idénticas al regex anterior")
+
+    print("\nPico de memoria vs tamaño de archivo (misma cantidad de errores):")
+    bloque_mb = len(FILLER_BLOCK.encode("utf-8")) / (1024 * 1024)
+    for relleno in (10, 100, 500):
+        print(f"  {relleno * bloque_mb:8.1f} MB → pico {_pico_memoria_mb(relleno):7.2f} MB")
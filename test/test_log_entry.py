@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# test_log_entry.py
+"""
+Prueba de LogEntry (app/log_entry.py).
+
+- str(entry) es la línea de siempre; from_line() es su inversa.
+- entry.signature == build_signature(str(entry)) y entry.timestamp es lo que
+  log_stats._parse_log_line sacaba de la línea.
+- parse_and_aggregate_log_lines da lo mismo con LogEntry que con strings.
+- Al deserializar (pool de procesos de clasificación) level, context, la
+  firma y la fecha cruda vuelven internadas.
+- Memoria retenida por 100.000 errores: clasificación, firmas de aviso
+  (dividir_nuevos_y_avisados) y agregado del resultado, con strings
+  formateados (antes) vs LogEntry (ahora).
+
+Uso:
+    python test/test_log_entry.py
+"""
+
+import gc
+import os
+import random
+import sys
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app.log_entry import LogEntry
+from app.log_stats import _parse_log_line, parse_and_aggregate_log_lines
+from app.logs_scraper import _clasificar_filas
+from app.signatures import build_signature, clear_signature_cache
+
+DIA = date(2026, 2, 15)
+_TRAZA = "#0 /app/vendor/laravel/framework/src/Illuminate/Database/Connection.php(671): run()\n"
+
+
+def _filas(n, seed=9):
+    """Filas [level, context, fecha, content] como las de la tabla; se generan al vuelo."""
+    rnd = random.Random(seed)
+    for i in range(n):
+        fecha = f"2026-02-15 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"
+        r = i % 5
+        if r < 2:
+            content = (f"SQLSTATE[40001]: Serialization failure id={i} {{\"exception\":\"[object] "
+                       f"(PDOException(code: 40001))\n[stacktrace]\n" + _TRAZA * rnd.randint(3, 25) + '"}')
+        elif r < 4:
+            content = f'{{"error":"token expirado {i}"}} Host: api.x.com Accept: */* ' + "x" * rnd.randint(50, 400)
+        else:
+            content = f"Undefined index: foo in /app/x.php line {i % 50}"
+        yield ["error" if r != 2 else "info", "production", fecha, content]
+
+
+def test_linea_y_campos():
+    e = LogEntry("ERROR", "production", "2026-02-15 10:00:00", "SQLSTATE[40001]: boom Host: x")
+    linea = "ERROR - production - 2026-02-15 10:00:00 - SQLSTATE[40001]: boom Host: x"
+    assert str(e) == linea and f"{e}" == linea and e == linea
+    assert LogEntry.from_line(linea) == e and "boom" in e
+    assert e.signature == build_signature(linea) == "ERROR - production - 2026-02-15 10:00:00 - SQLSTATE[40001]"
+    assert e.timestamp == _parse_log_line(linea)["fecha"]
+    assert LogEntry("ERROR", "x", "15/02/2026", "y").timestamp is None
+
+
+def test_linea_sin_encabezado_y_hash():
+    import pickle
+
+    for cruda in ("texto suelto sin encabezado", "A - B - C", ""):
+        e = LogEntry.from_line(cruda)
+        assert str(e) == e.line == cruda and e == cruda
+        assert LogEntry.from_line(str(e)) == e
+        assert e.signature == build_signature(cruda) and e.timestamp is None
+    assert LogEntry.from_line("A - B") != LogEntry("", "", "", "A - B")
+
+    e = LogEntry("ERROR", "production", "2026-02-15 10:00:00", "boom")
+    assert hash(e) == hash(e) == hash(str(e)) and e in {str(e)}
+    copia = pickle.loads(pickle.dumps(e))
+    assert copia == e and hash(copia) == hash(e) and copia.signature == e.signature
+
+
+def test_pickle_vuelve_a_internar():
+    import pickle
+
+    e = LogEntry("ERROR", "production eu-1", "15/02/2026 10:00", "Undefined index: foo")
+    e.signature
+    copia = pickle.loads(pickle.dumps(e))
+    assert copia == e and copia.signature == e.signature
+    assert copia.level is e.level and copia.context is e.context
+    assert copia.signature is e.signature and copia.fecha is e.fecha
+
+
+def test_firmas_y_agregado_identicos():
+    controlados, no_controlados = _clasificar_filas(_filas(3000))
+    entradas = controlados + no_controlados
+    lineas = [str(e) for e in entradas]
+    for e, linea in zip(entradas, lineas):
+        assert e.signature == build_signature(linea)
+    # Encabezado con un token de corte: cae al cálculo sobre la línea completa
+    raro = LogEntry("ERROR", "Host: x", "2026-02-15 10:00:00", "boom")
+    assert raro.signature == build_signature(str(raro))
+    assert parse_and_aggregate_log_lines(entradas, DIA) == parse_and_aggregate_log_lines(lineas, DIA)
+
+
+# --- memoria ---
+
+def _legacy_clasificar(filas):
+    """Antes: cada error se guardaba como la línea formateada."""
+    controlados, no_controlados = _clasificar_filas(filas)
+    return [str(e) for e in controlados], [str(e) for e in no_controlados]
+
+
+def _retenido_mb(fn):
+    clear_signature_cache()
+    gc.collect()
+    tracemalloc.start()
+    resultado = fn()
+    gc.collect()
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del resultado
+    clear_signature_cache()
+    return actual / (1024 * 1024)
+
+
+def bench(n=100_000):
+    def pipeline(clasificar, firmar):
+        def correr():
+            c, nc = clasificar(_filas(n))
+            firmas = {firmar(e) for e in c + nc}    # dividir_nuevos_y_avisados
+            # aggregated_errors(): con strings, split(" - ", 3) + strip copian el contenido
+            return c, nc, firmas, [parse_and_aggregate_log_lines(lst, DIA) for lst in (nc, c)]
+        return correr
+
+    antes = pipeline(_legacy_clasificar, build_signature)
+    ahora = pipeline(_clasificar_filas, lambda e: e.signature)
+
+    print(f"\nMemoria retenida por {n:,} errores:")
+    la = _retenido_mb(lambda: _legacy_clasificar(_filas(n)))
+    lh = _retenido_mb(lambda: _clasificar_filas(_filas(n)))
+    print(f"  listas clasificadas:                  strings {la:7.1f} MB   LogEntry {lh:7.1f} MB")
+    aa, ah = _retenido_mb(antes), _retenido_mb(ahora)
+    print(f"  + firmas de aviso + agregado:         strings {aa:7.1f} MB   LogEntry {ah:7.1f} MB  "
+          f"({(1 - ah / aa) * 100:.0f}% menos)")
+
+
+if __name__ == "__main__":
+    test_linea_y_campos()
+    test_linea_sin_encabezado_y_hash()
+    test_pickle_vuelve_a_internar()
+    test_firmas_y_agregado_identicos()
+    print("✅ LogEntry: mismas líneas, firmas, fechas y agregados que con strings")
+
+    bench()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# test_log_index.py
+"""
+Prueba del índice de /logs (app/log_index.py).
+
+- parse_log_index() resuelve lo mismo que los recorridos con BeautifulSoup que
+  se usaban antes (_buscar_log_por_fecha / _get_most_recent_log_date).
+- Llamadas repetidas dentro del TTL no vuelven a pedir /logs; una fecha que no
+  está en el índice cacheado fuerza un solo GET nuevo.
+- Tiempo de parseo: una pasada con html.parser vs árbol BeautifulSoup + 3 select.
+
+Uso:
+    python test/test_log_index.py
+"""
+
+import os
+import re
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from bs4 import BeautifulSoup
+
+from app.log_index import (
+    ALL_LINKS,
+    LIST_GROUP,
+    get_log_index,
+    invalidate_log_index,
+    parse_log_index,
+    resolve_log_link,
+)
+
+
+def _pagina(fechas, extra_fuera=True, worker=True):
+    """Página estilo log-viewer: menú fuera de la lista + div.list-group con archivos."""
+    items = []
+    for i, f in enumerate(fechas):
+        if worker and i % 3 == 0:
+            items.append(f'<a href="?l=w{i}" class="list-group-item"><span class="fa fa-file"></span> worker-{f}.log</a>')
+        items.append(f'<a href="?l=tok{i}" class="list-group-item"><span class="fa fa-file"></span> laravel-{f}.log</a>')
+    fuera = '<a href="/logs/laravel-1999-01-01.log">laravel-1999-01-01.log</a>' if extra_fuera else ""
+    return (
+        f'<html><body><nav><a href="/">Inicio</a>{fuera}</nav>'
+        f'<div class="col"><div class="list-group div-scroll">{"".join(items)}</div></div>'
+        '<table><tr><td>&quot;x&quot;</td></tr></table></body></html>'
+    )
+
+
+# --- recorridos anteriores (copiados de app/logs_scraper.py antes del cambio) ---
+
+def _legacy_buscar(soup, fecha_str):
+    link_tag = None
+    for a in soup.select("div.list-group a"):
+        text = (a.get_text() or "").strip()
+        if text == f"laravel-{fecha_str}.log":
+            link_tag = a
+            break
+        if link_tag is None and text.endswith(f"-{fecha_str}.log"):
+            link_tag = a
+    return link_tag
+
+
+def _legacy_most_recent(soup):
+    fechas = []
+    for a in soup.select("div.list-group a"):
+        m = re.search(r'(\d{4}-\d{2}-\d{2})\.log', (a.get_text() or "").strip())
+        if m:
+            fechas.append(datetime.strptime(m.group(1), "%Y-%m-%d").date())
+    return max(fechas) if fechas else None
+
+
+def _legacy_t4trans(soup, fecha_str):
+    log_links = [a for a in soup.find_all('a', href=True) if '.log' in a.get_text()]
+    for a in log_links:
+        if a.get_text(strip=True) == f"laravel-{fecha_str}.log":
+            return a
+    return None
+
+
+def _fechas(n):
+    hoy = datetime.now().date()
+    return [(hoy - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(n)]
+
+
+def test_mismo_resultado_que_beautifulsoup():
+    fechas = _fechas(30)
+    html = _pagina(fechas)
+    soup = BeautifulSoup(html, "html.parser")
+
+    index = parse_log_index(html, LIST_GROUP)
+    for f in fechas + ["1999-01-01", "2100-01-01"]:
+        legacy = _legacy_buscar(soup, f)
+        esperado = None if legacy is None else ((legacy.get_text() or "").strip(), legacy.get("href"))
+        assert index.resolve(f) == esperado, f
+    assert index.most_recent()[0] == _legacy_most_recent(soup)
+    assert "laravel-1999-01-01.log" not in index.available_files()
+
+    index = parse_log_index(html, ALL_LINKS)
+    for f in fechas + ["1999-01-01"]:
+        legacy = _legacy_t4trans(soup, f)
+        esperado = None if legacy is None else (legacy.get_text(strip=True), legacy.get("href"))
+        assert index.resolve(f) == esperado, f
+
+
+def test_solo_worker():
+    html = _pagina([], worker=False).replace(
+        "</div></div>", '<a href="?l=x">worker-2026-02-15.log</a></div></div>'
+    )
+    assert parse_log_index(html).resolve("2026-02-15") == ("worker-2026-02-15.log", "?l=x")
+
+
+class _Resp:
+    def __init__(self, text):
+        self.text = text
+
+    def raise_for_status(self):
+        pass
+
+
+class _FakeSession:
+    def __init__(self, html):
+        self.html = html
+        self.gets = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.gets += 1
+        return _Resp(self.html)
+
+
+def test_cache_y_refresco_en_miss():
+    invalidate_log_index()
+    hoy, ayer = _fechas(2)
+    sesion = _FakeSession(_pagina([ayer]))
+
+    _, link = resolve_log_link(sesion, "app", "https://x.test/logs", ayer)
+    assert link is not None and sesion.gets == 1
+    for _ in range(5):
+        resolve_log_link(sesion, "app", "https://x.test/logs", ayer)
+    assert sesion.gets == 1
+
+    # Apareció el archivo de hoy después de cachear: un solo GET extra
+    sesion.html = _pagina([hoy, ayer])
+    _, link = resolve_log_link(sesion, "app", "https://x.test/logs", hoy)
+    assert link is not None and sesion.gets == 2
+
+    invalidate_log_index("app")
+    get_log_index(sesion, "app", "https://x.test/logs")
+    assert sesion.gets == 3
+
+
+def _bench(n_archivos=400, repeticiones=50):
+    html = _pagina(_fechas(n_archivos))
+    hoy, ayer = _fechas(2)
+
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        soup = BeautifulSoup(html, "html.parser")
+        _legacy_buscar(soup, "2100-01-01")
+        _legacy_buscar(soup, ayer)
+        _legacy_most_recent(soup)
+    legacy = (time.perf_counter() - t0) / repeticiones
+
+    t0 = time.perf_counter()
+    for _ in range(repeticiones):
+        index = parse_log_index(html)
+        index.resolve("2100-01-01")
+        index.resolve(ayer)
+        index.most_recent()
+    nuevo = (time.perf_counter() - t0) / repeticiones
+    return len(html), len(index.files), legacy, nuevo
+
+
+if __name__ == "__main__":
+    test_mismo_resultado_que_beautifulsoup()
+    test_solo_worker()
+    test_cache_y_refresco_en_miss()
+    print("✅ Índice de /logs: mismos links que BeautifulSoup, caché con TTL")
+
+    size, archivos, legacy, nuevo = _bench()
+    print(f"\nPágina /logs de {size / 1024:.0f} KB ({archivos} archivos):")
+    print(f"  BeautifulSoup + 3 recorridos: {legacy * 1000:7.2f} ms")
+    print(f"  una pasada html.parser:       {nuevo * 1000:7.2f} ms  (x{legacy / nuevo:.1f})")
+    print("  índice cacheado:                 0 ms  (sin GET /logs dentro del TTL)")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# test_log_parser.py
+"""
+Compara el parser incremental (app/log_parser.py) con el parser BeautifulSoup
+original sobre una página de log-viewer guardada.
+
+Verifica que las filas y las listas controlados / no controlados sean
+idénticas, y mide tiempo y pico de memoria de ambos.
+
+Uso:
+    python test/test_log_parser.py [ruta_html] [repeticiones]
+"""
+
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app.log_parser import iter_log_rows, _iter_log_rows_soup
+from app.logs_scraper import _clasificar_filas
+
+DEFAULT_HTML = ROOT / "t4alerts_backend" / "debug_logs_broker_goto.html"
+
+
+def _cargar_html(path: Path = DEFAULT_HTML) -> str:
+    return path.read_text(encoding="utf-8")
+
+
+def _medir(fn, html: str, repeticiones: int):
+    """Devuelve (resultado, segundos_promedio, pico_memoria_MB)."""
+    tracemalloc.start()
+    resultado = fn(html)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn(html)
+    promedio = (time.perf_counter() - inicio) / repeticiones
+    return resultado, promedio, pico / (1024 * 1024)
+
+
+def test_filas_identicas():
+    html = _cargar_html()
+    assert list(iter_log_rows(html)) == list(_iter_log_rows_soup(html))
+
+
+def test_filas_identicas_por_chunks():
+    """El resultado no depende de cómo se corte el HTML en chunks."""
+    html = _cargar_html()
+    chunks = [html[i:i + 4096] for i in range(0, len(html), 4096)]
+    assert list(iter_log_rows(chunks)) == list(_iter_log_rows_soup(html))
+
+
+def test_clasificacion_identica():
+    html = _cargar_html()
+    assert _clasificar_filas(iter_log_rows(html)) == _clasificar_filas(_iter_log_rows_soup(html))
+
+
+def benchmark(path: Path = DEFAULT_HTML, repeticiones: int = 5) -> None:
+    html = _cargar_html(path)
+    print("=" * 70)
+    print(f"BENCHMARK PARSER DE LOGS: {path.name} ({len(html) / 1024:.0f} KB)")
+    print("=" * 70)
+
+    clasificar_soup = lambda h: _clasificar_filas(_iter_log_rows_soup(h))
+    clasificar_stream = lambda h: _clasificar_filas(iter_log_rows(h))
+
+    res_soup, t_soup, mem_soup = _medir(clasificar_soup, html, repeticiones)
+    res_stream, t_stream, mem_stream = _medir(clasificar_stream, html, repeticiones)
+
+    print(f"BeautifulSoup : {t_soup * 1000:8.1f} ms  | pico memoria {mem_soup:7.1f} MB")
+    print(f"Incremental   : {t_stream * 1000:8.1f} ms  | pico memoria {mem_stream:7.1f} MB")
+    print(f"Speedup       : x{t_soup / t_stream:.2f}")
+    print(f"Controlados: {len(res_stream[0])} | No controlados: {len(res_stream[1])}")
+    print(f"✅ Resultados idénticos: {res_soup == res_stream}")
+
+
+if __name__ == "__main__":
+    ruta = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_HTML
+    reps = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    benchmark(ruta, reps)
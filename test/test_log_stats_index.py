@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+# test_log_stats_index.py
+"""
+Prueba del índice incremental de app/log_stats.py.
+
+- resumen_por_fecha() y get_daily_errors() devuelven lo mismo que el
+  recorrido completo del archivo que se hacía antes.
+- Tras agregar líneas solo se parsean las nuevas; al reescribir el archivo
+  (save_logs con mode="w" o reescritura externa) el índice se reconstruye.
+- El índice persistido se recarga en un proceso nuevo sin reparsear, y vive
+  en LOG_STATS_INDEX_DIR, no al lado del .log.
+- Benchmark: recorrido completo vs consulta al índice.
+
+Uso:
+    python test/test_log_stats_index.py [lineas]
+"""
+
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+INDEX_DIR = Path(tempfile.mkdtemp(prefix="stats_index_"))
+os.environ.setdefault("LOG_STATS_INDEX_DIR", str(INDEX_DIR))
+
+from app import log_stats
+from app.log_stats import _firma_mensaje, _parse_log_line, get_daily_errors, resumen_por_fecha
+from app.writer import save_logs
+
+DIAS = [date(2026, 2, 10) + timedelta(days=i) for i in range(5)]
+MENSAJES = [
+    'SQLSTATE[40001]: Serialization failure SQLSTATE=40001 {"exception":"[object] x"}',
+    "Undefined index: driver_id [stacktrace] #0 /app/x.php",
+    "Call to a member function on null",
+    "Timeout consultando API externa",
+    "Error type A",
+]
+
+
+def _lineas(n: int, seed: int = 1) -> list:
+    rnd = random.Random(seed)
+    out = []
+    for _ in range(n):
+        dt = datetime.combine(rnd.choice(DIAS), datetime.min.time()) + timedelta(seconds=rnd.randrange(86400))
+        msg = rnd.choice(MENSAJES) + (f" #{rnd.randrange(50)}" if rnd.random() < 0.5 else "")
+        out.append(f"ERROR - production - {dt:%Y-%m-%d %H:%M:%S} - {msg}")
+    return out
+
+
+# ---------------------------------------------------- referencia anterior ---
+
+def _legacy_resumen(path: Path, dia: date, umbral: int = 3):
+    stats = {}
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            data = _parse_log_line(line)
+            if not data:
+                continue
+            dt = data["fecha"]
+            info = stats.setdefault(_firma_mensaje(data["mensaje"]),
+                                    {"by_date": Counter(), "first": dt})
+            info["by_date"][dt.date()] += 1
+            info["first"] = min(info["first"], dt)
+    total, repetidos, nuevos = 0, [], []
+    for firma, info in stats.items():
+        n = info["by_date"].get(dia, 0)
+        if not n:
+            continue
+        total += n
+        if n >= umbral:
+            repetidos.append((firma, n))
+        if info["first"].date() == dia:
+            nuevos.append((firma, info["first"]))
+    repetidos.sort(key=lambda x: x[1], reverse=True)
+    nuevos.sort(key=lambda x: x[1], reverse=True)
+    return total, repetidos, nuevos
+
+
+def _legacy_daily(path: Path, dia: date):
+    errors_map = {}
+    with path.open(encoding="utf-8") as f:
+        for line in f:
+            data = _parse_log_line(line)
+            if not data or data["fecha"].date() != dia:
+                continue
+            dt = data["fecha"]
+            firma = _firma_mensaje(data["mensaje"])
+            e = errors_map.setdefault(firma, {"firma": firma, "first_time": dt, "count": 0})
+            e["count"] += 1
+            e["first_time"] = min(e["first_time"], dt)
+    return sorted(errors_map.values(), key=lambda x: x["first_time"])
+
+
+def _assert_igual(path: Path) -> None:
+    for dia in DIAS:
+        assert resumen_por_fecha(path, dia) == _legacy_resumen(path, dia), dia
+        assert get_daily_errors(path, dia) == _legacy_daily(path, dia), dia
+
+
+def _olvidar_memoria() -> None:
+    """Simula un proceso nuevo: solo queda el índice en disco."""
+    log_stats._INDEXES.clear()
+
+
+# ------------------------------------------------------------------ tests ---
+
+def test_equivalencia_incremental_y_reescritura():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "errores_no_controlados_test.log"
+        lineas = _lineas(3000)
+
+        path.write_text("\n".join(lineas[:1000]) + "\n", encoding="utf-8")
+        _assert_igual(path)
+
+        # Append: solo se parsean las líneas nuevas
+        with path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lineas[1000:2000]) + "\n")
+        index = log_stats._get_index(path)
+        offset_previo = index.offset
+        _assert_igual(path)
+        assert index.offset > offset_previo
+
+        # Línea final sin salto de línea: cuenta, pero no se persiste
+        with path.open("a", encoding="utf-8") as f:
+            f.write(lineas[2000])
+        _assert_igual(path)
+        with path.open("a", encoding="utf-8") as f:
+            f.write("\n" + "\n".join(lineas[2001:2500]) + "\n")
+        _assert_igual(path)
+
+        # Proceso nuevo: recarga desde disco
+        _olvidar_memoria()
+        _assert_igual(path)
+
+        # Reescritura externa del mismo tamaño o mayor (sin avisar al índice)
+        path.write_text("\n".join(_lineas(2500, seed=2)) + "\n", encoding="utf-8")
+        _assert_igual(path)
+
+        # save_logs con mode="w" invalida explícitamente
+        save_logs(_lineas(200, seed=3), _lineas(100, seed=4), output_dir=tmp,
+                  mode="w", app_key="test")
+        _assert_igual(path)
+        assert log_stats._index_path(path).exists()
+        assert log_stats._index_path(path).parent == log_stats.LOG_STATS_INDEX_DIR
+        assert not [p for p in Path(tmp).iterdir() if p.name.endswith(".stats.json")]
+
+
+def benchmark(n: int = 100_000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "errores_no_controlados_bench.log"
+        path.write_text("\n".join(_lineas(n)) + "\n", encoding="utf-8")
+        dia = DIAS[2]
+
+        print("=" * 70)
+        print(f"BENCHMARK get_daily_errors: {n} líneas ({path.stat().st_size / 1024 / 1024:.1f} MB)")
+        print("=" * 70)
+
+        inicio = time.perf_counter()
+        _legacy_daily(path, dia)
+        t_legacy = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        get_daily_errors(path, dia)
+        t_primera = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        for _ in range(10):
+            get_daily_errors(path, dia)
+        t_cache = (time.perf_counter() - inicio) / 10
+
+        with path.open("a", encoding="utf-8") as f:
+            f.write("\n".join(_lineas(1000, seed=9)) + "\n")
+        inicio = time.perf_counter()
+        get_daily_errors(path, dia)
+        t_append = time.perf_counter() - inicio
+
+        _olvidar_memoria()
+        inicio = time.perf_counter()
+        get_daily_errors(path, dia)
+        t_disco = time.perf_counter() - inicio
+
+        print(f"recorrido completo (antes)   : {t_legacy * 1000:8.1f} ms")
+        print(f"índice, primera construcción : {t_primera * 1000:8.1f} ms")
+        print(f"índice, sin cambios          : {t_cache * 1000:8.2f} ms")
+        print(f"índice, +1000 líneas         : {t_append * 1000:8.1f} ms")
+        print(f"índice, recargado de disco   : {t_disco * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    test_equivalencia_incremental_y_reescritura()
+    print("✅ Índice incremental equivalente al recorrido completo\n")
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
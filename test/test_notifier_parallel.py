@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# test_notifier_parallel.py
+"""
+Prueba del envío paralelo de notificaciones (app/notifier.py) y de los token
+buckets de app/rate_limit.py, con canales locales que simulan latencia.
+
+- Los canales avanzan en paralelo: el tiempo total se acerca al del canal
+  más lento, no a la suma apps × canales.
+- MAX_CONCURRENCY se respeta por canal.
+- Un canal que falla no afecta a los demás.
+- El token bucket espacia los envíos según su rate.
+
+Uso:
+    python test/test_notifier_parallel.py
+"""
+
+import os
+import sys
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app import notifier
+from app.notification_channel import NotificationChannel
+from app.rate_limit import TokenBucket
+from app.result import ScrapingResult
+
+
+class _CanalLento(NotificationChannel):
+    def __init__(self, nombre: str, demora: float, concurrencia: int, falla: bool = False,
+                 bucket: TokenBucket | None = None):
+        self._nombre = nombre
+        self.demora = demora
+        self.MAX_CONCURRENCY = concurrencia
+        self.falla = falla
+        self.bucket = bucket
+        self.activos = 0
+        self.max_activos = 0
+        self._lock = threading.Lock()
+
+    def send_report(self, result) -> bool:
+        with self._lock:
+            self.activos += 1
+            self.max_activos = max(self.max_activos, self.activos)
+        try:
+            if self.bucket:
+                self.bucket.acquire()
+            time.sleep(self.demora)
+            if self.falla:
+                raise RuntimeError("canal caído")
+            return True
+        finally:
+            with self._lock:
+                self.activos -= 1
+
+    def send_alert(self, message: str) -> bool:
+        return False
+
+    def name(self) -> str:
+        return self._nombre
+
+
+def _resultados(n: int) -> list:
+    return [ScrapingResult(app_key=f"app{i}", app_name=f"App {i}", dia=date(2026, 2, 15),
+                           fecha_str="2026-02-15") for i in range(n)]
+
+
+def test_fan_out_paralelo_y_aislado():
+    canales = [
+        _CanalLento("Email", 0.2, concurrencia=2),
+        _CanalLento("Chat", 0.1, concurrencia=2),
+        _CanalLento("Roto", 0.05, concurrencia=2, falla=True),
+        _CanalLento("SMS", 0.0, concurrencia=1, bucket=TokenBucket(rate=10, capacity=1)),
+    ]
+    originales = notifier.CHANNELS
+    notifier.CHANNELS = canales
+    try:
+        apps = _resultados(4)
+        inicio = time.perf_counter()
+        latencias = notifier.notificar_apps(apps)
+        total = time.perf_counter() - inicio
+    finally:
+        notifier.CHANNELS = originales
+
+    secuencial = sum(c.demora for c in canales) * len(apps) + 0.3
+    assert total < secuencial / 2, (total, secuencial)
+    # Email: 4 apps × 0.2s con 2 hilos ≈ 0.4s
+    assert total < 0.6, total
+    assert [c.max_activos for c in canales] == [2, 2, 2, 1]
+
+    assert latencias["Email"].enviados == 4 and latencias["Email"].fallos == 0
+    assert latencias["Roto"].fallos == 4 and latencias["Roto"].enviados == 0
+    assert latencias["SMS"].enviados == 4
+    notifier.imprimir_latencias(latencias, total)
+    print(f"   (secuencial estimado: {secuencial - 0.3:.2f}s)")
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=20, capacity=2)
+    inicio = time.perf_counter()
+    esperas = [bucket.acquire() for _ in range(6)]
+    total = time.perf_counter() - inicio
+    # 2 de ráfaga + 4 a 20/s ≈ 0.2s
+    assert esperas[0] == esperas[1] == 0.0
+    assert 0.15 < total < 0.4, total
+
+
+if __name__ == "__main__":
+    test_token_bucket()
+    test_fan_out_paralelo_y_aislado()
+    print("✅ Notificaciones en paralelo con límites por canal y fallos aislados")
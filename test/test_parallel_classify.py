@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# test_parallel_classify.py
+"""
+Prueba de la clasificación por trozos en un pool de procesos (app/parallel_classify.py).
+
+- split_on_entries() corta siempre justo antes de un header de entrada.
+- classify_raw_log() con workers>1 da exactamente lo mismo (mismo orden) que
+  clasificar el archivo entero en el proceso, para .log de Laravel y de
+  T4TRANS, y devuelve las firmas ya calculadas.
+- Benchmark de escalado sobre un .log sintético: 1 (en proceso), 2, 4 y 8 workers.
+
+Uso:
+    python test/test_parallel_classify.py          # equivalencia + benchmark (~60 MB)
+    python test/test_parallel_classify.py 20       # benchmark con ~20 MB
+"""
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app.parallel_classify import LARAVEL, T4TRANS, classify_raw_log, shutdown_pool, split_on_entries
+from app.signatures import build_signature
+
+_TRAZA = "#{n} /app/vendor/laravel/framework/src/Illuminate/Database/Connection.php(671): run()\n"
+
+
+def _log(mb, env="production", seed=4):
+    """.log de Laravel sintético de ~mb MB: INFO, INFO con error, ERROR con stacktrace, DEBUG."""
+    rnd = random.Random(seed)
+    partes, tam, i = [], 0, 0
+    while tam < mb * 1024 * 1024:
+        ts = f"2026-02-15 {i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}"
+        r = i % 6
+        if r == 0:
+            linea = (f"[{ts}] {env}.ERROR: SQLSTATE[40001]: Serialization failure id={i} "
+                     f"{{\"exception\":\"[object] (PDOException(code: 40001))\n[stacktrace]\n"
+                     + "".join(_TRAZA.format(n=k) for k in range(rnd.randint(5, 40))) + '"}\n')
+        elif r == 1:
+            linea = f"[{ts}] {env}.INFO: respuesta {{\"error\":\"token {i}\"}}\n"
+        elif r == 2:
+            linea = f"[{ts}] {env}.ERROR: Mensaje\n   en varias\n   lineas {i}\n"
+        elif r == 3:
+            linea = f"[{ts}] {env}.DEBUG: algo con error {i}\n"
+        else:
+            linea = f"[{ts}] {env}.INFO: request ok id={i} payload={'x' * rnd.randint(20, 200)}\n"
+        partes.append(linea)
+        tam += len(linea)
+        i += 1
+    return "".join(partes)
+
+
+def _chunks(texto, n=64 * 1024):
+    return [texto[i:i + n] for i in range(0, len(texto), n)]
+
+
+def test_cortes_en_limites_de_entrada():
+    texto = _log(0.3)
+    trozos = list(split_on_entries(_chunks(texto, 5000), 20_000))
+    assert len(trozos) > 5 and "".join(trozos) == texto
+    for t in trozos[1:]:
+        assert t.startswith("[2026-02-15 ") and "] production." in t[:40]
+    for t in trozos[:-1]:
+        assert t.endswith("\n")
+
+
+def test_mismo_resultado_que_en_proceso():
+    for kind, env in ((LARAVEL, "production"), (T4TRANS, "local")):
+        texto = _log(1, env=env)
+        esperado = classify_raw_log(_chunks(texto), kind, workers=0)
+        obtenido = classify_raw_log(_chunks(texto), kind, workers=2, chunk_mb=0.05)
+        assert obtenido == esperado, kind
+        assert sum(map(len, obtenido)) > 100
+        for entry in obtenido[0][:50] + obtenido[1][:50]:
+            assert entry._signature == build_signature(str(entry))
+
+
+def bench(mb=60):
+    texto = _log(mb)
+    chunks = _chunks(texto)
+    print(f"\nClasificación + firma de un .log de {len(texto) / 1024 / 1024:.0f} MB "
+          f"({os.cpu_count()} CPU en esta máquina):")
+    base = None
+    for workers in (1, 2, 4, 8):
+        if workers > 1:
+            classify_raw_log(_chunks(_log(1)), LARAVEL, workers=workers, chunk_mb=0.1)  # arranque del pool
+        t0 = time.perf_counter()
+        c, nc = classify_raw_log(chunks, LARAVEL, workers=workers)
+        if workers == 1:
+            for entry in c + nc:
+                entry.signature
+        dt = time.perf_counter() - t0
+        base = base or dt
+        etiqueta = "en proceso" if workers == 1 else f"{workers} workers"
+        print(f"  {etiqueta:>11}: {dt:6.2f} s  (x{base / dt:.2f})  {len(c) + len(nc):,} errores")
+    shutdown_pool()
+
+
+if __name__ == "__main__":
+    test_cortes_en_limites_de_entrada()
+    test_mismo_resultado_que_en_proceso()
+    print("✅ Clasificación por trozos: mismos errores, mismo orden, firmas calculadas")
+
+    bench(float(sys.argv[1]) if len(sys.argv) > 1 else 60)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# test_result_aggregated.py
+"""
+Verifica que ScrapingResult.aggregated_errors() devuelve lo mismo que
+get_daily_errors() sobre los .log que save_logs() escribe en la corrida
+(lo que antes leían Email y Google Chat), y que se calcula una sola vez,
+también cuando varios canales la piden a la vez desde hilos distintos.
+
+Uso:
+    python test/test_result_aggregated.py
+"""
+
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.log_stats import get_daily_errors
+from app.result import ScrapingResult
+from app.writer import save_logs
+
+DIA = date(2026, 2, 15)
+
+NO_CONTROLADOS = [
+    "ERROR - production - 2026-02-15 10:55:41 - SQLSTATE[40001]: Serialization failure SQLSTATE=40001 detalle 1",
+    "ERROR - production - 2026-02-15 09:10:00 - Call to a member function on null",
+    "ERROR - production - 2026-02-15 11:00:02 - SQLSTATE[40001]: Serialization failure SQLSTATE=40001 detalle 2",
+    "ERROR - production - 2026-02-14 23:59:59 - Error de otro día",
+]
+CONTROLADOS = [
+    "ERROR - production - 2026-02-15 08:00:00 - Token expirado",
+    "ERROR - production - 2026-02-15 08:00:00 - Token expirado",
+    "ERROR - local - 2026-02-15 07:30:00 - Validación fallida",
+]
+
+
+def _sin_full_content(errores):
+    return [{k: v for k, v in e.items() if k != "full_content"} for e in errores]
+
+
+def test_igual_que_leer_los_logs():
+    result = ScrapingResult(
+        app_key="test", app_name="Test", dia=DIA, fecha_str=DIA.isoformat(),
+        no_controlados_nuevos=NO_CONTROLADOS, controlados_nuevos=CONTROLADOS,
+        no_controlados_avisados=["ERROR - production - 2026-02-15 12:00:00 - ya avisado"],
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        save_logs(result.controlados_nuevos, result.no_controlados_nuevos,
+                  output_dir=tmp, mode="w", app_key=result.app_key)
+        nc_disco = get_daily_errors(Path(tmp) / "errores_no_controlados_test.log", DIA)
+        c_disco = get_daily_errors(Path(tmp) / "errores_controlados_test.log", DIA)
+
+    nc, c = result.aggregated_errors()
+    assert _sin_full_content(nc) == nc_disco
+    assert _sin_full_content(c) == c_disco
+    assert nc[0]["full_content"].startswith("Call to a member")
+    assert [e["count"] for e in nc] == [1, 2]
+
+
+def test_memoizado():
+    result = ScrapingResult(app_key="test", app_name="Test", dia=DIA, fecha_str=DIA.isoformat(),
+                            no_controlados_nuevos=NO_CONTROLADOS)
+    assert result.aggregated_errors() is result.aggregated_errors()
+    assert "_aggregated" not in result.to_dict()
+
+
+def test_una_vez_con_canales_en_paralelo():
+    from app import log_stats
+
+    original = log_stats.parse_and_aggregate_log_lines
+    llamadas = []
+
+    def lento(lineas, dia):
+        llamadas.append(len(lineas))
+        time.sleep(0.05)
+        return original(lineas, dia)
+
+    result = ScrapingResult(app_key="test", app_name="Test", dia=DIA, fecha_str=DIA.isoformat(),
+                            no_controlados_nuevos=NO_CONTROLADOS, controlados_nuevos=CONTROLADOS)
+    barrera = threading.Barrier(8)
+    vistas = []
+
+    def canal():
+        barrera.wait()
+        vistas.append(result.aggregated_errors())
+
+    log_stats.parse_and_aggregate_log_lines = lento
+    try:
+        hilos = [threading.Thread(target=canal) for _ in range(8)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+    finally:
+        log_stats.parse_and_aggregate_log_lines = original
+    assert llamadas == [len(NO_CONTROLADOS), len(CONTROLADOS)]
+    assert all(v is vistas[0] for v in vistas)
+
+
+if __name__ == "__main__":
+    test_igual_que_leer_los_logs()
+    test_memoizado()
+    test_una_vez_con_canales_en_paralelo()
+    print("✅ aggregated_errors() equivalente a get_daily_errors() y memoizado")
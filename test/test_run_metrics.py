@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# test_run_metrics.py
+"""
+Prueba de los tiempos por etapa (app/run_metrics.py).
+
+- Las etapas marcadas dentro de track_app() van a la app del hilo que la
+  procesa, aunque varias apps corran en paralelo; fuera de una app no se mide.
+- notificar_apps() registra notify:<Canal> en la app del resultado.
+- write_run_report() escribe el JSON y el texto de Prometheus.
+- main.py --profile procesa las apps de a una (nunca dos cProfile activos)
+  y guarda el perfil de la más lenta.
+
+Uso:
+    python test/test_run_metrics.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app import notifier, run_metrics
+from app.notification_channel import NotificationChannel
+from app.result import ScrapingResult
+from app.run_metrics import count, reset_run, stage, track_app, write_run_report
+
+
+def _procesar(app_key, demora):
+    with track_app(app_key):
+        with stage("login"):
+            time.sleep(demora)
+        for _ in range(3):
+            with stage("classify"):
+                time.sleep(demora / 3)
+        count("bytes_fetched", 1000)
+    return app_key
+
+
+def test_etapas_por_app_en_paralelo():
+    run = reset_run()
+    with stage("login"):        # sin app: no se registra
+        pass
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        list(pool.map(_procesar, ["a", "b", "c"], [0.03, 0.06, 0.09]))
+    datos = run.to_dict()["apps"]
+    assert set(datos) == {"a", "b", "c"}
+    for app_key, demora in (("a", 0.03), ("b", 0.06), ("c", 0.09)):
+        etapas = datos[app_key]["stages"]
+        assert etapas["classify"]["count"] == 3
+        assert demora <= etapas["login"]["seconds"] < demora + 0.05
+        assert datos[app_key]["counters"]["bytes_fetched"] == 1000
+
+
+class _Canal(NotificationChannel):
+    def send_report(self, result) -> bool:
+        time.sleep(0.01)
+        return True
+
+    def send_alert(self, message: str) -> bool:
+        return True
+
+    def name(self) -> str:
+        return "Prueba"
+
+
+def test_notificaciones_por_canal():
+    run = reset_run()
+    anteriores = notifier.CHANNELS
+    notifier.CHANNELS = [_Canal()]
+    try:
+        resultados = [ScrapingResult(app_key=k, app_name=k, dia=date(2026, 2, 15), fecha_str="2026-02-15")
+                      for k in ("x", "y")]
+        notifier.notificar_apps(resultados)
+    finally:
+        notifier.CHANNELS = anteriores
+    datos = run.to_dict()["apps"]
+    assert datos["x"]["stages"]["notify:Prueba"]["count"] == 1
+    assert datos["y"]["stages"]["notify:Prueba"]["seconds"] >= 0.01
+
+
+def test_reporte_json_y_prometheus():
+    run = reset_run()
+    _procesar("app-1", 0.01)
+    run.finish_app("app-1", 0.05, "ok")
+    with tempfile.TemporaryDirectory() as tmp:
+        run_metrics.RUN_REPORT_PATH = os.path.join(tmp, "r", "run_report.json")
+        run_metrics.RUN_REPORT_PROM = os.path.join(tmp, "r", "run.prom")
+        destino = write_run_report({"fecha": "2026-02-15"})
+        data = json.loads(Path(destino).read_text())
+        prom = Path(run_metrics.RUN_REPORT_PROM).read_text()
+    assert data["fecha"] == "2026-02-15" and data["apps"]["app-1"]["status"] == "ok"
+    assert 't4alerts_run_stage_seconds{app="app-1",stage="login"}' in prom
+    assert 't4alerts_run_app_seconds{app="app-1",status="ok"} 0.05' in prom
+    assert "# TYPE t4alerts_run_stage_seconds gauge" in prom
+
+
+def test_profile_de_a_una_app():
+    import main
+
+    activas, maximo, lock = [0], [0], threading.Lock()
+
+    def procesar_falso(app_key, fecha_str, dia):
+        with lock:
+            activas[0] += 1
+            maximo[0] = max(maximo[0], activas[0])
+        time.sleep(0.02)
+        with lock:
+            activas[0] -= 1
+        return ScrapingResult(app_key=app_key, app_name=app_key, dia=dia, fecha_str=fecha_str,
+                              controlados_nuevos=[], controlados_avisados=[],
+                              no_controlados_nuevos=[], no_controlados_avisados=[])
+
+    originales = (main.PROFILE, main.SCRAPER_MAX_WORKERS, main.procesar_aplicacion,
+                  main.notificar_apps, main.store_stats_snapshot, main.RUN_REPORT_PATH,
+                  run_metrics.RUN_REPORT_PATH, run_metrics.RUN_REPORT_PROM)
+    with tempfile.TemporaryDirectory() as tmp:
+        main.PROFILE, main.SCRAPER_MAX_WORKERS = True, 4
+        main.procesar_aplicacion = procesar_falso
+        main.notificar_apps = lambda resultados: {}
+        main.store_stats_snapshot = lambda *args, **kwargs: False
+        main.RUN_REPORT_PATH = run_metrics.RUN_REPORT_PATH = os.path.join(tmp, "run_report.json")
+        run_metrics.RUN_REPORT_PROM = ""
+        try:
+            apps = {f"perfil_{i}": {"name": f"Perfil {i}", "base_url": f"http://h{i}.test"} for i in range(4)}
+            resumen = main.ejecutar_ronda("2026-02-15", date(2026, 2, 15), None, apps, raise_on_crash=True)
+            perfiles = [f for f in os.listdir(tmp) if f.startswith("profile_")]
+        finally:
+            (main.PROFILE, main.SCRAPER_MAX_WORKERS, main.procesar_aplicacion,
+             main.notificar_apps, main.store_stats_snapshot, main.RUN_REPORT_PATH,
+             run_metrics.RUN_REPORT_PATH, run_metrics.RUN_REPORT_PROM) = originales
+    assert sorted(resumen["ok"]) == sorted(apps)
+    assert maximo[0] == 1, maximo[0]
+    assert len(perfiles) == 1, perfiles
+
+
+if __name__ == "__main__":
+    test_etapas_por_app_en_paralelo()
+    test_notificaciones_por_canal()
+    test_reporte_json_y_prometheus()
+    test_profile_de_a_una_app()
+    print("✅ Tiempos por etapa: por app y por hilo, notificaciones por canal, JSON + Prometheus")
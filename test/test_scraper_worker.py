@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# test_scraper_worker.py
+"""
+Prueba del worker de scraping en proceso (scraper_worker.py) con un Postgres
+local y una BD sqlite temporal para create_app():
+
+- overhead por tick: un main.py nuevo (intérprete + imports + create_app +
+  init_db) contra un tick del worker ya caliente
+- aislamiento: una app que rompe con un error inesperado queda como error
+  de esa app; las demás se procesan y notifican, y el worker sigue vivo
+- main.main() (un solo proceso) sigue saliendo con error en ese caso
+
+El scraping y el envío se reemplazan por funciones locales: acá se mide el
+costo fijo de cada tick, no la red.
+
+Requiere PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE (mismos defaults que db/connection.py).
+
+Uso:
+    python test/test_scraper_worker.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='worker_')}/t4alerts.db")
+os.environ.setdefault("RUN_REPORT_PATH", "")
+
+APPS = {
+    "worker_test_ok": {"name": "Worker OK"},
+    "worker_test_roto": {"name": "Worker Roto"},
+}
+NOTIFICADOS = []
+
+
+def _procesar_falso(app_key, fecha_str, dia):
+    from app.result import ScrapingResult
+
+    if app_key == "worker_test_roto":
+        raise RuntimeError("boom")
+    return ScrapingResult(app_key=app_key, app_name=APPS[app_key]["name"], dia=dia, fecha_str=fecha_str,
+                          controlados_nuevos=[], controlados_avisados=[],
+                          no_controlados_nuevos=[], no_controlados_avisados=[])
+
+
+def _parchar(main):
+    main.procesar_aplicacion = _procesar_falso
+    main.cargar_apps = lambda flask_app=None: dict(APPS)
+    main.notificar_apps = lambda resultados: NOTIFICADOS.extend(r.app_key for r in resultados) or {}
+    main.store_stats_snapshot = lambda *args, **kwargs: False
+
+
+def _setup_en_frio() -> float:
+    """Lo que paga cada tick con main.py como subproceso (sin contar el scraping)."""
+    codigo = "import main; f = main.crear_contexto(); main.init_db(); main.cargar_apps(f)"
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, "-c", codigo], cwd=str(ROOT), check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t0
+
+
+def test_worker_caliente_y_aislado():
+    import main
+    from scraper_worker import ScraperWorker
+
+    _parchar(main)
+    worker = ScraperWorker()
+    en_frio = _setup_en_frio()
+
+    primero = worker.tick(str(date.today()))
+    segundo = worker.tick(str(date.today()))
+
+    for resumen in (primero, segundo):
+        assert resumen["ok"] == ["worker_test_ok"], resumen
+        assert [e["app_key"] for e in resumen["errors"]] == ["worker_test_roto"]
+        assert resumen["errors"][0]["error_type"] == "RuntimeError"
+    assert NOTIFICADOS == ["worker_test_ok", "worker_test_ok"]
+    assert (primero["tick"], segundo["tick"]) == (1, 2)
+    assert worker.flask_app is not None
+    # El segundo tick no vuelve a importar ni a crear la app
+    assert segundo["setup_seconds"] < en_frio / 5, (en_frio, segundo["setup_seconds"])
+
+    print(f"  overhead por tick: main.py nuevo {en_frio:.2f}s · "
+          f"worker 1er tick {primero['setup_seconds']:.2f}s · siguientes {segundo['setup_seconds'] * 1000:.1f} ms")
+
+
+def test_main_sigue_fallando_si_una_app_rompe():
+    import main
+
+    _parchar(main)
+    NOTIFICADOS.clear()
+    argv = sys.argv
+    sys.argv = ["main.py", str(date.today())]
+    try:
+        main.main()
+        raise AssertionError("main() debía propagar el error de la app")
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    finally:
+        sys.argv = argv
+    # ...pero después de procesar y notificar a las demás
+    assert NOTIFICADOS == ["worker_test_ok"]
+
+
+if __name__ == "__main__":
+    test_worker_caliente_y_aislado()
+    test_main_sigue_fallando_si_una_app_rompe()
+    print("✅ Worker en proceso: preparación una sola vez, apps aisladas y main.py sin cambios de contrato")
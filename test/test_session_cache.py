@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+# test_session_cache.py
+"""
+Prueba de la caché de sesiones de AppSession contra un servidor local que
+imita el login de Laravel (CSRF + cookie de sesión) y un login JWT.
+
+- La segunda AppSession reutiliza la sesión guardada: cero logins.
+- Si el servidor invalida la sesión, el GET se redirige al login, se hace
+  login de nuevo y se repite el GET de forma transparente, con los headers
+  del pedido original (Range / If-None-Match de incremental_fetch).
+- Una entrada vencida o con otras credenciales no se usa.
+- La expiración JWT se toma del claim `exp`.
+- Benchmark: apertura de sesión con login vs restaurada de caché.
+
+Uso:
+    python test/test_session_cache.py
+"""
+
+import base64
+import json
+import os
+import secrets
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CACHE_DIR = tempfile.mkdtemp(prefix="t4alerts_sessions_")
+os.environ["SESSION_CACHE_URL"] = CACHE_DIR
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app import session_cache
+from app.config import APPS_CONFIG
+from app.session_manager import AppSession
+
+LATENCIA = 0.02  # por request, para que el login "cueste" como en producción
+
+
+def _jwt(exp: float) -> str:
+    enc = lambda d: base64.urlsafe_b64encode(json.dumps(d).encode()).rstrip(b"=").decode()
+    return f"{enc({'alg': 'none'})}.{enc({'exp': int(exp)})}.firma"
+
+
+class _Estado:
+    def __init__(self):
+        self.sesiones = set()
+        self.tokens = set()
+        self.logins = 0
+        self.ranges = []  # header Range de cada GET /logs autenticado
+
+
+class _Handler(BaseHTTPRequestHandler):
+    estado: _Estado = None
+
+    def log_message(self, *args):
+        pass
+
+    def _cookie_sesion(self):
+        for parte in (self.headers.get("Cookie") or "").split(";"):
+            nombre, _, valor = parte.strip().partition("=")
+            if nombre == "laravel_session":
+                return valor
+        return None
+
+    def _responder(self, code, body=b"", headers=None):
+        time.sleep(LATENCIA)
+        self.send_response(code)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.startswith("/login"):
+            html = (b'<form><input name="_token" value="csrf123"><input name="email">'
+                    b'<input name="password" type="password"></form>')
+            self._responder(200, html, {"Set-Cookie": "laravel_session=anon; Path=/; HttpOnly"})
+        elif self.path.startswith("/logs"):
+            if self._cookie_sesion() in self.estado.sesiones:
+                self.estado.ranges.append(self.headers.get("Range"))
+                self._responder(200, b"<table><tbody><tr><td>error</td></tr></tbody></table>")
+            else:
+                self._responder(302, headers={"Location": "/login"})
+        elif self.path.startswith("/api/logs"):
+            token = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+            self._responder(200 if token in self.estado.tokens else 401, b"{}")
+        else:
+            self._responder(404)
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        cuerpo = self.rfile.read(largo).decode()
+        if self.path.startswith("/login"):
+            self.estado.logins += 1
+            sid = secrets.token_hex(8)
+            self.estado.sesiones.add(sid)
+            expira = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 7200))
+            self._responder(302, headers={
+                "Location": "/logs",
+                "Set-Cookie": f"laravel_session={sid}; Path=/; Expires={expira}; HttpOnly",
+            })
+        elif self.path.startswith("/api/login"):
+            self.estado.logins += 1
+            token = _jwt(time.time() + 3600)
+            self.estado.tokens.add(token)
+            body = json.dumps({"status": True, "token": {"accessToken": token}}).encode()
+            self._responder(200, body, {"Content-Type": "application/json"})
+        else:
+            self._responder(404)
+
+
+def _servidor():
+    estado = _Estado()
+    handler = type("H", (_Handler,), {"estado": estado})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{httpd.server_port}"
+    APPS_CONFIG["local_form"] = {
+        "name": "Local Form", "base_url": base, "login_path": "/login", "logs_path": "/logs",
+        "username": "ops@example.test", "password": "secret",
+    }
+    APPS_CONFIG["local_jwt"] = {
+        "name": "Local JWT", "base_url": base, "login_path": "/api/login", "logs_path": "/api/logs",
+        "username": "ops@example.test", "password": "secret", "auth_type": "jwt_api",
+    }
+    return httpd, estado, base
+
+
+def _caso_form_reutiliza_y_reautentica(estado, base):
+    session_cache.invalidate_session("local_form")
+    estado.logins = 0
+
+    with AppSession("local_form") as s:
+        assert s.get(f"{base}/logs").status_code == 200
+    assert estado.logins == 1
+
+    with AppSession("local_form") as s:
+        assert s.get(f"{base}/logs").status_code == 200
+    assert estado.logins == 1, "la segunda sesión debía salir de la caché"
+
+    # El servidor olvida las sesiones: re-login transparente y GET repetido
+    estado.sesiones.clear()
+    with AppSession("local_form") as s:
+        resp = s.get(f"{base}/logs")
+        assert resp.status_code == 200 and b"<table>" in resp.content
+    assert estado.logins == 2
+
+    # Y la sesión nueva quedó guardada
+    with AppSession("local_form") as s:
+        assert s.get(f"{base}/logs").status_code == 200
+    assert estado.logins == 2
+
+    # El GET repetido tras el re-login conserva los headers del original (Range
+    # de incremental_fetch), no los de una sesión vacía
+    estado.sesiones.clear()
+    estado.ranges.clear()
+    with AppSession("local_form") as s:
+        assert s.get(f"{base}/logs", headers={"Range": "bytes=100-"}).status_code == 200
+    assert estado.logins == 3
+    # (el login también termina en un GET /logs, sin Range: el último es el repetido)
+    assert estado.ranges[-1] == "bytes=100-", estado.ranges
+
+
+def _caso_entrada_vencida_o_credenciales_cambiadas(estado, base):
+    store = session_cache.get_store()
+    data = store.get("local_form")
+    data["expires_at"] = time.time() - 1
+    store.set("local_form", data, 60)
+    with AppSession("local_form"):
+        pass
+    assert estado.logins == 4
+
+    APPS_CONFIG["local_form"]["password"] = "otra"
+    with AppSession("local_form"):
+        pass
+    assert estado.logins == 5
+    APPS_CONFIG["local_form"]["password"] = "secret"
+
+
+def _caso_jwt_exp(estado, base):
+    session_cache.invalidate_session("local_jwt")
+    antes = estado.logins
+    with AppSession("local_jwt") as s:
+        assert s.get(f"{base}/api/logs").status_code == 200
+    entrada = session_cache.get_store().get("local_jwt")
+    assert abs(entrada["expires_at"] - (time.time() + 3600)) < 5
+
+    with AppSession("local_jwt") as s:
+        assert s.get(f"{base}/api/logs").status_code == 200
+    assert estado.logins == antes + 1
+
+    estado.tokens.clear()
+    with AppSession("local_jwt") as s:
+        assert s.get(f"{base}/api/logs").status_code == 200
+    assert estado.logins == antes + 2
+
+
+def test_cache_de_sesiones():
+    # Los casos comparten el servidor y el contador de logins, en este orden
+    httpd, estado, base = _servidor()
+    try:
+        _caso_form_reutiliza_y_reautentica(estado, base)
+        _caso_entrada_vencida_o_credenciales_cambiadas(estado, base)
+        _caso_jwt_exp(estado, base)
+    finally:
+        httpd.shutdown()
+
+
+def benchmark(base, repeticiones: int = 10) -> None:
+    print("=" * 70)
+    print(f"BENCHMARK apertura de sesión + GET /logs (latencia simulada {LATENCIA * 1000:.0f} ms/request)")
+    print("=" * 70)
+
+    def _medir():
+        inicio = time.perf_counter()
+        for _ in range(repeticiones):
+            with AppSession("local_form") as s:
+                s.get(f"{base}/logs")
+        return (time.perf_counter() - inicio) / repeticiones
+
+    session_cache.SESSION_CACHE_ENABLED = False
+    t_login = _medir()
+    session_cache.SESSION_CACHE_ENABLED = True
+    _medir()
+    t_cache = _medir()
+    print(f"login cada vez : {t_login * 1000:7.1f} ms")
+    print(f"sesión en caché: {t_cache * 1000:7.1f} ms  (x{t_login / t_cache:.1f})")
+
+
+if __name__ == "__main__":
+    try:
+        test_cache_de_sesiones()
+        print("✅ Caché de sesiones: reutiliza, re-autentica al vencer y respeta credenciales\n")
+        httpd, _, base = _servidor()
+        try:
+            benchmark(base)
+        finally:
+            httpd.shutdown()
+    finally:
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# test_signature_cache.py
+"""
+Prueba del servicio de firmas memoizado (app/signatures.py).
+
+- build_signature / summary_signature memoizadas devuelven lo mismo que la
+  regla sin memo (y _firma_mensaje de log_stats es summary_signature).
+- Los contadores de aciertos suben y el LRU respeta su tamaño máximo.
+- La clave del LRU es el texto: dos líneas distintas con el mismo hash y
+  largo no comparten firma (la firma decide qué se avisa).
+- Las firmas de LogEntry no pasan por el LRU y se cuentan aparte ("entry").
+- Micro-benchmark: un pipeline que firma las mismas líneas 3 veces
+  (error_filter, agregados, dashboard), con y sin memo.
+
+Uso:
+    python test/test_signature_cache.py
+"""
+
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app import signatures
+from app.log_stats import _firma_mensaje
+from app.signatures import (
+    _compute_signature,
+    _compute_summary_signature,
+    build_signature,
+    clear_signature_cache,
+    signature_cache_stats,
+    summary_signature,
+)
+
+
+def _lineas(n, distintas, seed=5):
+    rnd = random.Random(seed)
+    traza = "#0 /app/vendor/laravel/framework/src/Illuminate/Database/Connection.php(671): run()\n"
+    base = []
+    for i in range(distintas):
+        r = i % 4
+        if r == 0:
+            base.append(f"ERROR - production - 2026-02-15 10:00:{i % 60:02d} - SQLSTATE[40001]: "
+                        f"Serialization failure id={i} {{\"exception\":\"x\"}}\n[stacktrace]\n"
+                        + traza * rnd.randint(5, 30))
+        elif r == 1:
+            base.append(f"ERROR - production - 2026-02-15 10:01:{i % 60:02d} - SQLSTATE[40001]: -911 "
+                        f"SQL0911N The current transaction has been rolled back. SQLSTATE=40001 id={i}")
+        elif r == 2:
+            base.append(f"INFO - production - 2026-02-15 10:02:00 - {{\"error\":\"token {i}\"}} "
+                        f"Host: api.x.com Accept: */*")
+        else:
+            base.append(f"ERROR - local - 2026-02-15 10:03:00 - Undefined index: foo line {i}")
+    return [base[i % distintas] for i in range(n)]
+
+
+def test_mismo_resultado_que_sin_memo():
+    clear_signature_cache()
+    for linea in _lineas(2000, 500):
+        assert build_signature(linea) == _compute_signature(linea)
+        assert summary_signature(linea) == _compute_summary_signature(linea)
+        assert _firma_mensaje(linea) == _compute_summary_signature(linea)
+
+
+def test_reglas_de_aviso_y_resumen():
+    db2 = "SQLSTATE[40001]: -911 SQL0911N rolled back. SQLSTATE=40001 extra"
+    assert build_signature(db2) == "SQLSTATE[40001]"
+    assert summary_signature(db2) == "SQLSTATE[40001]: -911 SQL0911N rolled back. SQLSTATE=40001"
+    assert summary_signature('boom {"exception":"x"} [stacktrace]') == "boom"
+
+
+def test_contadores():
+    clear_signature_cache()
+    lineas = _lineas(300, 100)
+    for linea in lineas:
+        build_signature(linea)
+    stats = signature_cache_stats()
+    assert stats["alert"]["misses"] == 100 and stats["alert"]["hits"] == 200
+    assert stats["hits"] == 200 and abs(stats["hit_rate"] - 2 / 3) < 1e-9
+    clear_signature_cache()
+    assert signature_cache_stats()["misses"] == 0
+
+
+def test_lru_acotado():
+    clear_signature_cache()
+    maxsize = signature_cache_stats()["alert"]["maxsize"]
+    for i in range(maxsize + 50):
+        build_signature(f"ERROR - x - {i}")
+    assert signature_cache_stats()["alert"]["size"] == maxsize
+
+
+class _MismoHash(str):
+    """str con hash fijo: fuerza una colisión (mismo hash y largo) en el LRU."""
+
+    def __hash__(self):
+        return 42
+
+
+def test_colision_de_hash_no_comparte_firma():
+    clear_signature_cache()
+    a = _MismoHash("ERROR - production - 2026-02-15 10:00:00 - Undefined index: aaa")
+    b = _MismoHash("ERROR - production - 2026-02-15 10:00:00 - Undefined index: bbb")
+    assert hash(a) == hash(b) and len(a) == len(b)
+    assert build_signature(a) == _compute_signature(a)
+    assert build_signature(b) == _compute_signature(b) != build_signature(a)
+    assert signature_cache_stats()["alert"]["misses"] == 2
+
+
+def test_firmas_de_registros_aparte():
+    from app.log_entry import LogEntry
+
+    clear_signature_cache()
+    entrada = LogEntry("ERROR", "production", "2026-02-15 10:00:00", "Undefined index: foo")
+    assert entrada.signature == build_signature(str(entrada))
+    stats = signature_cache_stats()
+    assert stats["entry"]["computed"] == 1
+    assert stats["alert"]["misses"] == 1 and stats["hits"] == 0  # solo la de build_signature
+
+
+def _pipeline(lineas, firmar):
+    # error_filter + agregados del resultado + ruta de stats: tres firmas por línea
+    for _ in range(3):
+        for linea in lineas:
+            firmar(linea)
+
+
+def bench(n=300_000, distintas=10_000):
+    lineas = _lineas(n, distintas)
+    t0 = time.perf_counter()
+    _pipeline(lineas, _compute_signature)
+    sin_memo = time.perf_counter() - t0
+
+    clear_signature_cache()
+    t0 = time.perf_counter()
+    _pipeline(lineas, build_signature)
+    con_memo = time.perf_counter() - t0
+    stats = signature_cache_stats()
+
+    print(f"\nPipeline que firma {n:,} líneas ({distintas:,} distintas) 3 veces:")
+    print(f"  sin memo: {sin_memo:6.2f} s")
+    print(f"  con LRU:  {con_memo:6.2f} s  (x{sin_memo / con_memo:.2f}, "
+          f"{stats['hit_rate'] * 100:.1f}% hits, {stats['alert']['size']:,} entradas)")
+
+
+if __name__ == "__main__":
+    if signatures.SIGNATURE_CACHE_SIZE <= 0:
+        print("⚠️ SIGNATURE_CACHE_SIZE=0: memo desactivado, nada que probar")
+        sys.exit(0)
+    test_mismo_resultado_que_sin_memo()
+    test_reglas_de_aviso_y_resumen()
+    test_contadores()
+    test_lru_acotado()
+    test_colision_de_hash_no_comparte_firma()
+    test_firmas_de_registros_aparte()
+    print("✅ Firmas memoizadas: mismas firmas, contadores y LRU acotado")
+
+    bench()
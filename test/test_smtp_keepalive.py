@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+# test_smtp_keepalive.py
+"""
+Prueba de la conexión SMTP reutilizable de mailer/client.py contra un
+servidor SMTP local (aiosmtpd si está instalado, si no smtpd de la stdlib).
+
+- send_email() reutiliza una sola conexión para varios correos.
+- Si el servidor corta la conexión, el siguiente envío reconecta solo.
+- send_many() envía un lote por la misma conexión.
+- Benchmark: correos/segundo con conexión nueva por correo vs keep-alive.
+
+Uso:
+    python test/test_smtp_keepalive.py [cantidad]
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+import warnings
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class ServidorSMTPLocal:
+    """SMTP en 127.0.0.1 que cuenta correos y conexiones recibidas."""
+
+    def __init__(self):
+        self.port = _puerto_libre()
+        self.mensajes = 0
+        self.conexiones = 0
+
+    def start(self):
+        try:
+            self._start_aiosmtpd()
+        except ImportError:
+            self._start_smtpd()
+        return self
+
+    def _start_aiosmtpd(self):
+        from aiosmtpd.controller import Controller
+
+        servidor = self
+
+        class _Handler:
+            async def handle_EHLO(self, server, session, envelope, hostname, responses):
+                servidor.conexiones += 1
+                session.host_name = hostname
+                return responses
+
+            async def handle_DATA(self, server, session, envelope):
+                servidor.mensajes += 1
+                return "250 OK"
+
+        self._controller = Controller(_Handler(), hostname="127.0.0.1", port=self.port)
+        self._controller.start()
+        self.stop = self._controller.stop
+
+    def _start_smtpd(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", DeprecationWarning)
+            import asyncore
+            import smtpd
+
+        servidor = self
+
+        class _Channel(smtpd.SMTPChannel):
+            def __init__(self, *args, **kwargs):
+                servidor.conexiones += 1
+                super().__init__(*args, **kwargs)
+
+        class _Server(smtpd.SMTPServer):
+            channel_class = _Channel
+
+            def process_message(self, peer, mailfrom, rcpttos, data, **kwargs):
+                servidor.mensajes += 1
+
+        self._mapa = {}
+        self._server = _Server(("127.0.0.1", self.port), None, map=self._mapa)
+        self._corriendo = True
+        self._hilo = threading.Thread(
+            target=lambda: [asyncore.loop(timeout=0.05, count=1, map=self._mapa)
+                            for _ in iter(lambda: self._corriendo, False)],
+            daemon=True,
+        )
+        self._hilo.start()
+
+        def _stop():
+            self._corriendo = False
+            self._hilo.join()
+            asyncore.close_all(map=self._mapa)
+
+        self.stop = _stop
+        self.cortar_conexiones = lambda: [
+            ch.close() for ch in list(self._mapa.values()) if isinstance(ch, _Channel)
+        ]
+
+
+def _configurar(port: int) -> None:
+    os.environ.update({
+        "MAIL_HOST": "127.0.0.1",
+        "MAIL_PORT": str(port),
+        "MAIL_ENCRYPTION": "none",
+        "MAIL_FROM_ADDRESS": "alerts@example.test",
+        "NOTIFY_RATE_EMAIL": "0",
+    })
+    os.environ.pop("MAIL_USERNAME", None)
+    os.environ.pop("MAIL_PASSWORD", None)
+
+
+def _esperar(cond, timeout=2.0):
+    limite = time.monotonic() + timeout
+    while not cond() and time.monotonic() < limite:
+        time.sleep(0.01)
+
+
+def _caso_reutiliza_y_reconecta(servidor: ServidorSMTPLocal):
+    from mailer import client
+
+    client.close_smtp()
+    sender = client.get_smtp_sender()
+    inicio_conexiones = servidor.conexiones
+    inicio_msgs = servidor.mensajes
+
+    for i in range(5):
+        client.send_email(f"Prueba {i}", "<p>hola</p>", ["ops@example.test"])
+    _esperar(lambda: servidor.mensajes - inicio_msgs == 5)
+    assert servidor.mensajes - inicio_msgs == 5
+    assert servidor.conexiones - inicio_conexiones == 1, servidor.conexiones - inicio_conexiones
+
+    # El servidor corta la conexión: el siguiente envío reconecta solo
+    if hasattr(servidor, "cortar_conexiones"):
+        servidor.cortar_conexiones()
+        time.sleep(0.1)
+        client.send_email("Tras corte", "<p>hola</p>", ["ops@example.test"])
+        _esperar(lambda: servidor.mensajes - inicio_msgs == 6)
+        assert servidor.mensajes - inicio_msgs == 6
+        assert sender.reconnects == 1
+
+    # send_many por la misma conexión; los que no tienen destinatario se omiten
+    enviados = client.send_many(
+        [(f"Lote {i}", "<p>x</p>", ["ops@example.test"], "t4alerts") for i in range(10)]
+        + [("Sin destinatario", "<p>x</p>", [], None)]
+    )
+    assert enviados == 10
+    _esperar(lambda: servidor.mensajes - inicio_msgs == 16)
+    assert servidor.mensajes - inicio_msgs == 16
+    client.close_smtp()
+
+
+def test_smtp_keepalive():
+    servidor = ServidorSMTPLocal().start()
+    _configurar(servidor.port)
+    try:
+        _caso_reutiliza_y_reconecta(servidor)
+    finally:
+        servidor.stop()
+
+
+def benchmark(servidor: ServidorSMTPLocal, n: int = 200) -> None:
+    from mailer import client
+
+    print("=" * 70)
+    print(f"BENCHMARK SMTP local: {n} correos")
+    print("=" * 70)
+
+    client.close_smtp()
+    inicio = time.perf_counter()
+    for i in range(n):
+        msg = client.build_message(f"Legacy {i}", "<p>x</p>", ["ops@example.test"])
+        with client._smtp_client() as s:
+            s.send_message(msg)
+    t_legacy = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for i in range(n):
+        client.send_email(f"Keepalive {i}", "<p>x</p>", ["ops@example.test"])
+    t_keep = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    client.send_many([(f"Lote {i}", "<p>x</p>", ["ops@example.test"], None) for i in range(n)])
+    t_lote = time.perf_counter() - inicio
+    client.close_smtp()
+
+    print(f"conexión por correo : {n / t_legacy:8.0f} correos/s")
+    print(f"keep-alive          : {n / t_keep:8.0f} correos/s  (x{t_legacy / t_keep:.1f})")
+    print(f"send_many           : {n / t_lote:8.0f} correos/s  (x{t_legacy / t_lote:.1f})")
+    print("(contra un servidor remoto con STARTTLS + LOGIN la diferencia es mucho mayor)")
+
+
+if __name__ == "__main__":
+    test_smtp_keepalive()
+    print("✅ SMTP: una conexión reutilizada, reconexión tras corte y send_many OK\n")
+    servidor = ServidorSMTPLocal().start()
+    _configurar(servidor.port)
+    try:
+        benchmark(servidor, int(sys.argv[1]) if len(sys.argv) > 1 else 200)
+    finally:
+        servidor.stop()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# test_ssl_checker_concurrent.py
+"""
+Prueba del barrido SSL concurrente (SSLChecker.check_domains) contra servidores
+TLS locales con certificados autofirmados:
+
+- un servidor sano (certificado que vence en 30 días) y otro por vencer (2 días)
+- un "agujero negro" que acepta el TCP y nunca contesta el handshake
+- un puerto cerrado (connection refused)
+
+Todos se chequean a la vez bajo un deadline global: el barrido termina en
+~deadline aunque el agujero negro, chequeado en serie, se comería 8s de la
+stdlib + 10s del handshake de OpenSSL. Cada resultado trae su elapsed_ms.
+
+Uso:
+    python test/test_ssl_checker_concurrent.py
+"""
+
+import os
+import socket
+import ssl
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+
+from ssl_checker.checker import SSLChecker
+
+_DIR = tempfile.mkdtemp(prefix="ssl_test_")
+_HILOS = []
+
+
+def _cert_autofirmado(dias, nombre):
+    """(cert.pem, key.pem) de un certificado que vence en `dias` días."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    sujeto = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    ahora = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(sujeto)
+        .issuer_name(x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, f"Test CA {nombre}")]))
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(ahora - timedelta(days=1))
+        .not_valid_after(ahora + timedelta(days=dias, hours=12))
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = Path(_DIR) / f"{nombre}.pem"
+    key_path = Path(_DIR) / f"{nombre}.key"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                                           serialization.NoEncryption()))
+    return str(cert_path), str(key_path)
+
+
+def _escuchar():
+    srv = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    srv.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    srv.bind(("127.0.0.1", 0))
+    srv.listen(64)
+    return srv
+
+
+def _servidor_tls(dias, nombre, demora=0.0):
+    """Puerto de un servidor TLS que hace el handshake (tras `demora` s, simula la red) y cierra."""
+    ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ctx.load_cert_chain(*_cert_autofirmado(dias, nombre))
+    srv = _escuchar()
+
+    def aceptar():
+        while True:
+            threading.Thread(target=_atender_una, args=(srv.accept()[0], ctx, demora), daemon=True).start()
+
+    hilo = threading.Thread(target=aceptar, daemon=True)
+    hilo.start()
+    _HILOS.append(srv)
+    return srv.getsockname()[1]
+
+
+def _atender_una(conn, ctx, demora):
+    try:
+        time.sleep(demora)
+        conn.settimeout(5)
+        with ctx.wrap_socket(conn, server_side=True) as tls:
+            tls.recv(1)
+    except (ssl.SSLError, OSError):
+        pass
+
+
+def _agujero_negro():
+    """Puerto que acepta el TCP y nunca responde (el handshake se cuelga)."""
+    srv = _escuchar()
+    colgadas = []
+
+    def aceptar():
+        while True:
+            colgadas.append(srv.accept()[0])
+
+    threading.Thread(target=aceptar, daemon=True).start()
+    _HILOS.append(srv)
+    return srv.getsockname()[1]
+
+
+def _puerto_cerrado():
+    srv = _escuchar()
+    puerto = srv.getsockname()[1]
+    srv.close()
+    return puerto
+
+
+def test_barrido_concurrente_con_deadline():
+    sano = _servidor_tls(30, "sano")
+    por_vencer = _servidor_tls(2, "por_vencer")
+    muerto = _agujero_negro()
+    cerrado = _puerto_cerrado()
+
+    checker = SSLChecker()
+    deadline = 2.0
+    objetivos = [("localhost", sano), ("localhost", muerto), ("127.0.0.1", cerrado), ("localhost", por_vencer)]
+    t0 = time.monotonic()
+    results = checker.check_domains(objetivos, workers=8, deadline_seconds=deadline)
+    total = time.monotonic() - t0
+
+    assert [r["hostname"] for r in results] == ["localhost", "localhost", "127.0.0.1", "localhost"]
+    ok, colgado, rechazado, critico = results
+    assert ok["status"] == "OK" and ok["days_left"] == 30, ok
+    assert ok["issuer"] == "Test CA sano"
+    assert critico["status"] == "CRITICAL" and critico["days_left"] == 2, critico
+    assert colgado["status"] == "ERROR" and rechazado["status"] == "ERROR"
+    # El puerto cerrado no pasa por el reintento con OpenSSL
+    assert rechazado["elapsed_ms"] < 1000, rechazado
+    assert ok["elapsed_ms"] < 1000 and critico["elapsed_ms"] < 1000
+    # Todo termina en ~deadline, no en 8s + 10s por el host colgado
+    assert colgado["elapsed_ms"] <= (deadline + 0.5) * 1000, colgado
+    assert total < deadline + 1.5, total
+
+    print(f"  barrido de {len(objetivos)} hosts (1 colgado): {total:.2f}s con deadline {deadline:g}s")
+    for r in results:
+        print(f"    {r['hostname']:<10} {r['status']:<9} {r['elapsed_ms']:>7.1f} ms  {r.get('error', '')[:50]}")
+
+
+def test_muchos_hosts_en_paralelo():
+    # 150 ms por handshake: del orden de un host remoto real
+    puerto = _servidor_tls(90, "muchos", demora=0.15)
+    checker = SSLChecker()
+    objetivos = [("localhost", puerto)] * 24
+
+    t0 = time.monotonic()
+    serie = [checker.check_domain(h, p) for h, p in objetivos]
+    t_serie = time.monotonic() - t0
+    t0 = time.monotonic()
+    paralelo = checker.check_domains(objetivos, workers=8, deadline_seconds=10)
+    t_paralelo = time.monotonic() - t0
+
+    assert all(r["status"] == "OK" for r in serie + paralelo)
+    assert t_paralelo < t_serie / 2, (t_serie, t_paralelo)
+    print(f"  {len(objetivos)} hosts sanos: en serie {t_serie:.2f}s, en paralelo {t_paralelo:.2f}s")
+
+
+if __name__ == "__main__":
+    test_barrido_concurrente_con_deadline()
+    test_muchos_hosts_en_paralelo()
+    print("✅ Barrido SSL concurrente: deadline global, tiempos por host y sin reintentos inútiles")
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# test_stats_cache.py
+"""
+Prueba de la caché de /api/stats/view (db/stats_cache.py + t4alerts_backend/stats/cache.py)
+contra un Postgres local.
+
+- build_stats_payload() arma lo mismo que armaba la ruta (agrupado por firma).
+- Guardar / leer snapshots; uno viejo no pisa a uno más nuevo.
+- final / fresh / stale según la fecha y la antigüedad.
+- Lease entre workers: un solo claim_refresh() gana hasta que se suelta.
+- Un lease vencido (worker muerto a mitad del refresco) no deja la fila
+  marcada como "refreshing" para siempre: el próximo pedido la retoma.
+- refresh_in_background(): un solo refresco por (app, fecha) y deja el dato fresco.
+- GET /api/stats/view sirve desde la caché (con la antigüedad) sin scrapear.
+
+Requiere PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE (mismos defaults que db/connection.py).
+
+Uso:
+    python test/test_stats_cache.py
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no hace login
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+# Si algo importa la config del backend, que use una BD sqlite temporal (nunca instance/)
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='stats_cache_')}/t4alerts.db")
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+
+from app.log_entry import LogEntry
+from app.result import ScrapingResult
+from app.stats_snapshot import build_stats_payload, store_stats_snapshot
+from db.connection import get_cursor
+from db.stats_cache import (
+    claim_refresh,
+    ensure_stats_cache_db,
+    load_stats_snapshot,
+    release_refresh,
+    save_stats_snapshot,
+)
+from t4alerts_backend.stats import cache as stats_cache
+
+APP = "test_stats_cache_app"
+
+
+def _limpiar():
+    ensure_stats_cache_db()
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM stats_cache WHERE app_key = %s;", (APP,))
+
+
+def _resultado(dia):
+    sql = LogEntry("ERROR", "production", f"{dia} 10:00:00",
+                   "SQLSTATE[40001]: Serialization failure [stacktrace]\n#0 x.php")
+    sql2 = LogEntry("ERROR", "production", f"{dia} 10:00:00",
+                    "SQLSTATE[40001]: Serialization failure [stacktrace]\n#0 y.php")
+    otro = LogEntry("ERROR", "production", f"{dia} 09:00:00", "Undefined index: foo")
+    ctrl = LogEntry("INFO", "production", f"{dia} 08:00:00", '{"error":"token expirado"}')
+    return ScrapingResult(
+        app_key=APP, app_name="Test", dia=dia, fecha_str=str(dia),
+        controlados_nuevos=[ctrl], controlados_avisados=[],
+        no_controlados_nuevos=[sql], no_controlados_avisados=[sql2, otro],
+    )
+
+
+def test_payload():
+    dia = date(2026, 2, 15)
+    data = build_stats_payload(_resultado(dia))
+    nc = data["logs"]["uncontrolled"]
+    # Misma firma = una fila; el mensaje es el de la primera aparición
+    assert [e["count"] for e in nc] == [2, 1]
+    assert nc[0]["message"].endswith("#0 x.php")
+    assert data["stats"]["sql_errors"] == 2 and data["stats"]["non_sql_errors"] == 1
+    assert data["stats"]["sqlstate_distribution"] == [
+        {"sqlstate": "SQLSTATE[40001]", "count": 2, "first_time": "2026-02-15 00:00:00"}
+    ]
+    assert len(data["logs"]["controlled"]) == 1
+
+
+def test_guardar_y_leer():
+    _limpiar()
+    dia = date(2026, 2, 15)
+    assert load_stats_snapshot(APP, dia) is None
+    nuevo = datetime(2026, 2, 16, 8, 0)
+    assert store_stats_snapshot(_resultado(dia), computed_at=nuevo)
+    # Un resultado más viejo (una corrida lenta que terminó después) no pisa al nuevo
+    save_stats_snapshot(APP, dia, {"viejo": True}, nuevo - timedelta(hours=1))
+    snap = load_stats_snapshot(APP, dia)
+    assert snap["computed_at"] == nuevo and "viejo" not in snap["payload"]
+    assert snap["payload"]["stats"]["sql_errors"] == 2
+    _limpiar()
+
+
+def test_estados():
+    dia = date(2026, 2, 15)
+    ahora = datetime(2026, 2, 16, 12, 0)
+    assert stats_cache.snapshot_status(datetime(2026, 2, 16, 0, 0), dia, ahora) == stats_cache.FINAL
+    assert stats_cache.snapshot_status(datetime(2026, 2, 15, 23, 0), dia, ahora) == stats_cache.STALE
+    hoy = ahora.date()
+    assert stats_cache.snapshot_status(ahora - timedelta(seconds=10), hoy, ahora) == stats_cache.FRESH
+    assert stats_cache.snapshot_status(ahora - timedelta(hours=2), hoy, ahora) == stats_cache.STALE
+
+
+def test_lease():
+    _limpiar()
+    dia = date(2026, 2, 15)
+    assert claim_refresh(APP, dia, 600)
+    assert not claim_refresh(APP, dia, 600)   # otro worker
+    time.sleep(0.01)
+    assert claim_refresh(APP, dia, 0)          # lease vencido (worker muerto): se retoma
+    release_refresh(APP, dia)
+    assert claim_refresh(APP, dia, 600)
+    release_refresh(APP, dia)
+    # La fila vacía del claim no cuenta como resultado
+    assert load_stats_snapshot(APP, dia) is None
+    _limpiar()
+
+
+def test_lease_vencido_se_retoma():
+    _limpiar()
+    flask_app = Flask(__name__)
+    dia = datetime.now().date()
+    store_stats_snapshot(_resultado(dia), computed_at=datetime.now() - timedelta(hours=3))
+    # Un worker tomó el refresco y murió sin soltarlo
+    assert claim_refresh(APP, dia, 600)
+    with get_cursor() as cur:
+        cur.execute("UPDATE stats_cache SET refresh_started_at = NOW() - INTERVAL '1 hour' "
+                    "WHERE app_key = %s AND fecha = %s;", (APP, dia))
+    assert load_stats_snapshot(APP, dia, 7200)["refreshing"] is True
+    info = stats_cache.lookup(APP, dia)["cache"]
+    assert info["status"] == stats_cache.STALE and info["refreshing"] is False
+
+    llamadas = []
+
+    def refrescar(app_key, fecha):
+        llamadas.append(fecha)
+        store_stats_snapshot(_resultado(dia))
+        return {"ok": True}, 200
+
+    assert stats_cache.refresh_in_background(flask_app, APP, str(dia), dia, refrescar)
+    stats_cache.submit_once(flask_app, APP, str(dia), refrescar).result(timeout=10)
+    while stats_cache._EN_CURSO:
+        time.sleep(0.01)
+    assert llamadas and stats_cache.lookup(APP, dia)["cache"]["status"] == stats_cache.FRESH
+    _limpiar()
+
+
+def test_refresh_en_segundo_plano():
+    _limpiar()
+    flask_app = Flask(__name__)
+    dia = datetime.now().date()
+    date_str = str(dia)
+    store_stats_snapshot(_resultado(dia), computed_at=datetime.now() - timedelta(hours=3))
+    assert stats_cache.lookup(APP, dia)["cache"]["status"] == stats_cache.STALE
+
+    llamadas = []
+    puede_terminar = threading.Event()
+
+    def refrescar(app_key, fecha):
+        llamadas.append((app_key, fecha))
+        puede_terminar.wait(5)
+        store_stats_snapshot(_resultado(dia))
+        return {"ok": True}, 200
+
+    assert stats_cache.refresh_in_background(flask_app, APP, date_str, dia, refrescar)
+    # Mismo worker: comparte el que está en curso; otro worker: el lease lo frena
+    assert stats_cache.refresh_in_background(flask_app, APP, date_str, dia, refrescar)
+    assert not claim_refresh(APP, dia, 600)
+    puede_terminar.set()
+    stats_cache.submit_once(flask_app, APP, date_str, refrescar).result(timeout=10)
+    while stats_cache._EN_CURSO:
+        time.sleep(0.01)
+
+    assert len(llamadas) == 1
+    data = stats_cache.lookup(APP, dia)
+    assert data["cache"]["status"] == stats_cache.FRESH
+    assert data["cache"]["refreshing"] is False  # lease liberado
+    _limpiar()
+
+
+def test_ruta_sirve_desde_cache():
+    from t4alerts_backend.stats import stats_bp
+
+    _limpiar()
+    flask_app = Flask(__name__)
+    flask_app.config["JWT_SECRET_KEY"] = "clave-de-prueba-de-al-menos-32-bytes"
+    JWTManager(flask_app)
+    flask_app.register_blueprint(stats_bp, url_prefix="/api/stats")
+    with flask_app.app_context():
+        token = create_access_token(identity="tester")
+
+    ayer = datetime.now().date() - timedelta(days=1)
+    store_stats_snapshot(_resultado(ayer), computed_at=datetime.combine(datetime.now().date(), datetime.min.time()))
+
+    client = flask_app.test_client()
+    t0 = time.perf_counter()
+    resp = client.get(f"/api/stats/view/{APP}?date={ayer}", headers={"Authorization": f"Bearer {token}"})
+    ms = (time.perf_counter() - t0) * 1000
+    data = resp.get_json()
+    assert resp.status_code == 200, resp.data
+    assert data["source"] == "stats-cache"
+    assert data["cache"]["status"] == stats_cache.FINAL and data["cache"]["age_seconds"] >= 0
+    assert data["stats"]["sql_errors"] == 2
+    assert not stats_cache._EN_CURSO  # no se lanzó ningún scraping
+    print(f"  /api/stats/view desde la caché: {ms:.1f} ms")
+    _limpiar()
+
+
+if __name__ == "__main__":
+    test_payload()
+    test_guardar_y_leer()
+    test_estados()
+    test_lease()
+    test_lease_vencido_se_retoma()
+    test_refresh_en_segundo_plano()
+    test_ruta_sirve_desde_cache()
+    print("✅ stats_cache: snapshots, stale-while-revalidate, lease y ruta sin scraping")
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# test_synthetic_monitor.py
+"""
+Prueba del monitoreo sintético (synth_monitoring/monitor.py) contra un
+servidor HTTP local con login por formulario (CSRF + POST) y un Postgres local.
+
+- run_all_checks() chequea las apps a la vez: la ronda dura ~lo que la app
+  más lenta, no la suma
+- cada chequeo trae el tiempo de cada fase (dns / connect / login / logs_ttfb)
+- la ronda queda en synthetic_checks y latency_baselines() da los p50/p95/p99
+- con historial, un login lento supera el p99 de la propia app y alerta
+  señalando la fase "login"; sin historial se usa el umbral fijo
+
+Requiere PGHOST/PGPORT/PGUSER/PGPASSWORD/PGDATABASE (mismos defaults que db/connection.py).
+
+Uso:
+    python test/test_synthetic_monitor.py
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# app.config exige credenciales al importarse; este test no usa apps reales
+os.environ.setdefault("DRIVERAPP_USER", "offline")
+os.environ.setdefault("DRIVERAPP_PASS", "offline")
+
+from app.config import APPS_CONFIG
+from db.connection import get_cursor
+from db.synthetic_checks import ensure_synthetic_checks_db, latency_baselines, save_synthetic_checks
+from synth_monitoring import monitor as synth
+
+APPS = ["synth_test_a", "synth_test_b", "synth_test_c"]
+DEMORA_LOGIN = {"synth_test_a": 0.3, "synth_test_b": 0.3, "synth_test_c": 0.3}
+SLACK = []
+
+
+class _App(BaseHTTPRequestHandler):
+    """GET /<app>/login (form con _token), POST /<app>/login, GET /<app>/logs."""
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, cuerpo=b"", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        app_key, pagina = self.path.strip("/").split("/", 1)
+        if pagina == "login":
+            self._responder(200, b'<form><input name="_token" value="t"><input name="email">'
+                                 b'<input name="password"></form>')
+        elif pagina == "logs":
+            ok = "sesion=1" in self.headers.get("Cookie", "")
+            self._responder(200 if ok else 302, b"[2026-01-01 10:00:00] production.ERROR: x",
+                            None if ok else {"Location": f"/{app_key}/login"})
+        else:
+            self._responder(404)
+
+    def do_POST(self):
+        app_key = self.path.strip("/").split("/", 1)[0]
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        time.sleep(DEMORA_LOGIN[app_key])
+        self._responder(302, headers={"Location": f"/{app_key}/logs", "Set-Cookie": "sesion=1; Path=/"})
+
+
+_BASE_URL = []
+
+
+@contextmanager
+def _solo_apps_de_prueba():
+    """APPS_CONFIG con solo las apps del servidor local; Slack capturado en SLACK."""
+    if not _BASE_URL:
+        srv = ThreadingHTTPServer(("127.0.0.1", 0), _App)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        _BASE_URL.append(f"http://localhost:{srv.server_address[1]}")
+    original = dict(APPS_CONFIG)
+    APPS_CONFIG.clear()
+    for app_key in APPS:
+        APPS_CONFIG[app_key] = {
+            "name": app_key, "base_url": _BASE_URL[0], "username": "u", "password": "p",
+            "login_path": f"/{app_key}/login", "logs_path": f"/{app_key}/logs",
+        }
+    slack_original = synth.enviar_aviso_slack
+    synth.enviar_aviso_slack = SLACK.append
+    SLACK.clear()
+    try:
+        yield
+    finally:
+        synth.enviar_aviso_slack = slack_original
+        APPS_CONFIG.clear()
+        APPS_CONFIG.update(original)
+
+
+def _limpiar():
+    ensure_synthetic_checks_db()
+    with get_cursor() as cur:
+        cur.execute("DELETE FROM synthetic_checks WHERE app_key = ANY(%s);", (APPS,))
+
+
+def test_ronda_en_paralelo_con_fases():
+    _limpiar()
+    monitor = synth.SyntheticMonitor()
+    with _solo_apps_de_prueba():
+        t0 = time.monotonic()
+        results = monitor.run_all_checks()
+        total = time.monotonic() - t0
+
+    assert list(results) == APPS
+    for r in results.values():
+        assert r["success"], r
+        fases = r["phases_ms"]
+        assert set(fases) == {"dns", "connect", "login", "logs_ttfb", "total"}, fases  # http: sin tls
+        assert fases["login"] >= 300, fases
+        assert r["degradation"] is None
+    # Tres logins de 300 ms a la vez
+    assert total < 0.3 * len(APPS), total
+
+    base = latency_baselines(APPS, datetime.now() - timedelta(hours=1))
+    assert base["synth_test_a"]["samples"] == 1
+    assert base["synth_test_a"]["login"]["p50"] >= 300
+    print(f"  ronda de {len(APPS)} apps (login de 300 ms c/u): {total:.2f}s")
+    print(f"    fases de synth_test_a: {results['synth_test_a']['phases_ms']}")
+
+
+def test_detect_degradation():
+    base = {"samples": 50,
+            "total": {"p50": 1000.0, "p95": 1500.0, "p99": 2500.0},
+            "login": {"p50": 600.0, "p95": 900.0, "p99": 1200.0},
+            "dns": {"p50": 5.0, "p95": 10.0, "p99": 20.0}}
+    normal = {"success": True, "phases_ms": {"total": 1400.0, "login": 700.0, "dns": 5.0}}
+    assert synth.detect_degradation(normal, base) is None
+    p95 = {"success": True, "phases_ms": {"total": 2100.0, "login": 1500.0, "dns": 5.0}}
+    assert synth.detect_degradation(p95, base)["level"] == "p95"
+    lento = {"success": True, "phases_ms": {"total": 3000.0, "login": 2500.0, "dns": 6.0}}
+    deg = synth.detect_degradation(lento, base)
+    assert deg["level"] == "p99" and deg["phase"] == "login" and deg["phase_p50_ms"] == 600.0
+    # Poco historial: umbral fijo (SYNTH_SLOW_SECONDS)
+    assert synth.detect_degradation(lento, {"samples": 3}) is None
+    muy_lento = {"success": True, "phases_ms": {"total": synth.SYNTH_SLOW_SECONDS * 1000 + 1}}
+    assert synth.detect_degradation(muy_lento, None)["level"] == "fixed"
+
+
+def test_alerta_contra_el_historial_propio():
+    _limpiar()
+    # Historial: synth_test_a siempre hizo login en ~300 ms
+    ahora = datetime.now()
+    save_synthetic_checks([
+        {"app_key": "synth_test_a", "checked_at": ahora - timedelta(minutes=5 * i), "success": True,
+         "phases_ms": {"dns": 1.0, "connect": 1.0, "login": 300.0 + i, "logs_ttfb": 5.0, "total": 320.0 + i}}
+        for i in range(synth.SYNTH_MIN_SAMPLES + 5)
+    ])
+    DEMORA_LOGIN["synth_test_a"] = 0.3 + synth.SYNTH_MIN_DEGRADATION_MS / 1000 + 0.2
+    try:
+        with _solo_apps_de_prueba():
+            results = synth.SyntheticMonitor().run_all_checks()
+            alertas = list(SLACK)
+    finally:
+        DEMORA_LOGIN["synth_test_a"] = 0.3
+    deg = results["synth_test_a"]["degradation"]
+    assert deg and deg["level"] == "p99" and deg["phase"] == "login", deg
+    assert results["synth_test_b"]["degradation"] is None  # sin historial y rápida
+    assert len(alertas) == 1 and "synth_test_a" in alertas[0]
+    print(f"  alerta p99: {alertas[0].splitlines()[-1]}")
+    _limpiar()
+
+
+if __name__ == "__main__":
+    test_detect_degradation()
+    test_ronda_en_paralelo_con_fases()
+    test_alerta_contra_el_historial_propio()
+    print("✅ Monitoreo sintético: en paralelo, fases por chequeo, historial y alertas por percentil")